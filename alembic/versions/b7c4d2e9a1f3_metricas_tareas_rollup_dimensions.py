@@ -0,0 +1,52 @@
+"""metricas_tareas_rollup_dimensions
+
+Revision ID: b7c4d2e9a1f3
+Revises: 8a888f8e3bc5
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c4d2e9a1f3'
+down_revision: Union[str, Sequence[str], None] = '8a888f8e3bc5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Convierte metricas_tareas en el rollup (fecha, usuario, tipo, prioridad, estado)."""
+    # La tabla nunca se pobló; la reconciliación inicial al arrancar la API la
+    # reconstruye desde tareas (hasta entonces /stats/user lee los agregados)
+    op.execute("DELETE FROM metricas_tareas")
+
+    estado_tarea = postgresql.ENUM(
+        'PROGRAMMED', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED', 'PAUSED',
+        name='estado_tarea', create_type=False,
+    )
+    op.add_column('metricas_tareas', sa.Column('fecha', sa.Date(), nullable=False))
+    op.add_column('metricas_tareas', sa.Column('usuario_id', sa.Integer(), nullable=False))
+    op.add_column('metricas_tareas', sa.Column('estado', estado_tarea, nullable=False))
+    op.add_column(
+        'metricas_tareas',
+        sa.Column('tareas_con_duracion', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.create_unique_constraint(
+        'uq_metricas_tareas_rollup',
+        'metricas_tareas',
+        ['fecha', 'usuario_id', 'tipo_tarea', 'prioridad', 'estado'],
+    )
+
+
+def downgrade() -> None:
+    """Elimina las dimensiones del rollup."""
+    op.drop_constraint('uq_metricas_tareas_rollup', 'metricas_tareas', type_='unique')
+    op.drop_column('metricas_tareas', 'tareas_con_duracion')
+    op.drop_column('metricas_tareas', 'estado')
+    op.drop_column('metricas_tareas', 'usuario_id')
+    op.drop_column('metricas_tareas', 'fecha')
@@ -0,0 +1,46 @@
+"""tareas_ubicacion_indexes
+
+Revision ID: c3e8f1a2b4d6
+Revises: b7c4d2e9a1f3
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f1a2b4d6'
+down_revision: Union[str, Sequence[str], None] = 'b7c4d2e9a1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_postgis() -> bool:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return False
+    return bind.execute(sa.text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first() is not None
+
+
+def upgrade() -> None:
+    """Índices para el filtro por radio de /geo/map/view.
+
+    Siempre crea el índice compuesto (lat, lon) para el bounding box; si la
+    extensión PostGIS está instalada añade un índice GIST sobre la misma
+    expresión geography que usa ST_DWithin.
+    """
+    op.create_index('ix_tareas_ubicacion', 'tareas', ['ubicacion_lat', 'ubicacion_lon'])
+    if _has_postgis():
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_tareas_ubicacion_geog ON tareas USING GIST "
+            "(geography(ST_SetSRID(ST_MakePoint(ubicacion_lon, ubicacion_lat), 4326)))"
+        )
+
+
+def downgrade() -> None:
+    """Elimina los índices de ubicación de tareas."""
+    op.execute("DROP INDEX IF EXISTS ix_tareas_ubicacion_geog")
+    op.drop_index('ix_tareas_ubicacion', table_name='tareas')
@@ -0,0 +1,35 @@
+"""tareas_delegado_estado_index
+
+Revision ID: d4f9a3b5c7e8
+Revises: c3e8f1a2b4d6
+Create Date: 2026-10-18 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f9a3b5c7e8'
+down_revision: Union[str, Sequence[str], None] = 'c3e8f1a2b4d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Índice compuesto para /telegram/tasks/user/{telegram_id}.
+
+    Cubre los conteos por estado de un delegado y el recorrido por
+    inicio_programado de sus tareas activas (paginación por cursor).
+    """
+    op.create_index(
+        'ix_tareas_delegado_estado_inicio',
+        'tareas',
+        ['delegado_usuario_id', 'estado', 'inicio_programado'],
+    )
+
+
+def downgrade() -> None:
+    """Elimina el índice compuesto por delegado y estado."""
+    op.drop_index('ix_tareas_delegado_estado_inicio', table_name='tareas')
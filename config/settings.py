@@ -117,14 +117,109 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
+    # Caché L1 en proceso delante de Redis (0 entradas = deshabilitada)
+    CACHE_L1_MAX_ENTRIES: int = 1000
+    CACHE_L1_TTL_SECONDS: float = 10.0
+    CACHE_L1_MAX_BYTES: int = 16 * 1024 * 1024
+
+    # === WEBSOCKETS ===
+    # Tamaño de la cola de salida por conexión y política ante consumidores lentos
+    # (drop_oldest | coalesce | disconnect)
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"
+    # Pub/Sub Redis entre workers: ventana de micro-batching (0 = publicar al
+    # instante), tamaño máximo del lote y canales por topic
+    WS_PUBSUB_BATCH_WINDOW_MS: float = 0.0
+    WS_PUBSUB_MAX_BATCH: int = 100
+    WS_PUBSUB_SHARD_BY_TOPIC: bool = True
+    # Colas de eventos del emisor/integrador: los eventos de una misma
+    # entidad dentro de la ventana se fusionan y se envían en un frame por
+    # lote. Con la cola llena: block (espera hasta
+    # WS_EVENT_ENQUEUE_TIMEOUT_SECONDS) | drop_oldest | degrade
+    WS_EVENT_BATCH_WINDOW_MS: float = 50.0
+    WS_EVENT_MAX_BATCH: int = 200
+    WS_EVENT_QUEUE_SIZE: int = 10_000
+    WS_EVENT_OVERFLOW_POLICY: str = "block"
+    WS_EVENT_ENQUEUE_TIMEOUT_SECONDS: float = 0.5
+
+    # === MÉTRICAS DE TAREAS ===
+    # Rollup incremental en metricas_tareas y reconciliación periódica
+    # desde tareas (0 segundos = sin reconciliación periódica)
+    TASK_METRICS_ROLLUP_ENABLED: bool = True
+    TASK_METRICS_RECONCILE_INTERVAL_SECONDS: float = 3600.0
+
+    # === DESPACHO DE EMERGENCIAS ===
+    # Índice espacial en memoria de efectivos (reconstrucción periódica
+    # desde la BD; 0 segundos = solo al arrancar)
+    EFECTIVO_INDEX_ENABLED: bool = True
+    EFECTIVO_INDEX_REFRESH_SECONDS: float = 300.0
+
+    # === DASHBOARD ===
+    # Contadores del dashboard en memoria (eventos de modelo + reconciliación
+    # SQL periódica; 0 segundos = sin reconciliación periódica) y deltas a
+    # los suscriptores como mucho cada DASHBOARD_PUBLISH_INTERVAL_SECONDS
+    DASHBOARD_STATE_ENABLED: bool = True
+    DASHBOARD_RECONCILE_INTERVAL_SECONDS: float = 60.0
+    DASHBOARD_PUBLISH_INTERVAL_SECONDS: float = 1.0
+
+    # === RATE LIMITING ===
+    # Backend del limitador GCRA: memory (por proceso, LRU acotado a
+    # RATE_LIMIT_MAX_CLIENTS) | redis (compartido entre workers)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_CLIENTS: int = 100_000
+
+    # === AUDIT TRAIL ===
+    # Escritura diferida por lotes: los eventos se encolan y un escritor de
+    # fondo los inserta al llegar a AUDIT_BATCH_SIZE filas o tras
+    # AUDIT_FLUSH_INTERVAL_SECONDS. Durabilidad: async (nadie espera) |
+    # critical (los eventos CRITICAL esperan a su lote) | sync (todos esperan)
+    AUDIT_WRITE_BEHIND_ENABLED: bool = True
+    AUDIT_DURABILITY: str = "critical"
+    AUDIT_QUEUE_SIZE: int = 10_000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # Espera máxima con la cola llena antes de escribir el evento en línea
+    AUDIT_ENQUEUE_TIMEOUT_SECONDS: float = 0.05
+    # Espera máxima de un evento durable hasta la confirmación de su lote
+    AUDIT_FLUSH_TIMEOUT_SECONDS: float = 5.0
+    AUDIT_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0
+
+    # === INSTRUMENTACIÓN SQL ===
+    # Fingerprints de sentencias con latencias/filas por ruta; una sentencia
+    # repetida SQL_N_PLUS_ONE_THRESHOLD veces en una solicitud se marca N+1
+    SQL_INSTRUMENTATION_ENABLED: bool = True
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10
+    SQL_MAX_FINGERPRINTS: int = 1000
 
     # === TELEGRAM BOT ===
     TELEGRAM_TOKEN: str
     ADMIN_CHAT_ID: str
     WHITELIST_IDS: List[int]
+    # Con TELEGRAM_WEBHOOK_URL (URL pública) el bot usa webhook; sin ella, polling
     TELEGRAM_WEBHOOK_URL: Optional[str] = None
     TELEGRAM_WEBHOOK_PATH: str = "/webhook/telegram"
     TELEGRAM_WEBHOOK_PORT: int = 8000
+    TELEGRAM_WEBHOOK_LISTEN: str = "0.0.0.0"
+    TELEGRAM_WEBHOOK_SECRET: Optional[str] = None
+    # Updates procesados a la vez (los de un mismo chat siempre en orden)
+    BOT_MAX_CONCURRENT_UPDATES: int = 32
+    # Puerto del endpoint Prometheus del bot (None = deshabilitado)
+    BOT_METRICS_PORT: Optional[int] = None
+    # Cliente HTTP del bot hacia la API: pool keep-alive compartido,
+    # timeout por llamada y reintentos con jitter para errores transitorios
+    API_BASE_URL: str = "http://api:8000/api/v1"
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_MAX_RETRIES: int = 2
+    HTTP_MAX_CONNECTIONS: int = 20
+    # Caché de lectura del bot (pendientes por usuario, listas de usuarios)
+    BOT_CACHE_TTL_SECONDS: float = 60.0
+    BOT_CACHE_MAX_ENTRIES: int = 5000
+    # WebSocket de la API para invalidar la caché ante eventos de tareas (opcional)
+    BOT_CACHE_WS_URL: Optional[str] = None
+    # Sesiones de wizard: memory (una réplica) | redis (compartidas entre réplicas)
+    BOT_WIZARD_STORE: str = "memory"
+    BOT_WIZARD_REDIS_URL: Optional[str] = None
+    BOT_WIZARD_SESSION_TTL_SECONDS: int = 1800
 
     # === TIMEZONE ===
     TZ: str = "UTC"
@@ -144,6 +239,8 @@ class Settings(BaseSettings):
     # === LOGGING ===
     LOG_LEVEL: str = "INFO"
     LOG_FILE: Optional[str] = None
+    # Consola escrita por lotes desde un hilo en lugar de en cada llamada
+    LOG_ASYNC_SINK: bool = False
 
     # === MONITOREO ===
     PROMETHEUS_ENABLED: bool = True
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput del bot frente a una API lenta.
+
+Levanta un servidor HTTP local que responde con ``--latency-ms`` de retardo
+y procesa ``--updates`` updates simulados con concurrencia (como
+``concurrent_updates`` de python-telegram-bot). Cada update consulta las
+tareas pendientes de un usuario:
+
+- ``requests``: cliente bloqueante anterior (``requests.get`` sin sesión);
+  cada llamada congela el event loop y abre una conexión nueva;
+- ``httpx``: ``ApiService`` asíncrono con pool keep-alive compartido y
+  deduplicación de GET en vuelo.
+
+Uso:
+    python scripts/bot_api_benchmark.py [--updates 200] [--users 50] [--latency-ms 100] [--concurrency 64]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import requests  # noqa: E402
+
+from src.bot.services.api_service import ApiService, close_http_client  # noqa: E402
+from src.schemas.tarea import Tarea  # noqa: E402
+
+TASK = {
+    "id": 1, "uuid": "5f0c6a2e-8d0b-4c55-9a41-2b7f1c9e0d11", "codigo": "TSK001",
+    "titulo": "Patrullaje", "tipo": "patrullaje", "estado": "programada", "prioridad": 3,
+    "inicio_programado": "2025-01-01T10:00:00", "delegado_usuario_id": 1, "creado_por_usuario_id": 1,
+}
+
+
+class LegacyApiService:
+    """ApiService anterior: ``requests.get`` bloqueante, sin sesión ni pool."""
+
+    def __init__(self, api_url: str):
+        self.api_url = api_url
+
+    def get_user_pending_tasks(self, telegram_id: int):
+        try:
+            response = requests.get(
+                f"{self.api_url}/tasks/user/telegram/{telegram_id}?status=pending", timeout=10
+            )
+            response.raise_for_status()
+            return [Tarea(**t) for t in response.json()]
+        except requests.exceptions.RequestException:
+            return []
+
+
+def _serve(latency: float) -> ThreadingHTTPServer:
+    body = json.dumps([TASK]).encode()
+    counter = {"requests": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            counter["requests"] += 1
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            return None
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.counter = counter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _process(updates: int, users: int, concurrency: int, handle) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await handle(i % users)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(updates)))
+    return updates / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    server = _serve(args.latency_ms / 1000)
+    base = f"http://127.0.0.1:{server.server_port}/api/v1"
+
+    legacy = LegacyApiService(base)
+
+    async def legacy_handle(user_id: int) -> None:
+        # Llamada bloqueante dentro de un handler async, como antes
+        legacy.get_user_pending_tasks(user_id)
+
+    service = ApiService(base)
+
+    async def async_handle(user_id: int) -> None:
+        await service.get_user_pending_tasks(user_id)
+
+    print(f"updates={args.updates} usuarios={args.users} latencia={args.latency_ms:.0f} ms "
+          f"concurrencia={args.concurrency}")
+    print(f"{'cliente':>9} | {'updates/s':>9} | {'solicitudes API':>15}")
+    for label, handle in (("requests", legacy_handle), ("httpx", async_handle)):
+        server.counter["requests"] = 0
+        rate = await _process(args.updates, args.users, args.concurrency, handle)
+        print(f"{label:>9} | {rate:>9.1f} | {server.counter['requests']:>15}")
+
+    await close_http_client()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
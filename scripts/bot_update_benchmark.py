@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Harness de carga del procesamiento de updates del bot.
+
+Encola ``Update`` sintéticos en ``application.update_queue`` (el mismo
+camino que el webhook) repartidos entre ``--chats`` chats. El handler simula
+E/S con ``--handler-ms`` de espera y una fracción ``--slow-ratio`` de updates
+tarda ``--slow-ms``. Compara:
+
+- ``secuencial``: procesamiento por defecto de python-telegram-bot;
+- ``concurrente``: ``SimpleUpdateProcessor`` (sin orden por chat);
+- ``por-chat``: ``PerChatUpdateProcessor`` (concurrente, orden por chat).
+
+Mide updates/s, latencia p50/p99 (de encolado a fin del handler) y cuántos
+updates se procesaron fuera de orden dentro de su chat. No usa red: las
+llamadas a la API de Telegram las responde un ``BaseRequest`` local.
+
+Uso:
+    python scripts/bot_update_benchmark.py [--updates 2000] [--chats 200] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from telegram import Update  # noqa: E402
+from telegram.ext import ApplicationBuilder, MessageHandler, SimpleUpdateProcessor, filters  # noqa: E402
+from telegram.request import BaseRequest, RequestData  # noqa: E402
+
+from src.bot.utils.update_processor import PerChatUpdateProcessor  # noqa: E402
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "GAD", "username": "gad_bench_bot"}
+
+
+class OfflineRequest(BaseRequest):
+    """Responde localmente a la API de Telegram (getMe y demás métodos)."""
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        result = BOT_USER if url.endswith("/getMe") else True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def _update(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": f"{update_id}",
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Agente"},
+        },
+    }
+
+
+async def _run(processor, args) -> Dict[str, float]:
+    builder = ApplicationBuilder().token("1:bench").request(OfflineRequest()).updater(None)
+    builder = builder.concurrent_updates(processor) if processor is not None else builder
+    application = builder.build()
+
+    rng = random.Random(42)
+    enqueued: Dict[int, float] = {}
+    latencies: List[float] = []
+    last_seen: Dict[int, int] = {}
+    out_of_order = 0
+    done = asyncio.Event()
+
+    async def handler(update, context) -> None:
+        nonlocal out_of_order
+        update_id = update.update_id
+        delay = args.slow_ms if rng.random() < args.slow_ratio else args.handler_ms
+        await asyncio.sleep(delay / 1000)
+        chat_id = update.effective_chat.id
+        if last_seen.get(chat_id, -1) > update_id:
+            out_of_order += 1
+        last_seen[chat_id] = max(last_seen.get(chat_id, -1), update_id)
+        latencies.append(time.perf_counter() - enqueued[update_id])
+        if len(latencies) == args.updates:
+            done.set()
+
+    application.add_handler(MessageHandler(filters.ALL, handler))
+    updates = [Update.de_json(_update(i, rng.randrange(args.chats)), application.bot) for i in range(args.updates)]
+
+    async with application:
+        await application.start()
+        start = time.perf_counter()
+        for update in updates:
+            enqueued[update.update_id] = time.perf_counter()
+            await application.update_queue.put(update)
+        await done.wait()
+        elapsed = time.perf_counter() - start
+        await application.stop()
+
+    latencies.sort()
+    return {
+        "updates_s": args.updates / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "out_of_order": out_of_order,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--handler-ms", type=float, default=5.0)
+    parser.add_argument("--slow-ms", type=float, default=500.0)
+    parser.add_argument("--slow-ratio", type=float, default=0.01)
+    parser.add_argument("--skip-sequential", action="store_true", help="omite el modo secuencial (lento)")
+    args = parser.parse_args()
+
+    modes = [
+        ("concurrente", lambda: SimpleUpdateProcessor(args.concurrency)),
+        ("por-chat", lambda: PerChatUpdateProcessor(args.concurrency)),
+    ]
+    if not args.skip_sequential:
+        modes.insert(0, ("secuencial", lambda: None))
+
+    print(f"updates={args.updates} chats={args.chats} concurrencia={args.concurrency} "
+          f"handler={args.handler_ms}ms lentos={args.slow_ratio:.0%}x{args.slow_ms}ms")
+    print(f"{'modo':>12} | {'updates/s':>10} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'fuera de orden':>14}")
+    for label, factory in modes:
+        result = await _run(factory(), args)
+        print(f"{label:>12} | {result['updates_s']:>10.1f} | {result['p50_ms']:>9.1f} | "
+              f"{result['p99_ms']:>9.1f} | {result['out_of_order']:>14}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del índice espacial de efectivos (k-NN con filtros).
+
+Compara la búsqueda por anillos de celdas de ``EfectivoSpatialIndex`` con
+un recorrido lineal de todos los efectivos, para varios tamaños de flota
+repartida en ~110 x 110 km.
+
+Uso:
+    python scripts/efectivo_index_benchmark.py [--sizes 1000,10000,100000] [--queries 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.api.models.efectivo import EstadoDisponibilidad  # noqa: E402
+from src.core.geo.efectivo_index import EfectivoEntry, EfectivoSpatialIndex, haversine_m  # noqa: E402
+
+CENTER = (-34.6037, -58.3816)
+
+
+def _linear(entries, lat, lng, k):
+    found = [
+        (haversine_m(lat, lng, e.lat, e.lng), e.efectivo_id)
+        for e in entries
+        if e.estado == EstadoDisponibilidad.DISPONIBLE
+    ]
+    return sorted(found)[:k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    estados = list(EstadoDisponibilidad)
+    print(f"{'efectivos':>9} | {'lineal (µs)':>11} | {'índice (µs)':>11} | {'speedup':>7}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rng = random.Random(size)
+        entries = [
+            EfectivoEntry(i, CENTER[0] + rng.uniform(-0.5, 0.5), CENTER[1] + rng.uniform(-0.5, 0.5),
+                          estados[i % len(estados)])
+            for i in range(size)
+        ]
+        index = EfectivoSpatialIndex()
+        index.replace_all(entries)
+        points = [(CENTER[0] + rng.uniform(-0.5, 0.5), CENTER[1] + rng.uniform(-0.5, 0.5))
+                  for _ in range(args.queries)]
+
+        linear_queries = points[: max(1, args.queries // max(1, size // 1000))]
+        start = time.perf_counter()
+        for lat, lng in linear_queries:
+            _linear(entries, lat, lng, args.k)
+        linear_us = (time.perf_counter() - start) / len(linear_queries) * 1e6
+
+        start = time.perf_counter()
+        for lat, lng in points:
+            index.nearest(lat, lng, k=args.k)
+        index_us = (time.perf_counter() - start) / len(points) * 1e6
+
+        print(f"{size:>9} | {linear_us:>11.1f} | {index_us:>11.1f} | {linear_us / index_us:>6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark del registro de latencias por endpoint de PerformanceMiddleware.
+
+Simula tráfico a ``/api/v1/tasks/{task_id}`` con muchos ids distintos y
+compara el registro anterior (clave = ruta cruda, solo media y máximo) con
+el actual (clave = plantilla de ruta, histograma log-lineal de tamaño fijo):
+coste por solicitud, número de claves y memoria retenida.
+
+Uso:
+    python scripts/endpoint_latency_benchmark.py [--requests 200000] [--ids 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.core.performance import PerformanceMiddleware  # noqa: E402
+
+
+class LegacyPathMiddleware:
+    """Registro anterior: diccionario de stats por ruta cruda."""
+
+    def __init__(self):
+        self.endpoint_stats = {}
+
+    def record_request(self, method, path, duration, status_code):
+        key = f"{method} {path}"
+        if key not in self.endpoint_stats:
+            self.endpoint_stats[key] = {"count": 0, "total_duration": 0.0, "avg_duration": 0.0,
+                                        "max_duration": 0.0, "status_codes": {}, "errors": 0}
+        stats = self.endpoint_stats[key]
+        stats["count"] += 1
+        stats["total_duration"] += duration
+        stats["avg_duration"] = stats["total_duration"] / stats["count"]
+        stats["max_duration"] = max(stats["max_duration"], duration)
+        status_key = str(status_code)
+        stats["status_codes"][status_key] = stats["status_codes"].get(status_key, 0) + 1
+        if status_code >= 400:
+            stats["errors"] += 1
+
+
+def _run(tracker, keys, durations):
+    start = time.perf_counter()
+    for key, duration in zip(keys, durations):
+        tracker.record_request("GET", key, duration, 200)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def _retained_kb(factory, keys, durations):
+    tracemalloc.start()
+    tracker = factory()
+    for key, duration in zip(keys, durations):
+        tracker.record_request("GET", key, duration, 200)
+    retained = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    return retained, len(tracker.endpoint_stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--ids", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    durations = [rng.lognormvariate(-4, 1) for _ in range(args.requests)]
+    raw_paths = [f"/api/v1/tasks/{rng.randrange(args.ids)}" for _ in range(args.requests)]
+    templates = ["/api/v1/tasks/{task_id}"] * args.requests
+
+    print(f"solicitudes={args.requests} ids={args.ids}")
+    print(f"{'registro':>10} | {'µs/solicitud':>12} | {'claves':>7} | {'memoria (KB)':>12}")
+    for label, factory, keys in (
+        ("ruta", LegacyPathMiddleware, raw_paths),
+        ("plantilla", PerformanceMiddleware, templates),
+    ):
+        per_request = _run(factory(), keys, durations)
+        retained, key_count = _retained_kb(factory, keys, durations)
+        print(f"{label:>10} | {per_request:>12.2f} | {key_count:>7} | {retained:>12.0f}")
+
+    tracker = PerformanceMiddleware()
+    _run(tracker, templates, durations)
+    stats = tracker.get_statistics()["endpoints"]["GET /api/v1/tasks/{task_id}"]
+    exact = sorted(durations)
+    for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999)):
+        print(f"{label}: histograma {stats['percentiles_ms'][label]:.3f} ms "
+              f"| exacto {exact[int(q * len(exact)) - 1] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
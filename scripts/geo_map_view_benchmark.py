@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /geo/map/view: filtro por radio en Python sobre todas las
+tareas con ubicación (ruta anterior) frente al prefiltro por bounding box
+en SQL más refinamiento de candidatos (``find_tasks_within_radius``).
+
+Usa SQLite en archivo temporal con el índice ``ix_tareas_ubicacion``;
+las tareas se reparten en un área de ~110 x 110 km alrededor del centro.
+
+Uso:
+    python scripts/geo_map_view_benchmark.py [--sizes 1000,10000,100000] [--radius-m 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+CENTER = (-34.6037, -58.3816)
+USER_ID = 1
+
+
+def _engine(path: str):
+    from sqlalchemy.dialects.postgresql import UUID as sa_UUID
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(sa_UUID, "sqlite")
+    def _uuid_sqlite(element, compiler, **kw):  # noqa: ANN001
+        return "CHAR(32)"
+
+    from src.api.models.base import Base
+
+    Base.metadata.schema = None
+    for table in Base.metadata.tables.values():
+        table.schema = None
+    return create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+
+async def _populate(engine, size: int) -> None:
+    import uuid
+
+    from sqlalchemy import insert
+
+    from src.api.models.base import Base
+    from src.api.models.tarea import Tarea
+    from src.shared.constants import TaskPriority, TaskStatus, TaskType
+
+    rng = random.Random(42)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        now = datetime.utcnow()
+        rows = []
+        for i in range(size):
+            rows.append({
+                "uuid": uuid.uuid4(),
+                "codigo": f"GEO{i:07d}",
+                "titulo": f"Tarea {i}",
+                "tipo": TaskType.PATRULLAJE,
+                "prioridad": TaskPriority(1 + i % 5),
+                "estado": TaskStatus.PROGRAMMED,
+                "inicio_programado": now,
+                "delegado_usuario_id": USER_ID,
+                "creado_por_usuario_id": USER_ID,
+                "ubicacion_lat": CENTER[0] + rng.uniform(-0.5, 0.5),
+                "ubicacion_lon": CENTER[1] + rng.uniform(-0.5, 0.5),
+                "efectivos_asignados": [],
+                "notas": {},
+                "extra_data": {},
+            })
+            if len(rows) == 5000:
+                await conn.execute(insert(Tarea), rows)
+                rows = []
+        if rows:
+            await conn.execute(insert(Tarea), rows)
+
+
+async def _legacy(db, radius_m: float) -> int:
+    """Ruta anterior: cargar todas las tareas con ubicación y filtrar en Python."""
+    from sqlalchemy import and_, select
+
+    from src.api.models.tarea import Tarea
+    from src.core.geo.proximity import approx_distance_m
+
+    stmt = select(Tarea).where(and_(Tarea.ubicacion_lat.is_not(None), Tarea.ubicacion_lon.is_not(None)))
+    tareas = (await db.execute(stmt)).scalars()
+    return sum(
+        1 for t in tareas
+        if approx_distance_m(*CENTER, float(t.ubicacion_lat), float(t.ubicacion_lon)) <= radius_m
+    )
+
+
+async def _run(size: int, radius_m: float, rounds: int) -> dict:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    from src.core.geo.proximity import find_tasks_within_radius
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(os.path.join(tmp, "bench.db"))
+        await _populate(engine, size)
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession)
+        results = {}
+        for label in ("legacy", "bbox"):
+            elapsed = 0.0
+            for _ in range(rounds):
+                async with session_factory() as db:
+                    start = time.perf_counter()
+                    if label == "legacy":
+                        found = await _legacy(db, radius_m)
+                    else:
+                        found = (await find_tasks_within_radius(db, *CENTER, radius_m, limit=5000))[1]
+                    elapsed += time.perf_counter() - start
+            results[label] = {"ms": elapsed / rounds * 1000, "found": found}
+        await engine.dispose()
+    return results
+
+
+async def main() -> None:
+    from src.core.geo.proximity import NUMPY_ENABLED
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--radius-m", type=float, default=2000.0)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"numpy: {'sí' if NUMPY_ENABLED else 'no'}  radio: {args.radius_m:.0f} m")
+    print(f"{'tareas':>8} | {'python (ms)':>11} | {'bbox (ms)':>9} | {'speedup':>7} | {'en radio':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = await _run(size, args.radius_m, args.rounds)
+        legacy, bbox = r["legacy"], r["bbox"]
+        assert legacy["found"] == bbox["found"], (legacy, bbox)
+        speedup = legacy["ms"] / bbox["ms"] if bbox["ms"] else 0.0
+        print(f"{size:>8} | {legacy['ms']:>11.1f} | {bbox['ms']:>9.1f} | {speedup:>6.1f}x | {bbox['found']:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark del coste de logging por solicitud y por mensaje WebSocket.
+
+Con nivel INFO y un sink de texto que descarta la salida, mide:
+
+- ``solicitud``: los dos ``api_logger.info`` con campos de ``log_requests``
+  (entrada y respuesta);
+- ``mensaje WS``: el ``ws_logger.debug`` por mensaje de
+  ``send_to_connection`` (deshabilitado a nivel INFO).
+
+Compara el ``StructuredLogger`` anterior (``json.dumps`` + f-string antes de
+que loguru mire el nivel) con el actual (nivel primero, campos como
+``extra`` serializados una vez en el sink).
+
+Uso:
+    python scripts/logging_benchmark.py [--iterations 50000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loguru import logger  # noqa: E402
+
+from src.core.logging import FILE_FORMAT, StructuredLogger, set_log_level, text_formatter  # noqa: E402
+
+
+class LegacyStructuredLogger:
+    """StructuredLogger anterior: serializa los campos antes de filtrar por nivel."""
+
+    def __init__(self, name: str):
+        self.logger = logger.bind(service=name)
+
+    def info(self, message: str, **kwargs):
+        if kwargs:
+            self.logger.info(f"{message} | Data: {json.dumps(kwargs, default=str)}")
+        else:
+            self.logger.info(message)
+
+    def debug(self, message: str, **kwargs):
+        if kwargs:
+            self.logger.debug(f"{message} | Debug: {json.dumps(kwargs, default=str)}")
+        else:
+            self.logger.debug(message)
+
+
+class NullStream:
+    def write(self, message: str) -> None:
+        pass
+
+
+def _request(log) -> None:
+    log.info(
+        "Request: GET /api/v1/tasks/",
+        method="GET", path="/api/v1/tasks/", query="",
+        client_ip="10.0.0.12", user_agent="Mozilla/5.0 (X11; Linux x86_64)",
+    )
+    log.info(
+        "Response: 200 | Time: 3.41ms",
+        status_code=200, method="GET", path="/api/v1/tasks/", duration_ms=3.41,
+    )
+
+
+def _ws_message(log) -> None:
+    log.debug(
+        "Mensaje encolado",
+        connection_id="c0a8012e-5d1f-4b6a-9e3c-7f2d8a1b4c5e",
+        event_type="task_updated", message_id="4b1e9f70-2c3d-4e5f-8a9b-0c1d2e3f4a5b",
+    )
+
+
+def _per_call_us(fn: Callable[[object], None], log, iterations: int) -> float:
+    for _ in range(min(1000, iterations)):
+        fn(log)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(log)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(NullStream(), format=text_formatter(FILE_FORMAT), level="INFO")
+    set_log_level("INFO")
+
+    loggers = [("anterior", LegacyStructuredLogger("bench")), ("actual", StructuredLogger("bench"))]
+    print(f"nivel=INFO iteraciones={args.iterations}")
+    print(f"{'logger':>10} | {'solicitud (µs)':>14} | {'mensaje WS (µs)':>15}")
+    for label, log in loggers:
+        request_us = _per_call_us(_request, log, args.iterations)
+        ws_us = _per_call_us(_ws_message, log, args.iterations)
+        print(f"{label:>10} | {request_us:>14.2f} | {ws_us:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
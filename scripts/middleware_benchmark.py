@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark del stack de middleware HTTP de la API sobre un endpoint trivial.
+
+Llama a la app ASGI directamente (sin red) con ``--concurrency`` solicitudes
+en vuelo y compara:
+
+- ``sin middleware``: línea base;
+- ``anterior``: los tres ``@app.middleware("http")`` de ``main.py``
+  (cabeceras de seguridad con ``get_settings()`` por solicitud, límite de
+  cuerpo, logging) más ``GovernmentRateLimitMiddleware``, todos
+  ``BaseHTTPMiddleware``;
+- ``anterior*``: igual, pero resolviendo ``get_settings()`` una sola vez,
+  para aislar el coste de las capas ``BaseHTTPMiddleware``;
+- ``ASGI único``: ``RequestPipelineMiddleware``.
+
+Los logs van a un sink que descarta la salida a nivel INFO, igual en todos
+los modos. Las solicitudes se reparten entre clientes (X-Real-IP) para no
+alcanzar el rate limit.
+
+Uso:
+    python scripts/middleware_benchmark.py [--requests 20000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, PlainTextResponse, Response  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from src.api.middleware.government_rate_limiting import (  # noqa: E402
+    GovernmentRateLimiter,
+    GovernmentRateLimitMiddleware,
+    configure_government_rate_limiter,
+)
+from src.api.middleware.request_pipeline import RequestPipelineMiddleware  # noqa: E402
+from src.core.logging import FILE_FORMAT, get_logger, set_log_level, text_formatter  # noqa: E402
+from src.core.performance import performance_middleware, route_template  # noqa: E402
+from src.core.query_instrumentation import request_query_context  # noqa: E402
+
+MAX_REQUEST_BODY_SIZE = 10 * 1024 * 1024
+bench_logger = get_logger("bench")
+
+
+def _add_legacy_stack(app: FastAPI, cached_settings: bool) -> None:
+    """Middlewares HTTP anteriores de ``main.py``, en el mismo orden."""
+    from config.settings import get_settings as _get_settings
+
+    resolved = _get_settings() if cached_settings else None
+
+    @app.middleware("http")
+    async def security_headers_middleware(request: Request, call_next: Callable[[Request], Awaitable[Response]]):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+        if request.url.path.startswith("/api/"):
+            response.headers["Content-Security-Policy"] = "default-src 'none'; frame-ancestors 'none';"
+        try:
+            _s = resolved or _get_settings()
+            allowed = getattr(_s, "cors_origins_list", [])
+            if (not allowed) and hasattr(_s, "ALLOWED_HOSTS"):
+                allowed = getattr(_s, "ALLOWED_HOSTS") or []
+            if isinstance(allowed, list) and any(o == "*" for o in allowed):
+                response.headers["Access-Control-Allow-Origin"] = "*"
+        except Exception:
+            pass
+        if "server" in response.headers:
+            del response.headers["server"]
+        return response
+
+    @app.middleware("http")
+    async def max_body_size_middleware(request: Request, call_next: Callable[[Request], Awaitable[Response]]):
+        content_length = request.headers.get("content-length")
+        if content_length is not None and int(content_length) > MAX_REQUEST_BODY_SIZE:
+            return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+        return await call_next(request)
+
+    app.add_middleware(GovernmentRateLimitMiddleware)
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next: Callable[[Request], Awaitable[Response]]):
+        start_time = time.time()
+        bench_logger.info(
+            f"Request: {request.method} {request.url.path}",
+            method=request.method, path=request.url.path,
+            query="<redacted>" if request.url.query else "",
+            client_ip=request.client.host if request.client else "unknown",
+            user_agent=request.headers.get("user-agent", "unknown"),
+        )
+        with request_query_context(request.scope):
+            response = await call_next(request)
+        process_time = (time.time() - start_time) * 1000
+        performance_middleware.record_request(
+            method=request.method, route=route_template(request.scope),
+            duration=process_time / 1000, status_code=response.status_code,
+        )
+        bench_logger.info(
+            f"Response: {response.status_code} | Time: {process_time:.2f}ms",
+            status_code=response.status_code, duration_ms=round(process_time, 2),
+            method=request.method, path=request.url.path,
+        )
+        return response
+
+
+def _app(mode: str) -> FastAPI:
+    app = FastAPI()
+    if mode.startswith("anterior"):
+        _add_legacy_stack(app, cached_settings=mode.endswith("*"))
+    elif mode == "ASGI único":
+        app.add_middleware(RequestPipelineMiddleware, logger=bench_logger)
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return PlainTextResponse("ok")
+
+    return app
+
+
+async def _drive(app: FastAPI, requests: int, concurrency: int, clients: int) -> Dict[str, float]:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        return None
+
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/api/v1/ping", "raw_path": b"/api/v1/ping",
+            "query_string": b"", "root_path": "", "server": ("test", 80),
+            "client": ("127.0.0.1", 1234),
+            "headers": [
+                (b"host", b"test"), (b"user-agent", b"bench"),
+                (b"x-real-ip", f"10.0.{i % clients // 256}.{i % clients % 256}".encode()),
+            ],
+        }
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        latencies.append(time.perf_counter() - start)
+
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for i in counter:
+            await one(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(lambda message: None, format=text_formatter(FILE_FORMAT), level="INFO")
+    set_log_level("INFO")
+    clients = max(1, args.requests // 50)
+
+    print(f"solicitudes={args.requests} concurrencia={args.concurrency} clientes={clients}")
+    print(f"{'modo':>15} | {'req/s':>9} | {'p50 (ms)':>9} | {'p99 (ms)':>9}")
+    for mode in ("sin middleware", "anterior", "anterior*", "ASGI único"):
+        configure_government_rate_limiter(GovernmentRateLimiter())
+        app = _app(mode)
+        await _drive(app, min(1000, args.requests), args.concurrency, clients)  # calentamiento
+        configure_government_rate_limiter(GovernmentRateLimiter())
+        result = await _drive(app, args.requests, args.concurrency, clients)
+        print(f"{mode:>15} | {result['rps']:>9.0f} | {result['p50_ms']:>9.2f} | {result['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark del overhead por solicitud de GovernmentRateLimitMiddleware.
+
+Llama a la app ASGI directamente (sin red ni cliente HTTP) repartiendo las
+solicitudes entre N clientes distintos (X-Real-IP) y compara:
+
+- sin middleware (línea base);
+- limitador anterior (lista de timestamps por cliente);
+- GCRA en memoria con LRU acotado;
+- GCRA en Redis (solo con ``--redis-url``; incluye el round-trip real).
+
+La columna ``check`` aísla el coste del limitador; el resto del overhead
+es de ``BaseHTTPMiddleware``. La memoria retenida por el estado del limitador se mide en una pasada
+aparte (tracemalloc distorsiona los tiempos).
+
+Uso:
+    python scripts/rate_limit_benchmark.py [--clients 10000] [--requests 50000] [--redis-url redis://localhost:6379/0]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import PlainTextResponse  # noqa: E402
+
+from src.api.middleware.government_rate_limiting import (  # noqa: E402
+    GovernmentRateLimiter,
+    GovernmentRateLimitMiddleware,
+    RateLimitDecision,
+    RedisGovernmentRateLimiter,
+    configure_government_rate_limiter,
+)
+
+
+class LegacyListLimiter:
+    """Limitador anterior: lista de timestamps por cliente, reconstruida en cada solicitud."""
+
+    def __init__(self):
+        self.requests = defaultdict(list)
+        self.window_seconds = 60
+
+    async def check(self, client_id: str, limit: int) -> RateLimitDecision:
+        now = time.time()
+        window_start = now - self.window_seconds
+        if client_id in self.requests:
+            self.requests[client_id] = [t for t in self.requests[client_id] if t > window_start]
+        if len(self.requests[client_id]) >= limit:
+            return RateLimitDecision(True, 1, 0)
+        self.requests[client_id].append(now)
+        return RateLimitDecision(False, 0, limit - len(self.requests[client_id]))
+
+
+def _app(with_middleware: bool) -> FastAPI:
+    app = FastAPI()
+    if with_middleware:
+        app.add_middleware(GovernmentRateLimitMiddleware)
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return PlainTextResponse("ok")
+
+    return app
+
+
+async def _drive(app, clients: int, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        return None
+
+    start = time.perf_counter()
+    for i in range(requests):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/api/v1/ping", "raw_path": b"/api/v1/ping",
+            "query_string": b"", "root_path": "", "server": ("test", 80),
+            "client": ("127.0.0.1", 1234),
+            "headers": [(b"host", b"test"), (b"x-real-ip", f"10.0.{i % clients // 256}.{i % clients % 256}".encode())],
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def _check_us(factory, clients: int, requests: int) -> float:
+    """Coste de ``check`` aislado del middleware."""
+    limiter = factory()
+    ids = [f"gov_ip:10.0.{i % clients // 256}.{i % clients % 256}" for i in range(requests)]
+    start = time.perf_counter()
+    for client_id in ids:
+        await limiter.check(client_id, 100)
+    elapsed = (time.perf_counter() - start) / requests * 1e6
+    if isinstance(limiter, RedisGovernmentRateLimiter):
+        await limiter.close()
+    return elapsed
+
+
+async def _state_kb(factory, clients: int, requests: int) -> float:
+    """Memoria retenida por el limitador tras repartir las solicitudes (pasada aparte)."""
+    tracemalloc.start()
+    limiter = factory()
+    for i in range(requests):
+        await limiter.check(f"gov_ip:10.0.{i % clients // 256}.{i % clients % 256}", 100)
+    retained = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    if isinstance(limiter, RedisGovernmentRateLimiter):
+        await limiter.close()
+    return retained
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    baseline = await _drive(_app(False), args.clients, args.requests)
+    print(f"clientes={args.clients} solicitudes={args.requests}")
+    print(f"{'backend':>12} | {'µs/solicitud':>12} | {'overhead (µs)':>13} | {'check (µs)':>10} | {'estado (KB)':>11}")
+    print(f"{'ninguno':>12} | {baseline:>12.1f} | {0.0:>13.1f} | {0.0:>10.2f} | {0:>11}")
+
+    backends = [("lista", LegacyListLimiter), ("gcra-memory", GovernmentRateLimiter)]
+    if args.redis_url:
+        backends.append(("gcra-redis", lambda: RedisGovernmentRateLimiter(args.redis_url)))
+    for label, factory in backends:
+        limiter = factory()
+        previous = configure_government_rate_limiter(limiter)
+        try:
+            per_request = await _drive(_app(True), args.clients, args.requests)
+        finally:
+            configure_government_rate_limiter(previous)
+        if isinstance(limiter, RedisGovernmentRateLimiter):
+            await limiter.close()
+        check_us = await _check_us(factory, args.clients, args.requests)
+        state_kb = await _state_kb(factory, args.clients, args.requests)
+        print(f"{label:>12} | {per_request:>12.1f} | {per_request - baseline:>13.1f} | "
+              f"{check_us:>10.2f} | {state_kb:>11.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
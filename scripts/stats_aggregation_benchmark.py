@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /stats/user: agregación en Python (cargar todas las filas
+Tarea) frente a agregados SQL (``aggregate_user_task_stats``).
+
+Cada medición corre en un proceso nuevo para que el pico de RSS
+(``ru_maxrss``) sea comparable. Usa SQLite en archivo temporal; en
+PostgreSQL la diferencia es mayor porque las filas viajan por la red.
+
+Uso:
+    python scripts/stats_aggregation_benchmark.py [--sizes 1000,10000,100000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+USER_ID = 1
+
+
+def _engine(path: str):
+    from sqlalchemy.dialects.postgresql import UUID as sa_UUID
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(sa_UUID, "sqlite")
+    def _uuid_sqlite(element, compiler, **kw):  # noqa: ANN001
+        return "CHAR(32)"
+
+    from src.api.models.base import Base
+
+    Base.metadata.schema = None
+    for table in Base.metadata.tables.values():
+        table.schema = None
+    return create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+
+async def _populate(path: str, size: int) -> None:
+    import uuid
+
+    from sqlalchemy import insert
+
+    from src.api.models.base import Base
+    from src.api.models.tarea import Tarea
+    from src.shared.constants import TaskPriority, TaskStatus, TaskType
+
+    engine = _engine(path)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        states = list(TaskStatus)
+        now = datetime.utcnow()
+        rows = []
+        for i in range(size):
+            estado = states[i % len(states)]
+            fin = now - timedelta(hours=i % 500) if estado == TaskStatus.COMPLETED else None
+            rows.append({
+                "uuid": uuid.uuid4(),
+                "codigo": f"BENCH{i:07d}",
+                "titulo": f"Tarea {i}",
+                "descripcion": "x" * 200,
+                "tipo": TaskType.PATRULLAJE,
+                "prioridad": TaskPriority.MEDIUM,
+                "estado": estado,
+                "inicio_programado": now,
+                "inicio_real": fin - timedelta(hours=1 + i % 7) if fin else None,
+                "fin_real": fin,
+                "delegado_usuario_id": USER_ID,
+                "creado_por_usuario_id": USER_ID,
+                "efectivos_asignados": [],
+                "notas": {},
+                "extra_data": {},
+            })
+            if len(rows) == 5000:
+                await conn.execute(insert(Tarea), rows)
+                rows = []
+        if rows:
+            await conn.execute(insert(Tarea), rows)
+    await engine.dispose()
+
+
+async def _python_stats(db, cutoff: datetime) -> dict:
+    """Ruta anterior: cargar las filas y contar en Python."""
+    from sqlalchemy import select
+
+    from src.api.models.tarea import Tarea
+    from src.shared.constants import TaskStatus
+
+    stmt = (
+        select(Tarea)
+        .where(Tarea.delegado_usuario_id == USER_ID)
+        .where(Tarea.created_at >= cutoff)
+        .where(Tarea.deleted_at.is_(None))
+    )
+    tareas = (await db.execute(stmt)).scalars().all()
+    completadas = sum(1 for t in tareas if t.estado == TaskStatus.COMPLETED)
+    duraciones = [
+        (t.fin_real - t.inicio_real).total_seconds() / 3600
+        for t in tareas
+        if t.estado == TaskStatus.COMPLETED and t.inicio_real and t.fin_real
+    ]
+    return {"total": len(tareas), "completadas": completadas,
+            "avg": sum(duraciones) / len(duraciones) if duraciones else 0.0}
+
+
+async def _measure(path: str, mode: str) -> dict:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    from src.api.routers.statistics import aggregate_user_task_stats
+
+    engine = _engine(path)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession)
+    cutoff = datetime.utcnow() - timedelta(days=30)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    async with session_factory() as db:
+        start = time.perf_counter()
+        if mode == "python":
+            await _python_stats(db, cutoff)
+        else:
+            await aggregate_user_task_stats(db, USER_ID, cutoff)
+        elapsed = time.perf_counter() - start
+    await engine.dispose()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"ms": elapsed * 1000, "rss_mb": rss_after / 1024, "rss_delta_mb": (rss_after - rss_before) / 1024}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--measure", nargs=2, metavar=("DB", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(asyncio.run(_measure(*args.measure))))
+        return
+
+    print(f"{'tareas':>8} | {'python (ms)':>11} | {'sql (ms)':>9} | {'python ΔRSS (MB)':>16} | {'sql ΔRSS (MB)':>13}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            asyncio.run(_populate(path, size))
+            results = {}
+            for mode in ("python", "sql"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--measure", path, mode],
+                    check=True, capture_output=True, text=True,
+                ).stdout.strip().splitlines()[-1]
+                results[mode] = json.loads(out)
+        py, sql = results["python"], results["sql"]
+        print(f"{size:>8} | {py['ms']:>11.1f} | {sql['ms']:>9.1f} | "
+              f"{py['rss_delta_mb']:>16.1f} | {sql['rss_delta_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de CPU por broadcast del WebSocketManager.
+
+Compara la serialización por destinatario (model_dump + json.dumps por cada
+conexión, comportamiento anterior) con el frame serializado una sola vez que
+se reutiliza para todas las conexiones.
+
+Uso:
+    python scripts/ws_broadcast_benchmark.py [--rounds 20] [--sizes 100,1000,10000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import WebSocket  # noqa: E402
+
+from src.core.websockets import EventType, WebSocketManager, WSMessage  # noqa: E402
+from src.core.ws_fanout import ORJSON_ENABLED  # noqa: E402
+
+
+class NullWebSocket(WebSocket):
+    """WebSocket que descarta los frames (solo mide CPU del servidor)."""
+
+    def __init__(self) -> None:
+        pass
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, data: str) -> None:
+        return None
+
+
+def _message() -> WSMessage:
+    return WSMessage(
+        event_type=EventType.DASHBOARD_UPDATE,
+        data={"total_tasks": 25, "active_tasks": 12, "alerts": [{"id": i, "level": "info"} for i in range(10)]},
+    )
+
+
+async def _drain(manager: WebSocketManager) -> None:
+    while any(sender.queue_depth for sender in manager._senders.values()):
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+async def _legacy_broadcast(manager: WebSocketManager, message: WSMessage) -> None:
+    """Reproduce la serialización por destinatario previa."""
+    for cid in list(manager.active_connections):
+        message_dict = message.model_dump(mode="json")
+        message_dict["timestamp"] = message.timestamp.isoformat()
+        manager._senders[cid].enqueue(json.dumps(message_dict))
+
+
+async def _run(size: int, rounds: int) -> dict[str, float]:
+    manager = WebSocketManager(enable_aggressive_cleanup=False, send_queue_size=rounds + 2)
+    for _ in range(size):
+        await manager.connect(NullWebSocket())
+    await _drain(manager)
+
+    results = {}
+    for label, fn in (("per_recipient", _legacy_broadcast), ("encode_once", None)):
+        cpu = 0.0
+        for _ in range(rounds):
+            message = _message()
+            start = time.process_time()
+            if fn is None:
+                await manager.broadcast(message)
+            else:
+                await fn(manager, message)
+            await _drain(manager)
+            cpu += time.process_time() - start
+        results[label] = cpu / rounds * 1000
+    for cid in list(manager.active_connections):
+        await manager.disconnect(cid)
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    args = parser.parse_args()
+
+    print(f"orjson: {'sí' if ORJSON_ENABLED else 'no'}")
+    print(f"{'conexiones':>10} | {'por destinatario (ms)':>22} | {'una vez (ms)':>12} | {'speedup':>7}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = await _run(size, args.rounds)
+        speedup = r["per_recipient"] / r["encode_once"] if r["encode_once"] else 0.0
+        print(f"{size:>10} | {r['per_recipient']:>22.2f} | {r['encode_once']:>12.2f} | {speedup:>6.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
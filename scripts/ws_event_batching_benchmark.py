@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark de una ráfaga de eventos de tareas por WebSocketEventEmitter.
+
+Simula una importación masiva: ``--events`` actualizaciones repartidas
+entre ``--tasks`` tareas, emitidas lo más rápido posible, con
+``--connections`` conexiones que reciben cada frame. Compara:
+
+- ``un frame por evento``: el procesamiento anterior (``_handle_event`` por
+  evento, un broadcast cada uno);
+- ``lotes``: la cola con coalescencia por entidad y frames ``entity_batch``.
+
+El gestor WebSocket es un doble que serializa cada frame una vez y cuenta
+los envíos por conexión, sin red.
+
+Uso:
+    python scripts/ws_event_batching_benchmark.py [--events 20000] [--tasks 500]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loguru import logger  # noqa: E402
+
+from src.api.middleware import websockets as ws_middleware  # noqa: E402
+from src.api.middleware.websockets import WebSocketEventEmitter  # noqa: E402
+from src.core.websockets import WebSocketManager  # noqa: E402
+from src.core.ws_event_batching import BatchingConfig  # noqa: E402
+
+
+class CountingManager:
+    """Serializa cada frame como el gestor real y cuenta los envíos."""
+
+    def __init__(self, connections: int) -> None:
+        self.connections = connections
+        self.frames = 0
+        self.sends = 0
+        self.bytes = 0
+
+    async def broadcast(self, message) -> int:
+        frame = WebSocketManager._encode_message(message)
+        self.frames += 1
+        self.sends += self.connections
+        self.bytes += len(frame) * self.connections
+        return self.connections
+
+    async def send_to_user(self, user_id, message) -> int:
+        return await self.broadcast(message)
+
+
+async def _run(mode: str, events: int, tasks: int, connections: int, window_ms: float) -> Dict[str, float]:
+    manager = CountingManager(connections)
+    ws_middleware.websocket_manager = manager
+    config = BatchingConfig(window_seconds=window_ms / 1000, max_batch=1000, max_pending=events)
+    emitter = WebSocketEventEmitter(config)
+
+    start = time.perf_counter()
+    if mode == "un frame por evento":
+        for n in range(events):
+            await emitter._handle_event({
+                "type": "task_event", "event_type": "updated", "task_id": n % tasks,
+                "task_data": {"id": n % tasks, "estado": "en_curso", "n": n}, "user_id": None,
+            })
+    else:
+        await emitter.start()
+        for n in range(events):
+            await emitter.emit_task_event("updated", n % tasks, {"id": n % tasks, "estado": "en_curso", "n": n})
+            if n % 100 == 0:
+                await asyncio.sleep(0)  # el productor cede el loop como una importación real
+        while not emitter._event_queue.empty():
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(window_ms / 1000 + 0.01)
+        await emitter.stop()
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed_ms": elapsed * 1000,
+        "frames": manager.frames,
+        "sends": manager.sends,
+        "mib": manager.bytes / (1024 * 1024),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--window-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    logger.remove()
+    print(f"eventos={args.events} tareas={args.tasks} conexiones={args.connections} ventana={args.window_ms}ms")
+    print(f"{'modo':>20} | {'tiempo (ms)':>11} | {'frames':>7} | {'envíos':>9} | {'MiB':>8}")
+    for mode in ("un frame por evento", "lotes"):
+        result = await _run(mode, args.events, args.tasks, args.connections, args.window_ms)
+        print(
+            f"{mode:>20} | {result['elapsed_ms']:>11.0f} | {result['frames']:>7} | "
+            f"{result['sends']:>9} | {result['mib']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Harness en proceso para medir el throughput del Pub/Sub WebSocket entre workers.
+
+Simula N workers (cada uno con su RedisWebSocketPubSub y un manager mínimo)
+conectados a un broker Redis en memoria que añade una latencia de red fija
+por round-trip. Compara:
+
+- publish inmediato (un PUBLISH por mensaje) frente a micro-batching
+  en pipeline (un round-trip por lote);
+- canal único frente a canales por topic (cada worker solo recibe los topics
+  que tienen sus conexiones locales).
+
+Uso:
+    python scripts/ws_pubsub_benchmark.py [--workers 4] [--messages 2000] [--rtt-ms 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.core.ws_pubsub import RedisWebSocketPubSub  # noqa: E402
+
+
+class InProcessBroker:
+    """Broker Pub/Sub en memoria con latencia simulada por round-trip."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.subscribers: Dict[str, Set["BrokerPubSub"]] = defaultdict(set)
+
+    async def _round_trip(self) -> None:
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+
+    def deliver(self, channel: str, payload: bytes) -> None:
+        for sub in self.subscribers.get(channel, ()):
+            sub.queue.put_nowait({"type": "message", "channel": channel, "data": payload})
+
+
+class BrokerPipeline:
+    def __init__(self, broker: InProcessBroker):
+        self.broker = broker
+        self.commands: List[tuple] = []
+
+    def publish(self, channel: str, payload: bytes) -> None:
+        self.commands.append((channel, payload))
+
+    async def execute(self) -> None:
+        await self.broker._round_trip()
+        for channel, payload in self.commands:
+            self.broker.deliver(channel, payload)
+
+
+class BrokerPubSub:
+    def __init__(self, broker: InProcessBroker):
+        self.broker = broker
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self.broker.subscribers[channel].add(self)
+
+    async def unsubscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self.broker.subscribers[channel].discard(self)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self) -> None:
+        for subs in self.broker.subscribers.values():
+            subs.discard(self)
+
+
+class BrokerClient:
+    """Subconjunto de redis.asyncio.Redis usado por RedisWebSocketPubSub."""
+
+    def __init__(self, broker: InProcessBroker):
+        self.broker = broker
+
+    async def publish(self, channel: str, payload: bytes) -> None:
+        await self.broker._round_trip()
+        self.broker.deliver(channel, payload)
+
+    def pipeline(self, transaction: bool = True) -> BrokerPipeline:
+        return BrokerPipeline(self.broker)
+
+    def pubsub(self) -> BrokerPubSub:
+        return BrokerPubSub(self.broker)
+
+    async def aclose(self) -> None:
+        return None
+
+
+class CountingManager:
+    """Manager mínimo: cuenta los frames recibidos de otros workers."""
+
+    def __init__(self, topics: Set[str]):
+        self.topic_connections = {t: {"local"} for t in topics}
+        self.received = 0
+
+    async def broadcast_local_frame(self, frame: str, event_type: str, topic: Optional[str] = None) -> int:
+        if topic is None or topic in self.topic_connections:
+            self.received += 1
+        return 1
+
+    async def broadcast_local_dict(self, message_dict: Dict[str, Any]) -> int:
+        self.received += 1
+        return 1
+
+
+async def _run(workers: int, messages: int, rtt: float, batch_window_ms: float,
+               shard_by_topic: bool, topics: int) -> Dict[str, float]:
+    broker = InProcessBroker(rtt)
+    nodes = []
+    for w in range(workers):
+        # Cada worker tiene conexiones locales solo en una parte de los topics
+        local_topics = {f"t{i}" for i in range(topics) if i % workers == w}
+        manager = CountingManager(local_topics)
+        pubsub = RedisWebSocketPubSub(
+            "redis://in-process", channel="bench", batch_window_ms=batch_window_ms,
+            max_batch=256, shard_by_topic=shard_by_topic, client=BrokerClient(broker),
+        )
+        await pubsub.start(manager)
+        nodes.append((pubsub, manager))
+    await asyncio.sleep(0)
+
+    frame = '{"event_type":"notification","data":{"x":1}}'
+    start = time.perf_counter()
+
+    async def produce(pubsub: RedisWebSocketPubSub, count: int) -> None:
+        for i in range(count):
+            await pubsub.publish_frame(frame, "notification", f"t{i % topics}")
+
+    per_worker = messages // workers
+    await asyncio.gather(*(produce(p, per_worker) for p, _ in nodes))
+    for pubsub, _ in nodes:
+        await pubsub._flush()
+    # Esperar a que terminen los lotes en vuelo y los suscriptores vacíen sus colas
+    while (sum(p.published_messages for p, _ in nodes) < per_worker * workers
+           or any(sub.queue.qsize() for subs in broker.subscribers.values() for sub in subs)):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    delivered = sum(p.received_messages for p, _ in nodes)
+    for pubsub, _ in nodes:
+        await pubsub.stop()
+    return {
+        "msgs_per_sec": per_worker * workers / elapsed if elapsed else 0.0,
+        "round_trips": broker.round_trips,
+        "delivered": delivered,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--topics", type=int, default=16)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    parser.add_argument("--batch-window-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    rtt = args.rtt_ms / 1000.0
+    scenarios = (
+        ("inmediato, canal único", 0.0, False),
+        ("inmediato, por topic", 0.0, True),
+        ("batch, canal único", args.batch_window_ms, False),
+        ("batch, por topic", args.batch_window_ms, True),
+    )
+    print(f"workers={args.workers} mensajes={args.messages} topics={args.topics} rtt={args.rtt_ms}ms")
+    print(f"{'escenario':>24} | {'msgs/s':>10} | {'round-trips':>11} | {'entregas':>8}")
+    for label, window, shard in scenarios:
+        r = await _run(args.workers, args.messages, rtt, window, shard, args.topics)
+        print(f"{label:>24} | {r['msgs_per_sec']:>10.0f} | {r['round_trips']:>11.0f} | {r['delivered']:>8.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,9 +2,10 @@
 """
 Punto de entrada principal para la API de GRUPO_GAD.
 """
+import asyncio
 import time
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, Awaitable, Callable
+from typing import AsyncIterator
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
@@ -13,15 +14,20 @@ from fastapi.staticfiles import StaticFiles
 from starlette import status
 from starlette.middleware.cors import CORSMiddleware
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
-from starlette.responses import Response
 
 from config.settings import get_settings, settings
 from src.api.routers import api_router
 from src.api.routers import dashboard as dashboard_router
 from src.api.routers import websockets as websockets_router
 from src.api.middleware.websockets import websocket_event_emitter
-from src.api.middleware.government_rate_limiting import setup_government_rate_limiting
+from src.api.middleware.request_pipeline import RequestPipelineMiddleware, cors_wildcard_enabled
+from src.api.middleware.government_rate_limiting import (
+    GovernmentRateLimiter,
+    RedisGovernmentRateLimiter,
+    configure_government_rate_limiter,
+)
 from src.core import database as db
+from src.core.audit_writer import start_audit_writer, stop_audit_writer
 from src.core.logging import setup_logging
 from src.core.websocket_integration import (
     initialize_websocket_integrator,
@@ -31,6 +37,23 @@ from src.core.websocket_integration import (
 from src.core.websockets import websocket_manager
 from src.core.ws_pubsub import RedisWebSocketPubSub  # opcional si hay Redis
 from src.core.cache import init_cache_service, shutdown_cache_service
+from src.core.geo.efectivo_index import (
+    install_efectivo_index_sync,
+    load_efectivo_index,
+    run_efectivo_index_refresh,
+    uninstall_efectivo_index_sync,
+)
+from src.core.dashboard_state import (
+    dashboard_state,
+    run_dashboard_publisher,
+    run_dashboard_reconciliation,
+)
+from src.core.task_metrics import (
+    install_task_metrics_rollup,
+    reconcile_task_metrics,
+    run_task_metrics_reconciliation,
+    uninstall_task_metrics_rollup,
+)
 
 # Importar métricas Prometheus si están disponibles
 try:
@@ -45,7 +68,8 @@ api_logger = setup_logging(
     log_level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else "INFO",
     enable_console=True,
     enable_file=True,
-    enable_json=getattr(settings, 'ENVIRONMENT', 'development') == 'production'
+    enable_json=getattr(settings, 'ENVIRONMENT', 'development') == 'production',
+    async_sink=bool(getattr(settings, 'LOG_ASYNC_SINK', False)),
 )
 
 
@@ -85,6 +109,86 @@ async def _initialize_database_connection() -> str | None:
     return db_url
 
 
+async def _initialize_task_metrics(app: FastAPI) -> None:
+    """
+    Activa el rollup de métricas de tareas, lo reconcilia una vez antes de
+    servir y arranca la reconciliación periódica. Si la reconciliación
+    inicial falla, /stats sigue leyendo los agregados sobre ``tareas``.
+    """
+    app.state.task_metrics_reconciler = None
+    if not db.AsyncSessionFactory or not getattr(settings, "TASK_METRICS_ROLLUP_ENABLED", True):
+        return
+    install_task_metrics_rollup()
+    try:
+        async with db.AsyncSessionFactory() as session:
+            await reconcile_task_metrics(session)
+    except Exception as e:
+        api_logger.error(f"Reconciliación inicial del rollup de métricas fallida: {e}")
+    interval = float(getattr(settings, "TASK_METRICS_RECONCILE_INTERVAL_SECONDS", 3600.0))
+    if interval > 0:
+        app.state.task_metrics_reconciler = asyncio.create_task(
+            run_task_metrics_reconciliation(db.AsyncSessionFactory, interval)
+        )
+    api_logger.info(f"Rollup de métricas de tareas activo (reconciliación cada {interval}s)")
+
+
+def _initialize_audit_writer() -> None:
+    """Arranca la escritura diferida por lotes del audit trail."""
+    if not db.AsyncSessionFactory or not getattr(settings, "AUDIT_WRITE_BEHIND_ENABLED", True):
+        return
+    start_audit_writer(
+        db.AsyncSessionFactory,
+        max_queue=int(getattr(settings, "AUDIT_QUEUE_SIZE", 10_000)),
+        batch_size=int(getattr(settings, "AUDIT_BATCH_SIZE", 500)),
+        flush_interval=float(getattr(settings, "AUDIT_FLUSH_INTERVAL_SECONDS", 1.0)),
+        enqueue_timeout=float(getattr(settings, "AUDIT_ENQUEUE_TIMEOUT_SECONDS", 0.05)),
+        durability=getattr(settings, "AUDIT_DURABILITY", "critical"),
+        flush_timeout=float(getattr(settings, "AUDIT_FLUSH_TIMEOUT_SECONDS", 5.0)),
+    )
+
+
+async def _initialize_efectivo_index(app: FastAPI) -> None:
+    """Construye el índice espacial de efectivos y programa su reconstrucción."""
+    app.state.efectivo_index_refresher = None
+    if not db.AsyncSessionFactory or not getattr(settings, "EFECTIVO_INDEX_ENABLED", True):
+        return
+    install_efectivo_index_sync()
+    try:
+        async with db.AsyncSessionFactory() as session:
+            await load_efectivo_index(session)
+    except Exception as e:
+        # Sin índice listo el despacho usa la consulta PostGIS
+        api_logger.error(f"No se pudo construir el índice de efectivos: {e}")
+    interval = float(getattr(settings, "EFECTIVO_INDEX_REFRESH_SECONDS", 300.0))
+    if interval > 0:
+        app.state.efectivo_index_refresher = asyncio.create_task(
+            run_efectivo_index_refresh(db.AsyncSessionFactory, interval)
+        )
+
+
+async def _initialize_dashboard_state(app: FastAPI) -> None:
+    """Carga el estado del dashboard y arranca su reconciliación y el publicador de deltas."""
+    app.state.dashboard_reconciler = None
+    app.state.dashboard_publisher = None
+    if not db.AsyncSessionFactory or not getattr(settings, "DASHBOARD_STATE_ENABLED", True):
+        return
+    dashboard_state.bind_event_loop()
+    try:
+        async with db.AsyncSessionFactory() as session:
+            await dashboard_state.reconcile(session)
+    except Exception as e:
+        # Se reintenta con la primera solicitud del dashboard o la reconciliación
+        api_logger.error(f"No se pudo cargar el estado del dashboard: {e}")
+    interval = float(getattr(settings, "DASHBOARD_RECONCILE_INTERVAL_SECONDS", 60.0))
+    if interval > 0:
+        app.state.dashboard_reconciler = asyncio.create_task(
+            run_dashboard_reconciliation(db.AsyncSessionFactory, interval)
+        )
+    app.state.dashboard_publisher = asyncio.create_task(
+        run_dashboard_publisher(float(getattr(settings, "DASHBOARD_PUBLISH_INTERVAL_SECONDS", 1.0)))
+    )
+
+
 async def _initialize_websockets() -> None:
     """Inicializa sistema de WebSockets."""
     api_logger.info("Iniciando sistema de WebSockets...")
@@ -221,7 +325,12 @@ async def _initialize_redis_and_cache(app: FastAPI) -> None:
                 source=source
             )
             
-            pubsub = RedisWebSocketPubSub(redis_url)
+            pubsub = RedisWebSocketPubSub(
+                redis_url,
+                batch_window_ms=settings.WS_PUBSUB_BATCH_WINDOW_MS,
+                max_batch=settings.WS_PUBSUB_MAX_BATCH,
+                shard_by_topic=settings.WS_PUBSUB_SHARD_BY_TOPIC,
+            )
             websocket_manager.set_pubsub(pubsub)
             await pubsub.start(websocket_manager)
             app.state.ws_pubsub = pubsub
@@ -229,10 +338,26 @@ async def _initialize_redis_and_cache(app: FastAPI) -> None:
             
             # Inicializar CacheService con la misma URL de Redis
             api_logger.info("Inicializando CacheService...")
-            cache_service = init_cache_service(redis_url=redis_url, prefix="gad:")
+            cache_service = init_cache_service(
+                redis_url=redis_url,
+                prefix="gad:",
+                l1_max_entries=settings.CACHE_L1_MAX_ENTRIES,
+                l1_ttl=settings.CACHE_L1_TTL_SECONDS,
+                l1_max_bytes=settings.CACHE_L1_MAX_BYTES,
+            )
             await cache_service.connect()
             app.state.cache_service = cache_service
             api_logger.info("CacheService iniciado correctamente")
+
+            # Rate limiting compartido entre workers
+            if str(getattr(settings, 'RATE_LIMIT_BACKEND', 'memory')).lower() == "redis":
+                limiter = RedisGovernmentRateLimiter(
+                    redis_url,
+                    fallback=GovernmentRateLimiter(max_clients=settings.RATE_LIMIT_MAX_CLIENTS),
+                )
+                app.state.local_rate_limiter = configure_government_rate_limiter(limiter)
+                app.state.redis_rate_limiter = limiter
+                api_logger.info("Rate limiting GCRA con backend Redis habilitado")
         else:
             # Log extendido para ayudar a diagnosticar casos donde la variable existe pero está vacía o con espacios
             env_present = "REDIS_URL" in os.environ or "UPSTASH_REDIS_URL" in os.environ
@@ -265,6 +390,15 @@ async def _shutdown_services(app: FastAPI) -> None:
     except Exception as e:
         api_logger.error(f"Error deteniendo CacheService: {e}")
 
+    # Cerrar backend Redis del rate limiting si estaba habilitado
+    try:
+        limiter = getattr(app.state, 'redis_rate_limiter', None)
+        if limiter is not None:
+            configure_government_rate_limiter(app.state.local_rate_limiter)
+            await limiter.close()
+    except Exception as e:
+        api_logger.error(f"Error cerrando rate limiting Redis: {e}")
+
     # Detener pub/sub si estaba habilitado
     try:
         _pubsub = getattr(app.state, 'ws_pubsub', None)
@@ -272,6 +406,25 @@ async def _shutdown_services(app: FastAPI) -> None:
             await _pubsub.stop()
     except Exception as e:
         api_logger.error(f"Error deteniendo pub/sub Redis: {e}", exc_info=True)
+
+    # Detener tareas periódicas (rollup de métricas, índice de efectivos y dashboard)
+    for name in ('task_metrics_reconciler', 'efectivo_index_refresher',
+                 'dashboard_reconciler', 'dashboard_publisher'):
+        background = getattr(app.state, name, None)
+        if background is not None:
+            background.cancel()
+            try:
+                await background
+            except asyncio.CancelledError:
+                pass
+    uninstall_task_metrics_rollup()
+    uninstall_efectivo_index_sync()
+
+    # Vaciar el audit trail pendiente antes de cerrar el pool
+    try:
+        await stop_audit_writer(float(getattr(settings, "AUDIT_SHUTDOWN_TIMEOUT_SECONDS", 10.0)))
+    except Exception as e:
+        api_logger.error(f"Error vaciando el audit trail: {e}")
     
     api_logger.info("Cerrando conexión a la base de datos...")
     if db.async_engine:
@@ -287,6 +440,10 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """
     # Startup
     await _initialize_database_connection()
+    await _initialize_task_metrics(app)
+    _initialize_audit_writer()
+    await _initialize_efectivo_index(app)
+    await _initialize_dashboard_state(app)
     app.state.start_time = time.time()
     
     await _initialize_websockets()
@@ -311,79 +468,6 @@ app = FastAPI(
 trusted_hosts = getattr(settings, 'trusted_proxy_hosts_list', ["localhost", "127.0.0.1"])  # type: ignore
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=trusted_hosts)  # type: ignore
 
-# --- Middleware de limitación de tamaño de petición (mitigación DoS multipart) ---
-MAX_REQUEST_BODY_SIZE = 10 * 1024 * 1024  # 10 MiB
-
-
-@app.middleware("http")
-async def security_headers_middleware(
-    request: Request,
-    call_next: Callable[[Request], Awaitable[Response]],
-) -> Response:
-    """Add security headers to all responses."""
-    response = await call_next(request)
-    
-    # Security headers
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-    
-    # Content Security Policy for API
-    if request.url.path.startswith("/api/"):
-        response.headers["Content-Security-Policy"] = "default-src 'none'; frame-ancestors 'none';"
-
-    # Lightweight CORS headers for simple requests (complementa CORSMiddleware)
-    # Nota: CORSMiddleware solo añade cabeceras cuando la petición incluye 'Origin'.
-    # Para facilitar UAT y clientes simples, exponemos 'Access-Control-Allow-Origin'
-    # cuando la configuración permite '*'.
-    try:
-        from config.settings import get_settings as _get_settings  # local import to avoid import-time effects
-        _s = _get_settings()
-        allowed = getattr(_s, 'cors_origins_list', [])
-        if (not allowed) and hasattr(_s, 'ALLOWED_HOSTS'):
-            allowed = getattr(_s, 'ALLOWED_HOSTS') or []
-        # Si '*' está habilitado explícitamente, añade cabecera universal
-        if isinstance(allowed, list) and any(o == "*" for o in allowed):
-            response.headers["Access-Control-Allow-Origin"] = "*"
-            response.headers.setdefault("Access-Control-Allow-Methods", "GET, POST, PUT, PATCH, DELETE, OPTIONS")
-            response.headers.setdefault("Access-Control-Allow-Headers", "*")
-    except Exception:
-        # Mantener silencioso si no hay settings válidos en tiempo de import
-        pass
-    
-    # Remove server header for security
-    if "server" in response.headers:
-        del response.headers["server"]
-    
-    return response
-
-
-@app.middleware("http")
-async def max_body_size_middleware(
-    request: Request, 
-    call_next: Callable[[Request], Awaitable[Response]],
-) -> Response:
-    # Comprobar Content-Length si está presente
-    content_length = request.headers.get("content-length")
-    if content_length is not None:
-        try:
-            if int(content_length) > MAX_REQUEST_BODY_SIZE:
-                return JSONResponse(
-                    status_code=413,
-                    content={"detail": "Request body too large"},
-                )
-        except ValueError:
-            # Si no es un número válido, continuar y dejar que downstream valide
-            pass
-
-    # Para transferencias chunked u otras sin Content-Length, no se puede
-    # verificar sin consumir el body; confiamos en proxies frontales y límites
-    # adicionales en producción para esa protección.
-    response = await call_next(request)
-    return response
-
 # --- Middleware CORS ---
 # Endurecer en producción: solo CORS_ALLOWED_ORIGINS; en dev permitir fallback a ALLOWED_HOSTS
 _env = getattr(settings, 'ENVIRONMENT', 'development')
@@ -406,11 +490,25 @@ app.add_middleware(
 # Verificar si rate limiting está habilitado (por defecto: sí, salvo config explícita)
 rate_limiting_enabled = getattr(settings, 'RATE_LIMITING_ENABLED', True)
 if rate_limiting_enabled:
-    setup_government_rate_limiting(app)
+    configure_government_rate_limiter(
+        GovernmentRateLimiter(max_clients=getattr(settings, 'RATE_LIMIT_MAX_CLIENTS', 100_000))
+    )
     api_logger.info("Rate limiting gubernamental activado para protección ciudadana")
 else:
     api_logger.warning("Rate limiting deshabilitado - solo usar en desarrollo")
 
+# --- Middleware de solicitudes (ASGI puro) ---
+MAX_REQUEST_BODY_SIZE = 10 * 1024 * 1024  # 10 MiB
+# Una sola pasada: id de solicitud y tiempos, rate limiting, límite de cuerpo
+# (mitigación DoS multipart), cabeceras de seguridad y logging estructurado
+app.add_middleware(
+    RequestPipelineMiddleware,
+    logger=api_logger,
+    max_body_size=MAX_REQUEST_BODY_SIZE,
+    rate_limiting=rate_limiting_enabled,
+    cors_wildcard=cors_wildcard_enabled(settings),
+)
+
 # --- Manejo de Errores Personalizado ---
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
@@ -429,61 +527,6 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
-# --- Middleware de Logging Mejorado ---
-
-
-@app.middleware("http")
-async def log_requests(
-    request: Request, 
-    call_next: Callable[[Request], Awaitable[Response]],
-) -> Response:
-    start_time = time.time()
-    
-    # Log de request con información estructurada
-    # Sanitizar logs: evitar imprimir query completa y headers sensibles
-    redacted_query = "<redacted>" if request.url.query else ""
-    api_logger.info(
-        f"Request: {request.method} {request.url.path}",
-        method=request.method,
-        path=request.url.path,
-        query=redacted_query,
-        client_ip=request.client.host if request.client else "unknown",
-        user_agent=request.headers.get("user-agent", "unknown"),
-    )
-    
-    try:
-        response = await call_next(request)
-    except Exception as exc:
-        process_time = (time.time() - start_time) * 1000
-        api_logger.error(
-            f"Request failed: {request.method} {request.url.path}",
-            error=exc,
-            method=request.method,
-            path=request.url.path,
-            duration_ms=round(process_time, 2),
-        )
-        raise
-    
-    process_time = (time.time() - start_time) * 1000
-    
-    # Record performance metrics
-    from src.core.performance import performance_middleware
-    performance_middleware.record_request(
-        method=request.method,
-        path=request.url.path,
-        duration=process_time / 1000,  # Convert to seconds
-        status_code=response.status_code
-    )
-    
-    api_logger.info(
-        f"Response: {response.status_code} | Time: {process_time:.2f}ms",
-        status_code=response.status_code,
-        duration_ms=round(process_time, 2),
-        method=request.method,
-        path=request.url.path
-    )
-    return response
-
 # --- Endpoint de métricas básicas ---
 
 
@@ -5,14 +5,18 @@ Protección contra DoS y abuso en servicios ciudadanos.
 """
 
 import time
-from typing import Dict, Callable, Any
-from collections import defaultdict
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional, Union
 from datetime import datetime
 
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from src.core.logging import get_logger
+
+rate_limit_logger = get_logger("middleware.rate_limiting")
+
 
 # Configuration for government rate limits
 GOVERNMENT_RATE_LIMITS = {
@@ -21,54 +25,168 @@ GOVERNMENT_RATE_LIMITS = {
     "websocket_handshake": 10,  # WebSocket connections per minute
     "admin_services": 200,  # requests per minute for admin
 }
+RATE_LIMIT_WINDOW_SECONDS = 60
+
+# Rutas sin rate limiting (health checks y métricas)
+RATE_LIMIT_EXEMPT_PATHS = frozenset({"/health", "/health/live", "/health/ready", "/metrics"})
+
+
+class RateLimitDecision(NamedTuple):
+    """Resultado de consultar el limitador para una solicitud."""
+
+    limited: bool
+    retry_after: int
+    remaining: int
+
+
+def _gcra(tat: float, now: float, limit: int, window: float) -> tuple[Optional[float], float]:
+    """
+    Paso GCRA (Generic Cell Rate Algorithm).
+
+    Cada solicitud adelanta el TAT (theoretical arrival time) un intervalo
+    ``window / limit``; se admite mientras el TAT no supere ``now + window``,
+    lo que equivale a ``limit`` solicitudes por ventana con ráfaga completa.
+
+    Returns:
+        ``(nuevo_tat, 0)`` si se admite, ``(None, segundos_de_espera)`` si no
+    """
+    interval = window / limit
+    new_tat = max(tat, now) + interval
+    allow_at = new_tat - window
+    if allow_at > now:
+        return None, allow_at - now
+    return new_tat, 0.0
+
+
+def _remaining(new_tat: float, now: float, limit: int, window: float) -> int:
+    return max(0, int((window - (new_tat - now)) / (window / limit)))
 
 
 class GovernmentRateLimiter:
     """
-    Simple in-memory rate limiter for government services.
-    For production with multiple workers, use Redis-backed rate limiting.
+    In-memory GCRA rate limiter: O(1) per request, one float per client.
+
+    Client state lives in an LRU bounded by ``max_clients``; evicting an
+    idle client only forgets budget it would have regained anyway. Limits
+    are per process: use ``RedisGovernmentRateLimiter`` to share them
+    across workers/machines.
     """
     
-    def __init__(self):
-        self.requests: Dict[str, list[float]] = defaultdict(list)
-        self.window_seconds = 60
-    
-    def is_rate_limited(self, client_id: str, limit: int) -> bool:
-        """Check if client has exceeded rate limit."""
-        now = time.time()
-        window_start = now - self.window_seconds
-        
-        # Clean old requests
-        if client_id in self.requests:
-            self.requests[client_id] = [
-                req_time for req_time in self.requests[client_id]
-                if req_time > window_start
-            ]
-        
-        # Check limit
-        request_count = len(self.requests[client_id])
-        
-        if request_count >= limit:
-            return True
-        
-        # Record this request
-        self.requests[client_id].append(now)
-        return False
+    def __init__(self, max_clients: int = 100_000, window_seconds: int = RATE_LIMIT_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.max_clients = max_clients
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self.evictions = 0
     
-    def get_retry_after(self, client_id: str) -> int:
-        """Get seconds until rate limit resets."""
-        if client_id not in self.requests or not self.requests[client_id]:
-            return 0
-        
-        oldest_request = min(self.requests[client_id])
-        window_end = oldest_request + self.window_seconds
-        retry_after = int(window_end - time.time())
-        
-        return max(retry_after, 1)
+    async def check(self, client_id: str, limit: int) -> RateLimitDecision:
+        """Registra la solicitud si está dentro del límite y devuelve la decisión."""
+        return self.check_now(client_id, limit, time.monotonic())
 
+    def check_now(self, client_id: str, limit: int, now: float) -> RateLimitDecision:
+        key = f"{client_id}:{limit}"
+        tat = self._tat.get(key, now)
+        new_tat, wait = _gcra(tat, now, limit, self.window_seconds)
+        if new_tat is None:
+            return RateLimitDecision(True, max(1, int(wait + 0.999)), 0)
+        self._tat[key] = new_tat
+        self._tat.move_to_end(key)
+        if len(self._tat) > self.max_clients:
+            self._tat.popitem(last=False)
+            self.evictions += 1
+        return RateLimitDecision(False, 0, _remaining(new_tat, now, limit, self.window_seconds))
 
-# Global rate limiter instance
-government_rate_limiter = GovernmentRateLimiter()
+    def get_stats(self) -> dict[str, Any]:
+        return {"backend": "memory", "clients": len(self._tat), "evictions": self.evictions}
+
+
+# Atomic GCRA step in Redis; uses the server clock so every worker agrees.
+# KEYS[1] = client key; ARGV[1] = limit; ARGV[2] = window (ms)
+# Returns {limited (0/1), retry_after_ms, remaining}
+_GCRA_LUA = """
+if redis.replicate_commands then pcall(redis.replicate_commands) end
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local interval = window / limit
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if allow_at > now then
+    return {1, math.ceil(allow_at - now), 0}
+end
+redis.call('SET', KEYS[1], string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now))
+return {0, 0, math.floor((window - (new_tat - now)) / interval)}
+"""
+
+
+class RedisGovernmentRateLimiter:
+    """
+    GCRA rate limiter shared by all workers through Redis.
+
+    Each request is one EVALSHA of an atomic Lua script (one round trip);
+    the key expires once the client's budget is fully restored, so Redis
+    only holds recently active clients. If Redis fails, the request is
+    checked against a local ``GovernmentRateLimiter`` instead.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        *,
+        client: Any = None,
+        prefix: str = "gad:ratelimit:",
+        window_seconds: int = RATE_LIMIT_WINDOW_SECONDS,
+        fallback: Optional[GovernmentRateLimiter] = None,
+    ):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(redis_url)
+        self.redis = client
+        self.prefix = prefix
+        self.window_seconds = window_seconds
+        self.fallback = fallback or GovernmentRateLimiter(window_seconds=window_seconds)
+        self._script = client.register_script(_GCRA_LUA)
+        self.redis_errors = 0
+
+    async def check(self, client_id: str, limit: int) -> RateLimitDecision:
+        key = f"{self.prefix}{client_id}:{limit}"
+        try:
+            limited, retry_ms, remaining = await self._script(
+                keys=[key], args=[limit, self.window_seconds * 1000]
+            )
+        except Exception as e:
+            self.redis_errors += 1
+            if self.redis_errors == 1 or self.redis_errors % 1000 == 0:
+                rate_limit_logger.warning(
+                    f"Rate limiting Redis no disponible, usando límite local: {e}",
+                    errors=self.redis_errors,
+                )
+            return await self.fallback.check(client_id, limit)
+        if int(limited):
+            return RateLimitDecision(True, max(1, int((int(retry_ms) + 999) // 1000)), 0)
+        return RateLimitDecision(False, 0, int(remaining))
+
+    def get_stats(self) -> dict[str, Any]:
+        return {"backend": "redis", "redis_errors": self.redis_errors, "fallback": self.fallback.get_stats()}
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+RateLimiterBackend = Union[GovernmentRateLimiter, RedisGovernmentRateLimiter]
+
+# Global rate limiter instance (reemplazable con configure_government_rate_limiter)
+government_rate_limiter: RateLimiterBackend = GovernmentRateLimiter()
+
+
+def configure_government_rate_limiter(backend: RateLimiterBackend) -> RateLimiterBackend:
+    """Sustituye el backend usado por el middleware; devuelve el anterior."""
+    global government_rate_limiter
+    previous, government_rate_limiter = government_rate_limiter, backend
+    return previous
 
 
 def get_government_client_id(request: Request) -> str:
@@ -117,7 +235,7 @@ class GovernmentRateLimitMiddleware(BaseHTTPMiddleware):  # type: ignore[misc]
     
     async def dispatch(self, request: Request, call_next: Callable[[Request], Any]):
         # Skip rate limiting for health checks and metrics
-        if request.url.path in ["/health", "/health/live", "/health/ready", "/metrics"]:
+        if request.url.path in RATE_LIMIT_EXEMPT_PATHS:
             return await call_next(request)
         
         # Get client identifier
@@ -126,47 +244,61 @@ class GovernmentRateLimitMiddleware(BaseHTTPMiddleware):  # type: ignore[misc]
         # Determine rate limit for this path
         rate_limit = get_rate_limit_for_path(request.url.path)
         
-        # Check rate limit
-        if government_rate_limiter.is_rate_limited(client_id, rate_limit):
-            retry_after = government_rate_limiter.get_retry_after(client_id)
-            
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "error": "rate_limit_exceeded",
-                    "message": "Ha excedido el límite de solicitudes para servicios gubernamentales.",
-                    "details": "Los servicios digitales tienen límites para garantizar disponibilidad equitativa.",
-                    "retry_after_seconds": retry_after,
-                    "rate_limit": rate_limit,
-                    "window_seconds": 60,
-                    "government_service": "GRUPO_GAD",
-                    "citizen_support": "Para asistencia, contacte soporte ciudadano.",
-                    "timestamp": datetime.utcnow().isoformat()
-                },
-                headers={
-                    "Retry-After": str(retry_after),
-                    "X-RateLimit-Limit": str(rate_limit),
-                    "X-RateLimit-Window": "60",
-                    "X-RateLimit-Policy": "government_citizen_protection",
-                    "X-Government-Service": "GRUPO_GAD"
-                }
-            )
+        # Check rate limit (GCRA: un paso O(1) en memoria o un EVALSHA en Redis)
+        decision = await government_rate_limiter.check(client_id, rate_limit)
+        if decision.limited:
+            return rate_limit_exceeded_response(rate_limit, decision.retry_after)
         
         # Add rate limit info to response headers
         response = await call_next(request)
-        
-        # Add informational headers
-        response.headers["X-RateLimit-Limit"] = str(rate_limit)
-        response.headers["X-RateLimit-Window"] = "60"
-        response.headers["X-Government-Service"] = "GRUPO_GAD"
-        
+        response.headers.update(rate_limit_headers(rate_limit, decision.remaining))
         return response
 
 
-def setup_government_rate_limiting(app):
+def rate_limit_headers(rate_limit: int, remaining: int) -> dict[str, str]:
+    """Cabeceras informativas añadidas a las respuestas admitidas."""
+    return {
+        "X-RateLimit-Limit": str(rate_limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Window": str(RATE_LIMIT_WINDOW_SECONDS),
+        "X-Government-Service": "GRUPO_GAD",
+    }
+
+
+def rate_limit_exceeded_response(rate_limit: int, retry_after: int) -> JSONResponse:
+    """Respuesta 429 para una solicitud rechazada por el limitador."""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={
+            "error": "rate_limit_exceeded",
+            "message": "Ha excedido el límite de solicitudes para servicios gubernamentales.",
+            "details": "Los servicios digitales tienen límites para garantizar disponibilidad equitativa.",
+            "retry_after_seconds": retry_after,
+            "rate_limit": rate_limit,
+            "window_seconds": RATE_LIMIT_WINDOW_SECONDS,
+            "government_service": "GRUPO_GAD",
+            "citizen_support": "Para asistencia, contacte soporte ciudadano.",
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        headers={
+            "Retry-After": str(retry_after),
+            "X-RateLimit-Limit": str(rate_limit),
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Window": str(RATE_LIMIT_WINDOW_SECONDS),
+            "X-RateLimit-Policy": "government_citizen_protection",
+            "X-Government-Service": "GRUPO_GAD"
+        }
+    )
+
+
+def setup_government_rate_limiting(app, backend: Optional[RateLimiterBackend] = None):
     """
     Configure rate limiting for FastAPI application.
-    Call this during app initialization.
+    Call this during app initialization; ``backend`` replaces the default
+    in-memory limiter (it can also be swapped later, e.g. at startup once
+    Redis is known, with ``configure_government_rate_limiter``).
     """
+    if backend is not None:
+        configure_government_rate_limiter(backend)
     app.add_middleware(GovernmentRateLimitMiddleware)
     return app
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Middleware ASGI único para las solicitudes HTTP de la API.
+
+Sustituye a la cadena de ``@app.middleware("http")`` (cabeceras de
+seguridad, límite de cuerpo, logging de solicitudes) y a
+``GovernmentRateLimitMiddleware``: cada capa ``BaseHTTPMiddleware`` pasaba
+la respuesta por ``call_next`` (tarea y stream intermedios). Aquí todo se
+hace en una pasada sobre los mensajes ASGI:
+
+- id de solicitud (``X-Request-ID``, se respeta el del cliente) y tiempos;
+- rate limiting GCRA (mismo limitador global y mismas respuestas 429);
+- límite de cuerpo por ``Content-Length`` y, en cuerpos sin él (chunked),
+  contando los bytes recibidos;
+- cabeceras de seguridad precalculadas al construir el middleware;
+- registro en ``performance_middleware`` y logs de solicitud/respuesta.
+
+Las respuestas en streaming funcionan sin cambios: las cabeceras se
+añaden en ``http.response.start`` y el cuerpo se reenvía tal cual.
+"""
+
+import time
+import uuid
+from typing import Any, Awaitable, Callable, List, MutableMapping, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.exceptions import HTTPException
+
+from src.api.middleware import government_rate_limiting as rate_limiting
+from src.core.logging import StructuredLogger, get_logger
+from src.core.performance import performance_middleware, route_template
+from src.core.query_instrumentation import request_query_context
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+RawHeaders = List[Tuple[bytes, bytes]]
+
+DEFAULT_MAX_BODY_SIZE = 10 * 1024 * 1024  # 10 MiB
+
+SECURITY_HEADERS = (
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+    ("X-XSS-Protection", "1; mode=block"),
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+    ("Permissions-Policy", "geolocation=(), microphone=(), camera=()"),
+)
+API_CSP_HEADER = ("Content-Security-Policy", "default-src 'none'; frame-ancestors 'none';")
+# Con '*' permitido se exponen cabeceras CORS también en peticiones sin Origin
+CORS_WILDCARD_HEADERS = (("Access-Control-Allow-Origin", "*"),)
+CORS_WILDCARD_DEFAULTS = (
+    ("Access-Control-Allow-Methods", "GET, POST, PUT, PATCH, DELETE, OPTIONS"),
+    ("Access-Control-Allow-Headers", "*"),
+)
+
+_MAX_REQUEST_ID_LENGTH = 128
+
+
+def _encode(headers: Any) -> RawHeaders:
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+class _BodyTooLarge(HTTPException):
+    """Cuerpo sin Content-Length que supera el límite mientras se recibe."""
+
+    def __init__(self) -> None:
+        super().__init__(status_code=413, detail="Request body too large")
+
+
+class RequestPipelineMiddleware:
+    """Cabeceras de seguridad, límite de cuerpo, rate limiting, tiempos y logs en una pasada."""
+
+    def __init__(
+        self,
+        app: Callable[..., Awaitable[None]],
+        *,
+        logger: Optional[StructuredLogger] = None,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+        rate_limiting: bool = True,
+        cors_wildcard: bool = False,
+    ) -> None:
+        self.app = app
+        self.logger = logger or get_logger("api.requests")
+        self.max_body_size = max_body_size
+        self.rate_limit_enabled = rate_limiting
+        # Cabeceras precalculadas (bytes) para no rehacerlas en cada respuesta
+        base = _encode(SECURITY_HEADERS) + (_encode(CORS_WILDCARD_HEADERS) if cors_wildcard else [])
+        self._headers = base
+        self._api_headers = base + _encode([API_CSP_HEADER])
+        self._default_headers = _encode(CORS_WILDCARD_DEFAULTS) if cors_wildcard else []
+        self._replaced = frozenset(name for name, _ in self._api_headers) | {b"server"}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        request_id = self._request_id(scope)
+        scope.setdefault("state", {})["request_id"] = request_id
+        status_code = 500
+
+        self.logger.info(
+            f"Request: {method} {path}",
+            method=method,
+            path=path,
+            query="<redacted>" if scope.get("query_string") else "",
+            client_ip=scope["client"][0] if scope.get("client") else "unknown",
+            user_agent=self._header(scope, b"user-agent") or "unknown",
+            request_id=request_id,
+        )
+
+        extra_headers: RawHeaders = [(b"x-request-id", request_id.encode("latin-1"))]
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                message["headers"] = self._apply_headers(path, message.get("headers") or [], extra_headers)
+            await send(message)
+
+        try:
+            early = await self._early_response(scope, path, extra_headers)
+            if early is not None:
+                await early(scope, receive, send_wrapper)
+            else:
+                with request_query_context(scope):
+                    await self.app(scope, self._limited_receive(receive), send_wrapper)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+            await self._too_large()(scope, receive, send_wrapper)
+        except Exception as exc:
+            self.logger.error(
+                f"Request failed: {method} {path}",
+                error=exc,
+                method=method,
+                path=path,
+                duration_ms=round((time.perf_counter() - start) * 1000, 2),
+                request_id=request_id,
+            )
+            raise
+
+        duration = time.perf_counter() - start
+        performance_middleware.record_request(
+            method=method,
+            route=route_template(scope),
+            duration=duration,
+            status_code=status_code,
+        )
+        self.logger.info(
+            f"Response: {status_code} | Time: {duration * 1000:.2f}ms",
+            status_code=status_code,
+            duration_ms=round(duration * 1000, 2),
+            method=method,
+            path=path,
+            request_id=request_id,
+        )
+
+    async def _early_response(self, scope: Scope, path: str, extra_headers: RawHeaders) -> Optional[JSONResponse]:
+        """Respuesta 429/413 sin llegar a la aplicación, o ``None`` para continuar."""
+        if self.rate_limit_enabled and path not in rate_limiting.RATE_LIMIT_EXEMPT_PATHS:
+            rate_limit = rate_limiting.get_rate_limit_for_path(path)
+            client_id = rate_limiting.get_government_client_id(Request(scope))
+            decision = await rate_limiting.government_rate_limiter.check(client_id, rate_limit)
+            if decision.limited:
+                return rate_limiting.rate_limit_exceeded_response(rate_limit, decision.retry_after)
+            extra_headers.extend(_encode(rate_limiting.rate_limit_headers(rate_limit, decision.remaining).items()))
+
+        content_length = self._header(scope, b"content-length")
+        if content_length is not None:
+            try:
+                if int(content_length) > self.max_body_size:
+                    return self._too_large()
+            except ValueError:
+                # Si no es un número válido, dejar que downstream valide
+                pass
+        return None
+
+    def _limited_receive(self, receive: Receive) -> Receive:
+        """Cuenta los bytes del cuerpo y corta al superar ``max_body_size``."""
+        received = 0
+
+        async def limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise _BodyTooLarge()
+            return message
+
+        return limited
+
+    @staticmethod
+    def _too_large() -> JSONResponse:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+
+    def _apply_headers(self, path: str, headers: Any, extra: RawHeaders) -> RawHeaders:
+        added = self._api_headers if path.startswith("/api/") else self._headers
+        replaced = self._replaced
+        result = [(name, value) for name, value in headers if name.lower() not in replaced]
+        if self._default_headers:
+            present = {name.lower() for name, _ in result}
+            result.extend(h for h in self._default_headers if h[0] not in present)
+        result.extend(added)
+        result.extend(extra)
+        return result
+
+    def _request_id(self, scope: Scope) -> str:
+        incoming = self._header(scope, b"x-request-id")
+        if incoming and len(incoming) <= _MAX_REQUEST_ID_LENGTH and incoming.isprintable():
+            return incoming
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _header(scope: Scope, name: bytes) -> Optional[str]:
+        for key, value in scope.get("headers", ()):
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+
+def cors_wildcard_enabled(settings: Any) -> bool:
+    """Indica si la configuración permite '*' (CORS_ALLOWED_ORIGINS o ALLOWED_HOSTS)."""
+    try:
+        allowed = getattr(settings, "cors_origins_list", []) or getattr(settings, "ALLOWED_HOSTS", None) or []
+    except Exception:
+        return False
+    return isinstance(allowed, list) and "*" in allowed
+
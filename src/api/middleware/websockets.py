@@ -7,10 +7,14 @@ Proporciona funcionalidades de:
 - Integración con sistema de autenticación
 - Monitoreo de conexiones
 - Notificaciones automáticas
+
+Los eventos se encolan en una ``CoalescingEventQueue`` acotada: los de la
+misma tarea/efectivo dentro de la ventana de agrupación se fusionan y los
+de varias entidades se envían en un único frame ``entity_batch``.
 """
 
 import asyncio
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
 from datetime import datetime
 
 from src.core.websockets import (
@@ -21,10 +25,45 @@ from src.core.websockets import (
     send_system_alert
 )
 from src.core.logging import get_logger
+from src.core.ws_event_batching import BatchingConfig, CoalescingEventQueue
 
 # Logger para middleware WebSocket
 ws_middleware_logger = get_logger("websockets.middleware")
 
+_ENTITY_EVENTS = {"task_event": "task_data", "efectivo_event": "efectivo_data"}
+# Al fusionar eventos de una entidad prevalece el de mayor rango
+_SUB_EVENT_RANK = {"created": 2, "status_changed": 1}
+
+
+def merge_emitter_events(pending: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Fusiona dos eventos pendientes de la misma entidad: gana el último
+    estado, pero un ``created`` sigue siendo ``created`` y un cambio de
+    estado conserva el estado original (``old`` del primero, ``new`` del último).
+
+    ``created`` + ``deleted`` no deja evento, ``deleted`` prevalece sobre
+    lo anterior y ``deleted`` + ``created`` (restauración) es ``updated``.
+    """
+    data_key = _ENTITY_EVENTS.get(new.get("type", ""))
+    if data_key is None or pending.get("type") != new.get("type"):
+        return new
+    first, last = pending.get("event_type", ""), new.get("event_type", "")
+    if last == "deleted":
+        return None if first == "created" else new
+    if first == "deleted" and last == "created":
+        return {**new, "event_type": "updated"}
+    merged = dict(new)
+    if _SUB_EVENT_RANK.get(first, 0) > _SUB_EVENT_RANK.get(last, 0):
+        merged["event_type"] = first
+    old_change = (pending.get(data_key) or {}).get("_status_change")
+    new_change = (new.get(data_key) or {}).get("_status_change")
+    if old_change and merged["event_type"] == "status_changed":
+        merged[data_key] = {
+            **(new.get(data_key) or {}),
+            "_status_change": {"old": old_change["old"], "new": (new_change or old_change)["new"]},
+        }
+    return merged
+
 
 class WebSocketEventEmitter:
     """
@@ -34,8 +73,8 @@ class WebSocketEventEmitter:
     en tiempo real a través de WebSockets.
     """
     
-    def __init__(self):
-        self._event_queue: asyncio.Queue[Any] = asyncio.Queue()
+    def __init__(self, config: Optional[BatchingConfig] = None):
+        self._event_queue = CoalescingEventQueue("emitter", config, merge=merge_emitter_events)
         self._processing_task: Optional[asyncio.Task[Any]] = None
         self._is_running = False
     
@@ -92,7 +131,7 @@ class WebSocketEventEmitter:
             "timestamp": datetime.now()
         }
         
-        await self._event_queue.put(event)
+        await self._event_queue.put(event, ("task", task_id, user_id), "task")
     
     async def emit_efectivo_event(self, event_type: str, efectivo_id: int,
                                  efectivo_data: Dict[str, Any]):
@@ -112,7 +151,7 @@ class WebSocketEventEmitter:
             "timestamp": datetime.now()
         }
         
-        await self._event_queue.put(event)
+        await self._event_queue.put(event, ("efectivo", efectivo_id), "efectivo")
     
     async def emit_system_event(self, event_type: str, title: str, 
                                content: str, level: str = "info"):
@@ -149,19 +188,29 @@ class WebSocketEventEmitter:
             "timestamp": datetime.now()
         }
         
-        await self._event_queue.put(event)
+        await self._event_queue.put(event, ("dashboard",), "dashboard")
+
+    def request_resync(self, kind: str):
+        """
+        Indica a los clientes que recarguen un tipo de entidad (``task``,
+        ``efectivo``) porque se perdieron eventos aguas arriba.
+        """
+        self._event_queue.mark_resync(kind)
     
     async def _process_events(self):
-        """Procesa eventos en cola de manera asíncrona."""
+        """Procesa lotes de eventos en cola de manera asíncrona."""
         while self._is_running:
             try:
-                # Esperar por evento con timeout
-                event = await asyncio.wait_for(
-                    self._event_queue.get(), 
+                # Esperar por lote con timeout
+                batch = await asyncio.wait_for(
+                    self._event_queue.get_batch(), 
                     timeout=1.0
                 )
                 
-                await self._handle_event(event)
+                try:
+                    await self._handle_batch(batch, self._event_queue.pop_resync())
+                finally:
+                    self._event_queue.task_done(len(batch))
                 
             except asyncio.TimeoutError:
                 # Timeout normal, continuar loop
@@ -172,6 +221,88 @@ class WebSocketEventEmitter:
                 ws_middleware_logger.error(f"Error procesando evento WebSocket: {str(e)}")
                 await asyncio.sleep(1)  # Evitar spam de errores
     
+    async def _handle_batch(self, events: List[Dict[str, Any]], resync: Set[str]):
+        """
+        Envía un lote: eventos de sistema/dashboard uno a uno y los de
+        entidades agrupados por destinatario en un frame ``entity_batch``
+        (un solo evento sin resincronización pendiente se envía como antes).
+        """
+        entity_groups: Dict[Optional[int], List[Dict[str, Any]]] = {}
+        for event in events:
+            if event.get("type") in _ENTITY_EVENTS:
+                entity_groups.setdefault(event.get("user_id"), []).append(event)
+            else:
+                await self._handle_event(event)
+
+        if resync and None not in entity_groups:
+            entity_groups[None] = []
+        for user_id, group in entity_groups.items():
+            group_resync = resync if user_id is None else set()
+            try:
+                if len(group) == 1 and not group_resync:
+                    await self._handle_event(group[0])
+                else:
+                    await self._send_entity_batch(group, user_id, group_resync)
+            except Exception as e:
+                ws_middleware_logger.error(f"Error enviando lote de eventos: {str(e)}")
+
+    async def _send_entity_batch(self, events: List[Dict[str, Any]], user_id: Optional[int],
+                                 resync: Set[str]):
+        """Un frame con los eventos de varias entidades."""
+        items = []
+        for event in events:
+            message = self._entity_message(event)
+            items.append({"event_type": message.event_type.value, "data": message.data})
+        message = WSMessage(
+            event_type=EventType.ENTITY_BATCH,
+            data={"events": items, "count": len(items), "resync": sorted(resync)},
+            target_user_id=user_id
+        )
+        if user_id:
+            sent_count = await websocket_manager.send_to_user(user_id, message)
+        else:
+            sent_count = await websocket_manager.broadcast(message)
+
+        ws_middleware_logger.debug(
+            "Lote de eventos enviado",
+            events=len(items),
+            resync=sorted(resync),
+            sent_to_connections=sent_count
+        )
+
+    def _entity_message(self, event: Dict[str, Any]) -> WSMessage:
+        """Mensaje individual de un evento de tarea o efectivo."""
+        sub_event_type = event["event_type"]
+        if event["type"] == "task_event":
+            ws_event_type = {
+                "created": EventType.TASK_CREATED,
+                "updated": EventType.TASK_UPDATED,
+                "status_changed": EventType.TASK_STATUS_CHANGED,
+                "assigned": EventType.TASK_ASSIGNED
+            }.get(sub_event_type, EventType.TASK_UPDATED)
+            return WSMessage(
+                event_type=ws_event_type,
+                data={
+                    "task_id": event["task_id"],
+                    "task_data": event["task_data"],
+                    "sub_event_type": sub_event_type
+                },
+                target_user_id=event.get("user_id")
+            )
+
+        ws_event_type = {
+            "status_changed": EventType.EFECTIVO_STATUS_CHANGED,
+            "location_update": EventType.EFECTIVO_LOCATION_UPDATE
+        }.get(sub_event_type, EventType.EFECTIVO_STATUS_CHANGED)
+        return WSMessage(
+            event_type=ws_event_type,
+            data={
+                "efectivo_id": event["efectivo_id"],
+                "efectivo_data": event["efectivo_data"],
+                "sub_event_type": sub_event_type
+            }
+        )
+    
     async def _handle_event(self, event: Dict[str, Any]):
         """
         Maneja un evento específico.
@@ -198,28 +329,8 @@ class WebSocketEventEmitter:
     
     async def _handle_task_event(self, event: Dict[str, Any]):
         """Maneja eventos de tareas."""
-        task_id = event["task_id"]
-        task_data = event["task_data"]
         user_id = event.get("user_id")
-        sub_event_type = event["event_type"]
-        
-        # Mapear tipos de eventos
-        ws_event_type = {
-            "created": EventType.TASK_CREATED,
-            "updated": EventType.TASK_UPDATED,
-            "status_changed": EventType.TASK_STATUS_CHANGED,
-            "assigned": EventType.TASK_ASSIGNED
-        }.get(sub_event_type, EventType.TASK_UPDATED)
-        
-        message = WSMessage(
-            event_type=ws_event_type,
-            data={
-                "task_id": task_id,
-                "task_data": task_data,
-                "sub_event_type": sub_event_type
-            },
-            target_user_id=user_id
-        )
+        message = self._entity_message(event)
         
         if user_id:
             sent_count = await websocket_manager.send_to_user(user_id, message)
@@ -228,37 +339,19 @@ class WebSocketEventEmitter:
         
         ws_middleware_logger.debug(
             "Evento de tarea enviado",
-            task_id=task_id,
-            event_type=sub_event_type,
+            task_id=event["task_id"],
+            event_type=event["event_type"],
             sent_to_connections=sent_count
         )
     
     async def _handle_efectivo_event(self, event: Dict[str, Any]):
         """Maneja eventos de efectivos."""
-        efectivo_id = event["efectivo_id"]
-        efectivo_data = event["efectivo_data"]
-        sub_event_type = event["event_type"]
-        
-        ws_event_type = {
-            "status_changed": EventType.EFECTIVO_STATUS_CHANGED,
-            "location_update": EventType.EFECTIVO_LOCATION_UPDATE
-        }.get(sub_event_type, EventType.EFECTIVO_STATUS_CHANGED)
-        
-        message = WSMessage(
-            event_type=ws_event_type,
-            data={
-                "efectivo_id": efectivo_id,
-                "efectivo_data": efectivo_data,
-                "sub_event_type": sub_event_type
-            }
-        )
-        
-        sent_count = await websocket_manager.broadcast(message)
+        sent_count = await websocket_manager.broadcast(self._entity_message(event))
         
         ws_middleware_logger.debug(
             "Evento de efectivo enviado",
-            efectivo_id=efectivo_id,
-            event_type=sub_event_type,
+            efectivo_id=event["efectivo_id"],
+            event_type=event["event_type"],
             sent_to_connections=sent_count
         )
     
@@ -1,16 +1,20 @@
 # -*- coding: utf-8 -*-
 """
 Modelo de MetricaTarea para el sistema GRUPO_GAD.
+
+Cada fila es un contador del rollup incremental de tareas para la
+combinación (día de creación, delegado, tipo, prioridad, estado); lo
+mantiene ``src.core.task_metrics``.
 """
 
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 
-from sqlalchemy import DECIMAL, REAL, Integer
+from sqlalchemy import DECIMAL, REAL, Date, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import ENUM
 from sqlalchemy.orm import Mapped, mapped_column
 
-from src.shared.constants import TaskPriority, TaskType
+from src.shared.constants import TaskPriority, TaskStatus, TaskType
 
 from .base import Base
 
@@ -19,9 +23,22 @@ class MetricaTarea(Base):
     """Modelo de Métricas de Tareas."""
 
     __tablename__ = "metricas_tareas"
+    __table_args__ = (
+        UniqueConstraint(
+            "fecha", "usuario_id", "tipo_tarea", "prioridad", "estado",
+            name="uq_metricas_tareas_rollup",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
+    # Dimensiones del rollup
+    fecha: Mapped[date] = mapped_column(Date, nullable=False)
+    usuario_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    estado: Mapped[TaskStatus] = mapped_column(
+        ENUM(TaskStatus, name="estado_tarea"), nullable=False
+    )
+
     tipo_tarea: Mapped[TaskType] = mapped_column(
     ENUM(TaskType, name="tipo_tarea"), nullable=False
     )
@@ -29,8 +46,10 @@ class MetricaTarea(Base):
     ENUM(TaskPriority, name="prioridad_tarea"), nullable=False
     )
 
-    # Métricas acumuladas
+    # Métricas acumuladas (total_horas solo suma tareas finalizadas con
+    # inicio_real y fin_real, contadas en tareas_con_duracion)
     total_tareas: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    tareas_con_duracion: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     total_horas: Mapped[float] = mapped_column(REAL, default=0.0, nullable=False)
     tiempo_promedio_horas: Mapped[Optional[float]] = mapped_column(REAL)
     tasa_exito: Mapped[Optional[float]] = mapped_column(DECIMAL(5, 2))
@@ -48,4 +67,7 @@ class MetricaTarea(Base):
     )
 
     def __str__(self) -> str:
-        return f"Métricas para Tarea {self.tipo_tarea} con prioridad {self.prioridad}"
+        return (
+            f"Métricas para Tarea {self.tipo_tarea} con prioridad {self.prioridad} "
+            f"({self.estado}, {self.fecha})"
+        )
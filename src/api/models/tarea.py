@@ -13,6 +13,7 @@ from sqlalchemy import (
     CheckConstraint,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
@@ -51,6 +52,15 @@ class Tarea(Base):
             "fin_real >= inicio_real)",
             name="chk_tareas_fechas_reales",
         ),
+        # Prefiltro por bounding box de /geo/map/view
+        Index("ix_tareas_ubicacion", "ubicacion_lat", "ubicacion_lon"),
+        # Conteos por estado y páginas de tareas activas de un delegado (bot)
+        Index(
+            "ix_tareas_delegado_estado_inicio",
+            "delegado_usuario_id",
+            "estado",
+            "inicio_programado",
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -6,16 +6,17 @@ Provides privileged operations that require admin/superuser access.
 All operations are audited and logged for security compliance.
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, Literal
 from datetime import datetime
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.dependencies import get_current_active_superuser
 from src.api.models.usuario import Usuario
 from src.core.database import get_db_session
+from src.core.performance import query_tracker
 from src.api.utils.logging import log_security_event
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -84,4 +85,30 @@ async def execute_admin_command(
         status="accepted",
         message=f"Administrative command '{command.action}' has been accepted and logged",
         timestamp=timestamp
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/queries/top")  # type: ignore[misc]
+async def top_queries(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: Literal["total_time", "count", "p99", "rows", "n_plus_one"] = Query("total_time"),
+    current_user: Usuario = Depends(get_current_active_superuser),
+) -> Dict[str, Any]:
+    """
+    Top SQL statements by normalized fingerprint for this worker.
+
+    Each entry carries the latency percentiles, row counts, originating
+    routes and how many requests executed it in an N+1 pattern.
+    """
+    n_plus_one = sorted(query_tracker.n_plus_one.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "order_by": order_by,
+        "queries": query_tracker.get_top_queries(limit=limit, order_by=order_by),
+        "n_plus_one": [
+            {"route": route, "fingerprint": fingerprint, "requests": count}
+            for (route, fingerprint), count in n_plus_one[:limit]
+        ],
+        "fingerprints": len(query_tracker.fingerprint_stats),
+        "dropped_fingerprints": query_tracker.dropped_fingerprints,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
@@ -2,15 +2,25 @@
 """
 Router de métricas para GRUPO_GAD.
 
-Este router expone endpoints para métricas de Prometheus.
+Este router expone endpoints para métricas de Prometheus y latencias por ruta.
 """
 
-from fastapi import APIRouter, Response
+import os
+from datetime import datetime
+from typing import Any, Dict
+
+from fastapi import APIRouter, Query, Response
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 from src.core.logging import get_logger
+from src.core.performance import performance_middleware
 from src.core.websockets import websocket_manager
-from src.observability.metrics import update_all_metrics_from_manager
+from src.observability.metrics import (
+    DEFAULT_LATENCY_WINDOW,
+    LATENCY_WINDOWS,
+    metrics_collector,
+    update_all_metrics_from_manager,
+)
 
 # Logger para el router de métricas
 metrics_logger = get_logger("api.routers.metrics")
@@ -36,4 +46,65 @@ async def prometheus_metrics() -> Response:
     
     # Generar respuesta en formato Prometheus
     content = generate_latest()
-    return Response(content=content, media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
+    return Response(content=content, media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/performance")  # type: ignore[misc]
+async def performance_percentiles(
+    include_snapshot: bool = Query(False, description="Incluir snapshot combinable entre workers"),
+) -> Dict[str, Any]:
+    """
+    Percentiles de latencia (p50/p90/p99/p999) por plantilla de ruta.
+
+    Los valores corresponden a este worker; ``snapshot`` puede combinarse con
+    los de otros workers mediante ``PerformanceMiddleware.merge_snapshot``.
+    """
+    routes = {
+        endpoint: {
+            "count": stats["count"],
+            "avg_ms": round(stats["avg_duration"] * 1000, 3),
+            "max_ms": round(stats["max_duration"] * 1000, 3),
+            **{f"{label}_ms": value for label, value in stats["percentiles_ms"].items()},
+            "errors": stats["errors"],
+        }
+        for endpoint, stats in performance_middleware.get_statistics()["endpoints"].items()
+    }
+    result: Dict[str, Any] = {
+        "worker_pid": os.getpid(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "routes": routes,
+    }
+    if include_snapshot:
+        result["snapshot"] = performance_middleware.snapshot()
+    return result
+
+
+@router.get("/websocket-latency")  # type: ignore[misc]
+async def websocket_latency_percentiles(
+    include_snapshot: bool = Query(False, description="Incluir snapshot combinable entre workers"),
+) -> Dict[str, Any]:
+    """
+    Percentiles de latencia de mensajes WebSocket por canal y ventana (1m, 5m, 1h).
+
+    El ``snapshot`` de cada worker se combina con
+    ``WebSocketMetricsCollector.merge_snapshots`` para el p99 del clúster.
+    """
+    channels = {
+        channel_type: {
+            label: {
+                f"{quantile}_ms": round(value * 1000, 3)
+                for quantile, value in metrics_collector.calculate_percentiles(channel_type, label).items()
+            }
+            for label, _, _ in LATENCY_WINDOWS
+        }
+        for channel_type in list(metrics_collector.latency_totals)
+    }
+    result: Dict[str, Any] = {
+        "worker_pid": os.getpid(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "default_window": DEFAULT_LATENCY_WINDOW,
+        "channels": channels,
+    }
+    if include_snapshot:
+        result["snapshot"] = metrics_collector.snapshot()
+    return result
@@ -9,20 +9,101 @@ from datetime import datetime, timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select
+from sqlalchemy import Date, cast, extract, func, literal_column, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config.settings import settings
 from src.api.dependencies import get_current_active_user
 from src.api.models.tarea import Tarea
 from src.api.models.usuario import Usuario
 from src.core.cache import CacheService, get_cache_service
 from src.core.database import get_db_session
 from src.core.logging import get_logger
+from src.core.task_metrics import read_user_task_stats, rollup_ready
 from src.shared.constants import TaskStatus
 
 stats_logger = get_logger(__name__)
 router = APIRouter(prefix="/stats", tags=["statistics"])
 
+# Estados contabilizados por separado en las estadísticas
+_STATS_STATES = {
+    "COMPLETED": TaskStatus.COMPLETED,
+    "IN_PROGRESS": TaskStatus.IN_PROGRESS,
+    "PROGRAMMED": TaskStatus.PROGRAMMED,
+    "CANCELLED": TaskStatus.CANCELLED,
+    "PAUSED": TaskStatus.PAUSED,
+}
+
+
+def _duration_hours(dialect: str) -> Any:
+    """Expresión SQL de (fin_real - inicio_real) en horas según el dialecto."""
+    if dialect == "sqlite":
+        return (func.julianday(Tarea.fin_real) - func.julianday(Tarea.inicio_real)) * 24.0
+    return extract("epoch", Tarea.fin_real - Tarea.inicio_real) / 3600.0
+
+
+def _day_bucket(dialect: str) -> Any:
+    """Expresión SQL que trunca fin_real al día según el dialecto."""
+    if dialect == "sqlite":
+        return func.date(Tarea.fin_real)
+    # 'day' literal (no parámetro) para que SELECT y GROUP BY coincidan
+    return cast(func.date_trunc(literal_column("'day'"), Tarea.fin_real), Date)
+
+
+async def aggregate_user_task_stats(
+    db: AsyncSession, user_id: int, cutoff_date: datetime
+) -> dict[str, Any]:
+    """
+    Calcula en SQL los agregados de tareas de un usuario desde ``cutoff_date``.
+    
+    Solo viajan filas agregadas: una con los conteos por estado y la duración
+    promedio (``COUNT ... FILTER`` / ``AVG``) y una por día con tareas
+    completadas.
+    
+    Returns:
+        Dict con ``total``, ``estados`` (conteo por estado),
+        ``promedio_duracion_horas`` y ``completadas_por_dia``
+    """
+    dialect = db.get_bind().dialect.name
+    in_period = (
+        Tarea.delegado_usuario_id == user_id,
+        Tarea.created_at >= cutoff_date,
+        Tarea.deleted_at.is_(None),
+    )
+    completed_with_times = (
+        (Tarea.estado == TaskStatus.COMPLETED)
+        & Tarea.inicio_real.is_not(None)
+        & Tarea.fin_real.is_not(None)
+    )
+
+    counts_stmt = select(
+        func.count().label("total"),
+        *(
+            func.count().filter(Tarea.estado == state).label(name)
+            for name, state in _STATS_STATES.items()
+        ),
+        func.avg(_duration_hours(dialect)).filter(completed_with_times).label("avg_hours"),
+    ).where(*in_period)
+    row = (await db.execute(counts_stmt)).one()
+
+    bucket = _day_bucket(dialect).label("dia")
+    buckets_stmt = (
+        select(bucket, func.count().label("completadas"))
+        .where(*in_period, completed_with_times)
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    buckets = (await db.execute(buckets_stmt)).all()
+
+    return {
+        "total": row.total,
+        "estados": {name: getattr(row, name) for name in _STATS_STATES},
+        "promedio_duracion_horas": float(row.avg_hours or 0.0),
+        "completadas_por_dia": [
+            {"fecha": str(dia), "completadas": completadas} for dia, completadas in buckets
+        ],
+    }
+
 
 @router.get("/user/{user_id}")  # type: ignore[misc]
 async def get_user_statistics(
@@ -42,12 +123,21 @@ async def get_user_statistics(
     - en_progreso: Tareas activas
     - promedio_duracion_horas: Tiempo promedio de finalización
     - productividad_diaria: Tareas completadas por día
+    - completadas_por_dia: Tareas completadas agrupadas por día
     - estados: Distribución por estado
     
+    **Fuente:**
+    - Con ``TASK_METRICS_ROLLUP_ENABLED`` y tras la primera reconciliación
+      se lee el rollup ``metricas_tareas``
+      (ventana y agrupación por día de creación de la tarea, con
+      granularidad diaria); si no, agregados SQL sobre ``tareas``
+      (agrupación por día de finalización)
+    
     **Caché:**
     - TTL: 5 minutos (300 segundos)
-    - Key: `stats:user:{user_id}:days:{days}`
-    - Invalidación: Al crear/finalizar tareas (TBD)
+    - Key: `stats:user:v{generación}:{user_id}:days:{days}` (namespace `stats:user`)
+    - Tag: `stats:user:{user_id}`
+    - Invalidación: al mutar tareas (namespace) o vía `/invalidate/user/{user_id}` (tag)
     
     Args:
         user_id: ID del usuario en la base de datos
@@ -64,10 +154,11 @@ async def get_user_statistics(
             detail="No tienes permiso para ver estadísticas de otro usuario",
         )
     
-    cache_key = f"stats:user:{user_id}:days:{days}"
-    
-    # Intentar obtener del caché si está habilitado
+    # Intentar obtener del caché si está habilitado (la clave se resuelve
+    # antes de calcular para que una invalidación concurrente la descarte)
+    cache_key = None
     if use_cache:
+        cache_key = await cache.namespaced_key("stats:user", f"{user_id}:days:{days}")
         cached_stats = await cache.get(cache_key)
         if cached_stats is not None:
             stats_logger.info(
@@ -96,38 +187,13 @@ async def get_user_statistics(
         # Fecha límite
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        # Query: Tareas del usuario en el período
-        stmt = (
-            select(Tarea)
-            .where(Tarea.delegado_usuario_id == user_id)
-            .where(Tarea.created_at >= cutoff_date)
-            .where(Tarea.deleted_at.is_(None))
-        )
-        result = await db.execute(stmt)
-        tareas = result.scalars().all()
-        
-        # Calcular métricas
-        total = len(tareas)
-        completadas = sum(1 for t in tareas if t.estado == TaskStatus.COMPLETED)
-        en_progreso = sum(1 for t in tareas if t.estado == TaskStatus.IN_PROGRESS)
-        programadas = sum(1 for t in tareas if t.estado == TaskStatus.PROGRAMMED)
-        canceladas = sum(1 for t in tareas if t.estado == TaskStatus.CANCELLED)
-        pausadas = sum(1 for t in tareas if t.estado == TaskStatus.PAUSED)
-        
-        # Calcular duración promedio (solo tareas completadas con inicio y fin)
-        duraciones = []
-        for tarea in tareas:
-            if (
-                tarea.estado == TaskStatus.COMPLETED
-                and tarea.inicio_real
-                and tarea.fin_real
-            ):
-                duracion_horas = (tarea.fin_real - tarea.inicio_real).total_seconds() / 3600
-                duraciones.append(duracion_horas)
-        
-        promedio_duracion = (
-            sum(duraciones) / len(duraciones) if duraciones else 0.0
-        )
+        # Rollup precalculado (ya reconciliado) o, sin él, agregados en la base de datos
+        if getattr(settings, "TASK_METRICS_ROLLUP_ENABLED", True) and rollup_ready():
+            agg = await read_user_task_stats(db, user_id, cutoff_date.date())
+        else:
+            agg = await aggregate_user_task_stats(db, user_id, cutoff_date)
+        estados = agg["estados"]
+        completadas = estados["COMPLETED"]
         
         # Productividad diaria
         productividad = completadas / days if days > 0 else 0.0
@@ -135,21 +201,16 @@ async def get_user_statistics(
         stats = {
             "user_id": user_id,
             "period_days": days,
-            "total": total,
+            "total": agg["total"],
             "completadas": completadas,
-            "en_progreso": en_progreso,
-            "programadas": programadas,
-            "canceladas": canceladas,
-            "pausadas": pausadas,
-            "promedio_duracion_horas": round(promedio_duracion, 2),
+            "en_progreso": estados["IN_PROGRESS"],
+            "programadas": estados["PROGRAMMED"],
+            "canceladas": estados["CANCELLED"],
+            "pausadas": estados["PAUSED"],
+            "promedio_duracion_horas": round(agg["promedio_duracion_horas"], 2),
             "productividad_diaria": round(productividad, 2),
-            "estados": {
-                "COMPLETED": completadas,
-                "IN_PROGRESS": en_progreso,
-                "PROGRAMMED": programadas,
-                "CANCELLED": canceladas,
-                "PAUSED": pausadas,
-            },
+            "estados": estados,
+            "completadas_por_dia": agg["completadas_por_dia"],
             "calculated_at": datetime.utcnow().isoformat(),
             "_cache": {
                 "hit": False,
@@ -158,8 +219,8 @@ async def get_user_statistics(
         }
         
         # Guardar en caché con TTL de 5 minutos
-        if use_cache:
-            await cache.set(cache_key, stats, ttl=300)
+        if cache_key is not None:
+            await cache.set(cache_key, stats, ttl=300, tags=[f"stats:user:{user_id}"])
             stats_logger.info(
                 "Estadísticas guardadas en caché",
                 user_id=user_id,
@@ -208,20 +269,20 @@ async def invalidate_user_statistics(
     
     try:
         # Invalidar todas las variaciones de días (7, 30, 90, etc.)
-        pattern = f"stats:user:{user_id}:*"
-        deleted = await cache.delete_pattern(pattern)
+        tag = f"stats:user:{user_id}"
+        deleted = await cache.invalidate_tags(tag)
         
         stats_logger.info(
             "Caché de estadísticas invalidado",
             user_id=user_id,
-            pattern=pattern,
+            tag=tag,
             deleted=deleted,
         )
         
         return {
             "message": f"Estadísticas del usuario {user_id} invalidadas",
             "deleted_keys": deleted,
-            "pattern": pattern,
+            "tag": tag,
         }
         
     except Exception as e:
@@ -36,13 +36,11 @@ async def invalidate_task_related_cache(cache: Optional[CacheService], task_id:
         return
     
     try:
-        # Invalidar estadísticas de usuario (que incluyen conteos de tareas)
-        deleted = await cache.delete_pattern("stats:user:*")
-        logger.info(f"Cache invalidado: {deleted} keys de stats:user:*")
-        
-        # Invalidar listas de tareas si existe un patrón
-        deleted = await cache.delete_pattern("tasks:list:*")
-        logger.info(f"Cache invalidado: {deleted} keys de tasks:list:*")
+        # Invalidar estadísticas de usuario (que incluyen conteos de tareas) y
+        # listas de tareas: incrementar la generación es O(1), sin SCAN
+        for namespace in ("stats:user", "tasks:list"):
+            generation = await cache.invalidate_namespace(namespace)
+            logger.info(f"Cache invalidado: namespace {namespace} (generación {generation})")
         
         # Si hay un task_id específico, invalidar cache de esa tarea
         if task_id:
@@ -115,8 +113,9 @@ async def create_emergency(
     """
     Creates an emergency task and assigns the nearest available efectivo.
     
-    Validates the request, finds the nearest efectivo using PostGIS proximity search,
-    and logs the operation for audit purposes.
+    Validates the request, finds the nearest available efectivo (in-memory
+    spatial index, PostGIS proximity search as fallback), and logs the
+    operation for audit purposes.
     
     Invalida automáticamente el cache relacionado con emergencias y tareas.
     """
@@ -7,11 +7,14 @@ Handles task operations specific to Telegram bot:
 - Getting user tasks by telegram_id
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+import struct
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from datetime import datetime
-from typing import List, Any
+from sqlalchemy import select, and_, func, literal, true, tuple_
+from datetime import datetime, timedelta, timezone
+from typing import List, Any, Optional, Tuple
 
 from src.api.schemas.telegram import (
     TelegramTaskCreate,
@@ -24,9 +27,140 @@ from src.api.dependencies import get_db_session, get_audit_service_dep
 from src.api.models import Usuario, Tarea
 from src.core.audit_service import AuditService
 from src.core.websockets import websocket_manager, WSMessage, EventType
+from src.shared.constants import TaskStatus
 
 router = APIRouter(prefix="/telegram/tasks", tags=["Telegram Tasks"])
 
+# States listed in the user's task page (oldest scheduled first)
+ACTIVE_TASK_STATES = (TaskStatus.PROGRAMMED, TaskStatus.IN_PROGRESS)
+
+# Keyset cursor: epoch microseconds, task id, tz-aware flag
+_CURSOR_FORMAT = struct.Struct(">qq?")
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+
+
+def encode_task_cursor(inicio_programado: datetime, task_id: int) -> str:
+    """
+    Opaque keyset cursor for the last task of a page.
+
+    Epoch microseconds, a tz-aware flag and the id packed with ``struct``
+    (17 bytes, 23 base64 characters), so ``hist:next:<cursor>`` stays well
+    under Telegram's 64-byte ``callback_data`` limit.
+    """
+    aware = inicio_programado.tzinfo is not None
+    delta = inicio_programado - (_EPOCH_UTC if aware else _EPOCH_NAIVE)
+    micros = (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+    raw = _CURSOR_FORMAT.pack(micros, task_id, aware)
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_task_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of ``encode_task_cursor``; raises ValueError if malformed."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    try:
+        micros, task_id, aware = _CURSOR_FORMAT.unpack(raw)
+    except struct.error as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    inicio = (_EPOCH_UTC if aware else _EPOCH_NAIVE) + timedelta(microseconds=micros)
+    return inicio, task_id
+
+
+async def fetch_user_task_summary(
+    db: AsyncSession,
+    telegram_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> Optional[dict[str, Any]]:
+    """
+    Task counters and one page of active tasks for a telegram_id in a single query.
+
+    The user lookup, the ``COUNT ... FILTER`` aggregates and the keyset page
+    (``inicio_programado, id`` after ``cursor``) are CTEs of one statement;
+    only the columns shown by the bot are selected, so no ORM objects are
+    built. Soft-deleted tasks are excluded.
+
+    Returns:
+        None if no user has that telegram_id, otherwise the counters,
+        ``tasks`` and ``next_cursor`` (None on the last page)
+    """
+    after = decode_task_cursor(cursor) if cursor else None
+
+    user = select(Usuario.id.label("user_id")).where(Usuario.telegram_id == telegram_id).cte("tg_user")
+    owned = and_(Tarea.delegado_usuario_id == user.c.user_id, Tarea.deleted_at.is_(None))
+
+    counts = (
+        select(
+            user.c.user_id,
+            func.count(Tarea.id).label("total_tasks"),
+            func.count(Tarea.id).filter(Tarea.estado == TaskStatus.IN_PROGRESS).label("active_tasks"),
+            func.count(Tarea.id).filter(Tarea.estado == TaskStatus.PROGRAMMED).label("pending_tasks"),
+            func.count(Tarea.id).filter(Tarea.estado == TaskStatus.COMPLETED).label("completed_tasks"),
+        )
+        .select_from(user.outerjoin(Tarea, owned))
+        .group_by(user.c.user_id)
+        .cte("tg_counts")
+    )
+
+    page_query = (
+        select(
+            Tarea.id,
+            Tarea.codigo,
+            Tarea.titulo,
+            Tarea.estado,
+            Tarea.tipo,
+            Tarea.inicio_programado,
+        )
+        .join(user, owned)
+        .where(Tarea.estado.in_(ACTIVE_TASK_STATES))
+        .order_by(Tarea.inicio_programado, Tarea.id)
+        # One extra row tells whether there is a next page
+        .limit(limit + 1)
+    )
+    if after is not None:
+        inicio, task_id = after
+        page_query = page_query.where(
+            tuple_(Tarea.inicio_programado, Tarea.id)
+            > tuple_(literal(inicio, Tarea.inicio_programado.type), literal(task_id, Tarea.id.type))
+        )
+    page = page_query.cte("tg_page")
+
+    stmt = (
+        select(counts, page)
+        .select_from(counts.outerjoin(page, true()))
+        .order_by(page.c.inicio_programado, page.c.id)
+    )
+    rows = (await db.execute(stmt)).all()
+    if not rows:
+        return None
+
+    first = rows[0]
+    page_rows = [row for row in rows if row.id is not None]
+    next_cursor = None
+    if len(page_rows) > limit:
+        page_rows = page_rows[:limit]
+        last = page_rows[-1]
+        next_cursor = encode_task_cursor(last.inicio_programado, last.id)
+
+    return {
+        "total_tasks": first.total_tasks,
+        "active_tasks": first.active_tasks,
+        "pending_tasks": first.pending_tasks,
+        "completed_tasks": first.completed_tasks,
+        "tasks": [
+            {
+                "id": row.id,
+                "codigo": row.codigo,
+                "titulo": row.titulo,
+                "estado": row.estado,
+                "tipo": row.tipo,
+                "inicio_programado": row.inicio_programado.isoformat() if row.inicio_programado else None,
+            }
+            for row in page_rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
 
 @router.post("/create", response_model=TelegramTaskCreateResponse)  # type: ignore[misc]
 async def create_task_from_telegram(
@@ -225,67 +359,38 @@ async def finalize_task_by_code(
 @router.get("/user/{telegram_id}", response_model=TelegramUserTasksResponse)  # type: ignore[misc]
 async def get_user_tasks_by_telegram(
     telegram_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Active tasks per page"),
     db: AsyncSession = Depends(get_db_session)
 ) -> TelegramUserTasksResponse:
     """
-    Get all tasks for a user by their telegram_id.
+    Get task counters and active tasks for a user by their telegram_id.
 
-    Returns active, pending, and completed tasks summary.
+    Counters cover all of the user's tasks; ``tasks`` is one page of
+    pending and in-progress tasks. Pass ``next_cursor`` back as ``cursor``
+    to fetch the following page.
     """
     try:
-        # 1. Find user
-        user_query = select(Usuario).where(Usuario.telegram_id == telegram_id)
-        user_result = await db.execute(user_query)
-        user = user_result.scalars().first()
-
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Usuario con telegram_id {telegram_id} no encontrado"
-            )
-
-        # 2. Get all tasks created by user (delegado_usuario_id = user.id)
-        tasks_query = select(Tarea).where(Tarea.delegado_usuario_id == user.id)
-        tasks_result = await db.execute(tasks_query)
-        all_tasks = tasks_result.scalars().all()
-
-        # 3. Calculate statistics
-        total_tasks = len(all_tasks)
-        active_tasks = sum(1 for t in all_tasks if t.estado == "en_curso")
-        pending_tasks = sum(1 for t in all_tasks if t.estado == "programada")
-        completed_tasks = sum(1 for t in all_tasks if t.estado == "finalizada")
-
-        # 4. Build task summaries (only non-finalized for brevity)
-        task_summaries = [
-            {
-                "id": task.id,
-                "codigo": task.codigo,
-                "titulo": task.titulo,
-                "estado": task.estado,
-                "tipo": task.tipo,
-                "inicio_programado": task.inicio_programado.isoformat() if task.inicio_programado else None
-            }
-            for task in all_tasks
-            if task.estado in ["programada", "en_curso"]
-        ]
-
-        return TelegramUserTasksResponse(
-            telegram_id=telegram_id,
-            total_tasks=total_tasks,
-            active_tasks=active_tasks,
-            pending_tasks=pending_tasks,
-            completed_tasks=completed_tasks,
-            tasks=task_summaries
+        summary = await fetch_user_task_summary(db, telegram_id, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
         )
-
-    except HTTPException:
-        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error obteniendo tareas del usuario: {str(e)}"
         )
 
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Usuario con telegram_id {telegram_id} no encontrado"
+        )
+
+    return TelegramUserTasksResponse(telegram_id=telegram_id, **summary)
+
 
 @router.get("/code/{codigo}")  # type: ignore[misc]
 async def get_task_by_code(
@@ -161,6 +161,7 @@ class TelegramUserTasksResponse(BaseModel):
     pending_tasks: int
     completed_tasks: int
     tasks: List[dict[str, Any]] = Field(default_factory=list, description="List of task summaries")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page of tasks, if any")
 
     class Config:
         json_schema_extra = {
@@ -175,10 +176,12 @@ class TelegramUserTasksResponse(BaseModel):
                         "id": 42,
                         "codigo": "OP-2024-001",
                         "titulo": "Reparar alumbrado",
-                        "estado": "activa",
-                        "prioridad": "alta"
+                        "estado": "en_curso",
+                        "tipo": "patrullaje",
+                        "inicio_programado": "2024-05-01T08:00:00+00:00"
                     }
-                ]
+                ],
+                "next_cursor": "AAYXX9-KoAAAAAAAAAAAKgE"
             }
         }
 
@@ -68,7 +68,7 @@ async def crear_tarea(update: Update, context: CallbackContext[Bot, Update, Chat
         api_url = getattr(settings, "API_V1_STR", "/api/v1")
         token = None  # Si tienes un token, obténlo aquí
         api_service = ApiService(api_url, token)
-        api_service.create_task(task_in)
+        await api_service.create_task(task_in)
         await update.message.reply_text(f"Tarea '{codigo}' creada exitosamente.")
 
     except (ValueError, TypeError) as e:
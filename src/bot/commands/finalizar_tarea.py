@@ -32,7 +32,7 @@ async def finalizar_tarea(update: Update, context: CallbackContext[Bot, Update,
         api_url = getattr(settings, "API_V1_STR", "/api/v1")
         token = None  # Si tienes un token, obténlo aquí
         api_service = ApiService(api_url, token)
-        api_service.finalize_task(
+        await api_service.finalize_task(
             task_code=codigo_tarea, telegram_id=user_id
         )
         await update.message.reply_text(
@@ -6,10 +6,12 @@ Comando /historial - Muestra el historial de tareas del usuario.
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext, CommandHandler
 from telegram import Bot, Chat, User
+from datetime import datetime
 from loguru import logger
-from typing import Any
+from typing import Any, Optional
 
 from src.bot.services.api_service import ApiService
+from src.bot.utils.keyboards import KeyboardFactory
 from config.settings import get_settings
 
 
@@ -63,6 +65,17 @@ async def historial(
             "🔍 Buscando tu historial de tareas..."
         )
         
+        if filtro == "activas":
+            # Resumen de la API: una consulta, páginas por cursor (botones hist:)
+            page = await render_active_tasks_page(api_service, user_id)
+            await loading_msg.delete()
+            if page is None:
+                raise RuntimeError("Resumen de tareas no disponible")
+            page_text, page_keyboard = page
+            await update.message.reply_text(page_text, reply_markup=page_keyboard, parse_mode="Markdown")
+            logger.info(f"Usuario {user_id} consultó historial (filtro: {filtro})", user_id=user_id, filtro=filtro)
+            return
+
         # Llamar a API (simulamos endpoint de historial)
         # En producción: tareas = await api_service.get_user_history(user_id, filtro)
         # Para este ejemplo, usamos get_user_pending_tasks y simulamos
@@ -118,6 +131,60 @@ async def historial(
         )
 
 
+async def render_active_tasks_page(
+    api_service: ApiService,
+    telegram_id: int,
+    cursor: Optional[str] = None
+) -> Optional[tuple[str, InlineKeyboardMarkup]]:
+    """
+    Página de tareas activas a partir del resumen de la API.
+    
+    La usan ``/historial activas`` (primera página) y los callbacks
+    ``hist:next:<cursor>`` / ``hist:first`` del teclado por cursor.
+    
+    Args:
+        api_service: Cliente de la API
+        telegram_id: ID de Telegram del usuario
+        cursor: ``next_cursor`` de la página anterior (None para la primera)
+        
+    Returns:
+        Texto y teclado de navegación, o None si la API no respondió
+    """
+    summary = await api_service.get_user_task_summary(telegram_id, cursor=cursor)
+    if summary is None:
+        return None
+    
+    text = (
+        f"⚡ *Historial de Tareas - Activas*\n"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"📊 En curso: {summary.get('active_tasks', 0)} | "
+        f"Programadas: {summary.get('pending_tasks', 0)} | "
+        f"Finalizadas: {summary.get('completed_tasks', 0)}\n\n"
+    )
+    
+    tareas = summary.get("tasks", [])
+    if not tareas:
+        text += "No tienes tareas activas en este momento.\n\n"
+    
+    for tarea in tareas:
+        titulo = tarea.get("titulo") or "Sin título"
+        if len(titulo) > 50:
+            titulo = titulo[:47] + "..."
+        inicio = tarea.get("inicio_programado")
+        fecha_str = datetime.fromisoformat(inicio).strftime("%d/%m/%Y") if inicio else "N/A"
+        text += (
+            f"⚡ *{tarea.get('codigo', 'N/A')}*\n"
+            f"   📝 {titulo}\n"
+            f"   📂 {tarea.get('tipo', 'Otro')} • 📅 {fecha_str}\n\n"
+        )
+    
+    keyboard = KeyboardFactory.cursor_pagination(
+        summary.get("next_cursor"),
+        first_page=cursor is None
+    )
+    return text, keyboard
+
+
 def _format_historial(tareas: list[Any], filtro: str, page: int = 1) -> str:
     """
     Formatea el historial de tareas en texto bonito.
@@ -3,7 +3,7 @@
 Manejador central para todos los callback queries del bot.
 """
 
-from typing import Any, List
+from typing import Any, List, Optional
 from telegram import Update
 from telegram.ext import CallbackContext, CallbackQueryHandler
 from telegram import Bot, Chat, User
@@ -11,6 +11,7 @@ from loguru import logger
 
 from config.settings import settings
 from src.bot.utils.keyboards import KeyboardFactory
+from src.bot.commands.historial import render_active_tasks_page
 from src.bot.handlers.wizard_text_handler import get_step_header, format_task_summary
 
 # Quick Wins imports
@@ -66,7 +67,7 @@ async def handle_callback_query(
     
     # Quick Win #4: Verificar estado del wizard
     user_id = update.effective_user.id if update.effective_user else 0
-    session = wizard_manager.get_session(user_id)
+    session = await wizard_manager.get_session(user_id)
     if not session.allow_callback():
         await query.answer(
             f"{StatusEmojis.WARNING} Operación en proceso, espera...",
@@ -84,6 +85,8 @@ async def handle_callback_query(
             await handle_finalizar_action(query, context, entity, parts[2:])
         elif action == "page":
             await handle_pagination_action(query, context, entity, parts[2:])
+        elif action == "hist":
+            await handle_historial_action(query, context, entity, parts[2:])
         else:
             # Quick Win #2: Mensaje de error específico
             error_msg = ErrorMessages.get_generic_error("acción")
@@ -231,8 +234,8 @@ async def handle_crear_action(
         ux_metrics.track_step_start(user_id, 2)
         
         # Quick Win #4: Inicializar wizard state
-        wizard_manager.start_wizard(user_id, "crear")
-        wizard_manager.advance_state(user_id, WizardState.ENTERING_CODE, data={'tipo': tipo})
+        await wizard_manager.start_wizard(user_id, "crear")
+        await wizard_manager.advance_state(user_id, WizardState.ENTERING_CODE, data={'tipo': tipo})
         
         # Inicializar wizard en context
         context.user_data['wizard'] = {
@@ -295,14 +298,14 @@ async def handle_crear_action(
             )
             await query.edit_message_text(error_msg, parse_mode="Markdown")
             ux_metrics.track_wizard_abandon(user_id, step=4, reason="session_lost")
-            wizard_manager.cancel_wizard(user_id)
+            await wizard_manager.cancel_wizard(user_id)
             return
         
         delegado_id = int(delegado_id_str)
         context.user_data['wizard']['data']['delegado_id'] = delegado_id
         context.user_data['wizard']['current_step'] = 5
         
-        wizard_manager.advance_state(user_id, WizardState.SELECTING_ASIGNADOS, data={'delegado_id': delegado_id})
+        await wizard_manager.advance_state(user_id, WizardState.SELECTING_ASIGNADOS, data={'delegado_id': delegado_id})
         ux_metrics.track_step_complete(user_id, 4)
         ux_metrics.track_step_start(user_id, 5)
         
@@ -513,7 +516,7 @@ async def handle_finalizar_action(
         user_id = query.from_user.id if query.from_user else 0
         
         # Obtener todas las tareas del usuario
-        tareas = api_service.get_user_pending_tasks(user_id)
+        tareas = await api_service.get_user_pending_tasks(user_id)
         
         # Buscar la tarea seleccionada
         tarea_seleccionada = next((t for t in tareas if t.codigo == task_code), None)
@@ -577,6 +580,45 @@ async def handle_pagination_action(
         await query.answer("❌ Contexto de paginación perdido", show_alert=True)
 
 
+async def handle_historial_action(
+    query: Any, 
+    context: CallbackContext[Bot, Update, Chat, User], 
+    entity: str, 
+    params: List[Any], 
+    *args: Any, 
+    **kwargs: Any
+) -> None:
+    """
+    Navega las páginas de ``/historial activas`` paginadas por cursor.
+    
+    Args:
+        query: CallbackQuery de Telegram
+        context: Contexto de la conversación
+        entity: ``next`` (con el cursor en params) o ``first``
+        params: Parámetros adicionales (cursor opaco de la API)
+    """
+    from src.bot.services.api_service import ApiService
+    
+    cursor: Optional[str]
+    if entity == "next" and params:
+        cursor = params[0]
+    elif entity == "first":
+        cursor = None
+    else:
+        await query.answer("❌ Página inválida", show_alert=True)
+        return
+    
+    user_id = query.from_user.id if query.from_user else 0
+    api_service = ApiService(base_url=settings.API_BASE_URL, timeout=settings.HTTP_TIMEOUT)
+    page = await render_active_tasks_page(api_service, user_id, cursor)
+    if page is None:
+        await query.answer("❌ No se pudo cargar el historial", show_alert=True)
+        return
+    
+    text, keyboard = page
+    await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
+
+
 async def _show_pending_tasks_list(
     query: Any, 
     context: CallbackContext[Bot, Update, Chat, User], 
@@ -599,7 +641,7 @@ async def _show_pending_tasks_list(
     
     # Obtener tareas desde API
     api_service = ApiService(settings.API_V1_STR)
-    tareas = api_service.get_user_pending_tasks(user_id)
+    tareas = await api_service.get_user_pending_tasks(user_id)
     
     # Guardar contexto de finalización para paginación
     context.user_data['finalizar_context'] = True
@@ -722,7 +764,7 @@ async def _finalize_task(
     api_service = ApiService(settings.API_V1_STR)
     
     try:
-        tarea_finalizada = api_service.finalize_task(codigo, user_id)
+        tarea_finalizada = await api_service.finalize_task(codigo, user_id)
         
         logger.bind(finalizar=True).info(
             f"Tarea finalizada exitosamente: {codigo}",
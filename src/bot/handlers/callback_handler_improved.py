@@ -58,7 +58,7 @@ async def handle_crear_action_improved(
     user_id = query.from_user.id if query.from_user else 0
     
     # Quick Win #4: Verificar si el callback está permitido
-    session = wizard_manager.get_session(user_id)
+    session = await wizard_manager.get_session(user_id)
     if not session.allow_callback():
         await query.answer(
             f"{StatusEmojis.WARNING} Operación en proceso, espera...",
@@ -161,8 +161,8 @@ async def _handle_tipo_selection_improved(query: CallbackQuery, context: Callbac
     ux_metrics.track_step_start(user_id, 1)
     
     # Quick Win #4: Iniciar sesión de wizard
-    wizard_manager.start_wizard(user_id, "crear")
-    wizard_manager.advance_state(
+    await wizard_manager.start_wizard(user_id, "crear")
+    await wizard_manager.advance_state(
         user_id,
         WizardState.ENTERING_CODE,
         data={'tipo': tipo}
@@ -263,13 +263,13 @@ async def _handle_delegado_selection_improved(query: CallbackQuery, context: Cal
         
         # Tracking de abandono
         ux_metrics.track_wizard_abandon(user_id, step=4, reason="session_lost")
-        wizard_manager.cancel_wizard(user_id)
+        await wizard_manager.cancel_wizard(user_id)
         return
     
     context.user_data['wizard']['data']['delegado_id'] = delegado_id
     context.user_data['wizard']['current_step'] = 5
     
-    wizard_manager.advance_state(
+    await wizard_manager.advance_state(
         user_id,
         WizardState.SELECTING_ASIGNADOS,
         data={'delegado_id': delegado_id}
@@ -320,7 +320,7 @@ async def _handle_confirmation_improved(query: CallbackQuery, context: CallbackC
     
     if action_type == "yes":
         # Quick Win #4: Marcar como procesando
-        wizard_manager.set_processing(user_id, True)
+        await wizard_manager.set_processing(user_id, True)
         
         # Quick Win #1: Mensaje de loading
         await query.edit_message_text(
@@ -343,7 +343,7 @@ async def _handle_confirmation_improved(query: CallbackQuery, context: CallbackC
         )
         
         # Mantener wizard activo para edición
-        wizard_manager.advance_state(user_id, WizardState.SELECTING_TYPE)
+        await wizard_manager.advance_state(user_id, WizardState.SELECTING_TYPE)
     
     else:
         # Asumir confirmación (compatibilidad con callbacks antiguos)
@@ -375,7 +375,7 @@ async def _create_task_improved(query: CallbackQuery, context: CallbackContext[B
         ux_metrics.track_wizard_complete(user_id)
         
         # Quick Win #4: Limpiar wizard
-        wizard_manager.cancel_wizard(user_id)
+        await wizard_manager.cancel_wizard(user_id)
         if 'wizard' in context.user_data:
             del context.user_data['wizard']
         
@@ -416,7 +416,7 @@ async def _create_task_improved(query: CallbackQuery, context: CallbackContext[B
         )
         
         # Desbloquear wizard
-        wizard_manager.set_processing(user_id, False)
+        await wizard_manager.set_processing(user_id, False)
         
         keyboard = KeyboardFactory.main_menu()
         await query.edit_message_text(
@@ -449,7 +449,7 @@ async def _handle_cancel_improved(query: CallbackQuery, context: CallbackContext
     ux_metrics.track_wizard_abandon(user_id, step=current_step, reason="user_cancel")
     
     # Quick Win #4: Limpiar estado
-    wizard_manager.cancel_wizard(user_id)
+    await wizard_manager.cancel_wizard(user_id)
     if 'wizard' in context.user_data:
         del context.user_data['wizard']
     
@@ -46,7 +46,7 @@ async def message_handler_improved(
     msg_text = update.message.text.strip()
     
     # Quick Win #4: Verificar si hay wizard activo
-    if is_wizard_active(user_id):
+    if await is_wizard_active(user_id):
         await _handle_wizard_text_input(update, context, user_id, msg_text)
         return
     
@@ -90,11 +90,11 @@ async def _handle_wizard_text_input(
         user_id: ID de usuario
         msg_text: Texto ingresado
     """
-    session = wizard_manager.get_session(user_id)
+    session = await wizard_manager.get_session(user_id)
     state = session.state
     
     # Quick Win #4: Verificar si se permite entrada de texto
-    if not can_process_text_input(user_id):
+    if not await can_process_text_input(user_id):
         # Estado no permite texto libre
         await update.message.reply_text(
             f"{StatusEmojis.WARNING} *Entrada no permitida en este momento*\n\n"
@@ -178,7 +178,7 @@ async def _process_codigo_input(
     context.user_data['wizard']['current_step'] = 3
     
     # Quick Win #4: Actualizar estado
-    wizard_manager.advance_state(
+    await wizard_manager.advance_state(
         user_id,
         WizardState.ENTERING_TITLE,
         data={'codigo': codigo}
@@ -254,7 +254,7 @@ async def _process_titulo_input(
     context.user_data['wizard']['data']['titulo'] = titulo
     context.user_data['wizard']['current_step'] = 4
     
-    wizard_manager.advance_state(
+    await wizard_manager.advance_state(
         user_id,
         WizardState.SELECTING_DELEGADO,
         data={'titulo': titulo}
@@ -321,7 +321,7 @@ async def _process_delegado_input(
     context.user_data['wizard']['data']['delegado_id'] = delegado_id
     context.user_data['wizard']['current_step'] = 5
     
-    wizard_manager.advance_state(
+    await wizard_manager.advance_state(
         user_id,
         WizardState.SELECTING_ASIGNADOS,
         data={'delegado_id': delegado_id}
@@ -383,7 +383,7 @@ async def _process_asignados_input(
     context.user_data['wizard']['data']['asignados'] = asignados_ids
     context.user_data['wizard']['current_step'] = 6
     
-    wizard_manager.advance_state(
+    await wizard_manager.advance_state(
         user_id,
         WizardState.CONFIRMING,
         data={'asignados': asignados_ids}
@@ -419,7 +419,7 @@ async def _handle_listo_shortcut(
     """
     try:
         api_service = ApiService(settings.API_V1_STR)
-        api_service.finalize_task(
+        await api_service.finalize_task(
             task_code=codigo_tarea,
             telegram_id=user_id
         )
@@ -1,16 +1,27 @@
 # -*- coding: utf-8 -*-
 """
 Punto de entrada principal para el bot de Telegram de GRUPO_GAD.
+
+Usa webhook si ``TELEGRAM_WEBHOOK_URL`` está definida y polling en caso
+contrario (desarrollo). En ambos modos los updates se procesan de forma
+concurrente, en orden dentro de cada chat.
 """
 
 import asyncio
 import sys
+from typing import Any
 
 from loguru import logger
-from telegram.ext import ApplicationBuilder
+from prometheus_client import start_http_server
+from telegram.ext import Application, ApplicationBuilder
 
 from config.settings import settings
 from src.bot.handlers import register_handlers
+from src.bot.services.api_service import close_http_client
+from src.bot.services.task_cache import run_cache_invalidation_listener
+from src.bot.utils.update_processor import PerChatUpdateProcessor
+
+BotApplication = Application[Any, Any, Any, Any, Any, Any]
 
 # --- Configuración de Loguru ---
 logger.remove()
@@ -35,7 +46,37 @@ logger.add(
 )
 
 
-async def main() -> None:
+async def _start_cache_listener(application: BotApplication) -> None:
+    """Suscribe la caché de lectura a los eventos de tareas de la API."""
+    if settings.BOT_CACHE_WS_URL:
+        application.bot_data["cache_listener"] = asyncio.create_task(
+            run_cache_invalidation_listener(settings.BOT_CACHE_WS_URL)
+        )
+
+
+async def _close_api_client(application: BotApplication) -> None:
+    """Cierra el pool HTTP compartido hacia la API al apagar el bot."""
+    listener = application.bot_data.pop("cache_listener", None)
+    if listener is not None:
+        listener.cancel()
+    await close_http_client()
+
+
+def build_application() -> BotApplication:
+    """Construye la aplicación con handlers y procesamiento concurrente por chat."""
+    application = (
+        ApplicationBuilder()
+        .token(settings.TELEGRAM_TOKEN)
+        .concurrent_updates(PerChatUpdateProcessor(settings.BOT_MAX_CONCURRENT_UPDATES))
+        .post_init(_start_cache_listener)
+        .post_shutdown(_close_api_client)
+        .build()
+    )
+    register_handlers(application)
+    return application
+
+
+def main() -> None:
     """Inicia el bot."""
     if not settings.TELEGRAM_TOKEN:
         logger.critical(
@@ -43,14 +84,30 @@ async def main() -> None:
         )
         return
 
-    application = ApplicationBuilder().token(settings.TELEGRAM_TOKEN).build()
+    application = build_application()
 
-    register_handlers(application)
+    if settings.BOT_METRICS_PORT:
+        # Métricas UX y de caché del bot (en modo webhook también en /metrics)
+        start_http_server(settings.BOT_METRICS_PORT)
+
+    if settings.TELEGRAM_WEBHOOK_URL:
+        from src.bot.webhook import run_webhook
+
+        asyncio.run(run_webhook(
+            application,
+            settings.TELEGRAM_WEBHOOK_URL,
+            path=settings.TELEGRAM_WEBHOOK_PATH,
+            listen=settings.TELEGRAM_WEBHOOK_LISTEN,
+            port=settings.TELEGRAM_WEBHOOK_PORT,
+            secret_token=settings.TELEGRAM_WEBHOOK_SECRET,
+        ))
+        return
 
-    logger.info("Bot iniciado y escuchando...")
-    await application.run_polling()
+    logger.info("Bot iniciado y escuchando (polling)...")
+    # run_polling gestiona su propio event loop
+    application.run_polling()
 
 
 if __name__ == "__main__":
     logger.info("Iniciando el bot...")
-    asyncio.run(main())
+    main()
@@ -1,77 +1,251 @@
 # -*- coding: utf-8 -*-
 """
 Servicio para interactuar con la API de GRUPO_GAD.
+
+Todas las llamadas son asíncronas y comparten un único ``httpx.AsyncClient``
+por event loop (pool keep-alive, HTTP/2 si ``h2`` está instalado), de modo
+que los handlers del bot no bloquean el loop ni abren una conexión nueva
+por solicitud. Los GET idénticos en vuelo se deduplican y los errores
+transitorios se reintentan con backoff exponencial y jitter.
 """
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import random
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin
 
-import requests
+import httpx
+from loguru import logger
 
 from config.settings import settings
+from src.bot.services.task_cache import PENDING_TASKS, USERS, BotReadCache, bot_read_cache
 from src.schemas.tarea import Tarea, TareaCreate
 
+try:
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+# Respuestas que se consideran transitorias y se reintentan
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+# Backoff: base y tope (segundos) del jitter exponencial
+RETRY_BACKOFF_BASE = 0.2
+RETRY_BACKOFF_MAX = 2.0
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_inflight: Dict[Tuple[str, str], "asyncio.Future[Any]"] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Cliente HTTP compartido del event loop actual (se crea en el primer uso)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            timeout=getattr(settings, "HTTP_TIMEOUT", 10.0),
+            limits=httpx.Limits(
+                max_connections=getattr(settings, "HTTP_MAX_CONNECTIONS", 20),
+                max_keepalive_connections=getattr(settings, "HTTP_MAX_CONNECTIONS", 20),
+            ),
+        )
+        _client_loop = loop
+        _inflight.clear()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Cierra el cliente compartido (apagado del bot)."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+    _inflight.clear()
+
+
+def _discard_inflight(key: Tuple[str, str], future: "asyncio.Future[Any]") -> None:
+    if _inflight.get(key) is future:
+        del _inflight[key]
+
+
+def _resolve_base_url(api_url: Optional[str]) -> str:
+    # Los handlers pasan a veces solo API_V1_STR ("/api/v1"): se resuelve
+    # contra el origen de API_BASE_URL
+    base = getattr(settings, "API_BASE_URL", "http://api:8000/api/v1")
+    if not api_url:
+        return base.rstrip("/")
+    return urljoin(base, api_url).rstrip("/")
+
 
 class ApiService:
-    def __init__(self, api_url: str, token: Optional[str] = None):
-        self.api_url = api_url
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        token: Optional[str] = None,
+        *,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[BotReadCache] = None,
+    ):
+        self.api_url = _resolve_base_url(base_url or api_url)
         self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.timeout = timeout if timeout is not None else getattr(settings, "HTTP_TIMEOUT", 10.0)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, "HTTP_MAX_RETRIES", 2)
+        self._client = client
+        self.cache = cache if cache is not None else bot_read_cache
 
-    def _get(self, endpoint: str) -> Any:
-        response = requests.get(f"{self.api_url}{endpoint}", headers=self.headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client if self._client is not None else get_http_client()
 
-    def _post(self, endpoint: str, data: dict[str, Any]) -> Any:
-        response = requests.post(
-            f"{self.api_url}{endpoint}", json=data, headers=self.headers, timeout=10
-        )
-        response.raise_for_status()
-        return response.json()
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        *,
+        json: Optional[dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Ejecuta la solicitud con reintentos (solo transitorios) y devuelve el JSON."""
+        url = f"{self.api_url}{endpoint}"
+        idempotent = method == "GET"
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(
+                    method, url, json=json, headers=self.headers,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+                if response.status_code in RETRY_STATUS_CODES and idempotent and attempt < self.max_retries:
+                    raise _RetryableStatus(response)
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TransportError, _RetryableStatus) as exc:
+                # Un POST solo se repite si la solicitud no llegó a enviarse
+                retryable = idempotent or isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+                logger.warning(
+                    f"Reintentando {method} {endpoint} en {delay:.2f}s "
+                    f"(intento {attempt + 1}/{self.max_retries}): {exc!r}"
+                )
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _get(self, endpoint: str, timeout: Optional[float] = None) -> Any:
+        """GET deduplicado: las llamadas idénticas en vuelo comparten la respuesta."""
+        key = (f"{self.api_url}{endpoint}", self.headers.get("Authorization", ""))
+        future = _inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._request("GET", endpoint, timeout=timeout))
+            _inflight[key] = future
+            future.add_done_callback(lambda done, key=key: _discard_inflight(key, done))
+        # shield: cancelar a un llamador no cancela la solicitud compartida
+        return await asyncio.shield(future)
 
-    def get_user_auth_level(self, telegram_id: int) -> Optional[str]:
+    async def _post(self, endpoint: str, data: dict[str, Any], timeout: Optional[float] = None) -> Any:
+        return await self._request("POST", endpoint, json=data, timeout=timeout)
+
+    async def get_user_auth_level(self, telegram_id: int) -> Optional[str]:
         """Obtiene el nivel de autenticación de un usuario."""
         try:
-            response = self._get(f"/auth/{telegram_id}")
+            response = await self._get(f"/auth/{telegram_id}")
             nivel = response.get("nivel")
             if isinstance(nivel, str):
                 return nivel
             return None
-        except requests.exceptions.RequestException:
+        except httpx.HTTPError:
             return None
 
-    def create_task(self, task_in: TareaCreate) -> Tarea:
+    async def create_task(self, task_in: TareaCreate) -> Tarea:
         """Crea una nueva tarea."""
-        response = self._post("/tasks/create", task_in.model_dump())
+        response = await self._post("/tasks/create", task_in.model_dump(mode="json"))
+        # Los asignados se identifican por id interno, no por telegram_id
+        self.cache.invalidate_namespace(PENDING_TASKS)
         return Tarea(**response)
 
-    def finalize_task(self, task_code: str, telegram_id: int) -> Tarea:
+    async def finalize_task(self, task_code: str, telegram_id: int) -> Tarea:
         """Finaliza una tarea por código y usuario."""
         data = {"task_code": task_code, "telegram_id": telegram_id}
-        response = self._post("/tasks/finalize", data)
+        try:
+            response = await self._post("/tasks/finalize", data)
+        finally:
+            self.cache.invalidate(PENDING_TASKS, telegram_id)
         return Tarea(**response)
 
-    def get_user_pending_tasks(self, telegram_id: int) -> List[Tarea]:
-        """Obtiene tareas pendientes de un usuario por telegram_id."""
+    async def get_user_pending_tasks(self, telegram_id: int, use_cache: bool = True) -> List[Tarea]:
+        """
+        Obtiene tareas pendientes de un usuario por telegram_id.
+
+        Se sirve desde la caché del bot mientras esté vigente, de modo que
+        paginar o seleccionar no vuelve a llamar a la API.
+        """
+        if use_cache:
+            cached = self.cache.get(PENDING_TASKS, telegram_id)
+            if cached is not None:
+                return list(cached)
         try:
-            response = self._get(f"/tasks/user/telegram/{telegram_id}?status=pending")
-            return [Tarea(**t) for t in response]
-        except requests.exceptions.RequestException:
+            response = await self._get(f"/tasks/user/telegram/{telegram_id}?status=pending")
+        except httpx.HTTPError:
             return []
-    
-    def get_users(self, role: Optional[str] = None) -> List[Dict[str, Any]]:
+        tareas = [Tarea(**t) for t in response]
+        self.cache.set(PENDING_TASKS, telegram_id, tareas)
+        return list(tareas)
+
+    async def get_user_task_summary(
+        self, telegram_id: int, cursor: Optional[str] = None, limit: int = 10
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Contadores de tareas y una página de tareas activas del usuario.
+
+        La API lo resuelve en una sola consulta; ``next_cursor`` de la
+        respuesta se pasa como ``cursor`` para la página siguiente (botón
+        de ``KeyboardFactory.cursor_pagination``).
+
+        Returns:
+            Respuesta de ``/telegram/tasks/user/{telegram_id}`` o None si falla
+        """
+        params: Dict[str, Any] = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        try:
+            return await self._get(f"/telegram/tasks/user/{telegram_id}?{urlencode(params)}")
+        except httpx.HTTPError:
+            return None
+
+    async def get_users(self, role: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Obtiene lista de usuarios, opcionalmente filtrados por rol.
-        
+
         Args:
             role: Rol a filtrar ('delegado', 'agente', etc.) o None para todos
-        
+
         Returns:
             Lista de usuarios con estructura {'id': int, 'nombre': str, 'role': str}
         """
+        cached = self.cache.get(USERS, role)
+        if cached is not None:
+            return list(cached)
         try:
             endpoint = "/users" if not role else f"/users?role={role}"
-            response = self._get(endpoint)
-            return response if isinstance(response, list) else []
-        except requests.exceptions.RequestException:
+            response = await self._get(endpoint)
+        except httpx.HTTPError:
             # En caso de error, retornar lista vacía
             return []
+        users = response if isinstance(response, list) else []
+        self.cache.set(USERS, role, users)
+        return list(users)
+
+
+class _RetryableStatus(Exception):
+    """Respuesta 502/503/504 a un GET que todavía admite reintentos."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
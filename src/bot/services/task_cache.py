@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de lectura del bot (tareas pendientes por usuario y listas de usuarios).
+
+Los flujos de paginación y selección vuelven a pedir las mismas listas en
+cada pulsación de botón; ``ApiService`` las lee a través de esta caché TTL
+con LRU acotado. Las escrituras del propio bot (crear/finalizar) invalidan
+las entradas afectadas y, opcionalmente, los eventos de tareas del
+WebSocket de la API invalidan las de otros orígenes.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from loguru import logger
+
+from config.settings import settings
+from src.bot.utils.ux_metrics import ux_metrics
+
+try:
+    import websockets
+    WEBSOCKETS_ENABLED = True
+except ImportError:
+    websockets = None
+    WEBSOCKETS_ENABLED = False
+
+# Espacios de claves: ("pending", telegram_id) y ("users", role)
+PENDING_TASKS = "pending"
+USERS = "users"
+
+# Eventos WebSocket de la API que cambian listas de tareas
+TASK_EVENT_TYPES = frozenset({"task_created", "task_updated", "task_status_changed", "task_assigned"})
+# Frame con varios eventos de entidades (``data.events``) y tipos a resincronizar (``data.resync``)
+ENTITY_BATCH_EVENT = "entity_batch"
+
+_MISSING = object()
+
+
+class BotReadCache:
+    """Caché TTL con expulsión LRU acotada a ``max_entries``."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 60.0,
+        max_entries: int = 5000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, namespace: str, key: Hashable) -> Any:
+        """Valor vigente o ``None``; registra acierto/fallo en ``ux_metrics``."""
+        value = self._lookup((namespace, key))
+        ux_metrics.track_cache_lookup(namespace, value is not _MISSING)
+        return None if value is _MISSING else value
+
+    def _lookup(self, full_key: Tuple[str, Hashable]) -> Any:
+        entry = self._entries.get(full_key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[full_key]
+            return _MISSING
+        self._entries.move_to_end(full_key)
+        return value
+
+    def set(self, namespace: str, key: Hashable, value: Any) -> None:
+        full_key = (namespace, key)
+        self._entries[full_key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(full_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, namespace: str, key: Hashable) -> None:
+        self._entries.pop((namespace, key), None)
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        """Elimina todas las entradas de un espacio; devuelve cuántas."""
+        keys = [k for k in self._entries if k[0] == namespace]
+        for k in keys:
+            del self._entries[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+        }
+
+
+bot_read_cache = BotReadCache(
+    ttl_seconds=getattr(settings, "BOT_CACHE_TTL_SECONDS", 60.0),
+    max_entries=getattr(settings, "BOT_CACHE_MAX_ENTRIES", 5000),
+)
+
+
+def apply_task_event(message: Dict[str, Any], cache: BotReadCache = bot_read_cache) -> bool:
+    """
+    Invalida las listas de tareas afectadas por un mensaje WebSocket de la API.
+
+    Si el evento identifica al usuario de Telegram solo se invalida su lista;
+    si no (caso habitual: los eventos llevan ids internos), se invalidan todas
+    las listas de pendientes. Un frame ``entity_batch`` se desempaqueta
+    evento a evento; si pide resincronizar tareas (eventos descartados en la
+    API) se vacían todas las listas de pendientes. Devuelve ``True`` si el
+    mensaje afectaba a tareas.
+    """
+    if message.get("event_type") == ENTITY_BATCH_EVENT:
+        data = message.get("data") or {}
+        if "task" in (data.get("resync") or ()):
+            cache.invalidate_namespace(PENDING_TASKS)
+            return True
+        applied = [apply_task_event(event, cache) for event in data.get("events") or ()]
+        return any(applied)
+    if message.get("event_type") not in TASK_EVENT_TYPES:
+        return False
+    task_data = (message.get("data") or {}).get("task_data") or {}
+    telegram_id = task_data.get("telegram_id")
+    if telegram_id is not None:
+        cache.invalidate(PENDING_TASKS, int(telegram_id))
+    else:
+        cache.invalidate_namespace(PENDING_TASKS)
+    return True
+
+
+async def run_cache_invalidation_listener(
+    ws_url: str,
+    cache: BotReadCache = bot_read_cache,
+    reconnect_delay: float = 5.0,
+) -> None:
+    """
+    Escucha el WebSocket de la API e invalida la caché ante eventos de tareas.
+
+    Tras cada (re)conexión se vacían las listas de pendientes, porque los
+    eventos emitidos mientras no había conexión se han perdido.
+    """
+    if not WEBSOCKETS_ENABLED:
+        logger.warning("Paquete websockets no disponible: la caché del bot solo expira por TTL")
+        return
+    while True:
+        try:
+            async with websockets.connect(ws_url) as connection:
+                cache.invalidate_namespace(PENDING_TASKS)
+                logger.info("Caché del bot suscrita a eventos de tareas de la API")
+                async for raw in connection:
+                    try:
+                        apply_task_event(json.loads(raw), cache)
+                    except (ValueError, TypeError, AttributeError):
+                        continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"WebSocket de invalidación desconectado: {e!r}; reintento en {reconnect_delay}s")
+        await asyncio.sleep(reconnect_delay)
@@ -4,7 +4,7 @@ Factory para construir teclados inline reutilizables con emojis semánticos.
 """
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 
 from src.bot.utils.emojis import (
     TaskEmojis, ActionEmojis, NavigationEmojis, StatusEmojis
@@ -161,6 +161,43 @@ class KeyboardFactory:
         
         return InlineKeyboardMarkup(keyboard)
     
+    @staticmethod
+    def cursor_pagination(
+        next_cursor: Optional[str],
+        first_page: bool = True,
+        action_prefix: str = "hist"
+    ) -> InlineKeyboardMarkup:
+        """
+        Navegación por cursor para listas paginadas por la API.
+        
+        Args:
+            next_cursor: ``next_cursor`` de la respuesta (None en la última página)
+            first_page: Si la página mostrada es la primera
+            action_prefix: Prefijo del callback_data (``<prefijo>:next:<cursor>``)
+        
+        Returns:
+            InlineKeyboardMarkup con "Inicio"/"Siguiente" y volver al menú
+        """
+        nav_buttons = []
+        if not first_page:
+            nav_buttons.append(InlineKeyboardButton(
+                f"{NavigationEmojis.LEFT} Inicio",
+                callback_data=f"{action_prefix}:first"
+            ))
+        if next_cursor:
+            nav_buttons.append(InlineKeyboardButton(
+                f"{NavigationEmojis.RIGHT} Siguiente",
+                callback_data=f"{action_prefix}:next:{next_cursor}"
+            ))
+        
+        keyboard = [nav_buttons] if nav_buttons else []
+        keyboard.append([InlineKeyboardButton(
+            f"{NavigationEmojis.BACK} Volver al Menú",
+            callback_data="menu:main"
+        )])
+        
+        return InlineKeyboardMarkup(keyboard)
+    
     @staticmethod
     def user_selector(
         users: List[Dict[str, Any]],
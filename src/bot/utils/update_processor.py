@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Procesamiento concurrente de updates con orden por chat.
+
+Con el procesamiento secuencial por defecto de python-telegram-bot, un
+handler lento (p. ej. una llamada a la API) retrasa los updates de todos los
+usuarios. ``PerChatUpdateProcessor`` procesa hasta ``max_concurrent_updates``
+updates a la vez, pero serializa los de un mismo chat para que los pasos de
+un wizard nunca se apliquen desordenados.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def update_order_key(update: object) -> Optional[int]:
+    """Chat (o usuario) cuyo orden hay que respetar; None si no aplica."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return None
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Procesador concurrente que mantiene el orden de llegada dentro de cada chat.
+
+    El candado del chat se toma en ``do_process_update``, que la librería
+    ejecuta ya dentro del semáforo global: un update en espera detrás de otro
+    del mismo chat ocupa una plaza de concurrencia mientras espera. El
+    semáforo y los candados atienden por orden de llegada, así que el orden
+    dentro del chat se conserva. Los candados se crean bajo demanda y se
+    liberan cuando el chat no tiene updates pendientes, así que la memoria es
+    O(chats con updates en vuelo).
+    """
+
+    __slots__ = ("_chat_locks",)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # chat -> [candado, updates del chat en vuelo]
+        self._chat_locks: Dict[int, List[Any]] = {}
+
+    async def do_process_update(self, update: object, coroutine: "Awaitable[Any]") -> None:
+        key = update_order_key(update)
+        if key is None:
+            await coroutine
+            return
+        entry = self._chat_locks.get(key)
+        if entry is None:
+            entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @property
+    def chats_in_flight(self) -> int:
+        """Chats con al menos un update en proceso o en espera."""
+        return len(self._chat_locks)
@@ -6,13 +6,25 @@ Este módulo implementa Quick Win #5: Instrumentación UX Básica
 - Métricas de abandono de wizard (objetivo <10%)
 - Latencia P95 por paso (objetivo <800ms)
 - Tasa de confirmaciones erróneas (objetivo <2%)
+
+Los eventos no se guardan uno a uno: se agregan en un anillo de ranuras de
+tiempo (contadores y sketches de latencia log-lineales por ranura), de modo
+que la memoria es fija y cada consulta recorre solo las ranuras de la
+ventana pedida. Los totales acumulados se exportan como series Prometheus.
 """
 
-from typing import Optional, Dict, List, Any
-from dataclasses import dataclass, field
+import time
+from typing import Optional, Dict, List, Any, Callable, Iterator, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
-import statistics
+
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+from config.settings import settings
+from src.shared.latency_histogram import LatencyHistogram, prometheus_histogram_buckets
+
+_ENVIRONMENT = getattr(settings, "ENVIRONMENT", None) or "development"
 
 
 class MetricType(Enum):
@@ -26,26 +38,65 @@ class MetricType(Enum):
     USER_ERROR = "user_error"
 
 
-@dataclass
-class UXMetricEvent:
+class LatencySketch:
     """
-    Evento de métrica UX con contexto.
-    
-    Quick Win #5: Instrumentación básica para métricas críticas.
+    Sketch de latencias con las ranuras log-lineales de ``LatencyHistogram``.
+
+    Solo guarda las ranuras ocupadas, así que fusionar sketches cuesta
+    O(ranuras ocupadas) y el error relativo de un percentil es < 6%.
     """
-    metric_type: MetricType
-    user_id: int
-    timestamp: datetime = field(default_factory=datetime.now)
-    
-    # Contexto del evento
-    wizard_type: Optional[str] = None  # "crear" o "finalizar"
-    step: Optional[int] = None  # Paso del wizard (1-6)
-    latency_ms: Optional[float] = None  # Latencia en milisegundos
-    error_type: Optional[str] = None  # Tipo de error
-    error_field: Optional[str] = None  # Campo con error
-    
-    # Metadata adicional
-    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    __slots__ = ("bins", "count", "sum_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, latency_ms: float) -> None:
+        index = LatencyHistogram.bucket_index(int(latency_ms * 1000))
+        self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.sum_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def merge(self, other: "LatencySketch") -> None:
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, q: float) -> float:
+        """Latencia (ms) del percentil ``q`` (0-1); 0.0 sin datos."""
+        if self.count == 0:
+            return 0.0
+        rank = min(self.count, int(self.count * q) + 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= rank:
+                low, high = LatencyHistogram.bucket_bounds(index)
+                return min((low + high) / 2 / 1000, self.max_ms)
+        return self.max_ms
+
+    def mean(self) -> float:
+        return self.sum_ms / self.count if self.count else 0.0
+
+
+class _MetricsSlot:
+    """Agregados de los eventos de una ranura de tiempo."""
+
+    __slots__ = ("start", "total", "counts", "error_fields", "step_latency")
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.total = 0
+        # (tipo de métrica, tipo de wizard) -> eventos
+        self.counts: Dict[Tuple[MetricType, Optional[str]], int] = {}
+        self.error_fields: Dict[str, int] = {}
+        self.step_latency: Dict[Optional[int], LatencySketch] = {}
 
 
 class UXMetricsCollector:
@@ -53,11 +104,91 @@ class UXMetricsCollector:
     Recolector de métricas UX con análisis en tiempo real.
     
     Quick Win #5: Tracking de métricas críticas de experiencia.
+
+    Los eventos se agregan en ``retention_hours * 3600 / slot_seconds``
+    ranuras reutilizadas en anillo; una ventana de N horas se resuelve con
+    granularidad de ``slot_seconds``.
     """
     
-    def __init__(self) -> None:
-        self._events: List[UXMetricEvent] = []
+    def __init__(
+        self,
+        slot_seconds: int = 300,
+        retention_hours: int = 24 * 7,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.slot_seconds = slot_seconds
+        self._clock = clock
+        self._slots: List[Optional[_MetricsSlot]] = [None] * max(1, retention_hours * 3600 // slot_seconds)
         self._wizard_sessions: Dict[int, Dict[str, Any]] = {}  # user_id -> session data
+        self._cache_hits: Dict[str, int] = {}  # caché -> aciertos
+        self._cache_misses: Dict[str, int] = {}  # caché -> fallos
+        # Totales desde el arranque (series Prometheus)
+        self._event_totals: Dict[Tuple[MetricType, Optional[str]], int] = {}
+        self._error_field_totals: Dict[str, int] = {}
+        self._step_histograms: Dict[Optional[int], LatencyHistogram] = {}
+    
+    # ==================== ALMACENAMIENTO ====================
+    
+    def _current_slot(self) -> _MetricsSlot:
+        start = self._clock() // self.slot_seconds * self.slot_seconds
+        position = int(start // self.slot_seconds) % len(self._slots)
+        slot = self._slots[position]
+        if slot is None or slot.start != start:
+            # La ranura se reutiliza: lo que contenía ya salió de la retención
+            slot = self._slots[position] = _MetricsSlot(start)
+            self.clear_stale_sessions()
+        return slot
+    
+    def _record(
+        self,
+        metric_type: MetricType,
+        wizard_type: Optional[str] = None,
+        step: Optional[int] = None,
+        latency_ms: Optional[float] = None,
+        error_field: Optional[str] = None
+    ) -> None:
+        """Agrega un evento a la ranura actual y a los totales."""
+        slot = self._current_slot()
+        slot.total += 1
+        key = (metric_type, wizard_type)
+        slot.counts[key] = slot.counts.get(key, 0) + 1
+        self._event_totals[key] = self._event_totals.get(key, 0) + 1
+        if error_field:
+            slot.error_fields[error_field] = slot.error_fields.get(error_field, 0) + 1
+            self._error_field_totals[error_field] = self._error_field_totals.get(error_field, 0) + 1
+        if metric_type == MetricType.STEP_LATENCY and latency_ms is not None:
+            sketch = slot.step_latency.get(step)
+            if sketch is None:
+                sketch = slot.step_latency[step] = LatencySketch()
+            sketch.record(latency_ms)
+            histogram = self._step_histograms.get(step)
+            if histogram is None:
+                histogram = self._step_histograms[step] = LatencyHistogram()
+            histogram.record(latency_ms / 1000)
+    
+    def _window_slots(self, time_window_hours: Optional[int] = None) -> List[_MetricsSlot]:
+        """Ranuras vigentes dentro de la ventana (todas las retenidas si es None)."""
+        now = self._clock()
+        oldest = now - len(self._slots) * self.slot_seconds
+        if time_window_hours:
+            oldest = max(oldest, now - time_window_hours * 3600 - self.slot_seconds)
+        return [s for s in self._slots if s is not None and s.start > oldest]
+    
+    def _count(self, slots: List[_MetricsSlot], metric_type: MetricType, wizard_type: Optional[str] = None) -> int:
+        total = 0
+        for slot in slots:
+            for (event_type, event_wizard), count in slot.counts.items():
+                if event_type == metric_type and (wizard_type is None or event_wizard == wizard_type):
+                    total += count
+        return total
+    
+    def _latency_sketch(self, slots: List[_MetricsSlot], step: Optional[int] = None) -> LatencySketch:
+        merged = LatencySketch()
+        for slot in slots:
+            for slot_step, sketch in slot.step_latency.items():
+                if step is None or slot_step == step:
+                    merged.merge(sketch)
+        return merged
     
     # ==================== WIZARD LIFECYCLE ====================
     
@@ -73,20 +204,14 @@ class UXMetricsCollector:
             user_id: ID de usuario
             wizard_type: Tipo de wizard
         """
-        event = UXMetricEvent(
-            metric_type=MetricType.WIZARD_START,
-            user_id=user_id,
-            wizard_type=wizard_type
-        )
-        self._events.append(event)
+        self._record(MetricType.WIZARD_START, wizard_type=wizard_type)
         
         # Iniciar tracking de sesión
         self._wizard_sessions[user_id] = {
             'started_at': datetime.now(),
             'wizard_type': wizard_type,
             'steps_completed': 0,
-            'errors_count': 0,
-            'step_latencies': []
+            'errors_count': 0
         }
     
     def track_wizard_complete(
@@ -101,30 +226,11 @@ class UXMetricsCollector:
             user_id: ID de usuario
             total_time_ms: Tiempo total en milisegundos
         """
-        event = UXMetricEvent(
-            metric_type=MetricType.WIZARD_COMPLETE,
-            user_id=user_id,
-            latency_ms=total_time_ms
+        session = self._wizard_sessions.pop(user_id, None)
+        self._record(
+            MetricType.WIZARD_COMPLETE,
+            wizard_type=session.get('wizard_type') if session else None
         )
-        
-        if user_id in self._wizard_sessions:
-            session = self._wizard_sessions[user_id]
-            event.wizard_type = session.get('wizard_type')
-            event.metadata = {
-                'total_steps': session.get('steps_completed', 0),
-                'total_errors': session.get('errors_count', 0)
-            }
-            
-            # Calcular tiempo si no se proporcionó
-            if total_time_ms is None and 'started_at' in session:
-                elapsed = datetime.now() - session['started_at']
-                event.latency_ms = elapsed.total_seconds() * 1000
-        
-        self._events.append(event)
-        
-        # Limpiar sesión
-        if user_id in self._wizard_sessions:
-            del self._wizard_sessions[user_id]
     
     def track_wizard_abandon(
         self, 
@@ -142,32 +248,12 @@ class UXMetricsCollector:
             step: Paso donde abandonó
             reason: Razón del abandono (opcional)
         """
-        event = UXMetricEvent(
-            metric_type=MetricType.WIZARD_ABANDON,
-            user_id=user_id,
+        session = self._wizard_sessions.pop(user_id, None)
+        self._record(
+            MetricType.WIZARD_ABANDON,
+            wizard_type=session.get('wizard_type') if session else None,
             step=step
         )
-        
-        if user_id in self._wizard_sessions:
-            session = self._wizard_sessions[user_id]
-            event.wizard_type = session.get('wizard_type')
-            
-            # Calcular tiempo hasta abandono
-            if 'started_at' in session:
-                elapsed = datetime.now() - session['started_at']
-                event.latency_ms = elapsed.total_seconds() * 1000
-            
-            event.metadata = {
-                'steps_completed': session.get('steps_completed', 0),
-                'errors_before_abandon': session.get('errors_count', 0),
-                'reason': reason
-            }
-        
-        self._events.append(event)
-        
-        # Limpiar sesión
-        if user_id in self._wizard_sessions:
-            del self._wizard_sessions[user_id]
     
     # ==================== STEP TRACKING ====================
     
@@ -196,28 +282,17 @@ class UXMetricsCollector:
             return
         
         session = self._wizard_sessions[user_id]
-        start_key = f'step_{step}_start'
+        start_time = session.pop(f'step_{step}_start', None)
         
-        if start_key in session:
-            start_time = session[start_key]
+        if start_time is not None:
             elapsed = datetime.now() - start_time
-            latency_ms = elapsed.total_seconds() * 1000
-            
-            # Registrar evento de latencia
-            event = UXMetricEvent(
-                metric_type=MetricType.STEP_LATENCY,
-                user_id=user_id,
+            self._record(
+                MetricType.STEP_LATENCY,
                 wizard_type=session.get('wizard_type'),
                 step=step,
-                latency_ms=latency_ms
+                latency_ms=elapsed.total_seconds() * 1000
             )
-            self._events.append(event)
-            
-            # Actualizar sesión
             session['steps_completed'] = step
-            if 'step_latencies' not in session:
-                session['step_latencies'] = []
-            session['step_latencies'].append(latency_ms)
     
     # ==================== ERROR TRACKING ====================
     
@@ -237,14 +312,7 @@ class UXMetricsCollector:
             error_type: Tipo de error
             step: Paso donde ocurrió
         """
-        event = UXMetricEvent(
-            metric_type=MetricType.VALIDATION_ERROR,
-            user_id=user_id,
-            step=step,
-            error_type=error_type,
-            error_field=field
-        )
-        self._events.append(event)
+        self._record(MetricType.VALIDATION_ERROR, step=step, error_field=field)
         
         # Incrementar contador de errores en sesión
         if user_id in self._wizard_sessions:
@@ -265,16 +333,42 @@ class UXMetricsCollector:
             user_id: ID de usuario
             error_details: Detalles del error
         """
-        event = UXMetricEvent(
-            metric_type=MetricType.CONFIRMATION_ERROR,
-            user_id=user_id,
-            metadata={'details': error_details}
+        session = self._wizard_sessions.get(user_id)
+        self._record(
+            MetricType.CONFIRMATION_ERROR,
+            wizard_type=session.get('wizard_type') if session else None
         )
+    
+    # ==================== CACHE TRACKING ====================
+    
+    def track_cache_lookup(self, cache: str, hit: bool) -> None:
+        """
+        Registra una consulta a la caché de lectura del bot.
         
-        if user_id in self._wizard_sessions:
-            event.wizard_type = self._wizard_sessions[user_id].get('wizard_type')
+        Args:
+            cache: Nombre de la caché ("pending", "users")
+            hit: True si se sirvió desde caché
+        """
+        counters = self._cache_hits if hit else self._cache_misses
+        counters[cache] = counters.get(cache, 0) + 1
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Obtiene aciertos, fallos y tasa de acierto por caché.
         
-        self._events.append(event)
+        Returns:
+            Diccionario caché -> {'hits', 'misses', 'hit_rate'}
+        """
+        stats: Dict[str, Dict[str, float]] = {}
+        for cache in set(self._cache_hits) | set(self._cache_misses):
+            hits = self._cache_hits.get(cache, 0)
+            misses = self._cache_misses.get(cache, 0)
+            stats[cache] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0
+            }
+        return stats
     
     # ==================== ANALYTICS ====================
     
@@ -295,13 +389,9 @@ class UXMetricsCollector:
         Returns:
             Tasa de abandono (0.0 a 1.0)
         """
-        events = self._filter_events(
-            time_window_hours=time_window_hours,
-            wizard_type=wizard_type
-        )
-        
-        starts = sum(1 for e in events if e.metric_type == MetricType.WIZARD_START)
-        completes = sum(1 for e in events if e.metric_type == MetricType.WIZARD_COMPLETE)
+        slots = self._window_slots(time_window_hours)
+        starts = self._count(slots, MetricType.WIZARD_START, wizard_type)
+        completes = self._count(slots, MetricType.WIZARD_COMPLETE, wizard_type)
         
         if starts == 0:
             return 0.0
@@ -326,22 +416,7 @@ class UXMetricsCollector:
         Returns:
             Latencia P95 en milisegundos
         """
-        events = self._filter_events(
-            metric_type=MetricType.STEP_LATENCY,
-            time_window_hours=time_window_hours
-        )
-        
-        if step is not None:
-            events = [e for e in events if e.step == step]
-        
-        latencies = [e.latency_ms for e in events if e.latency_ms is not None]
-        
-        if not latencies:
-            return 0.0
-        
-        latencies.sort()
-        p95_index = int(len(latencies) * 0.95)
-        return latencies[p95_index] if p95_index < len(latencies) else latencies[-1]
+        return self._latency_sketch(self._window_slots(time_window_hours), step).percentile(0.95)
     
     def get_confirmation_error_rate(
         self,
@@ -358,10 +433,9 @@ class UXMetricsCollector:
         Returns:
             Tasa de error (0.0 a 1.0)
         """
-        events = self._filter_events(time_window_hours=time_window_hours)
-        
-        completes = sum(1 for e in events if e.metric_type == MetricType.WIZARD_COMPLETE)
-        errors = sum(1 for e in events if e.metric_type == MetricType.CONFIRMATION_ERROR)
+        slots = self._window_slots(time_window_hours)
+        completes = self._count(slots, MetricType.WIZARD_COMPLETE)
+        errors = self._count(slots, MetricType.CONFIRMATION_ERROR)
         
         total = completes + errors
         if total == 0:
@@ -382,15 +456,10 @@ class UXMetricsCollector:
         Returns:
             Diccionario campo -> contador
         """
-        events = self._filter_events(
-            metric_type=MetricType.VALIDATION_ERROR,
-            time_window_hours=time_window_hours
-        )
-        
         breakdown: Dict[str, int] = {}
-        for event in events:
-            if event.error_field:
-                breakdown[event.error_field] = breakdown.get(event.error_field, 0) + 1
+        for slot in self._window_slots(time_window_hours):
+            for error_field, count in slot.error_fields.items():
+                breakdown[error_field] = breakdown.get(error_field, 0) + count
         
         return breakdown
     
@@ -409,13 +478,8 @@ class UXMetricsCollector:
         confirmation_errors = self.get_confirmation_error_rate(time_window_hours=24)
         error_breakdown = self.get_error_breakdown(time_window_hours=24)
         
-        # Calcular promedios
-        events_24h = self._filter_events(time_window_hours=24)
-        latency_events = [e for e in events_24h if e.metric_type == MetricType.STEP_LATENCY and e.latency_ms]
-        
-        avg_latency = 0.0
-        if latency_events:
-            avg_latency = statistics.mean([e.latency_ms for e in latency_events])
+        slots_24h = self._window_slots(time_window_hours=24)
+        avg_latency = self._latency_sketch(slots_24h).mean()
         
         return {
             'abandonment_rate': {
@@ -439,35 +503,18 @@ class UXMetricsCollector:
                 'meets_target': confirmation_errors * 100 < 2.0
             },
             'error_breakdown': error_breakdown,
-            'total_events_24h': len(events_24h)
+            'cache': self.get_cache_stats(),
+            'total_events_24h': sum(slot.total for slot in slots_24h)
         }
     
     # ==================== HELPERS ====================
     
-    def _filter_events(
-        self,
-        metric_type: Optional[MetricType] = None,
-        wizard_type: Optional[str] = None,
-        time_window_hours: Optional[int] = None
-    ) -> List[UXMetricEvent]:
-        """Filtra eventos por criterios."""
-        filtered = self._events
-        
-        if metric_type:
-            filtered = [e for e in filtered if e.metric_type == metric_type]
-        
-        if wizard_type:
-            filtered = [e for e in filtered if e.wizard_type == wizard_type]
-        
-        if time_window_hours:
-            cutoff = datetime.now() - timedelta(hours=time_window_hours)
-            filtered = [e for e in filtered if e.timestamp >= cutoff]
-        
-        return filtered
-    
     def clear_old_events(self, days_to_keep: int = 7) -> int:
         """
         Limpia eventos antiguos.
+
+        Las ranuras fuera de la retención se reutilizan solas; esto adelanta
+        la limpieza para una antigüedad menor.
         
         Args:
             days_to_keep: Días de eventos a mantener
@@ -475,15 +522,94 @@ class UXMetricsCollector:
         Returns:
             Número de eventos eliminados
         """
-        cutoff = datetime.now() - timedelta(days=days_to_keep)
-        initial_count = len(self._events)
-        self._events = [e for e in self._events if e.timestamp >= cutoff]
-        return initial_count - len(self._events)
+        cutoff = self._clock() - timedelta(days=days_to_keep).total_seconds()
+        removed = 0
+        for position, slot in enumerate(self._slots):
+            if slot is not None and slot.start + self.slot_seconds <= cutoff:
+                removed += slot.total
+                self._slots[position] = None
+        return removed
+    
+    def clear_stale_sessions(self, max_age_hours: int = 24) -> int:
+        """
+        Descarta sesiones de wizard sin completar ni abandonar explícitamente.
+        
+        Args:
+            max_age_hours: Antigüedad máxima de la sesión
+        
+        Returns:
+            Número de sesiones descartadas
+        """
+        cutoff = datetime.now() - timedelta(hours=max_age_hours)
+        stale = [uid for uid, s in self._wizard_sessions.items() if s['started_at'] < cutoff]
+        for user_id in stale:
+            del self._wizard_sessions[user_id]
+        return len(stale)
+
+
+class UXMetricsPrometheusCollector:
+    """
+    Collector Prometheus con los totales acumulados de ``UXMetricsCollector``.
+    """
+
+    def __init__(self, collector: UXMetricsCollector) -> None:
+        self.collector = collector
+
+    def collect(self) -> Iterator[Any]:
+        events = CounterMetricFamily(
+            "ggrt_bot_ux_events",
+            "Wizard lifecycle and error events",
+            labels=["env", "event", "wizard_type"],
+        )
+        for (metric_type, wizard_type), count in list(self.collector._event_totals.items()):
+            events.add_metric([_ENVIRONMENT, metric_type.value, wizard_type or ""], count)
+        latency = HistogramMetricFamily(
+            "ggrt_bot_step_latency_seconds",
+            "Wizard step latency",
+            labels=["env", "step"],
+        )
+        for step, histogram in list(self.collector._step_histograms.items()):
+            latency.add_metric(
+                [_ENVIRONMENT, "" if step is None else str(step)],
+                prometheus_histogram_buckets(histogram), histogram.sum
+            )
+        validation = CounterMetricFamily(
+            "ggrt_bot_validation_errors",
+            "Validation errors by field",
+            labels=["env", "field"],
+        )
+        for error_field, count in list(self.collector._error_field_totals.items()):
+            validation.add_metric([_ENVIRONMENT, error_field], count)
+        cache = CounterMetricFamily(
+            "ggrt_bot_cache_lookups",
+            "Bot read-cache lookups by result",
+            labels=["env", "cache", "result"],
+        )
+        for result, counters in (("hit", self.collector._cache_hits), ("miss", self.collector._cache_misses)):
+            for name, count in list(counters.items()):
+                cache.add_metric([_ENVIRONMENT, name, result], count)
+        active = GaugeMetricFamily(
+            "ggrt_bot_active_wizards",
+            "Wizards started and not yet completed or abandoned",
+            labels=["env"],
+        )
+        active.add_metric([_ENVIRONMENT], len(self.collector._wizard_sessions))
+        yield events
+        yield latency
+        yield validation
+        yield cache
+        yield active
 
 
 # Instancia global del collector
 ux_metrics = UXMetricsCollector()
 
+try:
+    REGISTRY.register(UXMetricsPrometheusCollector(ux_metrics))
+except ValueError:
+    # Ya registrado (recarga del módulo)
+    pass
+
 
 # Helper functions para uso fácil
 def track_wizard_start(user_id: int, wizard_type: str = "crear") -> None:
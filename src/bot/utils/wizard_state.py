@@ -6,13 +6,33 @@ Este módulo implementa Quick Win #4: Control de atajos
 - Deshabilitar comandos texto libre durante wizard
 - Estados sensibles para prevenir acciones involuntarias
 - Control de flujo seguro
+
+Las sesiones se guardan en un store intercambiable: en memoria (expiración
+por timing wheel) o en Redis (hash por usuario con TTL nativo), este último
+para ejecutar varias réplicas del bot. Las escrituras usan concurrencia
+optimista por versión. La interfaz de stores y gestor es asíncrona para no
+bloquear el event loop del bot con round trips a Redis.
 """
 
+import asyncio
+import json
+import time
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List, Set, Tuple, Union
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from loguru import logger
+
+from config.settings import settings
+
+try:
+    import msgpack
+    MSGPACK_ENABLED = True
+except ImportError:
+    msgpack = None
+    MSGPACK_ENABLED = False
+
 
 class WizardState(Enum):
     """
@@ -135,19 +155,255 @@ class WizardSession:
         return True
 
 
+class WizardSessionConflict(Exception):
+    """La sesión cambió en otra réplica entre la lectura y la escritura."""
+
+    def __init__(self, user_id: int):
+        super().__init__(f"Conflicto de versión en la sesión de wizard del usuario {user_id}")
+        self.user_id = user_id
+
+
+# Sesión cargada del store junto con su versión (0 = no existe)
+VersionedSession = Tuple[WizardSession, int]
+
+
+class InMemoryWizardStore:
+    """
+    Store de sesiones en proceso con expiración por timing wheel.
+
+    Cada sesión queda en la ranura del tick en que vence; en cada operación
+    se avanza la rueda y solo se recorren las ranuras vencidas, así que
+    expirar cuesta O(sesiones vencidas) y no hace falta barrer todo el dict.
+    Las sesiones en PROCESSING no expiran (se reprograman).
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 1800,
+        resolution_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._resolution = resolution_seconds
+        self._clock = clock
+        self._ttl_ticks = max(1, int(ttl_seconds / resolution_seconds + 0.5))
+        # Todas las fechas de vencimiento caen dentro de una vuelta de la rueda
+        self._wheel: List[Set[int]] = [set() for _ in range(self._ttl_ticks + 1)]
+        self._deadlines: Dict[int, int] = {}
+        self._sessions: Dict[int, VersionedSession] = {}
+        self._tick = self._now_tick()
+
+    def _now_tick(self) -> int:
+        return int(self._clock() / self._resolution)
+
+    def _schedule(self, user_id: int) -> None:
+        previous = self._deadlines.get(user_id)
+        if previous is not None:
+            self._wheel[previous % len(self._wheel)].discard(user_id)
+        deadline = self._tick + self._ttl_ticks
+        self._wheel[deadline % len(self._wheel)].add(user_id)
+        self._deadlines[user_id] = deadline
+
+    def _advance(self) -> int:
+        now_tick = self._now_tick()
+        steps = min(now_tick - self._tick, len(self._wheel))
+        first = self._tick + 1
+        self._tick = max(self._tick, now_tick)
+        expired = 0
+        for tick in range(first, first + steps):
+            slot = self._wheel[tick % len(self._wheel)]
+            for user_id in list(slot):
+                if self._deadlines[user_id] > now_tick:
+                    continue
+                if self._sessions[user_id][0].is_processing():
+                    self._schedule(user_id)
+                    continue
+                slot.discard(user_id)
+                del self._deadlines[user_id]
+                del self._sessions[user_id]
+                expired += 1
+        return expired
+
+    async def load(self, user_id: int) -> Optional[VersionedSession]:
+        """Sesión y versión (renueva el TTL) o ``None`` si no existe."""
+        self._advance()
+        entry = self._sessions.get(user_id)
+        if entry is not None:
+            self._schedule(user_id)
+        return entry
+
+    async def save(self, user_id: int, session: WizardSession, expected_version: int) -> int:
+        """Guarda si la versión no cambió desde ``load``; devuelve la nueva."""
+        self._advance()
+        current = self._sessions.get(user_id)
+        if (current[1] if current else 0) != expected_version:
+            raise WizardSessionConflict(user_id)
+        self._sessions[user_id] = (session, expected_version + 1)
+        self._schedule(user_id)
+        return expected_version + 1
+
+    async def purge_expired(self, max_idle_seconds: Optional[float] = None) -> int:
+        """
+        Adelanta la expiración; con ``max_idle_seconds`` usa ese umbral en
+        lugar del TTL (recorre todas las sesiones).
+        """
+        expired = self._advance()
+        if max_idle_seconds is None:
+            return expired
+        now = datetime.now()
+        stale = [
+            user_id for user_id, (session, _) in self._sessions.items()
+            if (now - session.last_activity).total_seconds() > max_idle_seconds
+            and not session.is_processing()
+        ]
+        for user_id in stale:
+            self._wheel[self._deadlines.pop(user_id) % len(self._wheel)].discard(user_id)
+            del self._sessions[user_id]
+        return expired + len(stale)
+
+    async def count_active(self) -> int:
+        self._advance()
+        return sum(1 for session, _ in self._sessions.values() if session.is_active())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Compare-and-set atómico: escribe solo si la versión es la leída y renueva el TTL.
+# ARGV: versión esperada, TTL en ms, pares campo/valor
+_CAS_LUA = """
+local current = redis.call('HGET', KEYS[1], 'version')
+if (current or '0') ~= ARGV[1] then
+  return -1
+end
+local version = tonumber(ARGV[1]) + 1
+redis.call('HSET', KEYS[1], 'version', version, unpack(ARGV, 3))
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return version
+"""
+
+
+def _encode_data(data: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    if MSGPACK_ENABLED:
+        return msgpack.packb(data, use_bin_type=True), b"msgpack"
+    return json.dumps(data, separators=(",", ":")).encode(), b"json"
+
+
+def _decode_data(raw: bytes, codec: bytes) -> Dict[str, Any]:
+    if codec == b"msgpack":
+        if not MSGPACK_ENABLED:
+            raise RuntimeError("Sesión codificada con msgpack pero el paquete no está instalado")
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
+
+
+class RedisWizardStore:
+    """
+    Store de sesiones compartido entre réplicas del bot.
+
+    Cada sesión es un hash ``{prefix}{user_id}`` con TTL nativo que se renueva
+    al leer (HGETALL + PEXPIRE en un solo round trip) y al escribir; ``data``
+    se codifica con msgpack (JSON si no está instalado). Las escrituras son
+    un script Lua de compare-and-set sobre el campo ``version``. Usa el
+    cliente ``redis.asyncio``.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        *,
+        client: Any = None,
+        ttl_seconds: float = 1800,
+        prefix: str = "gad:wizard:",
+    ) -> None:
+        if client is None:
+            import redis.asyncio as aioredis
+
+            client = aioredis.from_url(redis_url, socket_timeout=2.0)
+        self.redis = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._cas = client.register_script(_CAS_LUA)
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def load(self, user_id: int) -> Optional[VersionedSession]:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(self._key(user_id))
+        pipe.pexpire(self._key(user_id), int(self.ttl_seconds * 1000))
+        fields, _ = await pipe.execute()
+        if not fields:
+            return None
+        session = WizardSession(
+            state=WizardState(fields[b"state"].decode()),
+            data=_decode_data(fields[b"data"], fields.get(b"codec", b"json")),
+            started_at=datetime.fromisoformat(fields[b"started_at"].decode()),
+            last_activity=datetime.fromisoformat(fields[b"last_activity"].decode()),
+            shortcuts_enabled=fields[b"shortcuts_enabled"] == b"1",
+            text_commands_allowed=fields[b"text_commands_allowed"] == b"1",
+        )
+        return session, int(fields[b"version"])
+
+    async def save(self, user_id: int, session: WizardSession, expected_version: int) -> int:
+        data, codec = _encode_data(session.data)
+        version = await self._cas(
+            keys=[self._key(user_id)],
+            args=[
+                expected_version, int(self.ttl_seconds * 1000),
+                "state", session.state.value,
+                "data", data,
+                "codec", codec,
+                "started_at", session.started_at.isoformat(),
+                "last_activity", session.last_activity.isoformat(),
+                "shortcuts_enabled", int(session.shortcuts_enabled),
+                "text_commands_allowed", int(session.text_commands_allowed),
+            ],
+        )
+        if int(version) < 0:
+            raise WizardSessionConflict(user_id)
+        return int(version)
+
+    async def purge_expired(self, max_idle_seconds: Optional[float] = None) -> int:
+        """Redis expira las sesiones por TTL: no hay nada que purgar."""
+        return 0
+
+    async def count_active(self) -> int:
+        """Recorre las claves con SCAN; pensado para diagnóstico, no para cada mensaje."""
+        keys = [key async for key in self.redis.scan_iter(match=f"{self.prefix}*", count=500)]
+        if not keys:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(key, "state")
+        idle = WizardState.IDLE.value.encode()
+        return sum(1 for state in await pipe.execute() if state is not None and state != idle)
+
+
+WizardSessionStore = Union[InMemoryWizardStore, RedisWizardStore]
+
+
 class WizardSessionManager:
     """
     Gestor de sesiones de wizard por usuario.
     
     Quick Win #4: Gestión centralizada de estados por usuario.
+
+    Cada modificación lee la sesión con su versión, aplica el cambio y la
+    guarda con compare-and-set; si otra réplica la modificó entretanto, se
+    vuelve a leer y a aplicar el cambio (hasta ``max_conflict_retries``).
     """
     
-    def __init__(self) -> None:
-        self._sessions: Dict[int, WizardSession] = {}
+    def __init__(self, store: Optional[WizardSessionStore] = None, max_conflict_retries: int = 3) -> None:
+        self.store = store if store is not None else InMemoryWizardStore()
+        self.max_conflict_retries = max_conflict_retries
     
-    def get_session(self, user_id: int) -> WizardSession:
+    async def get_session(self, user_id: int) -> WizardSession:
         """
-        Obtiene o crea sesión de wizard para un usuario.
+        Obtiene la sesión de wizard de un usuario (IDLE si no tiene).
+
+        Leer renueva el TTL de la sesión. Una sesión IDLE nueva no se guarda
+        hasta que alguna operación la modifica.
         
         Args:
             user_id: ID de usuario de Telegram
@@ -155,13 +411,28 @@ class WizardSessionManager:
         Returns:
             Sesión de wizard del usuario
         """
-        if user_id not in self._sessions:
-            self._sessions[user_id] = WizardSession()
-        
-        self._sessions[user_id].update_activity()
-        return self._sessions[user_id]
+        loaded = await self.store.load(user_id)
+        if loaded is None:
+            return WizardSession()
+        session = loaded[0]
+        session.update_activity()
+        return session
     
-    def start_wizard(self, user_id: int, wizard_type: str = "crear") -> WizardSession:
+    async def _update(self, user_id: int, mutate: Callable[[WizardSession], Optional[WizardSession]]) -> WizardSession:
+        """Aplica ``mutate`` y guarda con compare-and-set, reintentando ante conflictos."""
+        for attempt in range(self.max_conflict_retries + 1):
+            loaded = await self.store.load(user_id)
+            session, version = loaded if loaded is not None else (WizardSession(), 0)
+            session = mutate(session) or session
+            session.update_activity()
+            try:
+                await self.store.save(user_id, session, version)
+                return session
+            except WizardSessionConflict:
+                logger.debug(f"Conflicto en sesión de wizard de {user_id} (intento {attempt + 1})")
+        raise WizardSessionConflict(user_id)
+    
+    async def start_wizard(self, user_id: int, wizard_type: str = "crear") -> WizardSession:
         """
         Inicia un nuevo wizard para el usuario.
         
@@ -172,26 +443,26 @@ class WizardSessionManager:
         Returns:
             Sesión de wizard iniciada
         """
-        session = WizardSession()
-        session.data['wizard_type'] = wizard_type
-        
-        if wizard_type == "crear":
-            session.state = WizardState.SELECTING_TYPE
+        def reset(_: WizardSession) -> WizardSession:
+            session = WizardSession()
+            session.data['wizard_type'] = wizard_type
+            if wizard_type == "crear":
+                session.state = WizardState.SELECTING_TYPE
+            return session
         
-        self._sessions[user_id] = session
-        return session
+        return await self._update(user_id, reset)
     
-    def cancel_wizard(self, user_id: int) -> None:
+    async def cancel_wizard(self, user_id: int) -> None:
         """
         Cancela y limpia el wizard del usuario.
         
         Args:
             user_id: ID de usuario
         """
-        if user_id in self._sessions:
-            self._sessions[user_id] = WizardSession()  # Reset a IDLE
+        if await self.store.load(user_id) is not None:
+            await self._update(user_id, lambda _: WizardSession())  # Reset a IDLE
     
-    def advance_state(
+    async def advance_state(
         self, 
         user_id: int, 
         next_state: WizardState,
@@ -208,16 +479,14 @@ class WizardSessionManager:
         Returns:
             Sesión actualizada
         """
-        session = self.get_session(user_id)
-        session.state = next_state
-        
-        if data:
-            session.data.update(data)
+        def advance(session: WizardSession) -> None:
+            session.state = next_state
+            if data:
+                session.data.update(data)
         
-        session.update_activity()
-        return session
+        return await self._update(user_id, advance)
     
-    def set_processing(self, user_id: int, processing: bool = True) -> None:
+    async def set_processing(self, user_id: int, processing: bool = True) -> None:
         """
         Marca sesión como procesando (bloqueada).
         
@@ -227,49 +496,53 @@ class WizardSessionManager:
             user_id: ID de usuario
             processing: True para bloquear, False para desbloquear
         """
-        session = self.get_session(user_id)
-        if processing:
-            session.state = WizardState.PROCESSING
-        session.update_activity()
+        def mark(session: WizardSession) -> None:
+            if processing:
+                session.state = WizardState.PROCESSING
+        
+        await self._update(user_id, mark)
     
-    def cleanup_old_sessions(self, max_age_minutes: int = 30) -> int:
+    async def cleanup_old_sessions(self, max_age_minutes: Optional[int] = None) -> int:
         """
         Limpia sesiones inactivas.
+
+        Las sesiones ya expiran solas por TTL; esto adelanta la purga o, con
+        ``max_age_minutes``, aplica un umbral distinto (solo store en memoria).
         
         Args:
-            max_age_minutes: Edad máxima en minutos
+            max_age_minutes: Edad máxima en minutos (None = TTL del store)
         
         Returns:
             Número de sesiones limpiadas
         """
-        now = datetime.now()
-        to_remove = []
-        
-        for user_id, session in self._sessions.items():
-            age = (now - session.last_activity).total_seconds() / 60
-            if age > max_age_minutes and session.state != WizardState.PROCESSING:
-                to_remove.append(user_id)
-        
-        for user_id in to_remove:
-            del self._sessions[user_id]
-        
-        return len(to_remove)
+        return await self.store.purge_expired(max_age_minutes * 60 if max_age_minutes is not None else None)
     
-    def get_active_sessions_count(self) -> int:
+    async def get_active_sessions_count(self) -> int:
         """
         Obtiene número de sesiones activas.
         
         Returns:
             Número de wizards activos
         """
-        return sum(1 for s in self._sessions.values() if s.is_active())
+        return await self.store.count_active()
+
+
+def create_wizard_store() -> WizardSessionStore:
+    """Store configurado (BOT_WIZARD_STORE); cae a memoria si Redis no está configurado."""
+    ttl = getattr(settings, "BOT_WIZARD_SESSION_TTL_SECONDS", 1800)
+    if getattr(settings, "BOT_WIZARD_STORE", "memory") == "redis":
+        redis_url = getattr(settings, "BOT_WIZARD_REDIS_URL", None)
+        if redis_url:
+            return RedisWizardStore(redis_url, ttl_seconds=ttl)
+        logger.warning("BOT_WIZARD_STORE=redis sin BOT_WIZARD_REDIS_URL: sesiones de wizard en memoria")
+    return InMemoryWizardStore(ttl_seconds=ttl)
 
 
 # Instancia global del gestor
-wizard_manager = WizardSessionManager()
+wizard_manager = WizardSessionManager(create_wizard_store())
 
 
-def get_wizard_state(user_id: int) -> WizardState:
+async def get_wizard_state(user_id: int) -> WizardState:
     """
     Obtiene estado actual del wizard del usuario.
     
@@ -279,10 +552,10 @@ def get_wizard_state(user_id: int) -> WizardState:
     Returns:
         Estado actual del wizard
     """
-    return wizard_manager.get_session(user_id).state
+    return (await wizard_manager.get_session(user_id)).state
 
 
-def is_wizard_active(user_id: int) -> bool:
+async def is_wizard_active(user_id: int) -> bool:
     """
     Verifica si el usuario tiene un wizard activo.
     
@@ -292,10 +565,10 @@ def is_wizard_active(user_id: int) -> bool:
     Returns:
         True si hay wizard activo
     """
-    return wizard_manager.get_session(user_id).is_active()
+    return (await wizard_manager.get_session(user_id)).is_active()
 
 
-def can_execute_command(user_id: int, command: str) -> bool:
+async def can_execute_command(user_id: int, command: str) -> bool:
     """
     Verifica si un comando puede ejecutarse.
     
@@ -308,10 +581,10 @@ def can_execute_command(user_id: int, command: str) -> bool:
     Returns:
         True si el comando está permitido
     """
-    return wizard_manager.get_session(user_id).allow_command(command)
+    return (await wizard_manager.get_session(user_id)).allow_command(command)
 
 
-def can_process_text_input(user_id: int) -> bool:
+async def can_process_text_input(user_id: int) -> bool:
     """
     Verifica si se debe procesar entrada de texto libre.
     
@@ -323,16 +596,16 @@ def can_process_text_input(user_id: int) -> bool:
     Returns:
         True si se permite texto libre
     """
-    return wizard_manager.get_session(user_id).allow_text_input()
+    return (await wizard_manager.get_session(user_id)).allow_text_input()
 
 
 # Tests y ejemplos
-if __name__ == "__main__":
+async def _demo() -> None:
     print("=== Tests de Control de Estados ===\n")
     
     # Test 1: Crear sesión
     user_id = 12345
-    session = wizard_manager.start_wizard(user_id, "crear")
+    session = await wizard_manager.start_wizard(user_id, "crear")
     print(f"Wizard iniciado: Estado = {session.state}")
     print(f"¿Wizard activo? {session.is_active()}")
     
@@ -343,29 +616,33 @@ if __name__ == "__main__":
     print(f"/ayuda permitido: {session.allow_command('/ayuda')}")
     
     # Test 3: Avanzar a ingreso de código
-    wizard_manager.advance_state(user_id, WizardState.ENTERING_CODE)
-    session = wizard_manager.get_session(user_id)
+    await wizard_manager.advance_state(user_id, WizardState.ENTERING_CODE)
+    session = await wizard_manager.get_session(user_id)
     print(f"\nEstado avanzado: {session.state}")
     print(f"¿Permite texto? {session.allow_text_input()}")
     
     # Test 4: Pasar a confirmación
-    wizard_manager.advance_state(user_id, WizardState.CONFIRMING)
-    session = wizard_manager.get_session(user_id)
+    await wizard_manager.advance_state(user_id, WizardState.CONFIRMING)
+    session = await wizard_manager.get_session(user_id)
     print(f"\nEn confirmación: {session.state}")
     print(f"/start permitido: {session.allow_command('/start')}")
     print(f"¿Permite texto? {session.allow_text_input()}")
     
     # Test 5: Procesar
-    wizard_manager.set_processing(user_id, True)
-    session = wizard_manager.get_session(user_id)
+    await wizard_manager.set_processing(user_id, True)
+    session = await wizard_manager.get_session(user_id)
     print(f"\nProcesando: {session.is_processing()}")
     print(f"¿Permite callbacks? {session.allow_callback()}")
     
     # Test 6: Cancelar
-    wizard_manager.cancel_wizard(user_id)
-    session = wizard_manager.get_session(user_id)
+    await wizard_manager.cancel_wizard(user_id)
+    session = await wizard_manager.get_session(user_id)
     print(f"\nDespués de cancelar: {session.state}")
     print(f"¿Wizard activo? {session.is_active()}")
     
     # Test 7: Sesiones activas
-    print(f"\nSesiones activas: {wizard_manager.get_active_sessions_count()}")
+    print(f"\nSesiones activas: {await wizard_manager.get_active_sessions_count()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
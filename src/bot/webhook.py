@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Modo webhook del bot de Telegram.
+
+Un endpoint ASGI mínimo (Starlette sobre uvicorn) recibe los updates que
+envía Telegram, verifica el ``secret_token`` y los encola en
+``application.update_queue``; la respuesta es inmediata y el procesamiento
+lo hace el ``update_processor`` de la aplicación. Evita depender de tornado
+(extra ``webhooks`` de python-telegram-bot).
+"""
+
+import hmac
+from typing import Optional
+
+import uvicorn
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from telegram import Update
+from telegram.ext import Application
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_webhook_app(application: Application, path: str, secret_token: Optional[str] = None) -> Starlette:
+    """App ASGI con ``POST {path}`` para Telegram, ``GET /health`` y ``GET /metrics``."""
+
+    async def receive_update(request: Request) -> Response:
+        if secret_token is not None:
+            provided = request.headers.get(SECRET_TOKEN_HEADER, "")
+            if not hmac.compare_digest(provided, secret_token):
+                return Response(status_code=403)
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logger.warning(f"Update de webhook inválido: {e!r}")
+            return Response(status_code=400)
+        await application.update_queue.put(update)
+        return Response(status_code=200)
+
+    async def health(_: Request) -> Response:
+        processor = application.update_processor
+        return JSONResponse({
+            "status": "ok",
+            "pending_updates": application.update_queue.qsize(),
+            "concurrent_updates": processor.current_concurrent_updates,
+            "max_concurrent_updates": processor.max_concurrent_updates,
+        })
+
+    async def metrics(_: Request) -> Response:
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    return Starlette(routes=[
+        Route(path, receive_update, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ])
+
+
+async def run_webhook(
+    application: Application,
+    webhook_url: str,
+    *,
+    path: str,
+    listen: str = "0.0.0.0",
+    port: int = 8000,
+    secret_token: Optional[str] = None,
+) -> None:
+    """
+    Registra el webhook en Telegram y sirve el endpoint hasta recibir SIGINT/SIGTERM.
+
+    Replica el ciclo de vida de ``run_polling`` (initialize, post_init, start,
+    stop, post_stop, shutdown, post_shutdown). El webhook no se elimina al salir para que
+    otras réplicas sigan recibiendo updates.
+    """
+    server = uvicorn.Server(uvicorn.Config(
+        create_webhook_app(application, path, secret_token),
+        host=listen, port=port, log_level="warning", lifespan="off",
+    ))
+    try:
+        async with application:
+            if application.post_init:
+                await application.post_init(application)
+            await application.bot.set_webhook(
+                url=webhook_url.rstrip("/") + path,
+                secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            await application.start()
+            logger.info(f"Bot en modo webhook escuchando en {listen}:{port}{path}")
+            try:
+                await server.serve()
+            finally:
+                await application.stop()
+                if application.post_stop:
+                    await application.post_stop(application)
+    finally:
+        if application.post_shutdown:
+            await application.post_shutdown(application)
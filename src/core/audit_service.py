@@ -17,6 +17,7 @@ from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload
 
 from src.api.models import AuditLog, AuditSession, AuditEventType, AuditSeverity, Usuario
+from src.core.audit_writer import AuditWriter, get_audit_writer
 from src.core.logging import get_logger
 
 audit_logger = get_logger("audit")
@@ -33,8 +34,10 @@ class AuditService:
     - Reports gubernamentales
     """
     
-    def __init__(self, db_session: AsyncSession):
+    def __init__(self, db_session: AsyncSession, writer: Optional[AuditWriter] = None):
         self.db = db_session
+        # Escritor write-behind; por defecto el global arrancado en el lifespan
+        self.writer = writer
     
     async def log_event(
         self,
@@ -77,7 +80,10 @@ class AuditService:
             ... (otros parámetros opcionales para contexto)
             
         Returns:
-            AuditLog: El registro de auditoría creado
+            AuditLog: El registro de auditoría creado. Con el escritor
+            write-behind activo es transitorio (sin ``id``) y se persiste en
+            el siguiente lote; los eventos CRITICAL esperan a ese lote salvo
+            con ``AUDIT_DURABILITY=async``.
         """
         
         # Generar ID único para el evento
@@ -97,8 +103,8 @@ class AuditService:
             }
             retention_until = datetime.utcnow() + timedelta(days=default_retention[severity])
         
-        # Crear registro de auditoría
-        audit_log = AuditLog(
+        # Fila de auditoría (la escribe el AuditWriter en lote si está activo)
+        row = dict(
             event_id=event_id,
             event_type=event_type,
             severity=severity,
@@ -123,19 +129,24 @@ class AuditService:
             compliance_tags=",".join(compliance_tags) if compliance_tags else None,
             retention_until=retention_until
         )
-        
-        self.db.add(audit_log)
-        await self.db.commit()
+        audit_log = AuditLog(**row)
+
+        writer = self.writer if self.writer is not None else get_audit_writer()
+        if writer is None or not await writer.submit(row):
+            # Sin escritor (tests, scripts) o cola saturada: escritura en línea
+            self.db.add(audit_log)
+            await self.db.commit()
         
         # Log estructurado para sistema de logging
-        audit_logger.bind(
+        audit_logger.info(
+            f"Audit event: {action_description}",
             event_id=event_id,
             event_type=event_type.value,
             user_id=user_id,
             resource=f"{resource_type}:{resource_id}" if resource_type else None,
             success=success,
             severity=severity.value
-        ).info(f"Audit event: {action_description}")
+        )
         
         return audit_log
     
@@ -415,7 +426,8 @@ class AuditService:
         new_values: Dict[str, Any],
         user_id: Optional[int] = None,
         session_id: Optional[str] = None,
-        request_context: Optional[Dict[str, Any]] = None
+        request_context: Optional[Dict[str, Any]] = None,
+        telegram_id: Optional[int] = None
     ) -> AuditLog:
         """Método de conveniencia para operaciones CREATE."""
         context = request_context or {}
@@ -424,6 +436,7 @@ class AuditService:
             event_type=AuditEventType.CREATE,
             action_description=f"Creado {resource_type} con ID: {resource_id}",
             user_id=user_id,
+            telegram_id=telegram_id,
             session_id=session_id,
             severity=AuditSeverity.MEDIUM,
             endpoint=context.get("endpoint"),
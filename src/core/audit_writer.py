@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+Escritura diferida (write-behind) del audit trail.
+
+``AuditService.log_event`` encola la fila en ``AuditWriter`` en lugar de
+hacer ``add`` + ``commit`` en la sesión de la solicitud. Una tarea de fondo
+vacía la cola en lotes (INSERT multi-fila, en su propia sesión) cuando se
+alcanzan ``batch_size`` filas o ``flush_interval`` segundos desde la primera
+fila pendiente.
+
+Durabilidad (``AUDIT_DURABILITY``):
+
+- ``async``: nadie espera a la escritura (fire-and-forget);
+- ``critical``: los eventos CRITICAL esperan a que su lote se confirme;
+- ``sync``: todos los eventos esperan a su lote (agrupados igualmente).
+
+Con la cola llena el productor espera hasta ``enqueue_timeout`` segundos;
+si no hay hueco, ``submit`` devuelve ``False`` y el llamador escribe el
+evento en línea, de modo que la contrapresión nunca pierde eventos.
+
+Quien espera la confirmación lo hace como mucho ``flush_timeout`` segundos;
+si el escritor se detiene o se cancela con filas en cola, sus esperas
+terminan con ``AuditWriterUnavailable`` en lugar de quedar colgadas.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from sqlalchemy import insert
+
+from src.api.models import AuditLog
+from src.core.logging import get_logger
+from src.shared.latency_histogram import LatencyHistogram, prometheus_histogram_buckets
+
+writer_logger = get_logger("audit.writer")
+
+DURABILITY_MODES = ("async", "critical", "sync")
+
+_STOP = object()
+
+_Pending = Tuple[Dict[str, Any], Optional["asyncio.Future[None]"]]
+
+
+class AuditWriterUnavailable(RuntimeError):
+    """La confirmación de un evento no llegó (escritor detenido o espera agotada)."""
+
+
+class AuditWriter:
+    """Cola acotada de filas de ``audit_logs`` con escritor de fondo por lotes."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        enqueue_timeout: float = 0.05,
+        durability: str = "critical",
+        flush_timeout: float = 5.0,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"AUDIT_DURABILITY inválida: {durability!r} (esperado {DURABILITY_MODES})")
+        self.session_factory = session_factory
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.durability = durability
+        self.flush_timeout = flush_timeout
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._closing = False
+        # Lote que se está escribiendo (para liberar sus esperas si se cancela)
+        self._in_flight: List[_Pending] = []
+        # Contadores (exportados por AuditWriterCollector)
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.producer_waits = 0
+        self.batches = 0
+        self.flush_latency = LatencyHistogram()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._closing
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def wants_flush(self, row: Dict[str, Any]) -> bool:
+        """Indica si el evento debe esperar a que su lote se confirme."""
+        if self.durability == "sync":
+            return True
+        return self.durability == "critical" and str(getattr(row.get("severity"), "value", "")) == "critical"
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Deja de aceptar eventos y vacía la cola antes de terminar."""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            writer_logger.error(
+                "Vaciado del audit trail incompleto al detener",
+                pending=self._queue.qsize(),
+            )
+            self._task.cancel()
+            # La cancelación libera las esperas de las filas no escritas
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def submit(self, row: Dict[str, Any]) -> bool:
+        """
+        Encola ``row``; si su durabilidad lo exige, espera a la confirmación.
+
+        Devuelve ``False`` si el escritor no está activo o la cola siguió
+        llena durante ``enqueue_timeout`` (el llamador debe escribir en línea).
+        Si el lote del evento falla, la excepción se propaga al llamador que
+        espera la confirmación; si no llega en ``flush_timeout`` segundos o el
+        escritor se detiene antes, se lanza ``AuditWriterUnavailable``.
+        """
+        if not self.running:
+            return False
+        waiter = asyncio.get_running_loop().create_future() if self.wants_flush(row) else None
+        item: _Pending = (row, waiter)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.producer_waits += 1
+            try:
+                await asyncio.wait_for(self._queue.put(item), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+        self.enqueued += 1
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), self.flush_timeout)
+            except asyncio.TimeoutError:
+                raise AuditWriterUnavailable(
+                    f"Evento de auditoría sin confirmar tras {self.flush_timeout}s"
+                ) from None
+        return True
+
+    async def _next_batch(self) -> Tuple[List[_Pending], bool]:
+        """Espera la primera fila y acumula hasta ``batch_size`` o ``flush_interval``."""
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        urgent = first[1] is not None
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                # Un evento que espera confirmación no aguarda a la ventana
+                remaining = deadline - time.monotonic()
+                if urgent or remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            urgent = urgent or item[1] is not None
+        return batch, False
+
+    async def _run(self) -> None:
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = await self._next_batch()
+                if batch:
+                    await self._flush(batch)
+            # Lo que quedara detrás del centinela (productores que esperaban hueco)
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    await self._flush([item])
+        except asyncio.CancelledError:
+            self._abandon_pending()
+            raise
+
+    def _abandon_pending(self) -> None:
+        """Libera las esperas del lote en curso y de la cola al cancelar el escritor."""
+        pending = self._in_flight
+        self._in_flight = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                pending.append(item)
+        if pending:
+            writer_logger.error("Eventos de audit trail sin escribir al cancelar el escritor", pending=len(pending))
+        error = AuditWriterUnavailable("El escritor del audit trail se detuvo antes de confirmar el evento")
+        for _, waiter in pending:
+            _resolve(waiter, error)
+
+    async def _flush(self, batch: List[_Pending]) -> None:
+        start = time.perf_counter()
+        self._in_flight = batch
+        try:
+            await self._insert([row for row, _ in batch])
+        except Exception as e:
+            writer_logger.warning(f"Lote de audit trail fallido ({len(batch)} filas), reintentando por fila: {e}")
+            await self._flush_rows(batch)
+        else:
+            self.written += len(batch)
+            for _, waiter in batch:
+                _resolve(waiter)
+        self._in_flight = []
+        self.batches += 1
+        self.flush_latency.record(time.perf_counter() - start)
+
+    async def _flush_rows(self, batch: List[_Pending]) -> None:
+        """Aísla las filas inválidas para no perder el resto del lote."""
+        for row, waiter in batch:
+            try:
+                await self._insert([row])
+            except Exception as e:
+                self.failed += 1
+                writer_logger.error(
+                    f"Evento de audit trail descartado: {e}",
+                    event_id=row.get("event_id"),
+                    event_type=str(getattr(row.get("event_type"), "value", row.get("event_type"))),
+                )
+                _resolve(waiter, e)
+            else:
+                self.written += 1
+                _resolve(waiter)
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        async with self.session_factory() as session:
+            try:
+                # executemany de Core: SQLAlchemy lo agrupa en INSERT multi-fila
+                await session.execute(insert(AuditLog), rows)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "durability": self.durability,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "producer_waits": self.producer_waits,
+            "batches": self.batches,
+            "flush_p99_ms": self.flush_latency.percentile(0.99) * 1000 if self.flush_latency.count else 0.0,
+        }
+
+
+def _resolve(waiter: Optional["asyncio.Future[None]"], error: Optional[BaseException] = None) -> None:
+    if waiter is None or waiter.done():
+        return
+    if error is None:
+        waiter.set_result(None)
+    else:
+        waiter.set_exception(error)
+
+
+_audit_writer: Optional[AuditWriter] = None
+
+
+def get_audit_writer() -> Optional[AuditWriter]:
+    """Escritor activo del proceso, o ``None`` (escritura en línea)."""
+    return _audit_writer
+
+
+def start_audit_writer(session_factory: Callable[[], Any], **options: Any) -> AuditWriter:
+    """Crea y arranca el escritor global (se llama desde el lifespan)."""
+    global _audit_writer
+    writer = AuditWriter(session_factory, **options)
+    writer.start()
+    _audit_writer = writer
+    writer_logger.info(
+        "Audit trail en modo write-behind",
+        durability=writer.durability,
+        batch_size=writer.batch_size,
+        flush_interval=writer.flush_interval,
+    )
+    return writer
+
+
+async def stop_audit_writer(timeout: float = 10.0) -> None:
+    """Vacía y detiene el escritor global."""
+    global _audit_writer
+    writer = _audit_writer
+    if writer is None:
+        return
+    await writer.stop(timeout)
+    _audit_writer = None
+    writer_logger.info("Audit trail vaciado", **writer.get_stats())
+
+
+class AuditWriterCollector:
+    """Exporta profundidad de cola, contrapresión y latencia de vaciado."""
+
+    def __init__(self, get_writer: Callable[[], Optional[AuditWriter]]) -> None:
+        self.get_writer = get_writer
+
+    def collect(self) -> Iterator[Any]:
+        writer = self.get_writer()
+        if writer is None:
+            return
+        depth = GaugeMetricFamily("ggrt_audit_queue_depth", "Eventos de auditoría pendientes de escribir")
+        depth.add_metric([], writer.queue_depth)
+        yield depth
+        events = CounterMetricFamily(
+            "ggrt_audit_events", "Eventos de auditoría por resultado del pipeline", labels=["outcome"]
+        )
+        for outcome, value in (
+            ("enqueued", writer.enqueued),
+            ("written", writer.written),
+            ("failed", writer.failed),
+            ("rejected", writer.rejected),
+        ):
+            events.add_metric([outcome], value)
+        yield events
+        waits = CounterMetricFamily(
+            "ggrt_audit_producer_waits", "Encolados que encontraron la cola llena"
+        )
+        waits.add_metric([], writer.producer_waits)
+        yield waits
+        flush = HistogramMetricFamily("ggrt_audit_flush_duration_seconds", "Latencia de escritura de cada lote")
+        flush.add_metric([], prometheus_histogram_buckets(writer.flush_latency), writer.flush_latency.sum)
+        yield flush
+
+
+try:
+    REGISTRY.register(AuditWriterCollector(get_audit_writer))
+except ValueError:
+    # Ya registrado (recarga del módulo)
+    pass
+
@@ -3,17 +3,181 @@ Servicio de caché con Redis para mejorar rendimiento.
 
 Este módulo provee una capa de abstracción sobre Redis para
 cachear datos frecuentemente consultados (estadísticas, listados, etc.).
+
+Opcionalmente se antepone una caché L1 en proceso (LRU con TTL y límite
+de tamaño) para evitar el round-trip y la decodificación JSON en los hits
+calientes. La coherencia entre workers se mantiene con un canal Pub/Sub de
+invalidación: cada escritura/borrado publica las keys afectadas y el resto
+de workers las descarta de su L1.
+
+Invalidación sin recorrer el keyspace:
+- Tags: ``set(..., tags=[...])`` registra la key en el set ``tag:<tag>`` y
+  ``invalidate_tags`` borra los miembros y el set en un script Lua atómico.
+- Namespaces con contador de generación: las keys de una familia llevan la
+  generación actual (``namespaced_key``) e ``invalidate_namespace`` la
+  incrementa (O(1)); las keys viejas quedan inalcanzables y expiran por TTL.
 """
 
+import asyncio
+import fnmatch
 import json
+import time
+import uuid
+from collections import OrderedDict
 from datetime import timedelta
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
 
 from src.core.logging import get_logger
+from src.observability.metrics import cache_lookup
 
 # Logger estructurado
 cache_logger = get_logger(__name__)
 
+# Marca del sobre que guarda la frescura (stale-while-revalidate) en Redis
+_SWR_MARKER = "__swr__"
+
+# SET + registro de la key en sus tags. Los sets de tags viven al menos
+# tanto como la key más longeva que contienen.
+# KEYS[1] = key, KEYS[2..] = sets de tags; ARGV[1] = valor, ARGV[2] = ttl (0 = sin expiración)
+_SET_WITH_TAGS_LUA = """
+local ttl = tonumber(ARGV[2])
+if ttl > 0 then
+  redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+else
+  redis.call('SET', KEYS[1], ARGV[1])
+end
+for i = 2, #KEYS do
+  local current = redis.call('TTL', KEYS[i])
+  redis.call('SADD', KEYS[i], KEYS[1])
+  if ttl <= 0 then
+    redis.call('PERSIST', KEYS[i])
+  elseif current == -2 or (current >= 0 and current < ttl) then
+    redis.call('EXPIRE', KEYS[i], ttl)
+  end
+end
+return 1
+"""
+
+# Borra las keys de los tags y los propios sets; devuelve las keys borradas.
+# KEYS = sets de tags
+_INVALIDATE_TAGS_LUA = """
+local deleted = {}
+for i = 1, #KEYS do
+  local members = redis.call('SMEMBERS', KEYS[i])
+  for _, key in ipairs(members) do
+    if redis.call('DEL', key) == 1 then
+      table.insert(deleted, key)
+    end
+  end
+  redis.call('DEL', KEYS[i])
+end
+return deleted
+"""
+
+# Tamaño de lote de SCAN/UNLINK en delete_pattern
+_SCAN_BATCH = 500
+
+# Reintentos de la suscripción al canal de invalidación (segundos)
+_INVALIDATION_RETRY_INITIAL = 0.5
+_INVALIDATION_RETRY_MAX = 30.0
+
+
+class LocalCache:
+    """
+    Caché L1 en proceso: LRU con TTL y expulsión por número de entradas
+    y por tamaño aproximado (bytes del JSON serializado).
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024,
+                 ttl: float = 10.0):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.ttl = ttl
+        # key -> (valor, expira_en, fresco_hasta, tamaño)
+        self._entries: "OrderedDict[str, Tuple[Any, float, Optional[float], int]]" = OrderedDict()
+        self.size_bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """Devuelve ``(valor, fresco_hasta)`` o None si no está o expiró."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            self.discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0], entry[2]
+
+    def set(self, key: str, value: Any, size: int, ttl: Optional[float] = None,
+            fresh_until: Optional[float] = None) -> None:
+        self.discard(key)
+        if size > self.max_bytes:
+            return
+        lifetime = self.ttl if ttl is None else min(self.ttl, ttl)
+        if lifetime <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + lifetime, fresh_until, size)
+        self.size_bytes += size
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            _, (_, _, _, old_size) = self._entries.popitem(last=False)
+            self.size_bytes -= old_size
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[3]
+
+    def discard_pattern(self, pattern: str) -> int:
+        keys = [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]
+        for k in keys:
+            self.discard(k)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+
+class SingleFlight:
+    """
+    Coalescencia de peticiones: mientras una corrutina recalcula una key,
+    el resto de llamadas para esa misma key esperan su resultado.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # Evitar "exception was never retrieved" si nadie esperaba
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
 
 class CacheService:
     """
@@ -26,18 +190,44 @@ class CacheService:
     - Prefijos para organizar keys
     """
 
-    def __init__(self, redis_url: str, prefix: str = "gad:"):
+    def __init__(
+        self,
+        redis_url: str,
+        prefix: str = "gad:",
+        l1_max_entries: int = 0,
+        l1_ttl: float = 10.0,
+        l1_max_bytes: int = 16 * 1024 * 1024,
+    ):
         """
         Inicializa el servicio de caché.
         
         Args:
             redis_url: URL de conexión a Redis (ej: redis://localhost:6379/0)
             prefix: Prefijo para todas las keys (ej: "gad:", "test:")
+            l1_max_entries: Entradas máximas de la caché L1 en proceso (0 = deshabilitada)
+            l1_ttl: TTL máximo (segundos) de una entrada en L1
+            l1_max_bytes: Tamaño máximo aproximado de L1 en bytes
         """
         self.redis_url = redis_url
         self.prefix = prefix
         self._redis: Optional[Any] = None
         self._connected = False
+        # Caché L1 opcional + coherencia entre workers
+        self._l1: Optional[LocalCache] = (
+            LocalCache(max_entries=l1_max_entries, max_bytes=l1_max_bytes, ttl=l1_ttl)
+            if l1_max_entries > 0 else None
+        )
+        self.invalidation_channel = f"{prefix}cache:invalidate"
+        self._origin = uuid.uuid4().hex[:12]
+        self._invalidation_task: Optional[asyncio.Task[None]] = None
+        # La L1 solo se usa mientras se reciben invalidaciones de otros workers
+        self._l1_coherent = False
+        self._single_flight = SingleFlight()
+        self._refresh_tasks: Dict[str, asyncio.Task[None]] = {}
+        # Contadores por nivel
+        self._hits = {"l1": 0, "l2": 0}
+        self._misses = {"l1": 0, "l2": 0}
+        self.stale_served = 0
 
     async def connect(self) -> None:
         """Conecta al servidor Redis."""
@@ -78,6 +268,7 @@ class CacheService:
             # Verificar conexión
             await self._redis.ping()
             self._connected = True
+            self._start_invalidation_listener()
             cache_logger.info(
                 "CacheService conectado exitosamente",
                 redis_url=self.redis_url,
@@ -117,6 +308,7 @@ class CacheService:
                     await self._redis.ping()
                     self.redis_url = fallback_url
                     self._connected = True
+                    self._start_invalidation_listener()
                     cache_logger.info("CacheService conectado (fallback no-TLS)")
                     return
             except Exception as e2:
@@ -131,6 +323,14 @@ class CacheService:
 
     async def disconnect(self) -> None:
         """Desconecta del servidor Redis."""
+        for task in [self._invalidation_task, *self._refresh_tasks.values()]:
+            if task is not None:
+                task.cancel()
+        self._invalidation_task = None
+        self._l1_coherent = False
+        self._refresh_tasks.clear()
+        if self._l1 is not None:
+            self._l1.clear()
         if self._redis is not None and self._connected:
             try:
                 await self._redis.aclose()
@@ -141,10 +341,21 @@ class CacheService:
                 self._redis = None
                 self._connected = False
 
+    @property
+    def _local(self) -> Optional[LocalCache]:
+        """L1 utilizable: ``None`` si está deshabilitada o sin canal de invalidación."""
+        return self._l1 if self._l1_coherent else None
+
     def _make_key(self, key: str) -> str:
         """Construye la key completa con prefijo."""
         return f"{self.prefix}{key}"
 
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def _generation_key(self, namespace: str) -> str:
+        return f"gen:{namespace}"
+
     async def get(self, key: str) -> Optional[Any]:
         """
         Obtiene un valor del caché.
@@ -155,22 +366,44 @@ class CacheService:
         Returns:
             Valor deserializado o None si no existe/error
         """
+        found = await self._lookup(key)
+        return None if found is None else found[0]
+
+    async def _lookup(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """Busca en L1 y luego en Redis; devuelve ``(valor, fresco_hasta)``."""
+        l1 = self._local
+        if l1 is not None:
+            local = l1.get(key)
+            self._count("l1", local is not None)
+            if local is not None:
+                return local
+
         if not self._connected or self._redis is None:
             cache_logger.warning("get() llamado sin conexión Redis")
             return None
 
         full_key = self._make_key(key)
 
+        ttl: Optional[float] = None
         try:
-            value = await self._redis.get(full_key)
+            if l1 is not None:
+                # GET + TTL en un solo round-trip para acotar la vida en L1
+                pipe = self._redis.pipeline(transaction=False)
+                pipe.get(full_key)
+                pipe.ttl(full_key)
+                value, raw_ttl = await pipe.execute()
+                ttl = None if raw_ttl is None or raw_ttl < 0 else float(raw_ttl)
+            else:
+                value = await self._redis.get(full_key)
             if value is None:
+                self._count("l2", False)
                 cache_logger.debug("Cache MISS", key=full_key)
                 return None
 
             # Deserializar JSON
             deserialized = json.loads(value)
+            self._count("l2", True)
             cache_logger.debug("Cache HIT", key=full_key)
-            return deserialized
 
         except json.JSONDecodeError as e:
             cache_logger.error(f"Error deserializando cache key {full_key}: {e}")
@@ -181,11 +414,27 @@ class CacheService:
             cache_logger.error(f"Error obteniendo cache key {full_key}: {e}")
             return None
 
+        fresh_until: Optional[float] = None
+        if isinstance(deserialized, dict) and _SWR_MARKER in deserialized:
+            fresh_until = deserialized[_SWR_MARKER]
+            deserialized = deserialized.get("v")
+        if l1 is not None:
+            l1.set(key, deserialized, len(value), ttl=ttl, fresh_until=fresh_until)
+        return deserialized, fresh_until
+
+    def _count(self, tier: str, hit: bool) -> None:
+        if hit:
+            self._hits[tier] += 1
+        else:
+            self._misses[tier] += 1
+        cache_lookup(tier, hit, self._calculate_hit_rate(self._hits[tier], self._misses[tier]) / 100)
+
     async def set(
         self,
         key: str,
         value: Any,
         ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
     ) -> bool:
         """
         Guarda un valor en el caché.
@@ -194,10 +443,16 @@ class CacheService:
             key: Clave sin prefijo (ej: "stats:user:123")
             value: Valor a cachear (será serializado a JSON)
             ttl: Tiempo de vida en segundos (None = sin expiración)
+            tags: Tags a los que se asocia la key (ver ``invalidate_tags``)
             
         Returns:
             True si se guardó exitosamente, False en caso de error
         """
+        return await self._store(key, value, ttl, tags=tags)
+
+    async def _store(self, key: str, value: Any, ttl: Optional[int],
+                     fresh_until: Optional[float] = None,
+                     tags: Optional[Iterable[str]] = None) -> bool:
         if not self._connected or self._redis is None:
             cache_logger.warning("set() llamado sin conexión Redis")
             return False
@@ -206,15 +461,30 @@ class CacheService:
 
         try:
             # Serializar a JSON
-            serialized = json.dumps(value, default=str)  # default=str para datetime
+            payload = value if fresh_until is None else {_SWR_MARKER: fresh_until, "v": value}
+            serialized = json.dumps(payload, default=str)  # default=str para datetime
             
             # Guardar en Redis con TTL opcional
-            if ttl is not None:
+            tag_keys = [self._tag_key(t) for t in tags or ()]
+            if tag_keys:
+                await self._redis.eval(
+                    _SET_WITH_TAGS_LUA, 1 + len(tag_keys), full_key, *tag_keys, serialized, ttl or 0
+                )
+            elif ttl is not None:
                 await self._redis.setex(full_key, ttl, serialized)
             else:
                 await self._redis.set(full_key, serialized)
 
-            cache_logger.debug("Cache SET", key=full_key, ttl=ttl)
+            cache_logger.debug("Cache SET", key=full_key, ttl=ttl, tags=len(tag_keys))
+            if self._l1 is not None:
+                l1 = self._local
+                if l1 is not None:
+                    # Re-decodificar para que L1 guarde lo mismo que devolvería Redis
+                    decoded = json.loads(serialized)
+                    if fresh_until is not None:
+                        decoded = decoded["v"]
+                    l1.set(key, decoded, len(serialized), ttl=ttl, fresh_until=fresh_until)
+                await self._publish_invalidation(keys=[key])
             return True
 
         except (TypeError, ValueError) as e:
@@ -224,6 +494,139 @@ class CacheService:
             cache_logger.error(f"Error guardando cache key {full_key}: {e}")
             return False
 
+    async def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        stale_ttl: int = 0,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Any:
+        """
+        Devuelve el valor cacheado o lo calcula con ``loader``.
+        
+        - Single-flight: ante varios misses concurrentes de la misma key solo
+          una corrutina ejecuta ``loader``; el resto espera su resultado.
+        - Stale-while-revalidate: con ``stale_ttl > 0`` el valor se conserva
+          ``stale_ttl`` segundos tras expirar ``ttl``; durante esa ventana se
+          sirve el valor viejo mientras se refresca en segundo plano.
+        
+        Args:
+            key: Clave sin prefijo
+            loader: Corrutina que calcula el valor en caso de miss
+            ttl: Segundos durante los que el valor se considera fresco
+            stale_ttl: Segundos extra durante los que se sirve el valor viejo
+            tags: Tags a los que se asocia la key al guardarla
+        """
+        found = await self._lookup(key)
+        if found is not None:
+            value, fresh_until = found
+            if fresh_until is None or time.time() < fresh_until:
+                return value
+            # Valor viejo: servirlo y refrescar en segundo plano (una sola vez)
+            self.stale_served += 1
+            if key not in self._refresh_tasks and not self._single_flight.in_flight(key):
+                task = asyncio.create_task(self._refresh(key, loader, ttl, stale_ttl, tags))
+                self._refresh_tasks[key] = task
+                task.add_done_callback(lambda _t, k=key: self._refresh_tasks.pop(k, None))
+            return value
+
+        return await self._single_flight.do(key, lambda: self._load(key, loader, ttl, stale_ttl, tags))
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                    ttl: Optional[int], stale_ttl: int,
+                    tags: Optional[Iterable[str]] = None) -> Any:
+        value = await loader()
+        if value is not None:
+            if stale_ttl > 0 and ttl is not None:
+                await self._store(key, value, ttl + stale_ttl, fresh_until=time.time() + ttl, tags=tags)
+            else:
+                await self._store(key, value, ttl, tags=tags)
+        return value
+
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]],
+                       ttl: Optional[int], stale_ttl: int,
+                       tags: Optional[Iterable[str]] = None) -> None:
+        try:
+            await self._single_flight.do(key, lambda: self._load(key, loader, ttl, stale_ttl, tags))
+        except Exception as e:
+            cache_logger.warning(f"Error refrescando cache key {key} en segundo plano: {e}")
+
+    # --- Coherencia L1 entre workers ---
+    def _start_invalidation_listener(self) -> None:
+        if self._l1 is None or self._invalidation_task is not None:
+            return
+        self._invalidation_task = asyncio.create_task(self._invalidation_loop())
+
+    async def _publish_invalidation(self, keys: Optional[list[str]] = None,
+                                    pattern: Optional[str] = None) -> None:
+        if self._redis is None or not self._connected:
+            return
+        message: dict[str, Any] = {"o": self._origin}
+        if keys:
+            message["k"] = keys
+        if pattern:
+            message["p"] = pattern
+        try:
+            await self._redis.publish(self.invalidation_channel, json.dumps(message))
+        except Exception as e:
+            cache_logger.error(f"Error publicando invalidación de caché: {e}")
+
+    def _apply_invalidation(self, raw: Any) -> None:
+        if self._l1 is None:
+            return
+        try:
+            if isinstance(raw, (bytes, bytearray)):
+                raw = raw.decode("utf-8")
+            message = json.loads(raw)
+        except (ValueError, UnicodeDecodeError):
+            return
+        if not isinstance(message, dict) or message.get("o") == self._origin:
+            return
+        for key in message.get("k", ()):
+            self._l1.discard(key)
+        if message.get("p"):
+            self._l1.discard_pattern(message["p"])
+
+    async def _invalidation_loop(self) -> None:
+        """
+        Escucha el canal de invalidación y descarta keys de la L1 local.
+
+        Si la suscripción se pierde, la L1 se vacía y deja de usarse hasta
+        volver a suscribirse (reintentos con backoff exponencial).
+        """
+        delay = _INVALIDATION_RETRY_INITIAL
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._redis.pubsub()  # type: ignore[union-attr]
+                await pubsub.subscribe(self.invalidation_channel)
+                self._l1_coherent = True
+                delay = _INVALIDATION_RETRY_INITIAL
+                async for msg in pubsub.listen():
+                    if msg and msg.get("type") == "message":
+                        self._apply_invalidation(msg.get("data"))
+                cache_logger.warning("Canal de invalidación de caché cerrado; resuscribiendo")
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                cache_logger.error(f"Fallo en canal de invalidación de caché: {e}", retry_in=delay)
+            finally:
+                # Sin canal de invalidación la L1 podría quedar incoherente
+                self._l1_coherent = False
+                if self._l1 is not None:
+                    self._l1.clear()
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                return
+            delay = min(delay * 2, _INVALIDATION_RETRY_MAX)
+
     async def delete(self, key: str) -> bool:
         """
         Elimina una key del caché.
@@ -239,6 +642,9 @@ class CacheService:
             return False
 
         full_key = self._make_key(key)
+        if self._l1 is not None:
+            self._l1.discard(key)
+            await self._publish_invalidation(keys=[key])
 
         try:
             deleted = await self._redis.delete(full_key)
@@ -250,10 +656,103 @@ class CacheService:
             cache_logger.error(f"Error eliminando cache key {full_key}: {e}")
             return False
 
+    async def invalidate_tags(self, *tags: str) -> int:
+        """
+        Elimina atómicamente todas las keys asociadas a los tags.
+        
+        Args:
+            tags: Tags sin prefijo (ej: "stats:user:123", "tasks")
+            
+        Returns:
+            Número de keys eliminadas
+        """
+        if not tags:
+            return 0
+        if not self._connected or self._redis is None:
+            cache_logger.warning("invalidate_tags() llamado sin conexión Redis")
+            return 0
+
+        try:
+            deleted = await self._redis.eval(
+                _INVALIDATE_TAGS_LUA, len(tags), *(self._tag_key(t) for t in tags)
+            )
+        except Exception as e:
+            cache_logger.error(f"Error invalidando tags {tags}: {e}")
+            return 0
+
+        keys = [k[len(self.prefix):] if k.startswith(self.prefix) else k for k in deleted or ()]
+        if self._l1 is not None and keys:
+            for key in keys:
+                self._l1.discard(key)
+            await self._publish_invalidation(keys=keys)
+        cache_logger.debug("Cache INVALIDATE TAGS", tags=list(tags), deleted=len(keys))
+        return len(keys)
+
+    async def namespaced_key(self, namespace: str, key: str) -> str:
+        """
+        Construye una key dentro de la generación actual de un namespace.
+        
+        Args:
+            namespace: Familia de keys (ej: "tasks:list")
+            key: Resto de la clave
+            
+        Returns:
+            Clave ``"{namespace}:v{generación}:{key}"`` (sin prefijo)
+        """
+        generation = await self._generation(namespace)
+        return f"{namespace}:v{generation}:{key}"
+
+    async def _generation(self, namespace: str) -> int:
+        gen_key = self._generation_key(namespace)
+        l1 = self._local
+        if l1 is not None:
+            local = l1.get(gen_key)
+            if local is not None:
+                return int(local[0])
+        if not self._connected or self._redis is None:
+            return 0
+        try:
+            raw = await self._redis.get(self._make_key(gen_key))
+        except Exception as e:
+            cache_logger.error(f"Error leyendo generación de {namespace}: {e}")
+            return 0
+        generation = int(raw or 0)
+        if l1 is not None:
+            l1.set(gen_key, generation, size=8)
+        return generation
+
+    async def invalidate_namespace(self, namespace: str) -> int:
+        """
+        Invalida en O(1) todas las keys de un namespace incrementando su
+        contador de generación. Las keys anteriores expiran por su TTL.
+        
+        Returns:
+            Nueva generación (0 si no se pudo incrementar)
+        """
+        if not self._connected or self._redis is None:
+            cache_logger.warning("invalidate_namespace() llamado sin conexión Redis")
+            return 0
+
+        gen_key = self._generation_key(namespace)
+        try:
+            generation = int(await self._redis.incr(self._make_key(gen_key)))
+        except Exception as e:
+            cache_logger.error(f"Error invalidando namespace {namespace}: {e}")
+            return 0
+        if self._l1 is not None:
+            if self._l1_coherent:
+                self._l1.set(gen_key, generation, size=8)
+            await self._publish_invalidation(keys=[gen_key])
+        cache_logger.debug("Cache INVALIDATE NAMESPACE", namespace=namespace, generation=generation)
+        return generation
+
     async def delete_pattern(self, pattern: str) -> int:
         """
         Elimina todas las keys que coincidan con un patrón.
         
+        Recorre el keyspace con SCAN; para invalidaciones frecuentes usar
+        ``invalidate_tags`` o ``invalidate_namespace``.
+        
         Args:
             pattern: Patrón con wildcards (ej: "stats:user:*")
             
@@ -265,18 +764,25 @@ class CacheService:
             return 0
 
         full_pattern = self._make_key(pattern)
+        if self._l1 is not None:
+            self._l1.discard_pattern(pattern)
+            await self._publish_invalidation(pattern=pattern)
 
         try:
-            # Buscar keys que coincidan
-            keys = []
-            async for key in self._redis.scan_iter(match=full_pattern):
-                keys.append(key)
-
-            if not keys:
+            # Borrar por lotes (UNLINK libera memoria fuera del hilo principal)
+            deleted = 0
+            batch: list[Any] = []
+            async for key in self._redis.scan_iter(match=full_pattern, count=_SCAN_BATCH):
+                batch.append(key)
+                if len(batch) >= _SCAN_BATCH:
+                    deleted += await self._redis.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await self._redis.unlink(*batch)
+
+            if not deleted:
                 return 0
 
-            # Eliminar en batch
-            deleted: int = await self._redis.delete(*keys)
             cache_logger.info(
                 "Cache DELETE PATTERN",
                 pattern=full_pattern,
@@ -346,6 +852,7 @@ class CacheService:
                 ),
                 "evicted_keys": info.get("evicted_keys", 0),
                 "prefix": self.prefix,
+                "tiers": self.get_tier_stats(),
             }
 
         except Exception as e:
@@ -355,6 +862,25 @@ class CacheService:
                 "error": str(e),
             }
 
+    def get_tier_stats(self) -> dict[str, Any]:
+        """Hits/misses por nivel (L1 en proceso y L2 Redis) de este worker."""
+        tiers: dict[str, Any] = {}
+        for tier in ("l1", "l2"):
+            tiers[tier] = {
+                "hits": self._hits[tier],
+                "misses": self._misses[tier],
+                "hit_rate": self._calculate_hit_rate(self._hits[tier], self._misses[tier]),
+            }
+        tiers["l1"].update(
+            enabled=self._l1 is not None,
+            entries=len(self._l1) if self._l1 is not None else 0,
+            size_bytes=self._l1.size_bytes if self._l1 is not None else 0,
+            evictions=self._l1.evictions if self._l1 is not None else 0,
+        )
+        tiers["coalesced_loads"] = self._single_flight.coalesced
+        tiers["stale_served"] = self.stale_served
+        return tiers
+
     @staticmethod
     def _calculate_hit_rate(hits: int, misses: int) -> float:
         """Calcula el hit rate del caché."""
@@ -382,7 +908,7 @@ async def get_cache_service() -> CacheService:
     return _cache_service
 
 
-def init_cache_service(redis_url: str, prefix: str = "gad:") -> CacheService:
+def init_cache_service(redis_url: str, prefix: str = "gad:", **l1_options: Any) -> CacheService:
     """
     Inicializa la instancia global de CacheService.
     
@@ -391,12 +917,13 @@ def init_cache_service(redis_url: str, prefix: str = "gad:") -> CacheService:
     Args:
         redis_url: URL de conexión a Redis
         prefix: Prefijo para keys
+        **l1_options: Opciones de la caché L1 (l1_max_entries, l1_ttl, l1_max_bytes)
         
     Returns:
         Instancia de CacheService
     """
     global _cache_service
-    _cache_service = CacheService(redis_url=redis_url, prefix=prefix)
+    _cache_service = CacheService(redis_url=redis_url, prefix=prefix, **l1_options)
     cache_logger.info("CacheService global inicializado", prefix=prefix)
     return _cache_service
 
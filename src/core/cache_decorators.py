@@ -6,13 +6,17 @@ Provides decorators for automatic caching of endpoint results with:
 - Automatic invalidation on mutations
 - Key generation from function args
 - Async support
+- Single-flight: concurrent misses for the same key run the function once
+- Optional stale-while-revalidate
+- Tag and generation-namespace invalidation (no keyspace SCAN)
 """
 
 import functools
 import hashlib
 import json
-from typing import Any, Awaitable, Callable, Optional, TypeVar
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
 
+from src.core.cache import CacheService, SingleFlight
 from src.core.logging import get_logger
 
 cache_logger = get_logger(__name__)
@@ -24,6 +28,10 @@ F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
 # En producción, si este override es None, usaremos src.core.cache._cache_service.
 _cache_service: Optional[Any] = None
 
+# Coalescencia de misses concurrentes cuando el servicio no es un CacheService
+# (p.ej. dobles de test); CacheService.get_or_set trae la suya propia.
+_single_flight = SingleFlight()
+
 
 def _get_effective_cache_service() -> Optional[Any]:
     """Devuelve el CacheService efectivo.
@@ -83,13 +91,66 @@ def _generate_cache_key(func_name: str, args: tuple[Any, ...], kwargs: dict[str,
     return f"{func_name}:{key_hash}"
 
 
+def _resolve_names(templates: Optional[Iterable[str]], kwargs: dict[str, Any]) -> list[str]:
+    """
+    Resolve tag/namespace templates against the call kwargs.
+    
+    Templates use ``str.format`` syntax, e.g. ``"stats:user:{user_id}"``.
+    Templates whose placeholders are missing from kwargs are skipped.
+    """
+    names = []
+    for template in templates or ():
+        try:
+            names.append(template.format(**kwargs))
+        except (KeyError, IndexError):
+            cache_logger.warning(f"Cache tag template {template!r} could not be resolved; skipped")
+    return names
+
+
+async def _invalidate(
+    svc: Any,
+    patterns: Optional[Iterable[str]],
+    tags: Optional[Iterable[str]],
+    namespaces: Optional[Iterable[str]],
+    kwargs: dict[str, Any],
+) -> None:
+    """Run every requested invalidation, logging (not raising) failures."""
+    resolved_tags = _resolve_names(tags, kwargs)
+    if resolved_tags:
+        try:
+            deleted_count = await svc.invalidate_tags(*resolved_tags)
+            if deleted_count > 0:
+                cache_logger.debug(f"Invalidated {deleted_count} entries tagged {resolved_tags}")
+        except Exception as e:
+            cache_logger.warning(f"Cache invalidation error for tags {resolved_tags}: {e}")
+    for namespace in _resolve_names(namespaces, kwargs):
+        try:
+            await svc.invalidate_namespace(namespace)
+            cache_logger.debug(f"Invalidated cache namespace: {namespace}")
+        except Exception as e:
+            cache_logger.warning(f"Cache invalidation error for namespace {namespace}: {e}")
+    for pattern in patterns or ():
+        try:
+            deleted_count = await svc.delete_pattern(pattern)
+            if deleted_count > 0:
+                cache_logger.debug(f"Invalidated {deleted_count} entries: {pattern}")
+        except Exception as e:
+            cache_logger.warning(f"Cache invalidation error for {pattern}: {e}")
+
+
 def cache_result(
     ttl_seconds: int = 300,
-    key_prefix: str = "endpoint"
+    key_prefix: str = "endpoint",
+    stale_ttl_seconds: int = 0,
+    tags: Optional[list[str]] = None,
+    namespace: Optional[str] = None,
 ) -> Callable[[F], F]:
     """
     Decorator to cache endpoint results in Redis.
     
+    Concurrent misses for the same key are coalesced so the function runs
+    only once (single-flight).
+    
     Usage:
         @cache_result(ttl_seconds=300)
         async def get_usuarios(db: AsyncSession = Depends(get_db_session)):
@@ -98,6 +159,12 @@ def cache_result(
     Args:
         ttl_seconds: Time to live in seconds (default: 300 = 5 minutes)
         key_prefix: Prefix for cache key (helps organize by endpoint type)
+        stale_ttl_seconds: Extra seconds a stale result is served while it is
+            refreshed in the background (0 = disabled)
+        tags: Tags recorded with the cached entry; templates are formatted
+            with the call kwargs (e.g. ``"stats:user:{user_id}"``)
+        namespace: Generation namespace the key lives in, invalidated in
+            O(1) with ``invalidate_namespace``
     
     Returns:
         Decorator function
@@ -113,6 +180,21 @@ def cache_result(
             
             # Generate cache key
             cache_key = _generate_cache_key(f"{key_prefix}:{func.__name__}", args, kwargs)
+            entry_tags = _resolve_names(tags, kwargs)
+            if namespace is not None:
+                try:
+                    cache_key = await _svc.namespaced_key(namespace, cache_key)
+                except Exception as e:
+                    cache_logger.warning(f"Cache namespace error for {namespace}: {e}")
+            
+            if isinstance(_svc, CacheService):
+                return await _svc.get_or_set(
+                    cache_key,
+                    lambda: func(*args, **kwargs),
+                    ttl=ttl_seconds,
+                    stale_ttl=stale_ttl_seconds,
+                    tags=entry_tags,
+                )
             
             try:
                 # Try to get from cache
@@ -125,38 +207,52 @@ def cache_result(
             except Exception as e:
                 cache_logger.warning(f"Cache get error for {cache_key}: {e}")
             
-            # Call the actual function
-            result = await func(*args, **kwargs)
-            
-            # Store in cache
-            try:
-                await _svc.set(
-                    key=cache_key,
-                    value=result,
-                    ttl=ttl_seconds  # TTL in seconds
-                )
-                cache_logger.debug(f"Cached result for {cache_key} (TTL: {ttl_seconds}s)")
-            except Exception as e:
-                cache_logger.warning(f"Cache set error for {cache_key}: {e}")
+            async def load() -> Any:
+                # Call the actual function
+                result = await func(*args, **kwargs)
+                
+                # Store in cache
+                try:
+                    if entry_tags:
+                        await _svc.set(key=cache_key, value=result, ttl=ttl_seconds, tags=entry_tags)
+                    else:
+                        await _svc.set(
+                            key=cache_key,
+                            value=result,
+                            ttl=ttl_seconds  # TTL in seconds
+                        )
+                    cache_logger.debug(f"Cached result for {cache_key} (TTL: {ttl_seconds}s)")
+                except Exception as e:
+                    cache_logger.warning(f"Cache set error for {cache_key}: {e}")
+                return result
             
-            return result
+            return await _single_flight.do(cache_key, load)
         
         return wrapper
     
     return decorator
 
 
-def invalidate_cache(pattern: str) -> Callable[[F], F]:
+def invalidate_cache(
+    pattern: Optional[str] = None,
+    tags: Optional[list[str]] = None,
+    namespaces: Optional[list[str]] = None,
+) -> Callable[[F], F]:
     """
-    Decorator to invalidate cache entries matching a pattern after function execution.
+    Decorator to invalidate cache entries after function execution.
+    
+    Prefer ``tags``/``namespaces``: they never walk the keyspace. ``pattern``
+    is kept for compatibility and uses SCAN.
     
     Usage:
-        @invalidate_cache("endpoint:create_usuario:*")
-        async def create_usuario(usuario_in: UsuarioCreate):
-            # ... create user
+        @invalidate_cache(tags=["user:{user_id}"], namespaces=["usuarios:list"])
+        async def update_usuario(user_id: int, usuario_in: UsuarioUpdate):
+            # ... update user
     
     Args:
         pattern: Cache key pattern to invalidate (supports * wildcard)
+        tags: Tags to invalidate; templates are formatted with the call kwargs
+        namespaces: Generation namespaces to bump
     
     Returns:
         Decorator function
@@ -170,12 +266,7 @@ def invalidate_cache(pattern: str) -> Callable[[F], F]:
             
             # Invalidate cache after successful execution
             if _svc is not None:
-                try:
-                    deleted_count = await _svc.delete_pattern(pattern)
-                    if deleted_count > 0:
-                        cache_logger.debug(f"Invalidated {deleted_count} cache entries matching pattern: {pattern}")
-                except Exception as e:
-                    cache_logger.warning(f"Cache invalidation error for pattern {pattern}: {e}")
+                await _invalidate(_svc, [pattern] if pattern else None, tags, namespaces, kwargs)
             
             return result
         
@@ -187,17 +278,20 @@ def invalidate_cache(pattern: str) -> Callable[[F], F]:
 def cache_and_invalidate(
     ttl_seconds: int = 300,
     key_prefix: str = "endpoint",
-    invalidate_patterns: Optional[list[str]] = None
+    invalidate_patterns: Optional[list[str]] = None,
+    invalidate_tags: Optional[list[str]] = None,
+    invalidate_namespaces: Optional[list[str]] = None,
 ) -> Callable[[F], F]:
     """
     Decorator that combines caching and automatic invalidation.
     
-    Caches the result AND invalidates related cache patterns.
+    Caches the result AND invalidates related cache tags, namespaces and
+    (legacy, SCAN-based) patterns.
     
     Usage:
         @cache_and_invalidate(
             ttl_seconds=600,
-            invalidate_patterns=["endpoint:list_usuarios:*"]
+            invalidate_namespaces=["usuarios:list"],
         )
         async def create_usuario(usuario_in: UsuarioCreate):
             # ... create user
@@ -206,6 +300,8 @@ def cache_and_invalidate(
         ttl_seconds: Time to live for cache
         key_prefix: Prefix for cache key
         invalidate_patterns: List of patterns to invalidate after execution
+        invalidate_tags: Tags to invalidate (templates formatted with kwargs)
+        invalidate_namespaces: Generation namespaces to bump
     
     Returns:
         Decorator function
@@ -216,17 +312,11 @@ def cache_and_invalidate(
             # Call the actual function
             result = await func(*args, **kwargs)
             
-            # Invalidate related cache patterns
-            if invalidate_patterns:
+            # Invalidate related cache entries
+            if invalidate_patterns or invalidate_tags or invalidate_namespaces:
                 _svc = _get_effective_cache_service()
                 if _svc is not None:
-                    for pattern in invalidate_patterns:
-                        try:
-                            deleted_count = await _svc.delete_pattern(pattern)
-                            if deleted_count > 0:
-                                cache_logger.debug(f"Invalidated {deleted_count} entries: {pattern}")
-                        except Exception as e:
-                            cache_logger.warning(f"Cache invalidation error for {pattern}: {e}")
+                    await _invalidate(_svc, invalidate_patterns, invalidate_tags, invalidate_namespaces, kwargs)
             
             return result
         
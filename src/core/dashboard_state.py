@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""
+Estado en memoria del dashboard operativo.
+
+Mantiene los contadores que muestra el dashboard sin consultar la base de
+datos por cada suscriptor:
+
+- tareas no borradas por (estado, prioridad);
+- efectivos no borrados por estado de disponibilidad;
+- alertas: tareas abiertas (programadas, en curso o pausadas) con
+  prioridad URGENT o CRITICAL.
+
+Los contadores se actualizan con los eventos de modelo que procesa
+``WebSocketModelIntegrator`` y se reconstruyen periódicamente con dos
+``GROUP BY`` (``reconcile``), que corrigen eventos perdidos, escrituras
+fuera del ORM y cambios hechos en otros workers.
+
+Los suscriptores (topic ``dashboard_update``) no reciben el snapshot
+completo en cada cambio: ``run_dashboard_publisher`` agrupa los cambios y
+envía como mucho un delta por intervalo, con solo las claves que cambiaron
+y su valor absoluto (aplicar dos veces el mismo delta es inocuo). Cada
+delta lleva un ``version`` creciente; un cliente que detecte un salto pide
+de nuevo el snapshot. Los deltas se envían solo a las conexiones locales:
+cada worker tiene su propio estado.
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models.efectivo import Efectivo, EstadoDisponibilidad
+from src.api.models.tarea import Tarea
+from src.core.logging import get_logger
+from src.shared.constants import TaskPriority, TaskStatus
+
+dashboard_logger = get_logger("core.dashboard_state")
+
+DASHBOARD_TOPIC = "dashboard_update"
+OPEN_TASK_STATES = frozenset({TaskStatus.PROGRAMMED, TaskStatus.IN_PROGRESS, TaskStatus.PAUSED})
+ALERT_PRIORITIES = frozenset({TaskPriority.URGENT, TaskPriority.CRITICAL})
+# Espera tras un evento que no se pudo aplicar antes de reconciliar (agrupa derivas)
+DRIFT_RECONCILE_DELAY_SECONDS = 5.0
+
+TaskKey = Tuple[TaskStatus, TaskPriority]
+FlatView = Dict[Tuple[str, ...], int]
+
+
+def _coerce(enum_cls: Type[Enum], value: Any) -> Any:
+    """Miembro del enum a partir del miembro, su valor o su nombre; None si no es válido."""
+    if value is None or isinstance(value, enum_cls):
+        return value
+    try:
+        return enum_cls(value)
+    except ValueError:
+        try:
+            return enum_cls[str(value)]
+        except KeyError:
+            return None
+
+
+def _is_unknown(key: Any) -> bool:
+    return key is None or (isinstance(key, tuple) and None in key)
+
+
+def _nest(flat: FlatView) -> Dict[str, Any]:
+    """``{("tasks_by_estado", "PAUSED"): 3}`` -> ``{"tasks_by_estado": {"PAUSED": 3}}``."""
+    nested: Dict[str, Any] = {}
+    for path, value in flat.items():
+        node = nested
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = value
+    return nested
+
+
+class DashboardState:
+    """Contadores del dashboard con deltas agrupados para los suscriptores."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.version = 0
+        self.last_updated: Optional[datetime] = None
+        self.events_applied = 0
+        self.drift_events = 0
+        self._tasks: Counter[TaskKey] = Counter()
+        self._efectivos: Counter[EstadoDisponibilidad] = Counter()
+        self._published: FlatView = {}
+        self._dirty = asyncio.Event()
+        self._drift = asyncio.Event()
+        self._load_lock = asyncio.Lock()
+
+    def bind_event_loop(self) -> None:
+        """
+        Recrea las primitivas asyncio para el loop actual (un arranque de la
+        aplicación en otro loop, p. ej. en tests), conservando su estado.
+        """
+        dirty, drift = self._dirty.is_set(), self._drift.is_set()
+        self._dirty, self._drift, self._load_lock = asyncio.Event(), asyncio.Event(), asyncio.Lock()
+        if dirty:
+            self._dirty.set()
+        if drift:
+            self._drift.set()
+
+    # --- Eventos de modelo ---
+    def apply_model_event(self, event_type: str, model_name: str, instance_data: Dict[str, Any]) -> bool:
+        """
+        Aplica un evento de ``WebSocketModelIntegrator`` a los contadores.
+
+        Args:
+            event_type: insert, update o delete
+            model_name: Tarea o Efectivo (el resto se ignora)
+            instance_data: Valores actuales y previos (``_old_<campo>``)
+
+        Returns:
+            True si cambió algún contador
+        """
+        if model_name == "Tarea":
+            changed = self._apply_task(event_type, instance_data)
+        elif model_name == "Efectivo":
+            changed = self._apply_efectivo(event_type, instance_data)
+        else:
+            return False
+        self.events_applied += 1
+        if changed:
+            self._touch()
+        return changed
+
+    def _apply_task(self, event_type: str, data: Dict[str, Any]) -> bool:
+        new = (_coerce(TaskStatus, data.get("estado")), _coerce(TaskPriority, data.get("prioridad")))
+        old = (
+            _coerce(TaskStatus, data["_old_estado"]) if "_old_estado" in data else new[0],
+            _coerce(TaskPriority, data["_old_prioridad"]) if "_old_prioridad" in data else new[1],
+        )
+        return self._move(self._tasks, event_type, old, new, data)
+
+    def _apply_efectivo(self, event_type: str, data: Dict[str, Any]) -> bool:
+        new = _coerce(EstadoDisponibilidad, data.get("estado_disponibilidad", data.get("estado")))
+        if "_old_estado_disponibilidad" in data:
+            old = _coerce(EstadoDisponibilidad, data["_old_estado_disponibilidad"])
+        elif "_old_estado" in data:
+            old = _coerce(EstadoDisponibilidad, data["_old_estado"])
+        else:
+            old = new
+        return self._move(self._efectivos, event_type, old, new, data)
+
+    def _move(self, counter: "Counter[Any]", event_type: str, old: Any, new: Any, data: Dict[str, Any]) -> bool:
+        """Resta la clave anterior y suma la nueva según el tipo de evento."""
+        if event_type == "insert":
+            if _is_unknown(new):
+                return self._mark_drift()
+            counter[new] += 1
+            return True
+        if event_type == "delete":
+            if _is_unknown(old):
+                return self._mark_drift()
+            return self._decrement(counter, old)
+        if event_type != "update":
+            return False
+        if data.get("_previous_unknown"):
+            return self._mark_drift()
+        if old == new:
+            return False
+        if _is_unknown(old) or _is_unknown(new):
+            return self._mark_drift()
+        self._decrement(counter, old)
+        counter[new] += 1
+        return True
+
+    def _decrement(self, counter: "Counter[Any]", key: Any) -> bool:
+        if counter[key] <= 0:
+            # El contador no conocía la fila: la reconciliación lo corrige
+            self._mark_drift()
+            return False
+        counter[key] -= 1
+        return True
+
+    def request_reconciliation(self) -> None:
+        """Adelanta la reconciliación (p. ej. tras descartar eventos de modelo)."""
+        self._mark_drift()
+
+    @property
+    def drift_pending(self) -> bool:
+        """Hay eventos que no se pudieron aplicar desde la última reconciliación."""
+        return self._drift.is_set()
+
+    async def wait_for_drift(self) -> None:
+        """Espera a que un evento no se pueda aplicar (o vuelve ya si lo hubo)."""
+        await self._drift.wait()
+
+    def _mark_drift(self) -> bool:
+        self.drift_events += 1
+        self._drift.set()
+        return False
+
+    def _touch(self) -> None:
+        self.last_updated = datetime.now(timezone.utc)
+        self._dirty.set()
+
+    # --- Reconciliación ---
+    def replace(self, tasks: Dict[TaskKey, int], efectivos: Dict[EstadoDisponibilidad, int]) -> int:
+        """
+        Sustituye los contadores por los leídos de la base de datos.
+
+        Returns:
+            Número de contadores que difieren de los mantenidos en memoria
+        """
+        new_tasks = Counter({key: n for key, n in tasks.items() if n and not _is_unknown(key)})
+        new_efectivos = Counter({key: n for key, n in efectivos.items() if n and key is not None})
+        corrections = sum(
+            1 for key in set(self._tasks) | set(new_tasks) if self._tasks[key] != new_tasks[key]
+        ) + sum(
+            1 for key in set(self._efectivos) | set(new_efectivos)
+            if self._efectivos[key] != new_efectivos[key]
+        )
+        self._tasks, self._efectivos = new_tasks, new_efectivos
+        self._drift.clear()
+        if corrections or not self.ready:
+            self._touch()
+        self.ready = True
+        return corrections
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        """
+        Recalcula los contadores con dos ``GROUP BY`` sobre ``tareas`` y
+        ``efectivos`` (filas no borradas).
+
+        Un evento confirmado entre la lectura y su aplicación puede contarse
+        dos veces; la siguiente reconciliación lo corrige.
+
+        Returns:
+            Número de contadores corregidos
+        """
+        tasks_stmt = (
+            select(Tarea.estado, Tarea.prioridad, func.count())
+            .where(Tarea.deleted_at.is_(None))
+            .group_by(Tarea.estado, Tarea.prioridad)
+        )
+        efectivos_stmt = (
+            select(Efectivo.estado_disponibilidad, func.count())
+            .where(Efectivo.deleted_at.is_(None))
+            .group_by(Efectivo.estado_disponibilidad)
+        )
+        tasks: Dict[TaskKey, int] = {}
+        for estado, prioridad, total in await db.execute(tasks_stmt):
+            key = (_coerce(TaskStatus, estado), _coerce(TaskPriority, prioridad))
+            tasks[key] = tasks.get(key, 0) + int(total)
+        efectivos: Dict[EstadoDisponibilidad, int] = {}
+        for disponibilidad, total in await db.execute(efectivos_stmt):
+            efectivo_key = _coerce(EstadoDisponibilidad, disponibilidad)
+            efectivos[efectivo_key] = efectivos.get(efectivo_key, 0) + int(total)
+
+        was_ready = self.ready
+        corrections = self.replace(tasks, efectivos)
+        if was_ready and corrections:
+            dashboard_logger.warning(f"Estado del dashboard corregido: {corrections} contadores")
+        return corrections
+
+    async def ensure_loaded(self, session_factory: Any) -> bool:
+        """Carga los contadores la primera vez que se necesitan (una sola consulta concurrente)."""
+        if self.ready:
+            return True
+        async with self._load_lock:
+            if not self.ready:
+                async with session_factory() as db:
+                    await self.reconcile(db)
+        return self.ready
+
+    # --- Vistas ---
+    def _flat(self) -> FlatView:
+        by_estado: Counter[TaskStatus] = Counter()
+        by_prioridad: Counter[TaskPriority] = Counter()
+        alerts = 0
+        for (estado, prioridad), n in self._tasks.items():
+            by_estado[estado] += n
+            by_prioridad[prioridad] += n
+            if estado in OPEN_TASK_STATES and prioridad in ALERT_PRIORITIES:
+                alerts += n
+        available = self._efectivos[EstadoDisponibilidad.DISPONIBLE]
+        busy = self._efectivos[EstadoDisponibilidad.EN_TAREA]
+
+        view: FlatView = {
+            ("total_tasks",): sum(by_estado.values()),
+            ("active_tasks",): by_estado[TaskStatus.IN_PROGRESS],
+            ("completed_tasks",): by_estado[TaskStatus.COMPLETED],
+            ("pending_tasks",): by_estado[TaskStatus.PROGRAMMED] + by_estado[TaskStatus.PAUSED],
+            ("active_efectivos",): available + busy,
+            ("available_efectivos",): available,
+            ("busy_efectivos",): busy,
+            ("alerts_count",): alerts,
+        }
+        view.update({("tasks_by_estado", s.name): by_estado[s] for s in TaskStatus})
+        view.update({("tasks_by_prioridad", p.name): by_prioridad[p] for p in TaskPriority})
+        view.update({("efectivos_by_estado", e.name): self._efectivos[e] for e in EstadoDisponibilidad})
+        return view
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado completo; ``version`` es la del último delta publicado."""
+        data = _nest(self._flat())
+        data.update({
+            "version": self.version,
+            "ready": self.ready,
+            "last_updated": (self.last_updated or datetime.now(timezone.utc)).isoformat(),
+        })
+        return data
+
+    def task_counts_by_estado(self) -> Dict[TaskStatus, int]:
+        counts: Dict[TaskStatus, int] = {state: 0 for state in TaskStatus}
+        for (estado, _), n in self._tasks.items():
+            counts[estado] += n
+        return counts
+
+    # --- Publicación ---
+    def mark_dirty(self) -> None:
+        """Pide al publicador que compare el estado con el último delta enviado."""
+        self._dirty.set()
+
+    async def wait_dirty(self) -> None:
+        await self._dirty.wait()
+
+    def pop_delta(self) -> Optional[Dict[str, Any]]:
+        """
+        Claves que cambiaron desde el último delta, con su valor actual.
+
+        Returns:
+            ``{"version", "delta", "last_updated"}`` o None si nada cambió
+        """
+        self._dirty.clear()
+        current = self._flat()
+        changed = {key: value for key, value in current.items() if self._published.get(key) != value}
+        if not changed:
+            return None
+        self._published = current
+        self.version += 1
+        return {
+            "version": self.version,
+            "delta": _nest(changed),
+            "last_updated": (self.last_updated or datetime.now(timezone.utc)).isoformat(),
+        }
+
+
+async def publish_dashboard_delta(delta: Dict[str, Any]) -> int:
+    """Envía el delta a las conexiones locales suscritas a ``dashboard_update``."""
+    from src.core.websockets import EventType, WSMessage, websocket_manager
+    from src.core.ws_fanout import encode_frame
+
+    message = WSMessage(event_type=EventType.DASHBOARD_UPDATE, data=delta, topic=DASHBOARD_TOPIC)
+    frame = encode_frame({**message.model_dump(mode="json"), "timestamp": message.timestamp.isoformat()})
+    return await websocket_manager.broadcast_local_frame(frame, EventType.DASHBOARD_UPDATE, DASHBOARD_TOPIC)
+
+
+async def run_dashboard_publisher(
+    min_interval_seconds: float,
+    state: Optional[DashboardState] = None,
+    publish: Callable[[Dict[str, Any]], Awaitable[Any]] = publish_dashboard_delta,
+) -> None:
+    """
+    Publica como mucho un delta cada ``min_interval_seconds`` (cancelar la
+    tarea para detenerlo). El primer cambio tras un periodo sin cambios se
+    envía al momento; los siguientes se agrupan hasta el próximo intervalo.
+    """
+    state = state or dashboard_state
+    while True:
+        await state.wait_dirty()
+        try:
+            delta = state.pop_delta()
+            if delta is not None:
+                await publish(delta)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            dashboard_logger.error(f"Error publicando delta del dashboard: {e}")
+        await asyncio.sleep(min_interval_seconds)
+
+
+async def run_dashboard_reconciliation(
+    session_factory: Any,
+    interval_seconds: float,
+    state: Optional[DashboardState] = None,
+    drift_delay_seconds: float = DRIFT_RECONCILE_DELAY_SECONDS,
+) -> None:
+    """
+    Bucle de reconciliación (cancelar la tarea para detenerlo): cada
+    ``interval_seconds`` o, antes, ``drift_delay_seconds`` después de un
+    evento que no se pudo aplicar.
+    """
+    state = state or dashboard_state
+    while True:
+        try:
+            await asyncio.wait_for(state.wait_for_drift(), timeout=interval_seconds)
+            await asyncio.sleep(drift_delay_seconds)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            async with session_factory() as db:
+                await state.reconcile(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            dashboard_logger.error(f"Error reconciliando el estado del dashboard: {e}")
+            await asyncio.sleep(drift_delay_seconds)
+
+
+# Instancia global (una por worker)
+dashboard_state = DashboardState()
@@ -8,11 +8,23 @@ import os
 from typing import Any, AsyncGenerator
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 from sqlalchemy.pool import StaticPool
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from config.settings import settings
 
+class AppSession(Session):
+    """
+    Sesión síncrona subyacente de las sesiones de la aplicación.
+
+    Los listeners de ORM (rollup de métricas, índice de efectivos, eventos
+    WebSocket) se registran sobre esta clase y no sobre ``Session``, de modo
+    que otras sesiones del proceso (scripts, otros engines) no pagan ese
+    trabajo en cada flush.
+    """
+
+
 # --- Variables Globales para la Base de Datos ---
 # Serán inicializadas por init_db()
 async_engine: Any = None
@@ -85,11 +97,22 @@ def init_db(db_url: str) -> None:
     AsyncSessionFactory = async_sessionmaker(
         bind=async_engine,
         class_=AsyncSession,
+        sync_session_class=AppSession,
         expire_on_commit=False,
         # Configuración de sesión optimizada
         autoflush=False,  # Control manual de flush para mejor performance
     )
 
+    # Instrumentación SQL (fingerprints, latencias, N+1) -> query_tracker
+    if getattr(settings, "SQL_INSTRUMENTATION_ENABLED", True):
+        from src.core.query_instrumentation import install_query_instrumentation
+
+        install_query_instrumentation(
+            async_engine.sync_engine,
+            n_plus_one_threshold=getattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 10),
+            max_fingerprints=getattr(settings, "SQL_MAX_FINGERPRINTS", 1000),
+        )
+
 
 def _ensure_initialized_default() -> None:
     """Ensure default in-memory SQLite engine/session factory exists.
@@ -121,6 +144,7 @@ def _ensure_initialized_default() -> None:
         AsyncSessionFactory = async_sessionmaker(
             bind=async_engine,
             class_=AsyncSession,
+            sync_session_class=AppSession,
             expire_on_commit=False,
         )
 
@@ -3,6 +3,7 @@
 Geospatial services module for GRUPO_GAD.
 """
 
+from .efectivo_index import EfectivoSpatialIndex, efectivo_index
 from .postgis_service import find_nearest_efectivo
 
-__all__ = ["find_nearest_efectivo"]
\ No newline at end of file
+__all__ = ["EfectivoSpatialIndex", "efectivo_index", "find_nearest_efectivo"]
\ No newline at end of file
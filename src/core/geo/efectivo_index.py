@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+Índice espacial en memoria de efectivos para el despacho de emergencias.
+
+Rejilla lat/lon de celdas fijas (``cell_deg`` grados): cada celda es un
+bucket con los efectivos de esa zona y la búsqueda k-NN recorre anillos de
+celdas alrededor del punto hasta que ningún efectivo fuera de los anillos
+visitados puede estar más cerca que el k-ésimo encontrado.
+
+La ubicación de un efectivo sale de ``efectivos.geom`` (PostGIS, si la
+columna existe) o de las claves ``lat``/``lng`` de su ``metadata``. El
+índice se construye al arrancar, se mantiene con los commits del ORM que
+tocan efectivos y se reconstruye periódicamente; la base de datos sigue
+siendo la fuente de verdad: cada resultado se verifica con una consulta
+por clave primaria antes de devolverlo.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from math import asin, cos, floor, radians, sin, sqrt
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.api.models.efectivo import EstadoDisponibilidad, Efectivo
+from src.core.database import AppSession
+from src.core.geo.proximity import M_PER_DEG_LAT, postgis_available
+from src.core.logging import get_logger
+
+logger = get_logger("core.geo.efectivo_index")
+
+_EARTH_RADIUS_M = 6_371_008.8
+_PENDING_INFO_KEY = "efectivo_index_pending"
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia de círculo máximo en metros."""
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * asin(min(1.0, sqrt(a)))
+
+
+@dataclass
+class EfectivoEntry:
+    """Efectivo indexado."""
+
+    efectivo_id: int
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    estado: Optional[EstadoDisponibilidad] = None
+    especialidad: Optional[str] = None
+
+
+class EfectivoSpatialIndex:
+    """Rejilla de celdas lat/lon con búsqueda de los k efectivos más cercanos."""
+
+    def __init__(self, cell_deg: float = 0.05):
+        self.cell_deg = cell_deg
+        self._loaded = False
+        self._entries: Dict[int, EfectivoEntry] = {}
+        self._cells: Dict[Tuple[int, int], Dict[int, EfectivoEntry]] = {}
+        self._cell_of: Dict[int, Tuple[int, int]] = {}
+        # (fila mín, fila máx, col mín, col máx) de las celdas ocupadas; None = recalcular
+        self._extent: Optional[Tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def ready(self) -> bool:
+        """Cargado y con al menos un efectivo ubicado (si no, se consulta PostGIS)."""
+        return self._loaded and bool(self._cell_of)
+
+    @ready.setter
+    def ready(self, value: bool) -> None:
+        self._loaded = value
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return floor(lat / self.cell_deg), floor(lng / self.cell_deg)
+
+    def _unlink(self, efectivo_id: int) -> None:
+        cell = self._cell_of.pop(efectivo_id, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            bucket.pop(efectivo_id, None)
+            if not bucket:
+                del self._cells[cell]
+                self._extent = None
+
+    def upsert(
+        self,
+        efectivo_id: int,
+        *,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        estado: Optional[EstadoDisponibilidad] = None,
+        especialidad: Optional[str] = None,
+    ) -> EfectivoEntry:
+        """Crea o actualiza un efectivo; los campos None conservan su valor."""
+        entry = self._entries.get(efectivo_id)
+        if entry is None:
+            entry = self._entries[efectivo_id] = EfectivoEntry(efectivo_id)
+        if estado is not None:
+            entry.estado = estado
+        if especialidad is not None:
+            entry.especialidad = especialidad
+        if lat is not None and lng is not None:
+            entry.lat, entry.lng = float(lat), float(lng)
+            cell = self._cell(entry.lat, entry.lng)
+            if self._cell_of.get(efectivo_id) != cell:
+                self._unlink(efectivo_id)
+                if cell not in self._cells:
+                    self._cells[cell] = {}
+                    self._extent = None
+                self._cells[cell][efectivo_id] = entry
+                self._cell_of[efectivo_id] = cell
+        return entry
+
+    def remove(self, efectivo_id: int) -> None:
+        self._unlink(efectivo_id)
+        self._entries.pop(efectivo_id, None)
+
+    def replace_all(self, entries: Iterable[EfectivoEntry]) -> None:
+        """Reemplaza el contenido completo (reconstrucción) y marca el índice como cargado."""
+        self._entries.clear()
+        self._cells.clear()
+        self._cell_of.clear()
+        self._extent = None
+        for entry in entries:
+            self.upsert(entry.efectivo_id, lat=entry.lat, lng=entry.lng,
+                        estado=entry.estado, especialidad=entry.especialidad)
+        self._loaded = True
+
+    @staticmethod
+    def _matches(entry: EfectivoEntry, estado: Optional[EstadoDisponibilidad],
+                 especialidad: Optional[str]) -> bool:
+        return (estado is None or entry.estado == estado) and (
+            especialidad is None or entry.especialidad == especialidad
+        )
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int = 1,
+        estado: Optional[EstadoDisponibilidad] = EstadoDisponibilidad.DISPONIBLE,
+        especialidad: Optional[str] = None,
+    ) -> List[Tuple[EfectivoEntry, float]]:
+        """
+        Los ``k`` efectivos más cercanos que cumplen los filtros, con su
+        distancia en metros, ordenados por distancia.
+        """
+        if not self._cells or k <= 0:
+            return []
+        ci, cj = self._cell(lat, lng)
+        if self._extent is None:
+            rows = [i for i, _ in self._cells]
+            cols = [j for _, j in self._cells]
+            self._extent = (min(rows), max(rows), min(cols), max(cols))
+        min_i, max_i, min_j, max_j = self._extent
+        max_ring = max(abs(ci - min_i), abs(ci - max_i), abs(cj - min_j), abs(cj - max_j))
+        # Demasiados anillos vacíos (punto lejos de todo): recorrido lineal
+        if (2 * max_ring + 1) ** 2 > 4 * len(self._entries):
+            scanned = [
+                (entry, haversine_m(lat, lng, entry.lat, entry.lng))
+                for bucket in self._cells.values()
+                for entry in bucket.values()
+                if entry.lat is not None and entry.lng is not None
+                and self._matches(entry, estado, especialidad)
+            ]
+            return sorted(scanned, key=lambda item: item[1])[:k]
+
+        found: List[Tuple[EfectivoEntry, float]] = []
+        for ring in range(max_ring + 1):
+            for i in range(ci - ring, ci + ring + 1):
+                edge = i in (ci - ring, ci + ring)
+                for j in range(cj - ring, cj + ring + 1) if edge else (cj - ring, cj + ring):
+                    for entry in self._cells.get((i, j), {}).values():
+                        # Las celdas solo guardan efectivos ubicados
+                        if entry.lat is None or entry.lng is None:
+                            continue
+                        if self._matches(entry, estado, especialidad):
+                            found.append((entry, haversine_m(lat, lng, entry.lat, entry.lng)))
+            if len(found) >= k:
+                found.sort(key=lambda item: item[1])
+                found = found[:k]
+                if found[-1][1] <= self._ring_clearance_m(lat, ring):
+                    return found
+        found.sort(key=lambda item: item[1])
+        return found[:k]
+
+    def _ring_clearance_m(self, lat: float, ring: int) -> float:
+        """Cota inferior de la distancia a cualquier punto fuera de los anillos 0..ring."""
+        extreme_lat = min(90.0, abs(lat) + (ring + 1) * self.cell_deg)
+        deg_m = min(M_PER_DEG_LAT, M_PER_DEG_LAT * cos(radians(extreme_lat)))
+        # Margen por la diferencia entre la proyección local y la haversine
+        return ring * self.cell_deg * deg_m * 0.99
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "efectivos": len(self._entries),
+            "located": len(self._cell_of),
+            "cells": len(self._cells),
+            "cell_deg": self.cell_deg,
+        }
+
+
+efectivo_index = EfectivoSpatialIndex()
+
+
+def _metadata_location(metadata: Any) -> Tuple[Optional[float], Optional[float]]:
+    if isinstance(metadata, dict):
+        try:
+            lat, lng = metadata.get("lat"), metadata.get("lng")
+            if lat is not None and lng is not None:
+                return float(lat), float(lng)
+        except (TypeError, ValueError):
+            pass
+    return None, None
+
+
+async def _geom_locations(db: AsyncSession) -> Dict[int, Tuple[float, float]]:
+    """Coordenadas de ``efectivos.geom`` si hay PostGIS y la columna existe."""
+    if not await postgis_available(db):
+        return {}
+    has_geom = await db.execute(text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'efectivos' AND column_name = 'geom'"
+    ))
+    if has_geom.first() is None:
+        return {}
+    result = await db.execute(text(
+        "SELECT id, ST_Y(geom::geometry), ST_X(geom::geometry) "
+        "FROM efectivos WHERE geom IS NOT NULL AND deleted_at IS NULL"
+    ))
+    return {row[0]: (float(row[1]), float(row[2])) for row in result}
+
+
+async def load_efectivo_index(db: AsyncSession, index: Optional[EfectivoSpatialIndex] = None) -> int:
+    """Reconstruye el índice desde la base de datos; devuelve los efectivos ubicados."""
+    index = index or efectivo_index
+    geom = await _geom_locations(db)
+    stmt = select(
+        Efectivo.id, Efectivo.estado_disponibilidad, Efectivo.especialidad, Efectivo.extra_metadata
+    ).where(Efectivo.deleted_at.is_(None))
+    entries = []
+    for efectivo_id, estado, especialidad, metadata in await db.execute(stmt):
+        lat, lng = geom.get(efectivo_id) or _metadata_location(metadata)
+        entries.append(EfectivoEntry(efectivo_id, lat, lng, estado, especialidad))
+    index.replace_all(entries)
+    located = int(index.get_stats()["located"])
+    logger.info(f"Índice espacial de efectivos construido: {located}/{len(entries)} con ubicación")
+    return located
+
+
+async def find_nearest_from_index(
+    db: AsyncSession,
+    lat: float,
+    lng: float,
+    limit: int = 1,
+    especialidad: Optional[str] = None,
+    index: Optional[EfectivoSpatialIndex] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Efectivos disponibles más cercanos según el índice, verificados en la BD.
+
+    Los candidatos cuyo estado en la BD ya no coincide actualizan el índice
+    y se descartan; se piden candidatos extra para cubrir esos descartes.
+    """
+    index = index or efectivo_index
+    excluded: Set[int] = set()
+    results: List[Dict[str, Any]] = []
+    for _ in range(3):
+        candidates = [
+            (entry, dist)
+            for entry, dist in index.nearest(lat, lng, k=limit + len(excluded) + 2, especialidad=especialidad)
+            if entry.efectivo_id not in excluded
+        ]
+        if not candidates:
+            break
+        ids = [entry.efectivo_id for entry, _ in candidates]
+        stmt = select(Efectivo.id, Efectivo.estado_disponibilidad, Efectivo.especialidad).where(
+            Efectivo.id.in_(ids), Efectivo.deleted_at.is_(None)
+        )
+        current = {row[0]: row for row in await db.execute(stmt)}
+        results = []
+        stale = False
+        for entry, dist in candidates:
+            row = current.get(entry.efectivo_id)
+            if row is None:
+                index.remove(entry.efectivo_id)
+                stale = True
+            elif row[1] != EstadoDisponibilidad.DISPONIBLE or (especialidad and row[2] != especialidad):
+                index.upsert(entry.efectivo_id, estado=row[1], especialidad=row[2])
+                stale = True
+            else:
+                results.append({"efectivo_id": entry.efectivo_id, "distance_m": dist})
+                continue
+            excluded.add(entry.efectivo_id)
+        if len(results) >= limit or not stale:
+            break
+    if excluded:
+        logger.warning(f"Índice de efectivos desactualizado: {len(excluded)} candidatos corregidos")
+    return results[:limit]
+
+
+def _efectivo_changes(obj: Efectivo, deleted: bool) -> Dict[str, Any]:
+    """Campos cargados de un efectivo para aplicar al índice tras el commit."""
+    state = inspect(obj)
+    loaded = state.dict
+    change: Dict[str, Any] = {"efectivo_id": loaded.get("id"), "deleted": deleted}
+    if loaded.get("deleted_at") is not None:
+        change["deleted"] = True
+    if "estado_disponibilidad" in loaded:
+        change["estado"] = loaded["estado_disponibilidad"]
+    if "especialidad" in loaded:
+        change["especialidad"] = loaded["especialidad"]
+    change["lat"], change["lng"] = _metadata_location(loaded.get("extra_metadata"))
+    return change
+
+
+def _collect_efectivo_changes(session: Session, flush_context: Any) -> None:
+    """Listener ``after_flush``: acumula los efectivos modificados hasta el commit."""
+    pending = session.info.setdefault(_PENDING_INFO_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Efectivo):
+            pending.append(_efectivo_changes(obj, deleted=False))
+    for obj in session.deleted:
+        if isinstance(obj, Efectivo):
+            pending.append(_efectivo_changes(obj, deleted=True))
+
+
+def _apply_efectivo_changes(session: Session) -> None:
+    """Listener ``after_commit``: aplica al índice los cambios confirmados."""
+    for change in session.info.pop(_PENDING_INFO_KEY, ()):
+        efectivo_id = change["efectivo_id"]
+        if efectivo_id is None:
+            continue
+        if change["deleted"]:
+            efectivo_index.remove(efectivo_id)
+        else:
+            efectivo_index.upsert(
+                efectivo_id, lat=change["lat"], lng=change["lng"],
+                estado=change.get("estado"), especialidad=change.get("especialidad"),
+            )
+
+
+def _discard_efectivo_changes(session: Session, *args: Any) -> None:
+    session.info.pop(_PENDING_INFO_KEY, None)
+
+
+_LISTENERS = (
+    ("after_flush", _collect_efectivo_changes),
+    ("after_commit", _apply_efectivo_changes),
+    ("after_soft_rollback", _discard_efectivo_changes),
+)
+
+
+def install_efectivo_index_sync() -> None:
+    """Registra en las sesiones de la aplicación los listeners que mantienen el índice (idempotente)."""
+    for name, listener in _LISTENERS:
+        if not event.contains(AppSession, name, listener):
+            event.listen(AppSession, name, listener)
+
+
+def uninstall_efectivo_index_sync() -> None:
+    """Retira los listeners del índice."""
+    for name, listener in _LISTENERS:
+        if event.contains(AppSession, name, listener):
+            event.remove(AppSession, name, listener)
+
+
+async def run_efectivo_index_refresh(session_factory: Any, interval_seconds: float) -> None:
+    """Reconstrucción periódica (cambios de otros workers o fuera del ORM)."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with session_factory() as db:
+                await load_efectivo_index(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reconstruyendo el índice de efectivos: {e}")
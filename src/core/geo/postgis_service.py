@@ -6,11 +6,12 @@ Provides functionality for spatial queries using PostGIS geography types
 with SRID 4326 for accurate distance calculations.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from fastapi import HTTPException
 
+from src.core.geo.efectivo_index import efectivo_index, find_nearest_from_index
 from src.core.logging import get_logger
 
 logger = get_logger("core.geo.postgis")
@@ -20,25 +21,31 @@ async def find_nearest_efectivo(
     db: AsyncSession, 
     lat: float, 
     lng: float, 
-    limit: int = 1
+    limit: int = 1,
+    especialidad: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Find the nearest efectivos to a given location using PostGIS.
+    Find the nearest efectivos to a given location.
     
-    Uses geography types for accurate distance calculations in meters.
-    Only works with PostgreSQL + PostGIS.
+    When the in-memory spatial index is ready (loaded, with at least one
+    located efectivo), answers from it: only
+    available efectivos (optionally of one ``especialidad``), each one
+    verified against the database. Otherwise falls back to a PostGIS KNN
+    query using geography types for distances in meters, which only works
+    with PostgreSQL + PostGIS.
     
     Args:
         db: Database session
         lat: Latitude (-90 to 90)
         lng: Longitude (-180 to 180)
         limit: Maximum number of results to return
+        especialidad: Only efectivos with this specialty (index only)
         
     Returns:
         List of dicts with keys: efectivo_id, distance_m
         
     Raises:
-        HTTPException: 503 if not using PostgreSQL dialect
+        HTTPException: 503 if the index is not ready and not using PostgreSQL dialect
     """
     # Validate coordinates
     if not (-90 <= lat <= 90):
@@ -46,6 +53,9 @@ async def find_nearest_efectivo(
     if not (-180 <= lng <= 180):
         raise ValueError(f"Invalid longitude: {lng}. Must be between -180 and 180.")
     
+    if efectivo_index.ready:
+        return await find_nearest_from_index(db, lat, lng, limit=limit, especialidad=especialidad)
+    
     # Check if we're using PostgreSQL
     if db.bind.dialect.name != 'postgresql':
         logger.error(
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Búsqueda de tareas por radio para la vista de mapa.
+
+El radio se traduce a un bounding box lat/lon que filtra en SQL (índice
+compuesto ``ix_tareas_ubicacion``); solo los candidatos del recuadro se
+refinan con la distancia exacta, vectorizada con NumPy si está instalado.
+Con PostGIS disponible se usa solo ``ST_DWithin`` sobre geography (índice
+GIST ``ix_tareas_ubicacion_geog``), sin el recuadro plano, que cerca del
+borde del radio podía descartar puntos que la distancia geodésica acepta;
+el orden y la paginación se resuelven en la base de datos.
+"""
+
+from math import cos, hypot, radians
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models.tarea import Tarea
+from src.core.logging import get_logger
+
+logger = get_logger("core.geo.proximity")
+
+# NumPy es opcional: acelera el refinamiento de distancias de los candidatos
+try:
+    import numpy as np
+
+    NUMPY_ENABLED = True
+except ImportError:  # pragma: no cover - depende del entorno
+    NUMPY_ENABLED = False
+
+M_PER_DEG_LAT = 111_320.0
+_EARTH_CIRCUMFERENCE_M = 40075000.0
+
+# Resultado de la detección de PostGIS por URL de conexión
+_postgis_by_engine: Dict[str, bool] = {}
+
+
+def _m_per_deg_lon(lat: float) -> float:
+    return _EARTH_CIRCUMFERENCE_M * cos(radians(lat)) / 360.0
+
+
+def approx_distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia aproximada en metros usando proyección local simple.
+
+    Suficiente para radios pequeños (<= 20km) sin depender de paquetes externos.
+    """
+    dlat_m = (lat2 - lat1) * M_PER_DEG_LAT
+    dlon_m = (lon2 - lon1) * _m_per_deg_lon(lat1)
+    return hypot(dlat_m, dlon_m)
+
+
+def bounding_box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, Optional[float], Optional[float]]:
+    """
+    Recuadro ``(min_lat, max_lat, min_lon, max_lon)`` que contiene el radio.
+
+    Usa la misma proyección que ``approx_distance_m``, por lo que no descarta
+    ningún punto dentro del radio. Si el recuadro cruza el antimeridiano o
+    llega a un polo, la longitud no se acota (``None``).
+    """
+    dlat = radius_m / M_PER_DEG_LAT
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    m_per_deg_lon = _m_per_deg_lon(lat)
+    if m_per_deg_lon <= 1.0:
+        return min_lat, max_lat, None, None
+    dlon = radius_m / m_per_deg_lon
+    if lon - dlon < -180.0 or lon + dlon > 180.0:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+def distances_m(lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]) -> List[float]:
+    """Distancias aproximadas desde (lat, lon) a cada punto, vectorizadas si hay NumPy."""
+    if NUMPY_ENABLED:
+        dlat_m = (np.asarray(lats, dtype=np.float64) - lat) * M_PER_DEG_LAT
+        dlon_m = (np.asarray(lons, dtype=np.float64) - lon) * _m_per_deg_lon(lat)
+        return np.hypot(dlat_m, dlon_m).tolist()
+    m_per_deg_lon = _m_per_deg_lon(lat)
+    return [
+        hypot((plat - lat) * M_PER_DEG_LAT, (plon - lon) * m_per_deg_lon)
+        for plat, plon in zip(lats, lons)
+    ]
+
+
+async def postgis_available(db: AsyncSession) -> bool:
+    """Indica si la base de datos tiene la extensión PostGIS (cacheado por engine)."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.url)
+    if key not in _postgis_by_engine:
+        try:
+            result = await db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'"))
+            _postgis_by_engine[key] = result.first() is not None
+        except Exception as e:
+            logger.warning(f"No se pudo detectar PostGIS: {e}")
+            _postgis_by_engine[key] = False
+    return _postgis_by_engine[key]
+
+
+def _bbox_predicate(lat: float, lon: float, radius_m: float) -> Any:
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_m)
+    conditions = [Tarea.ubicacion_lat.between(min_lat, max_lat)]
+    if min_lon is not None:
+        conditions.append(Tarea.ubicacion_lon.between(min_lon, max_lon))
+    else:
+        conditions.append(Tarea.ubicacion_lon.is_not(None))
+    return and_(*conditions)
+
+
+async def find_tasks_within_radius(
+    db: AsyncSession,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    limit: int = 500,
+    offset: int = 0,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Tareas con ubicación dentro del radio, ordenadas por distancia.
+
+    Returns:
+        ``(tareas, total)``: la página pedida (dicts con ``uuid``, ``lat``,
+        ``lon``, ``prioridad`` y ``distance_m``) y el total dentro del radio
+    """
+    columns = (Tarea.uuid, Tarea.ubicacion_lat, Tarea.ubicacion_lon, Tarea.prioridad)
+
+    if await postgis_available(db):
+        point = func.ST_SetSRID(func.ST_MakePoint(Tarea.ubicacion_lon, Tarea.ubicacion_lat), 4326)
+        center = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
+        geog, center_geog = func.geography(point), func.geography(center)
+        distance = func.ST_Distance(geog, center_geog).label("distance_m")
+        within = func.ST_DWithin(geog, center_geog, radius_m)
+        total = (await db.execute(select(func.count()).where(within))).scalar_one()
+        stmt = select(*columns, distance).where(within).order_by(distance).limit(limit).offset(offset)
+        rows = (await db.execute(stmt)).all()
+        return [
+            {"uuid": u, "lat": float(la), "lon": float(lo), "prioridad": p, "distance_m": float(d)}
+            for u, la, lo, p, d in rows
+        ], total
+
+    # Sin PostGIS: candidatos del recuadro (índice compuesto) y refinamiento local
+    in_bbox = _bbox_predicate(lat, lon, radius_m)
+    candidates = (await db.execute(select(*columns).where(in_bbox))).all()
+    if not candidates:
+        return [], 0
+    lats = [float(row[1]) for row in candidates]
+    lons = [float(row[2]) for row in candidates]
+    dists = distances_m(lat, lon, lats, lons)
+    inside = sorted(
+        (i for i, d in enumerate(dists) if d <= radius_m), key=dists.__getitem__
+    )
+    page = inside[offset:offset + limit]
+    return [
+        {
+            "uuid": candidates[i][0],
+            "lat": lats[i],
+            "lon": lons[i],
+            "prioridad": candidates[i][3],
+            "distance_m": dists[i],
+        }
+        for i in page
+    ], len(inside)
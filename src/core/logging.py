@@ -6,15 +6,25 @@ Proporciona configuración consistente de logging para todos los módulos
 del proyecto con diferentes niveles, formateo estructurado y múltiples outputs.
 """
 
+import atexit
+import queue
 import sys
+import threading
 from pathlib import Path
 import os
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, TextIO
 import json
 from datetime import datetime
 
 from loguru import logger
 
+try:
+    import orjson
+    ORJSON_ENABLED = True
+except ImportError:
+    orjson = None
+    ORJSON_ENABLED = False
+
 # Crear directorio de logs si no existe
 LOGS_DIR = Path("logs")
 LOGS_DIR.mkdir(exist_ok=True)
@@ -36,55 +46,187 @@ FILE_FORMAT = (
 
 JSON_FORMAT = "{time} | {level} | {name} | {function} | {line} | {message}"
 
+LEVEL_NUMBERS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+# Etiqueta de los datos estructurados en los formatos de texto
+_DATA_LABELS = {"DEBUG": "Debug", "ERROR": "Error", "CRITICAL": "Critical"}
+
+# Nivel mínimo de los handlers configurados por setup_logging; sin
+# configurar, el handler por defecto de loguru acepta todo
+_min_level_no = 0
+
+
+def set_log_level(log_level: str) -> None:
+    """Fija el nivel por debajo del cual ``StructuredLogger`` descarta sin coste."""
+    global _min_level_no
+    _min_level_no = LEVEL_NUMBERS.get(log_level.upper(), 0)
+
+
+def _dumps(data: Any) -> str:
+    if ORJSON_ENABLED:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, default=str)
+
+
+def _record_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos estructurados del registro (``extra`` sin el servicio ni los internos)."""
+    return {k: v for k, v in record["extra"].items() if k != "service" and not k.startswith("_")}
+
+
+def text_formatter(fmt: str) -> Callable[[Dict[str, Any]], str]:
+    """Formato de texto que añade los campos estructurados serializados una vez."""
+    plain = fmt + "\n{exception}"
+
+    def _format(record: Dict[str, Any]) -> str:
+        extra = record["extra"]
+        if "_data" not in extra:
+            fields = _record_fields(record)
+            if not fields:
+                return plain
+            extra["_data"] = _dumps(fields)
+        label = _DATA_LABELS.get(record["level"].name, "Data")
+        return fmt + f" | {label}: {{extra[_data]}}\n{{exception}}"
+
+    return _format
+
+
+def json_formatter(record: Dict[str, Any]) -> str:
+    """Una línea JSON por registro, serializada en el sink (orjson si está instalado)."""
+    entry: Dict[str, Any] = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "service": record["extra"].get("service"),
+        "name": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    fields = _record_fields(record)
+    if fields:
+        entry["data"] = fields
+    if record["exception"] is not None:
+        exc_type, exc_value, _ = record["exception"]
+        entry["exception"] = f"{getattr(exc_type, '__name__', exc_type)}: {exc_value}"
+    record["extra"]["_json"] = _dumps(entry)
+    return "{extra[_json]}\n"
+
+
+class BatchedQueueSink:
+    """
+    Stream para loguru que escribe por lotes desde un hilo propio.
+
+    ``write`` solo encola; el hilo vuelca hasta ``max_batch`` mensajes por
+    escritura cada ``flush_interval`` segundos como mucho. Con la cola llena
+    los mensajes se descartan (``dropped``) en lugar de bloquear al llamador.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        stream: TextIO,
+        max_batch: int = 512,
+        flush_interval: float = 0.2,
+        max_queue: int = 100_000,
+    ) -> None:
+        self.stream = stream
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def write(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self) -> None:
+        """Vacía la cola y detiene el hilo (loguru lo llama en ``logger.remove``)."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Mensajes escritos tras ``stop`` dejan el centinela en medio del lote
+            if any(item is self._STOP for item in batch):
+                batch = [item for item in batch if item is not self._STOP]
+                stopping = True
+            if batch:
+                try:
+                    self.stream.write("".join(batch))
+                    self.stream.flush()
+                except Exception:
+                    # Un fallo del stream no debe matar el hilo de logging
+                    pass
+
 
 class StructuredLogger:
-    """Logger con capacidades de logging estructurado."""
+    """
+    Logger con capacidades de logging estructurado.
+
+    El nivel se comprueba antes de tocar los campos: una llamada por debajo
+    del nivel configurado no serializa ni construye nada. Los campos viajan
+    como ``extra`` de loguru y se serializan una sola vez en el sink.
+    """
+
+    __slots__ = ("name", "logger")
 
     def __init__(self, name: str):
         self.name = name
         self.logger = logger.bind(service=name)
 
+    def is_enabled_for(self, level: str) -> bool:
+        """Permite evitar cálculos caros para logs que se descartarían."""
+        return LEVEL_NUMBERS.get(level, 0) >= _min_level_no
+
+    def _log(self, level: str, message: str, fields: Dict[str, Any]) -> None:
+        target = self.logger.bind(**fields) if fields else self.logger
+        # depth=2: función y línea del llamador, no de StructuredLogger
+        target.opt(depth=2).log(level, message)
+
     def info(self, message: str, **kwargs):
         """Log info con datos estructurados opcionales."""
-        if kwargs:
-            self.logger.info(f"{message} | Data: {json.dumps(kwargs, default=str)}")
-        else:
-            self.logger.info(message)
+        if _min_level_no <= 20:
+            self._log("INFO", message, kwargs)
 
     def error(self, message: str, error: Optional[Exception] = None, **kwargs):
         """Log error con información de excepción y datos adicionales."""
-        extra_data = kwargs.copy()
+        if _min_level_no > 40:
+            return
         if error:
-            extra_data.update({
-                "error_type": type(error).__name__,
-                "error_message": str(error),
-            })
-        
-        if extra_data:
-            self.logger.error(f"{message} | Error: {json.dumps(extra_data, default=str)}")
-        else:
-            self.logger.error(message)
+            kwargs["error_type"] = type(error).__name__
+            kwargs["error_message"] = str(error)
+        self._log("ERROR", message, kwargs)
 
     def warning(self, message: str, **kwargs):
         """Log warning con datos estructurados opcionales."""
-        if kwargs:
-            self.logger.warning(f"{message} | Data: {json.dumps(kwargs, default=str)}")
-        else:
-            self.logger.warning(message)
+        if _min_level_no <= 30:
+            self._log("WARNING", message, kwargs)
 
     def debug(self, message: str, **kwargs):
         """Log debug con datos estructurados opcionales."""
-        if kwargs:
-            self.logger.debug(f"{message} | Debug: {json.dumps(kwargs, default=str)}")
-        else:
-            self.logger.debug(message)
+        if _min_level_no <= 10:
+            self._log("DEBUG", message, kwargs)
 
     def critical(self, message: str, **kwargs):
         """Log crítico con datos estructurados opcionales."""
-        if kwargs:
-            self.logger.critical(f"{message} | Critical: {json.dumps(kwargs, default=str)}")
-        else:
-            self.logger.critical(message)
+        self._log("CRITICAL", message, kwargs)
 
 
 def setup_logging(
@@ -93,6 +235,7 @@ def setup_logging(
     enable_console: bool = True,
     enable_file: bool = True,
     enable_json: bool = False,
+    async_sink: bool = False,
 ) -> StructuredLogger:
     """
     Configura el sistema de logging para un servicio específico.
@@ -103,6 +246,8 @@ def setup_logging(
         enable_console: Habilitar output a consola
         enable_file: Habilitar output a archivo
         enable_json: Habilitar logging en formato JSON para producción
+        async_sink: Escribir la consola por lotes desde un hilo
+            (``BatchedQueueSink``) en lugar de en cada llamada
         
     Returns:
         StructuredLogger: Logger configurado para el servicio
@@ -112,13 +257,14 @@ def setup_logging(
     
     # Configurar nivel de logging
     log_level = log_level.upper()
+    set_log_level(log_level)
     
     # Handler para consola (desarrollo)
     if enable_console:
         logger.add(
-            sys.stdout,
+            BatchedQueueSink(sys.stdout) if async_sink else sys.stdout,
             colorize=True,
-            format=CONSOLE_FORMAT,
+            format=text_formatter(CONSOLE_FORMAT),
             level=log_level,
             filter=lambda record: record["level"].name != "DEBUG" or log_level == "DEBUG"
         )
@@ -134,7 +280,7 @@ def setup_logging(
                     rotation="10 MB",
                     retention="30 days",
                     compression="zip",
-                    format=FILE_FORMAT,
+                    format=text_formatter(FILE_FORMAT),
                     level=log_level,
                     enqueue=True,
                     backtrace=True,
@@ -156,7 +302,7 @@ def setup_logging(
                     rotation="5 MB",
                     retention="30 days",
                     compression="zip",
-                    format=FILE_FORMAT,
+                    format=text_formatter(FILE_FORMAT),
                     level="ERROR",
                     enqueue=True,
                     backtrace=True,
@@ -174,9 +320,8 @@ def setup_logging(
                 rotation="50 MB",
                 retention="30 days",
                 compression="zip",
-                format=JSON_FORMAT,
+                format=json_formatter,  # Una línea JSON por registro
                 level=log_level,
-                serialize=True,  # Output en formato JSON
                 enqueue=True,
             )
         except Exception:
@@ -3,33 +3,156 @@
 Performance monitoring and optimization utilities for GRUPO_GAD.
 """
 
+import hashlib
+import re
 import time
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, AsyncGenerator, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional, Tuple
 
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.logging import get_logger
+from src.shared.latency_histogram import LatencyHistogram, prometheus_histogram_buckets
 
 performance_logger = get_logger("performance")
 
+try:
+    from config.settings import settings
+    _ENVIRONMENT = getattr(settings, "ENVIRONMENT", None) or "development"
+except (ImportError, AttributeError):
+    _ENVIRONMENT = "development"
+
+
+# Quantiles reported per route and per SQL fingerprint
+PERCENTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999))
+
+# Label used for requests that did not match any route (404s, scanners...)
+UNMATCHED_ROUTE = "unmatched"
+
+
+_SQL_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):[A-Za-z_]\w*|\?")
+_SQL_PARAM_CAST = re.compile(r"\?::\w+(?:\[\])?")
+_SQL_NUMBER = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?\b")
+_SQL_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_SQL_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SQL_ROWS = re.compile(r"\(\?(?:, \.\.\.)?\)(?:\s*,\s*\(\?(?:, \.\.\.)?\))+")
+_SQL_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint_sql(statement: str) -> Tuple[str, str]:
+    """
+    Normalize a SQL statement and return ``(fingerprint, normalized_sql)``.
+
+    Literals and bind parameters become ``?``, ``IN``/``VALUES`` lists of any
+    length collapse to ``(?, ...)`` and whitespace/comments are dropped, so
+    every execution of the same query shape shares one fingerprint.
+    """
+    normalized = _SQL_COMMENT.sub(" ", statement)
+    normalized = _SQL_STRING.sub("?", normalized)
+    normalized = _SQL_PARAM.sub("?", normalized)
+    normalized = _SQL_PARAM_CAST.sub("?", normalized)
+    normalized = _SQL_NUMBER.sub("?", normalized)
+    normalized = _SQL_IN_LIST.sub("IN (?, ...)", normalized)
+    normalized = _SQL_LIST.sub("(?, ...)", normalized)
+    normalized = _SQL_ROWS.sub("(?, ...)", normalized)
+    normalized = _SQL_SPACE.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16], normalized
+
+
+class QueryFingerprintStats:
+    """Latency histogram, row count and originating routes for one statement shape."""
+
+    MAX_ROUTES = 50
+
+    __slots__ = ("statement", "query_type", "histogram", "rows", "errors", "routes", "n_plus_one")
+
+    def __init__(self, statement: str) -> None:
+        self.statement = statement[:1000]
+        self.query_type = statement.split(" ", 1)[0].upper() if statement else "UNKNOWN"
+        self.histogram = LatencyHistogram()
+        self.rows = 0
+        self.errors = 0
+        self.routes: Dict[str, int] = {}
+        self.n_plus_one = 0
+
+    def record(self, duration: float, rows: Optional[int], route: Optional[str], error: bool) -> None:
+        self.histogram.record(duration)
+        if rows is not None and rows > 0:
+            self.rows += rows
+        if error:
+            self.errors += 1
+        if route is not None and (route in self.routes or len(self.routes) < self.MAX_ROUTES):
+            self.routes[route] = self.routes.get(route, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        histogram = self.histogram
+        top_routes = sorted(self.routes.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {
+            "query_type": self.query_type,
+            "statement": self.statement,
+            "count": histogram.count,
+            "total_time_ms": round(histogram.sum * 1000, 3),
+            "avg_ms": round(histogram.sum / histogram.count * 1000, 3) if histogram.count else 0.0,
+            "max_ms": round(histogram.max * 1000, 3),
+            "percentiles_ms": {
+                label: round(histogram.percentile(q) * 1000, 3) for label, q in PERCENTILES
+            },
+            "rows": self.rows,
+            "avg_rows": round(self.rows / histogram.count, 2) if histogram.count else 0.0,
+            "errors": self.errors,
+            "routes": dict(top_routes),
+            "n_plus_one_requests": self.n_plus_one,
+        }
+
 
 class QueryPerformanceTracker:
     """
     Tracks database query performance for optimization insights.
     """
     
-    def __init__(self, enabled: bool = True):
+    def __init__(self, enabled: bool = True, max_fingerprints: int = 1000):
         self.enabled = enabled
         self.slow_query_threshold = 1.0  # 1 second threshold for slow queries
         self.query_stats: Dict[str, Dict[str, Any]] = {}
+        self.max_fingerprints = max_fingerprints
+        self.fingerprint_stats: Dict[str, QueryFingerprintStats] = {}
+        self.dropped_fingerprints = 0
+        self.n_plus_one: Dict[Tuple[str, str], int] = {}
     
-    def record_query(self, query: str, duration: float, error: Optional[str] = None) -> None:
-        """Record query execution statistics."""
+    def record_query(
+        self,
+        query: str,
+        duration: float,
+        error: Optional[str] = None,
+        rows: Optional[int] = None,
+        route: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Record query execution statistics.
+
+        Besides the per query type totals, the statement is fingerprinted
+        (see :func:`fingerprint_sql`) and aggregated with its latency
+        histogram, row count and originating route. Returns the fingerprint.
+        """
         if not self.enabled:
-            return
+            return None
+        
+        fingerprint, normalized = fingerprint_sql(query)
+        fp_stats = self.fingerprint_stats.get(fingerprint)
+        if fp_stats is None and len(self.fingerprint_stats) < self.max_fingerprints:
+            fp_stats = self.fingerprint_stats[fingerprint] = QueryFingerprintStats(normalized)
+        if fp_stats is None:
+            self.dropped_fingerprints += 1
+        else:
+            fp_stats.record(duration, rows, route, error is not None)
             
         # Extract query type (SELECT, INSERT, UPDATE, DELETE)
         query_type = query.strip().upper().split()[0] if query.strip() else "UNKNOWN"
@@ -68,6 +191,44 @@ class QueryPerformanceTracker:
                 error=Exception(error) if isinstance(error, str) else error,
                 query=query[:200] + "..." if len(query) > 200 else query,
             )
+        
+        return fingerprint
+    
+    def record_n_plus_one(self, route: str, fingerprint: str, executions: int) -> None:
+        """Record a statement repeated ``executions`` times within one request."""
+        key = (route, fingerprint)
+        self.n_plus_one[key] = self.n_plus_one.get(key, 0) + 1
+        fp_stats = self.fingerprint_stats.get(fingerprint)
+        if fp_stats is not None:
+            fp_stats.n_plus_one += 1
+        performance_logger.warning(
+            "Possible N+1 query pattern",
+            route=route,
+            fingerprint=fingerprint,
+            executions=executions,
+            query=fp_stats.statement[:200] if fp_stats is not None else None,
+        )
+    
+    def get_top_queries(self, limit: int = 20, order_by: str = "total_time") -> List[Dict[str, Any]]:
+        """
+        Get the most expensive statement fingerprints.
+
+        ``order_by`` is one of ``total_time``, ``count``, ``p99``, ``rows``
+        or ``n_plus_one``.
+        """
+        sort_keys = {
+            "total_time": lambda s: s.histogram.sum,
+            "count": lambda s: s.histogram.count,
+            "p99": lambda s: s.histogram.percentile(0.99),
+            "rows": lambda s: s.rows,
+            "n_plus_one": lambda s: s.n_plus_one,
+        }
+        if order_by not in sort_keys:
+            raise ValueError(f"order_by must be one of {sorted(sort_keys)}")
+        ranked = sorted(
+            self.fingerprint_stats.items(), key=lambda item: sort_keys[order_by](item[1]), reverse=True
+        )
+        return [{"fingerprint": fingerprint, **stats.as_dict()} for fingerprint, stats in ranked[:limit]]
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get current performance statistics."""
@@ -75,12 +236,18 @@ class QueryPerformanceTracker:
             "enabled": self.enabled,
             "slow_query_threshold": self.slow_query_threshold,
             "statistics": dict(self.query_stats),
+            "fingerprints": len(self.fingerprint_stats),
+            "dropped_fingerprints": self.dropped_fingerprints,
+            "n_plus_one_patterns": len(self.n_plus_one),
             "timestamp": datetime.utcnow().isoformat()
         }
     
     def reset_statistics(self) -> None:
         """Reset all performance statistics."""
         self.query_stats.clear()
+        self.fingerprint_stats.clear()
+        self.n_plus_one.clear()
+        self.dropped_fingerprints = 0
 
 
 # Global query performance tracker
@@ -206,45 +373,85 @@ async def suggest_database_indexes(session: AsyncSession) -> List[Dict[str, Any]
         return []
 
 
+class EndpointStats:
+    """Latency histogram plus status code counters for one route."""
+
+    __slots__ = ("histogram", "status_codes", "errors")
+
+    def __init__(self) -> None:
+        self.histogram = LatencyHistogram()
+        self.status_codes: Dict[str, int] = {}
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        histogram = self.histogram
+        return {
+            "count": histogram.count,
+            "total_duration": histogram.sum,
+            "avg_duration": histogram.sum / histogram.count if histogram.count else 0.0,
+            "max_duration": histogram.max,
+            "percentiles_ms": {
+                label: round(histogram.percentile(q) * 1000, 3) for label, q in PERCENTILES
+            },
+            "status_codes": dict(self.status_codes),
+            "errors": self.errors,
+        }
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    Matched route template for an ASGI scope (``/api/v1/tasks/{task_id}``).
+
+    Using the template instead of the raw path keeps the number of tracked
+    endpoints bounded by the number of declared routes. Recent FastAPI
+    versions keep included routers nested, so the route's own template lacks
+    the router prefix; the prefix is then taken from the leading (static)
+    segments of the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    path = scope.get("path", "")
+    depth = template.count("/")
+    if ":path}" not in template and path.count("/") > depth:
+        template = path.rsplit("/", depth)[0] + template
+    return template
+
+
 class PerformanceMiddleware:
     """
     Middleware to track API endpoint performance.
+
+    Stats are keyed by ``"<METHOD> <route template>"`` and each key holds a
+    fixed-size :class:`LatencyHistogram`, so memory does not grow with the
+    number of distinct URLs.
     """
     
     def __init__(self) -> None:
-        self.endpoint_stats: Dict[str, Dict[str, Any]] = {}
+        self.endpoint_stats: Dict[str, EndpointStats] = {}
     
-    def record_request(self, method: str, path: str, duration: float, status_code: int) -> None:
-        """Record API request performance."""
-        endpoint_key = f"{method} {path}"
+    def record_request(self, method: str, route: str, duration: float, status_code: int) -> None:
+        """Record API request performance for a route template (see :func:`route_template`)."""
+        endpoint_key = f"{method} {route}"
         
-        if endpoint_key not in self.endpoint_stats:
-            self.endpoint_stats[endpoint_key] = {
-                "count": 0,
-                "total_duration": 0.0,
-                "avg_duration": 0.0,
-                "max_duration": 0.0,
-                "status_codes": {},
-                "errors": 0
-            }
+        stats = self.endpoint_stats.get(endpoint_key)
+        if stats is None:
+            stats = self.endpoint_stats[endpoint_key] = EndpointStats()
         
-        stats = self.endpoint_stats[endpoint_key]
-        stats["count"] += 1
-        stats["total_duration"] += duration
-        stats["avg_duration"] = stats["total_duration"] / stats["count"]
-        stats["max_duration"] = max(stats["max_duration"], duration)
+        stats.histogram.record(duration)
         
         # Track status codes
         status_key = str(status_code)
-        stats["status_codes"][status_key] = stats["status_codes"].get(status_key, 0) + 1
+        stats.status_codes[status_key] = stats.status_codes.get(status_key, 0) + 1
         
         if status_code >= 400:
-            stats["errors"] += 1
+            stats.errors += 1
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get current endpoint performance statistics."""
         return {
-            "endpoints": dict(self.endpoint_stats),
+            "endpoints": {key: stats.as_dict() for key, stats in self.endpoint_stats.items()},
             "timestamp": datetime.utcnow().isoformat()
         }
     
@@ -252,21 +459,123 @@ class PerformanceMiddleware:
         """Get the slowest endpoints by average response time."""
         sorted_endpoints = sorted(
             self.endpoint_stats.items(),
-            key=lambda x: x[1]["avg_duration"],
+            key=lambda x: x[1].histogram.sum / max(x[1].histogram.count, 1),
             reverse=True
         )
         
-        return [
-            {
+        result = []
+        for endpoint, stats in sorted_endpoints[:limit]:
+            histogram = stats.histogram
+            result.append({
                 "endpoint": endpoint,
-                "avg_duration_ms": round(stats["avg_duration"] * 1000, 2),
-                "max_duration_ms": round(stats["max_duration"] * 1000, 2),
-                "request_count": stats["count"],
-                "error_rate": round(stats["errors"] / stats["count"] * 100, 2) if stats["count"] > 0 else 0
+                "avg_duration_ms": round(histogram.sum / histogram.count * 1000, 2) if histogram.count else 0,
+                "p99_duration_ms": round(histogram.percentile(0.99) * 1000, 2),
+                "max_duration_ms": round(histogram.max * 1000, 2),
+                "request_count": histogram.count,
+                "error_rate": round(stats.errors / histogram.count * 100, 2) if histogram.count > 0 else 0
+            })
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serialisable snapshot of all routes, mergeable with :meth:`merge_snapshot`."""
+        return {
+            key: {
+                "histogram": stats.histogram.snapshot(),
+                "status_codes": dict(stats.status_codes),
+                "errors": stats.errors,
             }
-            for endpoint, stats in sorted_endpoints[:limit]
-        ]
+            for key, stats in self.endpoint_stats.items()
+        }
+
+    def merge_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Add a snapshot taken in another worker into this instance."""
+        for key, data in snapshot.items():
+            stats = self.endpoint_stats.get(key)
+            if stats is None:
+                stats = self.endpoint_stats[key] = EndpointStats()
+            stats.histogram.merge(LatencyHistogram.from_snapshot(data["histogram"]))
+            for status, count in data.get("status_codes", {}).items():
+                stats.status_codes[status] = stats.status_codes.get(status, 0) + count
+            stats.errors += data.get("errors", 0)
+
+    def reset_statistics(self) -> None:
+        """Reset all endpoint statistics."""
+        self.endpoint_stats.clear()
+
+
+class RouteLatencyCollector:
+    """
+    Prometheus collector exporting the per-route histograms.
+    """
+
+    def __init__(self, middleware: PerformanceMiddleware) -> None:
+        self.middleware = middleware
+
+    def collect(self) -> Iterator[HistogramMetricFamily]:
+        family = HistogramMetricFamily(
+            "ggrt_http_request_duration_seconds",
+            "HTTP request latency by route template",
+            labels=["env", "method", "route"],
+        )
+        for key, stats in list(self.middleware.endpoint_stats.items()):
+            method, _, route = key.partition(" ")
+            histogram = stats.histogram
+            family.add_metric([_ENVIRONMENT, method, route], prometheus_histogram_buckets(histogram), histogram.sum)
+        yield family
+
+
+class QueryFingerprintCollector:
+    """
+    Prometheus collector exporting per-fingerprint SQL latency, rows, errors
+    and N+1 detections. Cardinality is bounded by
+    ``QueryPerformanceTracker.max_fingerprints``.
+    """
+
+    def __init__(self, tracker: QueryPerformanceTracker) -> None:
+        self.tracker = tracker
+
+    def collect(self) -> Iterator[Any]:
+        latency = HistogramMetricFamily(
+            "ggrt_db_query_duration_seconds",
+            "SQL statement latency by normalized fingerprint",
+            labels=["env", "fingerprint", "query_type"],
+        )
+        rows = CounterMetricFamily(
+            "ggrt_db_query_rows",
+            "Rows returned or affected by normalized fingerprint",
+            labels=["env", "fingerprint"],
+        )
+        errors = CounterMetricFamily(
+            "ggrt_db_query_errors",
+            "Failed SQL statements by normalized fingerprint",
+            labels=["env", "fingerprint"],
+        )
+        n_plus_one = CounterMetricFamily(
+            "ggrt_db_n_plus_one",
+            "Requests where a statement ran at least the N+1 threshold times",
+            labels=["env", "route", "fingerprint"],
+        )
+        for fingerprint, stats in list(self.tracker.fingerprint_stats.items()):
+            histogram = stats.histogram
+            latency.add_metric(
+                [_ENVIRONMENT, fingerprint, stats.query_type], prometheus_histogram_buckets(histogram), histogram.sum
+            )
+            rows.add_metric([_ENVIRONMENT, fingerprint], stats.rows)
+            errors.add_metric([_ENVIRONMENT, fingerprint], stats.errors)
+        for (route, fingerprint), count in list(self.tracker.n_plus_one.items()):
+            n_plus_one.add_metric([_ENVIRONMENT, route, fingerprint], count)
+        yield latency
+        yield rows
+        yield errors
+        yield n_plus_one
 
 
 # Global performance middleware instance
-performance_middleware = PerformanceMiddleware()
\ No newline at end of file
+performance_middleware = PerformanceMiddleware()
+
+for _collector in (RouteLatencyCollector(performance_middleware), QueryFingerprintCollector(query_tracker)):
+    try:
+        REGISTRY.register(_collector)
+    except ValueError:
+        # Already registered (module reload)
+        pass
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación automática de SQL para GRUPO_GAD.
+
+Escucha ``before_cursor_execute``/``after_cursor_execute``/``handle_error``
+en el engine creado por ``init_db`` y alimenta ``query_tracker`` con cada
+sentencia: fingerprint normalizado, latencia, filas y ruta FastAPI de
+origen. Dentro de una solicitud (``request_query_context``) cuenta las
+ejecuciones por fingerprint y señala patrones N+1 cuando una misma
+sentencia se repite ``n_plus_one_threshold`` veces.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExceptionContext, ExecutionContext
+
+from src.core.logging import get_logger
+from src.core.performance import query_tracker, route_template
+
+instrumentation_logger = get_logger("query_instrumentation")
+
+# Ejecuciones de una misma sentencia en una solicitud a partir de las
+# cuales se considera un patrón N+1
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+
+_START_TIMES_KEY = "gad_query_start_times"
+
+# Ruta con la que se etiquetan las consultas fuera de una solicitud HTTP
+# (tareas de fondo, arranque): nunca ``None`` en las etiquetas de métricas
+NO_REQUEST_ROUTE = "-"
+
+
+class RequestQueryContext:
+    """Consultas ejecutadas durante una solicitud HTTP."""
+
+    __slots__ = ("scope", "executions", "total_queries")
+
+    def __init__(self, scope: Dict[str, Any]) -> None:
+        self.scope = scope
+        self.executions: Dict[str, int] = {}
+        self.total_queries = 0
+
+    @property
+    def route(self) -> str:
+        # La ruta se resuelve al ejecutar la consulta: el router ya completó
+        # scope["route"] aunque el contexto se creara antes del enrutado
+        return route_template(self.scope)
+
+
+_request_context: ContextVar[Optional[RequestQueryContext]] = ContextVar(
+    "gad_request_query_context", default=None
+)
+
+_n_plus_one_threshold = DEFAULT_N_PLUS_ONE_THRESHOLD
+
+
+@contextmanager
+def request_query_context(scope: Dict[str, Any]) -> Iterator[RequestQueryContext]:
+    """Asocia las consultas ejecutadas dentro del bloque a la solicitud ``scope``."""
+    context = RequestQueryContext(scope)
+    token = _request_context.set(context)
+    try:
+        yield context
+    finally:
+        _request_context.reset(token)
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Optional[ExecutionContext],
+    executemany: bool,
+) -> None:
+    conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Optional[ExecutionContext],
+    executemany: bool,
+) -> None:
+    start_times = conn.info.get(_START_TIMES_KEY)
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    rowcount = getattr(cursor, "rowcount", -1)
+    _record(statement, duration, rows=rowcount if rowcount is not None and rowcount >= 0 else None)
+
+
+def _handle_error(exception_context: ExceptionContext) -> None:
+    conn = exception_context.connection
+    start_times = conn.info.get(_START_TIMES_KEY) if conn is not None else None
+    if not start_times or exception_context.statement is None:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    _record(exception_context.statement, duration, error=str(exception_context.original_exception))
+
+
+def _record(statement: str, duration: float, rows: Optional[int] = None, error: Optional[str] = None) -> None:
+    request = _request_context.get()
+    route = request.route if request is not None else NO_REQUEST_ROUTE
+    fingerprint = query_tracker.record_query(statement, duration, error=error, rows=rows, route=route)
+    if request is None or fingerprint is None:
+        return
+    request.total_queries += 1
+    executions = request.executions.get(fingerprint, 0) + 1
+    request.executions[fingerprint] = executions
+    if executions == _n_plus_one_threshold:
+        query_tracker.record_n_plus_one(route, fingerprint, executions)
+
+
+_LISTENERS = (
+    ("before_cursor_execute", _before_cursor_execute),
+    ("after_cursor_execute", _after_cursor_execute),
+    ("handle_error", _handle_error),
+)
+
+
+def install_query_instrumentation(
+    engine: Engine,
+    n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD,
+    max_fingerprints: Optional[int] = None,
+) -> None:
+    """
+    Registra los listeners en ``engine`` (para engines async, ``sync_engine``).
+
+    Es idempotente; ``max_fingerprints`` acota la cardinalidad de
+    fingerprints (y de las series Prometheus derivadas).
+    """
+    global _n_plus_one_threshold
+    _n_plus_one_threshold = max(2, n_plus_one_threshold)
+    if max_fingerprints is not None:
+        query_tracker.max_fingerprints = max_fingerprints
+    for name, listener in _LISTENERS:
+        if not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
+    instrumentation_logger.info(
+        "Instrumentación SQL activada",
+        n_plus_one_threshold=_n_plus_one_threshold,
+        max_fingerprints=query_tracker.max_fingerprints,
+    )
+
+
+def uninstall_query_instrumentation(engine: Engine) -> None:
+    """Elimina los listeners registrados por :func:`install_query_instrumentation`."""
+    for name, listener in _LISTENERS:
+        if event.contains(engine, name, listener):
+            event.remove(engine, name, listener)
@@ -0,0 +1,449 @@
+"""
+Rollup incremental de métricas de tareas sobre la tabla ``metricas_tareas``.
+
+Cada tarea no borrada aporta a exactamente una fila del rollup, identificada
+por (día de creación, delegado, tipo, prioridad, estado): +1 en
+``total_tareas`` y, si está finalizada con ``inicio_real``/``fin_real``,
++1 en ``tareas_con_duracion`` y su duración en ``total_horas``.
+
+Un listener ``after_flush`` de las sesiones de la aplicación
+(``AppSession``) calcula, para cada tarea creada,
+modificada o eliminada, la diferencia entre su aportación anterior y la
+nueva y la aplica con UPSERT en la misma transacción. Así cualquier ruta
+que mute tareas (CRUD, bot, emergencias) mantiene el rollup sin cambios.
+``reconcile_task_metrics`` lo reconstruye desde ``tareas`` para corregir
+derivas (escrituras fuera del ORM, fallos parciales). Hasta la primera
+reconciliación completa (al arrancar) ``rollup_ready()`` es False y las
+lecturas deben usar los agregados sobre ``tareas``.
+"""
+
+import asyncio
+import typing
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import Date, Table, cast, delete, event, extract, func, inspect, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.api.models.metrica_tarea import MetricaTarea
+from src.api.models.tarea import Tarea
+from src.core.database import AppSession
+from src.core.logging import get_logger
+from src.shared.constants import TaskPriority, TaskStatus, TaskType
+
+metrics_logger = get_logger(__name__)
+
+# (fecha, usuario_id, tipo_tarea, prioridad, estado)
+RollupKey = Tuple[date, int, TaskType, TaskPriority, TaskStatus]
+_KEY_COLUMNS = ("fecha", "usuario_id", "tipo_tarea", "prioridad", "estado")
+# ``__table__`` está tipado como FromClause; el rollup es siempre una Table
+_ROLLUP_TABLE = typing.cast(Table, MetricaTarea.__table__)
+_TRACKED_ATTRS = (
+    "created_at", "delegado_usuario_id", "tipo", "prioridad", "estado",
+    "inicio_real", "fin_real", "deleted_at",
+)
+
+
+def _coerce_enum(enum_cls: Type[Enum], value: Any) -> Any:
+    """Acepta el miembro, su valor ("finalizada") o su nombre ("COMPLETED")."""
+    if value is None or isinstance(value, enum_cls):
+        return value
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return enum_cls[value]
+
+
+def _duration_hours(inicio: datetime, fin: datetime) -> float:
+    if (inicio.tzinfo is None) != (fin.tzinfo is None):
+        inicio, fin = inicio.replace(tzinfo=None), fin.replace(tzinfo=None)
+    return (fin - inicio).total_seconds() / 3600.0
+
+
+def task_contribution(values: Dict[str, Any]) -> Optional[Tuple[RollupKey, int, float]]:
+    """
+    Aportación de una tarea al rollup.
+
+    Returns:
+        ``(clave, tareas_con_duracion, horas)`` o None si la tarea no cuenta
+        (borrada lógicamente o sin delegado)
+    """
+    if values.get("deleted_at") is not None or values.get("delegado_usuario_id") is None:
+        return None
+    created_at = values.get("created_at") or datetime.now(timezone.utc)
+    estado = _coerce_enum(TaskStatus, values.get("estado")) or TaskStatus.PROGRAMMED
+    key = (
+        created_at.date(),
+        values["delegado_usuario_id"],
+        _coerce_enum(TaskType, values.get("tipo")),
+        _coerce_enum(TaskPriority, values.get("prioridad")) or TaskPriority.MEDIUM,
+        estado,
+    )
+    inicio, fin = values.get("inicio_real"), values.get("fin_real")
+    if estado == TaskStatus.COMPLETED and inicio is not None and fin is not None:
+        return key, 1, _duration_hours(inicio, fin)
+    return key, 0, 0.0
+
+
+_PREVIOUS_INFO_KEY = "task_metrics_previous"
+
+
+def _previous_unknown(obj: Tarea) -> bool:
+    """True si algún atributo no conserva su valor previo (instancia expirada)."""
+    state = inspect(obj)
+    return any(
+        not (state.attrs[name].history.deleted or state.attrs[name].history.unchanged)
+        for name in _TRACKED_ATTRS
+    )
+
+
+def _load_previous_values(session: Session, flush_context: Any, instances: Any) -> None:
+    """
+    Listener ``before_flush``: lee de la BD los valores previos de las tareas
+    modificadas o eliminadas tras expirar (p. ej. después de un commit), en
+    una sola consulta.
+    """
+    session.info.pop(_PREVIOUS_INFO_KEY, None)
+    ids = [
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Tarea) and inspect(obj).persistent and _previous_unknown(obj)
+    ]
+    if not ids:
+        return
+    columns = [getattr(Tarea, name) for name in _TRACKED_ATTRS]
+    with session.no_autoflush:
+        result = session.execute(select(Tarea.id, *columns).where(Tarea.id.in_(ids)))
+    session.info[_PREVIOUS_INFO_KEY] = {
+        row[0]: dict(zip(_TRACKED_ATTRS, row[1:])) for row in result
+    }
+
+
+def _snapshot(obj: Tarea, previous: bool, loaded: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Valores actuales (o previos al flush) de los atributos que definen la
+    aportación; ``loaded`` son los previos leídos en ``before_flush``.
+    """
+    if previous and loaded is not None:
+        return loaded
+    state = inspect(obj)
+    values = {}
+    for name in _TRACKED_ATTRS:
+        history = state.attrs[name].history
+        if previous and history.deleted:
+            values[name] = history.deleted[0]
+        elif previous and history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            # state.dict evita cargas perezosas dentro del flush
+            values[name] = state.dict.get(name)
+    return values
+
+
+def collect_task_deltas(session: Session) -> Dict[RollupKey, List[float]]:
+    """
+    Diferencias ``[total_tareas, tareas_con_duracion, total_horas]`` por
+    clave que produce el flush en curso.
+    """
+    deltas: Dict[RollupKey, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+
+    def _apply(contribution: Optional[Tuple[RollupKey, int, float]], sign: int) -> None:
+        if contribution is None:
+            return
+        key, timed, hours = contribution
+        delta = deltas[key]
+        delta[0] += sign
+        delta[1] += sign * timed
+        delta[2] += sign * hours
+
+    for obj in session.new:
+        if isinstance(obj, Tarea):
+            _apply(task_contribution(_snapshot(obj, previous=False)), 1)
+    loaded = session.info.pop(_PREVIOUS_INFO_KEY, {})
+    for obj in session.dirty:
+        if isinstance(obj, Tarea) and session.is_modified(obj, include_collections=False):
+            _apply(task_contribution(_snapshot(obj, True, loaded.get(obj.id))), -1)
+            _apply(task_contribution(_snapshot(obj, previous=False)), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Tarea):
+            _apply(task_contribution(_snapshot(obj, True, loaded.get(obj.id))), -1)
+
+    return {key: delta for key, delta in deltas.items() if delta[0] or delta[1] or delta[2]}
+
+
+def _upsert_statement(dialect: str, rows: List[Dict[str, Any]]) -> Any:
+    """INSERT ... ON CONFLICT DO UPDATE que suma los deltas a la fila existente."""
+    insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    table = _ROLLUP_TABLE
+    stmt = insert_fn(table).values(rows)
+    excluded = stmt.excluded
+    timed = _clamp_at_zero(dialect, table.c.tareas_con_duracion + excluded.tareas_con_duracion)
+    hours = _clamp_at_zero(dialect, table.c.total_horas + excluded.total_horas)
+    now = datetime.now(timezone.utc)
+    return stmt.on_conflict_do_update(
+        index_elements=list(_KEY_COLUMNS),
+        set_={
+            "total_tareas": _clamp_at_zero(dialect, table.c.total_tareas + excluded.total_tareas),
+            "tareas_con_duracion": timed,
+            "total_horas": hours,
+            "tiempo_promedio_horas": hours / func.nullif(timed, 0),
+            "ultima_actualizacion": now,
+            "updated_at": now,
+        },
+    )
+
+
+def _clamp_at_zero(dialect: str, expr: Any) -> Any:
+    """``max(expr, 0)``: un decremento nunca deja contadores negativos."""
+    return (func.greatest if dialect == "postgresql" else func.max)(expr, 0)
+
+
+def _decrement_statement(dialect: str, key: RollupKey, total: int, timed: int, hours: float) -> Any:
+    """
+    UPDATE de una fila existente con un delta no positivo en ``total_tareas``.
+
+    Si la fila no existe (tarea anterior al rollup, aún sin reconciliar) no
+    hay nada que restar y el UPDATE no afecta a ninguna fila.
+    """
+    table = _ROLLUP_TABLE
+    new_timed = _clamp_at_zero(dialect, table.c.tareas_con_duracion + timed)
+    new_hours = _clamp_at_zero(dialect, table.c.total_horas + hours)
+    now = datetime.now(timezone.utc)
+    return (
+        update(table)
+        .where(*(table.c[col] == value for col, value in zip(_KEY_COLUMNS, key)))
+        .values(
+            total_tareas=_clamp_at_zero(dialect, table.c.total_tareas + total),
+            tareas_con_duracion=new_timed,
+            total_horas=new_hours,
+            tiempo_promedio_horas=new_hours / func.nullif(new_timed, 0),
+            ultima_actualizacion=now,
+            updated_at=now,
+        )
+    )
+
+
+def _rollup_row(key: RollupKey, total: int, timed: int, hours: float) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    return {
+        **dict(zip(_KEY_COLUMNS, key)),
+        "total_tareas": total,
+        "tareas_con_duracion": timed,
+        "total_horas": hours,
+        "tiempo_promedio_horas": hours / timed if timed else None,
+        "ultima_actualizacion": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _apply_rollup_deltas(session: Session, flush_context: Any) -> None:
+    """Listener ``after_flush``: aplica los deltas en la transacción del flush."""
+    deltas = collect_task_deltas(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        metrics_logger.warning(f"Rollup de métricas no soportado en dialecto {dialect}")
+        return
+    # Orden estable de claves: evita interbloqueos entre transacciones concurrentes
+    ordered = sorted(deltas.items(), key=lambda kv: str(kv[0]))
+    # Solo se insertan filas que suman tareas; los decrementos actualizan la
+    # fila existente (o nada, si ese bucket nunca se contó) sin bajar de cero
+    rows = [
+        _rollup_row(key, int(total), int(timed), hours)
+        for key, (total, timed, hours) in ordered if total > 0
+    ]
+    if rows:
+        connection.execute(_upsert_statement(dialect, rows))
+    for key, (total, timed, hours) in ordered:
+        if total <= 0:
+            connection.execute(_decrement_statement(dialect, key, int(total), int(timed), hours))
+
+
+_LISTENERS = (("before_flush", _load_previous_values), ("after_flush", _apply_rollup_deltas))
+
+# True tras la primera reconciliación completa con los listeners instalados
+_rollup_ready = False
+
+
+def rollup_ready() -> bool:
+    """Si el rollup está mantenido y reconciliado (se puede leer en lugar de ``tareas``)."""
+    return _rollup_ready
+
+
+def install_task_metrics_rollup() -> None:
+    """Registra los listeners del rollup en las sesiones de la aplicación (idempotente)."""
+    for name, listener in _LISTENERS:
+        if not event.contains(AppSession, name, listener):
+            event.listen(AppSession, name, listener)
+
+
+def uninstall_task_metrics_rollup() -> None:
+    """Retira los listeners del rollup; deja de considerarse listo."""
+    global _rollup_ready
+    _rollup_ready = False
+    for name, listener in _LISTENERS:
+        if event.contains(AppSession, name, listener):
+            event.remove(AppSession, name, listener)
+
+
+def _as_date(value: Any) -> date:
+    # SQLite devuelve date() como texto
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+async def reconcile_task_metrics(db: AsyncSession) -> int:
+    """
+    Reconstruye el rollup desde ``tareas`` y corrige las filas que difieren.
+
+    En PostgreSQL bloquea ``metricas_tareas`` (SHARE ROW EXCLUSIVE) durante
+    la reconciliación: espera a las transacciones con deltas pendientes y
+    retiene las nuevas hasta el commit, de modo que ningún delta se pierde
+    ni se cuenta dos veces.
+
+    Returns:
+        Número de filas insertadas, actualizadas o eliminadas
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        await db.execute(
+            text(f"LOCK TABLE {_ROLLUP_TABLE.fullname} IN SHARE ROW EXCLUSIVE MODE")
+        )
+
+    day = func.date(Tarea.created_at) if dialect == "sqlite" else cast(Tarea.created_at, Date)
+    if dialect == "sqlite":
+        hours = (func.julianday(Tarea.fin_real) - func.julianday(Tarea.inicio_real)) * 24.0
+    else:
+        hours = extract("epoch", Tarea.fin_real - Tarea.inicio_real) / 3600.0
+    timed = (
+        (Tarea.estado == TaskStatus.COMPLETED)
+        & Tarea.inicio_real.is_not(None)
+        & Tarea.fin_real.is_not(None)
+    )
+    dims = (day, Tarea.delegado_usuario_id, Tarea.tipo, Tarea.prioridad, Tarea.estado)
+    expected_stmt = (
+        select(
+            *dims,
+            func.count(),
+            func.count().filter(timed),
+            func.coalesce(func.sum(hours).filter(timed), 0.0),
+        )
+        .where(Tarea.deleted_at.is_(None))
+        .group_by(*dims)
+    )
+    expected: Dict[RollupKey, Tuple[int, int, float]] = {}
+    for dia, usuario_id, tipo, prioridad, estado, total, n_timed, total_hours in await db.execute(expected_stmt):
+        expected[(_as_date(dia), usuario_id, tipo, prioridad, estado)] = (total, n_timed, float(total_hours))
+
+    current_stmt = select(
+        MetricaTarea.id,
+        *(getattr(MetricaTarea, col) for col in _KEY_COLUMNS),
+        MetricaTarea.total_tareas,
+        MetricaTarea.tareas_con_duracion,
+        MetricaTarea.total_horas,
+    )
+    corrections = 0
+    stale_ids = []
+    current_rows = await db.execute(current_stmt)
+    for row_id, fecha, usuario_id, tipo, prioridad, estado, total, n_timed, total_hours in current_rows:
+        key = (_as_date(fecha), usuario_id, tipo, prioridad, estado)
+        target = expected.pop(key, None)
+        if target is None:
+            stale_ids.append(row_id)
+            continue
+        if (total, n_timed) == target[:2] and abs((total_hours or 0.0) - target[2]) < 1e-6:
+            continue
+        await db.execute(
+            update(MetricaTarea)
+            .where(MetricaTarea.id == row_id)
+            .values(
+                total_tareas=target[0],
+                tareas_con_duracion=target[1],
+                total_horas=target[2],
+                tiempo_promedio_horas=target[2] / target[1] if target[1] else None,
+                ultima_actualizacion=datetime.now(timezone.utc),
+            )
+        )
+        corrections += 1
+
+    if stale_ids:
+        await db.execute(delete(MetricaTarea).where(MetricaTarea.id.in_(stale_ids)))
+        corrections += len(stale_ids)
+    if expected:
+        await db.execute(
+            _ROLLUP_TABLE.insert(),
+            [_rollup_row(key, *values) for key, values in expected.items()],
+        )
+        corrections += len(expected)
+
+    await db.commit()
+    global _rollup_ready
+    _rollup_ready = event.contains(AppSession, "after_flush", _apply_rollup_deltas)
+    if corrections:
+        metrics_logger.warning(f"Rollup de métricas de tareas corregido: {corrections} filas")
+    return corrections
+
+
+# Espera antes de reintentar mientras no haya habido una reconciliación completa
+_NOT_READY_RETRY_SECONDS = 30.0
+
+
+async def run_task_metrics_reconciliation(session_factory: Any, interval_seconds: float) -> None:
+    """Bucle periódico de reconciliación (cancelar la tarea para detenerlo)."""
+    while True:
+        await asyncio.sleep(
+            interval_seconds if _rollup_ready else min(interval_seconds, _NOT_READY_RETRY_SECONDS)
+        )
+        try:
+            async with session_factory() as db:
+                await reconcile_task_metrics(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics_logger.error(f"Error reconciliando métricas de tareas: {e}")
+
+
+async def read_user_task_stats(db: AsyncSession, user_id: int, since: date) -> Dict[str, Any]:
+    """
+    Estadísticas de un usuario leídas del rollup (mismo formato que
+    ``aggregate_user_task_stats``).
+
+    La ventana y ``completadas_por_dia`` usan el día de creación de la tarea.
+    """
+    stmt = (
+        select(
+            MetricaTarea.fecha,
+            MetricaTarea.estado,
+            func.sum(MetricaTarea.total_tareas),
+            func.sum(MetricaTarea.tareas_con_duracion),
+            func.sum(MetricaTarea.total_horas),
+        )
+        .where(MetricaTarea.usuario_id == user_id, MetricaTarea.fecha >= since)
+        .group_by(MetricaTarea.fecha, MetricaTarea.estado)
+        .order_by(MetricaTarea.fecha)
+    )
+    estados = {state.name: 0 for state in TaskStatus}
+    per_day: Dict[str, int] = {}
+    n_timed, total_hours = 0, 0.0
+    for fecha, estado, total, timed, hours in await db.execute(stmt):
+        estados[estado.name] += total
+        if estado == TaskStatus.COMPLETED:
+            n_timed += timed
+            total_hours += hours or 0.0
+            if total:
+                dia = str(_as_date(fecha))
+                per_day[dia] = per_day.get(dia, 0) + total
+    return {
+        "total": sum(estados.values()),
+        "estados": estados,
+        "promedio_duracion_horas": total_hours / n_timed if n_timed else 0.0,
+        "completadas_por_dia": [
+            {"fecha": fecha, "completadas": completadas} for fecha, completadas in per_day.items()
+        ],
+    }
+
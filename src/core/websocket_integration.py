@@ -4,21 +4,69 @@ Integración de WebSockets con modelos de GRUPO_GAD.
 
 Proporciona hooks para eventos de base de datos que automáticamente
 envían notificaciones WebSocket cuando ocurren cambios en los modelos.
+
+Los listeners de sesión (``install_model_event_hooks``) recogen en cada
+flush las tareas y efectivos creados, modificados o borrados, con los
+valores previos de estado/prioridad, y los encolan en el integrador tras
+el commit. El integrador los reenvía como eventos WebSocket y mantiene con
+ellos el estado del dashboard (``src.core.dashboard_state``).
+
+La cola del integrador es acotada y fusiona los eventos pendientes de la
+misma instancia (``merge_model_events``); si se descartan eventos por
+desbordamiento se adelanta la reconciliación del dashboard y se pide a los
+clientes que recarguen esa entidad.
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import asyncio
 from datetime import datetime
 
-from sqlalchemy import event
+from sqlalchemy import event, inspect
 from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 
 from src.api.middleware.websockets import WebSocketEventEmitter
+from src.api.models.efectivo import Efectivo
+from src.api.models.tarea import Tarea
+from src.core.dashboard_state import DashboardState, dashboard_state
+from src.core.database import AppSession
 from src.core.logging import get_logger
+from src.core.ws_event_batching import BatchingConfig, CoalescingEventQueue
 
 # Logger para integración
 integration_logger = get_logger("websockets.integration")
 
+# Modelo -> tipo de entidad de los eventos WebSocket
+_ENTITY_KINDS = {"Tarea": "task", "Efectivo": "efectivo", "Usuario": "usuario"}
+
+
+def merge_model_events(pending: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Fusiona dos eventos pendientes de la misma instancia en su efecto neto.
+
+    insert + update = insert con los valores finales; insert + delete no
+    deja evento; en el resto los ``_old_<campo>`` son los valores previos
+    al primer evento y delete + insert (restauración) es un update.
+    """
+    first, last = pending["event_type"], new["event_type"]
+    old_data, new_data = pending["instance_data"], new["instance_data"]
+    if first == "insert":
+        if last == "delete":
+            return None
+        data = {k: v for k, v in new_data.items() if not k.startswith("_")}
+        return {**new, "event_type": "insert", "instance_data": data}
+
+    event_type = "update" if (first == "delete" and last == "insert") else last
+    data = {k: v for k, v in new_data.items() if not k.startswith("_old_")}
+    fields = {k[len("_old_"):] for k in list(old_data) + list(new_data) if k.startswith("_old_")}
+    for field in fields:
+        before = old_data.get(f"_old_{field}", old_data.get(field))
+        if event_type == "delete" or before != data.get(field):
+            data[f"_old_{field}"] = before
+    if old_data.get("_previous_unknown") or new_data.get("_previous_unknown"):
+        data["_previous_unknown"] = True
+    return {**new, "event_type": event_type, "instance_data": data}
+
 
 class WebSocketModelIntegrator:
     """
@@ -28,11 +76,14 @@ class WebSocketModelIntegrator:
     notificaciones WebSocket correspondientes.
     """
     
-    def __init__(self, emitter: WebSocketEventEmitter):
+    def __init__(self, emitter: WebSocketEventEmitter, dashboard: Optional[DashboardState] = None,
+                 config: Optional[BatchingConfig] = None):
         self.enabled = True
-        self._event_queue: asyncio.Queue[Any] = asyncio.Queue()
+        self._event_queue = CoalescingEventQueue("integrator", config, merge=merge_model_events)
         self._processing_task: Optional[asyncio.Task[Any]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.emitter = emitter
+        self.dashboard = dashboard or dashboard_state
         
     def enable(self):
         """Habilita la integración."""
@@ -64,18 +115,69 @@ class WebSocketModelIntegrator:
             "timestamp": datetime.now()
         }
         
-        await self._event_queue.put(event)
+        await self._event_queue.put(event, *self._queue_key(model_name, instance_data))
+
+    def queue_event_nowait(self, event_type: str, model_name: str,
+                           instance_data: Dict[str, Any]):
+        """
+        Encola un evento desde código síncrono (listeners de sesión).
+
+        Si se llama desde otro hilo distinto al del event loop de la
+        integración, el encolado se delega al loop.
+        """
+        if not self.enabled:
+            return
+
+        event = {
+            "event_type": event_type,
+            "model_name": model_name,
+            "instance_data": instance_data,
+            "timestamp": datetime.now()
+        }
+
+        key, kind = self._queue_key(model_name, instance_data)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is None or running is self._loop:
+            self._event_queue.put_nowait(event, key, kind)
+        else:
+            self._loop.call_soon_threadsafe(self._event_queue.put_nowait, event, key, kind)
+
+    @staticmethod
+    def _queue_key(model_name: str, instance_data: Dict[str, Any]) -> Tuple[Optional[Tuple[str, Any]], str]:
+        """Clave de coalescencia (modelo, id) y tipo de entidad del evento."""
+        instance_id = instance_data.get("id")
+        key = (model_name, instance_id) if instance_id is not None else None
+        return key, _ENTITY_KINDS.get(model_name, model_name.lower())
     
     async def process_events(self):
-        """Procesa eventos de la cola de manera asíncrona."""
+        """Procesa lotes de eventos de la cola de manera asíncrona."""
         while True:
             try:
-                event = await self._event_queue.get()
-                await self._handle_model_event(event)
+                batch = await self._event_queue.get_batch()
+                dropped = self._event_queue.pop_resync()
+                if dropped:
+                    self._handle_dropped_events(dropped)
+                for event in batch:
+                    await self._handle_model_event(event)
+                    self._event_queue.task_done()
             except Exception as e:
                 integration_logger.error(f"Error procesando evento de modelo: {str(e)}")
                 await asyncio.sleep(1)  # Evitar spam de errores
     
+    def _handle_dropped_events(self, kinds: Any):
+        """Eventos descartados por desbordamiento: reconciliar y pedir recarga a los clientes."""
+        integration_logger.warning(
+            "Eventos de modelo descartados por cola llena",
+            kinds=sorted(kinds),
+            dropped=self._event_queue.dropped
+        )
+        self.dashboard.request_reconciliation()
+        for kind in kinds:
+            self.emitter.request_resync(kind)
+
     async def _handle_model_event(self, event: Dict[str, Any]):
         """
         Maneja un evento específico de modelo.
@@ -94,6 +196,9 @@ class WebSocketModelIntegrator:
                 event_type=event_type,
                 instance_id=instance_data.get("id")
             )
+
+            # Contadores del dashboard antes de que los handlers anoten el evento
+            self.dashboard.apply_model_event(event_type, model_name, instance_data)
             
             if model_name == "Tarea":
                 await self._handle_tarea_event(event_type, instance_data)
@@ -146,9 +251,9 @@ class WebSocketModelIntegrator:
             await self.emitter.emit_efectivo_event("created", int(efectivo_id), instance_data)
             
         elif event_type == "update":
-            # Verificar si cambió el estado
-            old_estado = instance_data.get("_old_estado")
-            new_estado = instance_data.get("estado")
+            # Verificar si cambió la disponibilidad (campos que fijan los hooks)
+            old_estado = instance_data.get("_old_estado_disponibilidad")
+            new_estado = instance_data.get("estado_disponibilidad")
             
             if old_estado and new_estado and old_estado != new_estado:
                 # Agregar información del cambio de estado
@@ -159,6 +264,8 @@ class WebSocketModelIntegrator:
                 await self.emitter.emit_efectivo_event("status_changed", int(efectivo_id), instance_data)
             else:
                 await self.emitter.emit_efectivo_event("updated", int(efectivo_id), instance_data)
+
+        await self._trigger_dashboard_update()
     
     async def _handle_usuario_event(self, event_type: str, instance_data: Dict[str, Any]):
         """Maneja eventos de usuarios."""
@@ -170,27 +277,13 @@ class WebSocketModelIntegrator:
         )
     
     async def _trigger_dashboard_update(self):
-        """Dispara una actualización del dashboard."""
-        try:
-            # Simular datos del dashboard
-            # TODO: Implementar consulta real a la base de datos
-            _dashboard_data = {
-                "total_tasks": 25,
-                "active_tasks": 12,
-                "completed_tasks": 8,
-                "pending_tasks": 5,
-                "active_efectivos": 18,
-                "available_efectivos": 15,
-                "busy_efectivos": 3,
-                "alerts_count": 2,
-                "last_updated": datetime.now().isoformat()
-            }
-            
-            await self.emitter.emit_system_event("dashboard_refresh", "Dashboard actualizado", 
-                                                "Datos del dashboard actualizados automáticamente")
-            
-        except Exception as e:
-            integration_logger.error(f"Error actualizando dashboard: {str(e)}")
+        """
+        Avisa al publicador del dashboard de que puede haber cambios.
+
+        El delta no se envía aquí: ``run_dashboard_publisher`` agrupa los
+        cambios y publica como mucho uno por intervalo.
+        """
+        self.dashboard.mark_dirty()
 
 
 # Instancia global del integrador (se inicializa con emitter cuando esté disponible)
@@ -245,11 +338,13 @@ async def notify_task_change(event_type: str, task_instance: Any):
             "fecha_actualizacion": getattr(task_instance, 'updated_at', None)
         }
         
-        # Agregar estado anterior si está disponible
+        # Agregar estado y prioridad anteriores si están disponibles
         if hasattr(task_instance, '_sa_instance_state'):
             history = task_instance._sa_instance_state.committed_state
             if history and 'estado' in history:
                 instance_data["_old_estado"] = history['estado']
+            if history and 'prioridad' in history:
+                instance_data["_old_prioridad"] = history['prioridad']
         
         integrator = get_websocket_integrator()
         if integrator:
@@ -313,6 +408,109 @@ def setup_sqlalchemy_events():
     integration_logger.info("Event listeners de SQLAlchemy configurados para WebSockets")
 
 
+# Listeners de sesión: eventos de modelo confirmados
+_PENDING_EVENTS_KEY = "websocket_model_events"
+# Modelo -> (nombre del evento, atributos con valor previo en updates)
+_TRACKED_MODELS: Dict[type, Tuple[str, Tuple[str, ...]]] = {
+    Tarea: ("Tarea", ("estado", "prioridad")),
+    Efectivo: ("Efectivo", ("estado_disponibilidad",)),
+}
+_EXTRA_FIELDS = {"Tarea": ("titulo",), "Efectivo": ()}
+
+
+def _model_event(obj: Any, event_type: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """
+    ``(event_type, model_name, instance_data)`` de una instancia del flush.
+
+    El borrado lógico (``deleted_at`` pasa a tener valor) se notifica como
+    ``delete`` y la restauración como ``insert``; los cambios en filas ya
+    borradas se ignoran. Si un atributo seguido cambió sin valor previo
+    conocido (instancia expirada) se marca ``_previous_unknown``.
+    """
+    spec = _TRACKED_MODELS.get(type(obj))
+    if spec is None:
+        return None
+    model_name, tracked = spec
+    state = inspect(obj)
+    loaded = state.dict
+    data: Dict[str, Any] = {"id": loaded.get("id")}
+    for name in _EXTRA_FIELDS[model_name] + tracked:
+        data[name] = loaded.get(name)
+
+    if event_type == "update":
+        deleted_at = state.attrs["deleted_at"].history
+        was_deleted = bool(deleted_at.deleted and deleted_at.deleted[0] is not None) or bool(
+            deleted_at.unchanged and deleted_at.unchanged[0] is not None
+        )
+        if loaded.get("deleted_at") is not None:
+            if was_deleted:
+                return None
+            event_type = "delete"
+        elif was_deleted:
+            event_type = "insert"
+        for name in tracked:
+            history = state.attrs[name].history
+            if history.added and history.deleted:
+                data[f"_old_{name}"] = history.deleted[0]
+            elif history.added:
+                data["_previous_unknown"] = True
+    elif event_type == "insert" and loaded.get("deleted_at") is not None:
+        return None
+    return event_type, model_name, data
+
+
+def _collect_model_events(session: Session, flush_context: Any) -> None:
+    """Listener ``after_flush``: acumula los eventos de tareas y efectivos hasta el commit."""
+    pending: List[Tuple[str, str, Dict[str, Any]]] = session.info.setdefault(_PENDING_EVENTS_KEY, [])
+    for objects, event_type in ((session.new, "insert"), (session.dirty, "update"), (session.deleted, "delete")):
+        for obj in objects:
+            if type(obj) not in _TRACKED_MODELS:
+                continue
+            if event_type == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            model_event = _model_event(obj, event_type)
+            if model_event is not None:
+                pending.append(model_event)
+
+
+def _dispatch_model_events(session: Session) -> None:
+    """Listener ``after_commit``: encola en el integrador los eventos confirmados."""
+    events = session.info.pop(_PENDING_EVENTS_KEY, None)
+    integrator = get_websocket_integrator()
+    if not events or integrator is None:
+        return
+    for event_type, model_name, instance_data in events:
+        try:
+            integrator.queue_event_nowait(event_type, model_name, instance_data)
+        except Exception as e:
+            integration_logger.error(f"Error encolando evento de {model_name}: {str(e)}")
+
+
+def _discard_model_events(session: Session, *args: Any) -> None:
+    session.info.pop(_PENDING_EVENTS_KEY, None)
+
+
+_SESSION_LISTENERS = (
+    ("after_flush", _collect_model_events),
+    ("after_commit", _dispatch_model_events),
+    ("after_soft_rollback", _discard_model_events),
+)
+
+
+def install_model_event_hooks() -> None:
+    """Registra en las sesiones de la aplicación los listeners que alimentan al integrador (idempotente)."""
+    for name, listener in _SESSION_LISTENERS:
+        if not event.contains(AppSession, name, listener):
+            event.listen(AppSession, name, listener)
+
+
+def uninstall_model_event_hooks() -> None:
+    """Retira los listeners de sesión del integrador."""
+    for name, listener in _SESSION_LISTENERS:
+        if event.contains(AppSession, name, listener):
+            event.remove(AppSession, name, listener)
+
+
 # Funciones para inicializar/finalizar
 async def start_websocket_integration():
     """Inicia la integración de WebSockets con modelos."""
@@ -322,7 +520,9 @@ async def start_websocket_integration():
         return
         
     integrator.enable()
+    integrator._loop = asyncio.get_running_loop()
     setup_sqlalchemy_events()
+    install_model_event_hooks()
     
     # Iniciar procesador de eventos
     integrator._processing_task = asyncio.create_task(
@@ -340,6 +540,7 @@ async def stop_websocket_integration():
         return
         
     integrator.disable()
+    uninstall_model_event_hooks()
     
     if integrator._processing_task:
         integrator._processing_task.cancel()
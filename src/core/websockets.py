@@ -9,7 +9,6 @@ Proporciona comunicación en tiempo real para:
 - Alertas y eventos críticos
 """
 
-import json
 import asyncio
 import hashlib
 import math
@@ -24,6 +23,7 @@ from fastapi import WebSocket
 from pydantic import BaseModel, Field
 
 from src.core.logging import get_logger
+from src.core.ws_fanout import BroadcastTracker, ConnectionSender, SlowConsumerPolicy, encode_frame
 
 # Intentar importar métricas si están disponibles
 try:
@@ -33,7 +33,9 @@ try:
         message_sent, 
         send_error, 
         heartbeat_completed,
-        update_user_count
+        update_user_count,
+        broadcast_fanout_completed,
+        metrics_collector,
     )
     METRICS_ENABLED = True
 except ImportError:
@@ -369,6 +371,9 @@ class EventType(str, Enum):
     # Efectivos
     EFECTIVO_STATUS_CHANGED = "efectivo_status_changed"
     EFECTIVO_LOCATION_UPDATE = "efectivo_location_update"
+
+    # Lote de eventos de varias entidades (tareas/efectivos) en un frame
+    ENTITY_BATCH = "entity_batch"
     
     # Notificaciones
     NOTIFICATION = "notification"
@@ -382,6 +387,14 @@ class EventType(str, Enum):
     PONG = "pong"
 
 
+# Eventos cuyo payload es el estado completo: el último sustituye a los pendientes
+_SNAPSHOT_EVENTS = frozenset({
+    EventType.SYSTEM_STATUS,
+    EventType.DASHBOARD_UPDATE,
+    EventType.METRICS_UPDATE,
+})
+
+
 class WSMessage(BaseModel):
     """Modelo para mensajes WebSocket con soporte para sharding de canales."""
     event_type: EventType
@@ -437,13 +450,27 @@ class WebSocketManager:
     - Métricas por canal
     """
     
-    def __init__(self, redis_url: Optional[str] = None, enable_aggressive_cleanup: bool = True):
+    def __init__(self, redis_url: Optional[str] = None, enable_aggressive_cleanup: bool = True,
+                 send_queue_size: Optional[int] = None,
+                 slow_consumer_policy: Optional[Union[str, SlowConsumerPolicy]] = None):
         # Conexiones activas: connection_id -> ConnectionInfo
         self.active_connections: Dict[str, ConnectionInfo] = {}
         
-        # Mapeos para búsqueda rápida
+        # Fan-out: cola de salida acotada + writer por conexión
+        self._senders: Dict[str, ConnectionSender] = {}
+        self.send_queue_size, self.slow_consumer_policy = self._resolve_fanout_config(
+            send_queue_size, slow_consumer_policy
+        )
+        self.slow_consumer_disconnects = 0
+        self._closed_dropped_frames = 0
+        self._closed_coalesced_frames = 0
+        
+        # Mapeos para búsqueda rápida (índices invertidos)
         self.user_connections: Dict[int, Set[str]] = {}  # user_id -> connection_ids
         self.role_connections: Dict[str, Set[str]] = {}  # role -> connection_ids
+        self.topic_connections: Dict[str, Set[str]] = {}  # topic -> connection_ids
+        self.channel_connections: Dict[str, Set[str]] = {}  # channel_name -> connection_ids
+        self.channel_type_connections: Dict[ChannelType, Set[str]] = {}  # channel_type -> connection_ids
         
         # Sistema de sharding de canales
         self.channel_router = ChannelRouter()
@@ -474,6 +501,28 @@ class WebSocketManager:
         
         ws_logger.info("WebSocketManager con sharding de canales inicializado")
     
+    @staticmethod
+    def _resolve_fanout_config(
+        send_queue_size: Optional[int],
+        slow_consumer_policy: Optional[Union[str, SlowConsumerPolicy]],
+    ) -> Tuple[int, SlowConsumerPolicy]:
+        """Resuelve tamaño de cola y política de fan-out (args > settings > defaults)."""
+        if send_queue_size is None or slow_consumer_policy is None:
+            try:
+                from config.settings import settings
+                if send_queue_size is None:
+                    send_queue_size = int(getattr(settings, "WS_SEND_QUEUE_SIZE", 256))
+                if slow_consumer_policy is None:
+                    slow_consumer_policy = getattr(settings, "WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+            except Exception:
+                pass
+        try:
+            policy = SlowConsumerPolicy(str(getattr(slow_consumer_policy, "value", slow_consumer_policy)).lower())
+        except ValueError:
+            ws_logger.warning(f"Política de consumidor lento inválida: {slow_consumer_policy}; usando drop_oldest")
+            policy = SlowConsumerPolicy.DROP_OLDEST
+        return max(1, send_queue_size or 256), policy
+    
     def _initialize_channel_stats(self):
         """Inicializa estadísticas para todos los canales configurados."""
         for channel_type, config in self.channel_router.channel_configs.items():
@@ -509,6 +558,58 @@ class WebSocketManager:
         
         return channel_name, channel_type
 
+    # --- Índices invertidos ---
+    @staticmethod
+    def _index_add(index: Dict[Any, Set[str]], key: Any, connection_id: str) -> None:
+        index.setdefault(key, set()).add(connection_id)
+
+    @staticmethod
+    def _index_discard(index: Dict[Any, Set[str]], key: Any, connection_id: str) -> None:
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.discard(connection_id)
+        if not ids:
+            del index[key]
+
+    def _select_recipients(self, candidates: Any, topic: Optional[str],
+                           exclude: Optional[Set[str]] = None) -> List[str]:
+        """Resuelve destinatarios en O(destinatarios) usando el índice de topics.
+
+        Sin topic reciben todos los candidatos; con topic, solo los suscritos.
+
+        ``candidates`` debe soportar ``in`` en O(1) (set o vista de claves).
+        Con topic se recorre el menor de los dos conjuntos.
+        """
+        if topic:
+            subscribers = self.topic_connections.get(topic)
+            if not subscribers:
+                return []
+            if len(subscribers) <= len(candidates):
+                ids = [cid for cid in subscribers if cid in candidates]
+            else:
+                ids = [cid for cid in candidates if cid in subscribers]
+        else:
+            ids = list(candidates)
+        if exclude:
+            ids = [cid for cid in ids if cid not in exclude]
+        return ids
+
+    def _add_topic(self, topic: str, connection_id: str) -> None:
+        """Indexa la suscripción y avisa al Pub/Sub del primer suscriptor local."""
+        first = topic not in self.topic_connections
+        self._index_add(self.topic_connections, topic, connection_id)
+        if first and self._pubsub is not None and hasattr(self._pubsub, "watch_topic"):
+            self._pubsub.watch_topic(topic)
+
+    def _discard_topic(self, topic: str, connection_id: str) -> None:
+        """Quita la suscripción y avisa al Pub/Sub cuando no quedan suscriptores locales."""
+        had = topic in self.topic_connections
+        self._index_discard(self.topic_connections, topic, connection_id)
+        if had and topic not in self.topic_connections and self._pubsub is not None \
+                and hasattr(self._pubsub, "unwatch_topic"):
+            self._pubsub.unwatch_topic(topic)
+
     # --- Gestión de Suscripciones (MVP) ---
     def subscribe(self, connection_id: str, topics: Set[str]) -> None:
         if not topics:
@@ -516,7 +617,11 @@ class WebSocketManager:
         ci = self.active_connections.get(connection_id)
         if not ci:
             return
-        ci.subscriptions.update(t.strip() for t in topics if isinstance(t, str) and t.strip())
+        for t in topics:
+            if isinstance(t, str) and t.strip():
+                topic = t.strip()
+                ci.subscriptions.add(topic)
+                self._add_topic(topic, connection_id)
 
     def unsubscribe(self, connection_id: str, topics: Set[str]) -> None:
         if not topics:
@@ -526,16 +631,10 @@ class WebSocketManager:
             return
         for t in list(topics):
             if isinstance(t, str):
-                ci.subscriptions.discard(t.strip())
+                topic = t.strip()
+                ci.subscriptions.discard(topic)
+                self._discard_topic(topic, connection_id)
 
-    @staticmethod
-    def _should_receive(ci: "ConnectionInfo", topic: Optional[str]) -> bool:
-        # Si no hay topic en el mensaje: todos reciben
-        if not topic:
-            return True
-        # Si hay topic, solo conexiones suscritas lo reciben
-        return topic in ci.subscriptions
-    
     async def connect(self, websocket: WebSocket, user_id: Optional[int] = None, 
                      user_role: Optional[str] = None, user_priority: int = 1) -> str:
         """
@@ -567,17 +666,29 @@ class WebSocketManager:
         connection_id = connection_info.connection_id
         self.active_connections[connection_id] = connection_info
         
+        # Writer dedicado: los envíos a esta conexión no bloquean a las demás
+        sender = ConnectionSender(
+            connection_id,
+            websocket,
+            max_queue=self.send_queue_size,
+            policy=self.slow_consumer_policy,
+            on_failure=self._on_send_failure,
+            on_overflow=self._on_slow_consumer,
+        )
+        self._senders[connection_id] = sender
+        sender.start()
+        
         # Mapear por usuario
         if user_id:
-            if user_id not in self.user_connections:
-                self.user_connections[user_id] = set()
-            self.user_connections[user_id].add(connection_id)
+            self._index_add(self.user_connections, user_id, connection_id)
         
         # Mapear por rol
         if user_role:
-            if user_role not in self.role_connections:
-                self.role_connections[user_role] = set()
-            self.role_connections[user_role].add(connection_id)
+            self._index_add(self.role_connections, user_role, connection_id)
+        
+        # Mapear por canal y tipo de canal
+        self._index_add(self.channel_connections, channel_name, connection_id)
+        self._index_add(self.channel_type_connections, channel_type, connection_id)
         
         # Actualizar estadísticas del canal
         self._update_channel_stats(channel_name, 1)
@@ -638,16 +749,18 @@ class WebSocketManager:
         
         # Limpiar mapeos
         if user_id:
-            if user_id in self.user_connections:
-                self.user_connections[user_id].discard(connection_id)
-                if not self.user_connections[user_id]:
-                    del self.user_connections[user_id]
+            self._index_discard(self.user_connections, user_id, connection_id)
         
         if user_role:
-            if user_role in self.role_connections:
-                self.role_connections[user_role].discard(connection_id)
-                if not self.role_connections[user_role]:
-                    del self.role_connections[user_role]
+            self._index_discard(self.role_connections, user_role, connection_id)
+        
+        for topic in connection_info.subscriptions:
+            self._discard_topic(topic, connection_id)
+        
+        if assigned_channel:
+            self._index_discard(self.channel_connections, assigned_channel, connection_id)
+        if connection_info.channel_type:
+            self._index_discard(self.channel_type_connections, connection_info.channel_type, connection_id)
         
         # Actualizar estadísticas del canal
         if assigned_channel:
@@ -655,6 +768,7 @@ class WebSocketManager:
         
         # Remover conexión
         del self.active_connections[connection_id]
+        sender = self._senders.pop(connection_id, None)
         
         # Registrar métricas de desconexión si están disponibles
         if METRICS_ENABLED:
@@ -674,6 +788,12 @@ class WebSocketManager:
             assigned_channel=assigned_channel,
             total_connections=len(self.active_connections)
         )
+        
+        # Detener writer y descartar frames pendientes
+        if sender is not None:
+            self._closed_dropped_frames += sender.dropped
+            self._closed_coalesced_frames += sender.coalesced
+            await sender.close()
     
     def _update_channel_stats(self, channel_name: str, delta: int):
         """Actualiza las estadísticas de un canal."""
@@ -684,58 +804,142 @@ class WebSocketManager:
         else:
             ws_logger.warning(f"Canal no encontrado en estadísticas: {channel_name}")
     
+    @staticmethod
+    def _coalesce_key(event_type: Any, topic: Optional[str]) -> Optional[str]:
+        """Clave con la que la política COALESCE sustituye frames pendientes.
+
+        Solo los eventos que llevan el estado completo (snapshots) se pueden
+        sustituir; los de entidad (tareas, efectivos) no llevan clave, porque
+        un frame de una tarea reemplazaría el pendiente de otra.
+        """
+        if event_type not in _SNAPSHOT_EVENTS:
+            return None
+        return f"{getattr(event_type, 'value', event_type)}:{topic or ''}"
+    
+    def _new_broadcast_tracker(self) -> BroadcastTracker:
+        return BroadcastTracker(broadcast_fanout_completed if METRICS_ENABLED else None)
+    
+    @staticmethod
+    def _encode_message(message: WSMessage) -> str:
+        """Construye el frame de texto de un mensaje (una vez por envío/broadcast)."""
+        message_dict = message.model_dump(mode='json')
+        # Convertir datetime a string para JSON
+        message_dict['timestamp'] = message.timestamp.isoformat()
+        return encode_frame(message_dict)
+    
+    def _enqueue_frame(self, connection_id: str, frame: str, event_type: EventType, key: Optional[str],
+                       tracker: Optional[BroadcastTracker] = None) -> bool:
+        """Encola un frame ya serializado en el writer de la conexión."""
+        sender = self._senders.get(connection_id)
+        if sender is None or not sender.enqueue(frame, key, tracker):
+            return False
+
+        # Métricas: ignorar ACK y PING para total_messages_sent
+        if event_type not in (EventType.CONNECTION_ACK, EventType.PING):
+            self.total_messages_sent += 1
+            # Registrar en métricas Prometheus si están habilitadas
+            if METRICS_ENABLED:
+                message_sent(is_broadcast=False)
+        
+        return True
+    
+    def _fan_out(self, connection_ids: Any, message: WSMessage, frame: Optional[str] = None) -> int:
+        """Encola ``message`` para cada conexión de ``connection_ids`` sin esperar a los envíos.
+
+        ``connection_ids`` ya debe estar filtrado por topic (``_select_recipients``).
+
+        El frame se serializa una sola vez y se comparte entre destinatarios.
+        Los writers de cada conexión envían en paralelo; la latencia de entrega
+        de cada destinatario se agrega por broadcast (p50/p99).
+        """
+        if frame is None:
+            try:
+                frame = self._encode_message(message)
+            except Exception as e:
+                ws_logger.error(f"Error serializando mensaje {message.message_id}: {str(e)}")
+                return 0
+        return self._fan_out_frame(connection_ids, frame, message.event_type, message.topic)
+    
+    def _fan_out_frame(self, connection_ids: Any, frame: str, event_type: EventType,
+                       topic: Optional[str]) -> int:
+        tracker = self._new_broadcast_tracker()
+        key = self._coalesce_key(event_type, topic)
+        sent_count = 0
+        for connection_id in connection_ids:
+            if self._enqueue_frame(connection_id, frame, event_type, key, tracker):
+                sent_count += 1
+        tracker.seal()
+        return sent_count
+    
+    async def _on_send_failure(self, connection_id: str, error: Exception) -> None:
+        """Callback del writer cuando ``send_text`` falla."""
+        ws_logger.error(
+            f"Error enviando mensaje a conexión {connection_id}: {str(error)}"
+        )
+        # Desconectar conexión problemática
+        await self.disconnect(connection_id)
+        self.total_send_errors += 1
+        
+        # Registrar error en métricas Prometheus
+        if METRICS_ENABLED:
+            send_error()
+    
+    async def _on_slow_consumer(self, connection_id: str) -> None:
+        """Callback del writer cuando la política DISCONNECT desborda la cola."""
+        ci = self.active_connections.get(connection_id)
+        self.slow_consumer_disconnects += 1
+        ws_logger.warning(
+            "Conexión desconectada por consumidor lento",
+            connection_id=connection_id,
+            send_queue_size=self.send_queue_size
+        )
+        await self.disconnect(connection_id)
+        if ci is not None:
+            try:
+                # 1013: Try Again Later
+                await ci.websocket.close(code=1013)
+            except Exception:
+                pass
+        if METRICS_ENABLED:
+            send_error(error_type="slow_consumer")
+    
     async def send_to_connection(self, connection_id: str, message: WSMessage) -> bool:
         """
         Envía un mensaje a una conexión específica.
         
+        El mensaje se encola en el writer de la conexión; los errores de envío
+        se gestionan de forma asíncrona desconectando la conexión.
+        
         Args:
             connection_id: ID de la conexión
             message: Mensaje a enviar
             
         Returns:
-            bool: True si se envió exitosamente
+            bool: True si se encoló exitosamente
         """
         if connection_id not in self.active_connections:
             ws_logger.warning(f"Conexión no encontrada: {connection_id}")
             return False
         
-        connection_info = self.active_connections[connection_id]
-        
         try:
-            message_dict = message.model_dump(mode='json')
-            # Convertir datetime a string para JSON
-            message_dict['timestamp'] = message.timestamp.isoformat()
-            
-            await connection_info.websocket.send_text(json.dumps(message_dict))
-            
-            ws_logger.debug(
-                f"Mensaje enviado a conexión {connection_id}",
-                event_type=message.event_type,
-                message_id=message.message_id
-            )
-
-            # Métricas: ignorar ACK y PING para total_messages_sent
-            if message.event_type not in (EventType.CONNECTION_ACK, EventType.PING):
-                self.total_messages_sent += 1
-                # Registrar en métricas Prometheus si están habilitadas
-                if METRICS_ENABLED:
-                    message_sent(is_broadcast=False)
-            
-            return True
-            
+            frame = self._encode_message(message)
         except Exception as e:
             ws_logger.error(
-                f"Error enviando mensaje a conexión {connection_id}: {str(e)}"
+                f"Error serializando mensaje para conexión {connection_id}: {str(e)}"
             )
-            # Desconectar conexión problemática
-            await self.disconnect(connection_id)
-            self.total_send_errors += 1
-            
-            # Registrar error en métricas Prometheus
-            if METRICS_ENABLED:
-                send_error()
-                
             return False
+        
+        if not self._enqueue_frame(connection_id, frame, message.event_type,
+                                   self._coalesce_key(message.event_type, message.topic)):
+            return False
+        
+        ws_logger.debug(
+            "Mensaje encolado",
+            connection_id=connection_id,
+            event_type=message.event_type,
+            message_id=message.message_id
+        )
+        return True
     
     async def send_to_user(self, user_id: int, message: WSMessage) -> int:
         """
@@ -751,15 +955,8 @@ class WebSocketManager:
         if user_id not in self.user_connections:
             return 0
         
-        connection_ids = self.user_connections[user_id].copy()
-        sent_count = 0
-        
-        for connection_id in connection_ids:
-            ci = self.active_connections.get(connection_id)
-            if not ci:
-                continue
-            if self._should_receive(ci, message.topic) and await self.send_to_connection(connection_id, message):
-                sent_count += 1
+        recipients = self._select_recipients(self.user_connections[user_id], message.topic)
+        sent_count = self._fan_out(recipients, message)
         if sent_count:
             self.total_broadcasts += 1
             self.last_broadcast_at = datetime.now()
@@ -779,15 +976,8 @@ class WebSocketManager:
         if role not in self.role_connections:
             return 0
         
-        connection_ids = self.role_connections[role].copy()
-        sent_count = 0
-        
-        for connection_id in connection_ids:
-            ci = self.active_connections.get(connection_id)
-            if not ci:
-                continue
-            if self._should_receive(ci, message.topic) and await self.send_to_connection(connection_id, message):
-                sent_count += 1
+        recipients = self._select_recipients(self.role_connections[role], message.topic)
+        sent_count = self._fan_out(recipients, message)
         # Actualizar métricas si hubo envíos
         if sent_count:
             self.total_broadcasts += 1
@@ -809,19 +999,17 @@ class WebSocketManager:
         Returns:
             int: Número de conexiones a las que se envió
         """
-        exclude_connections = exclude_connections or set()
-        connection_ids = [
-            cid for cid in self.active_connections.keys() 
-            if cid not in exclude_connections
-        ]
+        connection_ids = self._select_recipients(
+            self.active_connections.keys(), message.topic, exclude_connections
+        )
         
-        sent_count = 0
-        for connection_id in connection_ids:
-            ci = self.active_connections.get(connection_id)
-            if not ci:
-                continue
-            if self._should_receive(ci, message.topic) and await self.send_to_connection(connection_id, message):
-                sent_count += 1
+        try:
+            frame = self._encode_message(message)
+        except Exception as e:
+            ws_logger.error(f"Error serializando broadcast {message.message_id}: {str(e)}")
+            return 0
+        
+        sent_count = self._fan_out(connection_ids, message, frame)
         # Actualizar métricas si hubo envíos
         if sent_count:
             self.total_broadcasts += 1
@@ -829,10 +1017,11 @@ class WebSocketManager:
             # Registrar en métricas Prometheus
             if METRICS_ENABLED:
                 message_sent(is_broadcast=True)
-        # Publicar en pub/sub para otros workers (si está configurado)
+        # Publicar en pub/sub para otros workers (si está configurado),
+        # reutilizando el frame ya serializado
         try:
             if self._pubsub is not None and message.event_type != EventType.PING:
-                await self._pubsub.publish(message.model_dump(mode='json'))
+                await self._pubsub.publish_frame(frame, message.event_type.value, message.topic)
         except Exception:
             # No afectar envío local por errores de pub/sub
             pass
@@ -855,21 +1044,25 @@ class WebSocketManager:
         if "timestamp" not in message_dict:
             message_dict["timestamp"] = datetime.now().isoformat()
 
-        exclude_connections: Set[str] = set()
-        topic = message_dict.get("topic")
-        sent_count = 0
-        for cid, info in list(self.active_connections.items()):
-            if cid in exclude_connections:
-                continue
-            try:
-                if self._should_receive(info, topic):
-                    await info.websocket.send_text(json.dumps(message_dict))
-                    if evt not in (EventType.CONNECTION_ACK, EventType.PING):
-                        self.total_messages_sent += 1
-                    sent_count += 1
-            except Exception:
-                await self.disconnect(cid)
-                self.total_send_errors += 1
+        return await self.broadcast_local_frame(encode_frame(message_dict), evt, message_dict.get("topic"))
+
+    async def broadcast_local_frame(self, frame: str, event_type: Union[EventType, str],
+                                    topic: Optional[str] = None) -> int:
+        """Broadcast local de un frame ya serializado (usado por pub/sub) sin republicar.
+
+        El frame se reenvía tal cual a cada conexión, sin decodificar ni
+        volver a codificar el payload.
+        """
+        try:
+            evt = EventType(event_type)
+        except ValueError:
+            return 0
+        if evt == EventType.PING:
+            # Evitar meter PINGs desde pub/sub
+            return 0
+
+        recipients = self._select_recipients(self.active_connections.keys(), topic)
+        sent_count = self._fan_out_frame(recipients, frame, evt, topic)
         if sent_count:
             self.total_broadcasts += 1
             self.last_broadcast_at = datetime.now()
@@ -921,18 +1114,11 @@ class WebSocketManager:
         Returns:
             int: Número de conexiones a las que se envió
         """
-        connection_ids = [
-            cid for cid, info in self.active_connections.items()
-            if info.assigned_channel == channel_name
-        ]
+        connection_ids = self._select_recipients(
+            self.channel_connections.get(channel_name, set()), message.topic
+        )
         
-        sent_count = 0
-        for connection_id in connection_ids:
-            ci = self.active_connections.get(connection_id)
-            if not ci:
-                continue
-            if self._should_receive(ci, message.topic) and await self.send_to_connection(connection_id, message):
-                sent_count += 1
+        sent_count = self._fan_out(connection_ids, message)
         
         if sent_count:
             self.total_broadcasts += 1
@@ -953,18 +1139,11 @@ class WebSocketManager:
         Returns:
             int: Número de conexiones a las que se envió
         """
-        connection_ids = [
-            cid for cid, info in self.active_connections.items()
-            if info.channel_type == channel_type
-        ]
+        connection_ids = self._select_recipients(
+            self.channel_type_connections.get(channel_type, set()), message.topic
+        )
         
-        sent_count = 0
-        for connection_id in connection_ids:
-            ci = self.active_connections.get(connection_id)
-            if not ci:
-                continue
-            if self._should_receive(ci, message.topic) and await self.send_to_connection(connection_id, message):
-                sent_count += 1
+        sent_count = self._fan_out(connection_ids, message)
         
         if sent_count:
             self.total_broadcasts += 1
@@ -984,20 +1163,17 @@ class WebSocketManager:
         metrics = {}
         for channel_name, channel_info in self.channel_stats.items():
             # Contar conexiones activas en este canal
-            active_connections = [
-                cid for cid, info in self.active_connections.items()
-                if info.assigned_channel == channel_name
-            ]
+            active_count = len(self.channel_connections.get(channel_name, ()))
             
             metrics[channel_name] = {
                 "channel_type": channel_info.channel_type.value,
                 "user_capacity": channel_info.user_capacity,
-                "current_load": len(active_connections),
+                "current_load": active_count,
                 "utilization_percent": channel_info.utilization,
                 "is_overloaded": channel_info.is_overloaded,
                 "is_underutilized": channel_info.is_underutilized,
                 "priority_level": channel_info.priority_level,
-                "active_connections": len(active_connections)
+                "active_connections": active_count
             }
         
         return metrics
@@ -1010,13 +1186,10 @@ class WebSocketManager:
             Dict con estadísticas de sharding
         """
         # Contar conexiones por tipo de canal
-        channel_type_counts = {}
-        for channel_type in ChannelType:
-            channel_type_counts[channel_type.value] = 0
-        
-        for info in self.active_connections.values():
-            if info.channel_type:
-                channel_type_counts[info.channel_type.value] += 1
+        channel_type_counts = {
+            channel_type.value: len(self.channel_type_connections.get(channel_type, ()))
+            for channel_type in ChannelType
+        }
         
         return {
             "total_connections": len(self.active_connections),
@@ -1066,14 +1239,11 @@ class WebSocketManager:
         """Obtiene matriz de utilización de canales para análisis."""
         matrix = {}
         for channel_name, channel_info in self.channel_stats.items():
-            connections = [
-                cid for cid, info in self.active_connections.items()
-                if info.assigned_channel == channel_name
-            ]
-            utilization = (len(connections) / channel_info.user_capacity) * 100
+            connection_count = len(self.channel_connections.get(channel_name, ()))
+            utilization = (connection_count / channel_info.user_capacity) * 100
             matrix[channel_name] = {
                 "utilization": utilization,
-                "connection_count": len(connections),
+                "connection_count": connection_count,
                 "capacity": channel_info.user_capacity
             }
         return matrix
@@ -1365,6 +1535,49 @@ class WebSocketManager:
         
         return suggestions
 
+    def get_index_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene tamaños de los índices invertidos de routing.
+        
+        Returns:
+            Dict con número de claves y entradas por índice
+        """
+        indexes = {
+            "users": self.user_connections,
+            "roles": self.role_connections,
+            "topics": self.topic_connections,
+            "channels": self.channel_connections,
+            "channel_types": self.channel_type_connections,
+        }
+        stats: Dict[str, Any] = {
+            name: {
+                "keys": len(index),
+                "entries": sum(len(ids) for ids in index.values()),
+            }
+            for name, index in indexes.items()
+        }
+        stats["topic_subscribers"] = {topic: len(ids) for topic, ids in self.topic_connections.items()}
+        return stats
+
+    def get_fanout_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas del motor de fan-out (colas por conexión).
+        
+        Returns:
+            Dict con profundidad de colas, descartes y latencias p50/p99
+        """
+        depths = [sender.queue_depth for sender in self._senders.values()]
+        return {
+            "slow_consumer_policy": self.slow_consumer_policy.value,
+            "send_queue_size": self.send_queue_size,
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_frames": self._closed_dropped_frames + sum(s.dropped for s in self._senders.values()),
+            "coalesced_frames": self._closed_coalesced_frames + sum(s.coalesced for s in self._senders.values()),
+            "slow_consumer_disconnects": self.slow_consumer_disconnects,
+            "latency": metrics_collector.get_fanout_stats() if METRICS_ENABLED else {},
+        }
+
     def get_stats(self) -> Dict[str, Any]:
         """
         Obtiene estadísticas completas de conexiones WebSocket y sharding.
@@ -1389,8 +1602,10 @@ class WebSocketManager:
             }
         }
         
-        # Añadir estadísticas de sharding
+        # Añadir estadísticas de sharding y fan-out
         base_stats["sharding"] = self.get_sharding_stats()
+        base_stats["fanout"] = self.get_fanout_stats()
+        base_stats["indexes"] = self.get_index_stats()
         
         # Añadir estadísticas de cleanup si está habilitado
         if self.enable_aggressive_cleanup:
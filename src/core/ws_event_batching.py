@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Colas acotadas con coalescencia por entidad para los eventos WebSocket.
+
+``WebSocketModelIntegrator`` y ``WebSocketEventEmitter`` encolan un evento
+por cambio; una importación masiva o una ráfaga de actualizaciones de
+tareas generaba miles de broadcasts individuales y colas sin límite.
+
+``CoalescingEventQueue`` guarda un evento pendiente por clave (p. ej.
+``("task", 42)``): si llega otro para la misma clave se fusiona con el
+pendiente (por defecto gana el último estado) y conserva su posición y su
+instante de encolado, de modo que la latencia medida es la del primer
+cambio. El consumidor saca lotes con ``get_batch``: espera la ventana de
+agrupación y devuelve hasta ``max_batch`` eventos. Tras entregarlos (p. ej.
+una vez enviado el broadcast) llama a ``task_done`` con cuántos fueron, y
+en ese momento se registra la latencia.
+
+Con la cola llena y una clave nueva (``WS_EVENT_OVERFLOW_POLICY``):
+
+- ``block``: el productor asíncrono espera hueco hasta ``put_timeout``
+  segundos (contrapresión); si no lo hay, o el productor es síncrono, se
+  degrada;
+- ``drop_oldest``: se descarta el evento pendiente más antiguo;
+- ``degrade``: se descarta el evento nuevo.
+
+El tipo de entidad del evento descartado se marca para resincronizar: el
+siguiente lote lo indica (``pop_resync``) y los clientes recargan esa
+entidad en lugar de recibir cada cambio.
+
+Profundidad, eventos por resultado, tamaño de lote y latencia de extremo a
+extremo (encolado -> entrega) se exportan a Prometheus por cola.
+"""
+
+import asyncio
+import time
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from enum import Enum
+from itertools import count
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+from src.core.logging import get_logger
+from src.shared.latency_histogram import LatencyHistogram, prometheus_histogram_buckets
+
+batching_logger = get_logger("websockets.batching")
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Fusión de un evento pendiente con uno nuevo de la misma clave; None = ambos se anulan
+MergeFn = Callable[[Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class OverflowPolicy(str, Enum):
+    """Qué hacer cuando la cola está llena y llega una clave nueva."""
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DEGRADE = "degrade"
+
+
+@dataclass(frozen=True)
+class BatchingConfig:
+    """Parámetros de agrupación y límites de las colas de eventos."""
+    window_seconds: float = 0.05
+    max_batch: int = 200
+    max_pending: int = 10_000
+    policy: OverflowPolicy = OverflowPolicy.BLOCK
+    put_timeout: float = 0.5
+
+
+def resolve_batching_config() -> BatchingConfig:
+    """Configuración desde settings (WS_EVENT_*), con valores por defecto si no hay settings."""
+    defaults = BatchingConfig()
+    try:
+        from config.settings import settings
+    except Exception:
+        return defaults
+    raw_policy = getattr(settings, "WS_EVENT_OVERFLOW_POLICY", defaults.policy.value)
+    try:
+        policy = OverflowPolicy(str(getattr(raw_policy, "value", raw_policy)).lower())
+    except ValueError:
+        batching_logger.warning(f"Política de desbordamiento inválida: {raw_policy}; usando block")
+        policy = OverflowPolicy.BLOCK
+    return BatchingConfig(
+        window_seconds=max(0.0, float(getattr(settings, "WS_EVENT_BATCH_WINDOW_MS", 50.0)) / 1000),
+        max_batch=max(1, int(getattr(settings, "WS_EVENT_MAX_BATCH", defaults.max_batch))),
+        max_pending=max(1, int(getattr(settings, "WS_EVENT_QUEUE_SIZE", defaults.max_pending))),
+        policy=policy,
+        put_timeout=float(getattr(settings, "WS_EVENT_ENQUEUE_TIMEOUT_SECONDS", defaults.put_timeout)),
+    )
+
+
+def last_wins(pending: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    return new
+
+
+class CoalescingEventQueue:
+    """Cola acotada de eventos con un pendiente por clave y extracción por lotes."""
+
+    def __init__(
+        self,
+        name: str,
+        config: Optional[BatchingConfig] = None,
+        merge: MergeFn = last_wins,
+    ) -> None:
+        self.name = name
+        self.config = config or resolve_batching_config()
+        self.merge = merge
+        # clave -> [evento, instante de encolado (perf_counter), tipo de entidad]
+        self._pending: "OrderedDict[Hashable, List[Any]]" = OrderedDict()
+        self._unique = count()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._resync: Set[str] = set()
+        # Instantes de encolado de los eventos extraídos pendientes de ``task_done``
+        self._unacked: Deque[float] = deque(maxlen=self.config.max_pending)
+        # Contadores (exportados por EventQueueCollector)
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.producer_waits = 0
+        self.batches = 0
+        self.batch_sizes = [0] * len(BATCH_SIZE_BUCKETS)
+        self.batch_size_sum = 0
+        self.latency = LatencyHistogram()
+        _queues[name] = self
+
+    # --- API compatible con asyncio.Queue (un evento) ---
+    def qsize(self) -> int:
+        return len(self._pending)
+
+    def empty(self) -> bool:
+        return not self._pending
+
+    def full(self) -> bool:
+        return len(self._pending) >= self.config.max_pending
+
+    def get_nowait(self) -> Dict[str, Any]:
+        if not self._pending:
+            raise asyncio.QueueEmpty
+        return self._take(1)[0]
+
+    async def get(self) -> Dict[str, Any]:
+        while not self._pending:
+            await self._not_empty.wait()
+        return self._take(1)[0]
+
+    # --- Productores ---
+    def put_nowait(self, event: Dict[str, Any], key: Optional[Hashable] = None, kind: str = "event") -> bool:
+        """
+        Encola sin esperar, fusionando con el pendiente de la misma clave.
+
+        Args:
+            event: Evento a encolar
+            key: Clave de coalescencia (None = no se fusiona con ningún otro)
+            kind: Tipo de entidad, para resincronizar si el evento se pierde
+
+        Returns:
+            False si el evento se descartó por la política de desbordamiento
+        """
+        if key is None:
+            key = ("_unique", next(self._unique))
+        entry = self._pending.get(key)
+        if entry is not None:
+            merged = self.merge(entry[0], event)
+            self.coalesced += 1
+            if merged is None:
+                del self._pending[key]
+                self._update_flags()
+            else:
+                entry[0] = merged
+            return True
+
+        if self.full():
+            if self.config.policy is OverflowPolicy.DROP_OLDEST:
+                _, oldest = self._pending.popitem(last=False)
+                self.dropped += 1
+                self._resync.add(oldest[2])
+            else:
+                self.dropped += 1
+                self._resync.add(kind)
+                return False
+
+        self._pending[key] = [event, time.perf_counter(), kind]
+        self.enqueued += 1
+        self._update_flags()
+        return True
+
+    async def put(self, event: Dict[str, Any], key: Optional[Hashable] = None, kind: str = "event") -> bool:
+        """Como ``put_nowait``, pero con política ``block`` espera hueco hasta ``put_timeout``."""
+        if (
+            self.config.policy is OverflowPolicy.BLOCK
+            and self.full()
+            and (key is None or key not in self._pending)
+        ):
+            self.producer_waits += 1
+            deadline = time.perf_counter() + self.config.put_timeout
+            while self.full():
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._not_full.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+        return self.put_nowait(event, key, kind)
+
+    # --- Consumidor ---
+    async def get_batch(self, window: Optional[float] = None, max_batch: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Espera al primer evento, deja pasar la ventana de agrupación (salvo
+        que ya haya un lote completo) y devuelve hasta ``max_batch`` eventos
+        en orden de primer encolado.
+        """
+        window = self.config.window_seconds if window is None else window
+        max_batch = max_batch or self.config.max_batch
+        while not self._pending:
+            await self._not_empty.wait()
+        if window > 0 and len(self._pending) < max_batch:
+            await asyncio.sleep(window)
+        return self._take(max_batch)
+
+    def task_done(self, n: int = 1) -> None:
+        """
+        Indica que los ``n`` eventos extraídos más antiguos ya se entregaron
+        y registra su latencia de encolado a entrega.
+        """
+        now = time.perf_counter()
+        for _ in range(min(n, len(self._unacked))):
+            self.latency.record(now - self._unacked.popleft())
+
+    def mark_resync(self, kind: str) -> None:
+        """Marca un tipo de entidad para resincronizar (eventos perdidos aguas arriba)."""
+        self._resync.add(kind)
+
+    def pop_resync(self) -> Set[str]:
+        """Tipos de entidad con eventos descartados desde la última llamada."""
+        resync, self._resync = self._resync, set()
+        return resync
+
+    def _take(self, limit: int) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+        while self._pending and len(events) < limit:
+            _, (event, enqueued_at, _kind) = self._pending.popitem(last=False)
+            self._unacked.append(enqueued_at)
+            events.append(event)
+        self._update_flags()
+        if events:
+            self.delivered += len(events)
+            self.batches += 1
+            self.batch_size_sum += len(events)
+            for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+                if len(events) <= bound:
+                    self.batch_sizes[i] += 1
+                    break
+        return events
+
+    def _update_flags(self) -> None:
+        if self._pending:
+            self._not_empty.set()
+        else:
+            self._not_empty.clear()
+        if self.full():
+            self._not_full.clear()
+        else:
+            self._not_full.set()
+
+
+# Colas vivas por nombre (la última creada con cada nombre)
+_queues: "weakref.WeakValueDictionary[str, CoalescingEventQueue]" = weakref.WeakValueDictionary()
+
+
+def get_queue_stats() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas de las colas de eventos WebSocket por nombre."""
+    return {
+        name: {
+            "depth": queue.qsize(),
+            "enqueued": queue.enqueued,
+            "coalesced": queue.coalesced,
+            "dropped": queue.dropped,
+            "delivered": queue.delivered,
+            "producer_waits": queue.producer_waits,
+            "batches": queue.batches,
+            "avg_batch_size": queue.batch_size_sum / queue.batches if queue.batches else 0.0,
+            "latency_p99_ms": queue.latency.percentile(0.99) * 1000,
+            "policy": queue.config.policy.value,
+        }
+        for name, queue in list(_queues.items())
+    }
+
+
+class EventQueueCollector:
+    """Exporta profundidad, resultados, tamaño de lote y latencia de cada cola."""
+
+    def collect(self) -> Iterator[Any]:
+        queues: List[Tuple[str, CoalescingEventQueue]] = sorted(_queues.items())
+        if not queues:
+            return
+        depth = GaugeMetricFamily("ggrt_ws_event_queue_depth", "Eventos WebSocket pendientes", labels=["queue"])
+        events = CounterMetricFamily(
+            "ggrt_ws_events", "Eventos WebSocket por resultado de la cola", labels=["queue", "outcome"]
+        )
+        waits = CounterMetricFamily(
+            "ggrt_ws_event_producer_waits", "Encolados que encontraron la cola llena", labels=["queue"]
+        )
+        sizes = HistogramMetricFamily("ggrt_ws_event_batch_size", "Eventos por lote", labels=["queue"])
+        latency = HistogramMetricFamily(
+            "ggrt_ws_event_latency_seconds", "Latencia de encolado a entrega confirmada", labels=["queue"]
+        )
+        for name, queue in queues:
+            depth.add_metric([name], queue.qsize())
+            for outcome, value in (
+                ("enqueued", queue.enqueued),
+                ("coalesced", queue.coalesced),
+                ("dropped", queue.dropped),
+                ("delivered", queue.delivered),
+            ):
+                events.add_metric([name, outcome], value)
+            waits.add_metric([name], queue.producer_waits)
+            cumulative, buckets = 0, []
+            for bound, n in zip(BATCH_SIZE_BUCKETS, queue.batch_sizes):
+                cumulative += n
+                buckets.append((str(bound), cumulative))
+            buckets.append(("+Inf", queue.batches))
+            sizes.add_metric([name], buckets, queue.batch_size_sum)
+            latency.add_metric([name], prometheus_histogram_buckets(queue.latency), queue.latency.sum)
+        yield depth
+        yield events
+        yield waits
+        yield sizes
+        yield latency
+
+
+try:
+    REGISTRY.register(EventQueueCollector())
+except ValueError:
+    # Ya registrado (recarga del módulo)
+    pass
@@ -0,0 +1,237 @@
+"""
+Motor de fan-out para WebSockets.
+
+Cada conexión tiene una cola de salida acotada y una tarea escritora propia,
+de modo que un cliente lento no bloquea al resto durante un broadcast. Cuando
+la cola de una conexión se llena se aplica una política de consumidor lento
+configurable (descartar el más antiguo, coalescer o desconectar).
+
+Los frames se serializan una sola vez por broadcast (``encode_frame``) y el
+mismo buffer se reutiliza para todos los destinatarios.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple
+
+from src.core.logging import get_logger
+
+fanout_logger = get_logger("websockets.fanout")
+
+# orjson es opcional: si está instalado se usa para serializar frames
+try:
+    import orjson
+
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    ORJSON_ENABLED = True
+except ImportError:  # pragma: no cover - depende del entorno
+    ORJSON_ENABLED = False
+
+
+def encode_frame(payload: Any) -> str:
+    """Serializa un payload JSON a texto listo para ``send_text``."""
+    if ORJSON_ENABLED:
+        return orjson.dumps(payload, option=_ORJSON_OPTIONS).decode("utf-8")
+    return json.dumps(payload)
+
+
+class SlowConsumerPolicy(str, Enum):
+    """Qué hacer cuando la cola de salida de una conexión está llena."""
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+class BroadcastTracker:
+    """Acumula latencias de entrega de un broadcast y las reporta al completar.
+
+    Se crea un tracker por broadcast; cada frame encolado lo referencia y al
+    entregarse (o descartarse) se liquida. Cuando el broadcast está sellado y
+    no quedan frames pendientes se invoca ``on_complete`` con las latencias.
+    """
+
+    __slots__ = ("started_at", "pending", "latencies", "_sealed", "_on_complete")
+
+    def __init__(self, on_complete: Optional[Callable[[List[float]], None]] = None):
+        self.started_at = time.perf_counter()
+        self.pending = 0
+        self.latencies: List[float] = []
+        self._sealed = False
+        self._on_complete = on_complete
+
+    def add(self) -> None:
+        self.pending += 1
+
+    def seal(self) -> None:
+        """Marca que no se encolarán más frames para este broadcast."""
+        self._sealed = True
+        self._maybe_complete()
+
+    def delivered(self) -> None:
+        self.latencies.append(time.perf_counter() - self.started_at)
+        self._settle()
+
+    def discarded(self) -> None:
+        self._settle()
+
+    def _settle(self) -> None:
+        self.pending -= 1
+        self._maybe_complete()
+
+    def _maybe_complete(self) -> None:
+        if self._sealed and self.pending <= 0 and self._on_complete is not None:
+            callback, self._on_complete = self._on_complete, None
+            if self.latencies:
+                callback(self.latencies)
+
+
+# (payload, clave de coalescencia, tracker del broadcast)
+_Frame = Tuple[str, Optional[str], Optional[BroadcastTracker]]
+
+
+class ConnectionSender:
+    """Cola de salida acotada + tarea escritora para una conexión WebSocket."""
+
+    def __init__(
+        self,
+        connection_id: str,
+        websocket: Any,
+        max_queue: int = 256,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_OLDEST,
+        on_failure: Optional[Callable[[str, Exception], Awaitable[None]]] = None,
+        on_overflow: Optional[Callable[[str], Awaitable[None]]] = None,
+    ):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self._on_failure = on_failure
+        self._on_overflow = on_overflow
+        self._queue: Deque[_Frame] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.closed = False
+        # Contadores de la política de consumidor lento
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        """Arranca la tarea escritora en el loop actual."""
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._writer_loop())
+
+    def enqueue(self, payload: str, key: Optional[str] = None,
+                tracker: Optional[BroadcastTracker] = None) -> bool:
+        """Encola un frame sin bloquear.
+
+        Returns:
+            bool: False si la conexión está cerrada o fue desconectada por
+            exceder su cola (política DISCONNECT).
+        """
+        if self.closed:
+            return False
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                self._close_pending()
+                self._spawn(self._on_overflow, self.connection_id)
+                return False
+            if self.policy == SlowConsumerPolicy.COALESCE and key is not None and self._replace(key, payload, tracker):
+                self.coalesced += 1
+                return True
+            _, _, old_tracker = self._queue.popleft()
+            self.dropped += 1
+            if old_tracker is not None:
+                old_tracker.discarded()
+
+        if tracker is not None:
+            tracker.add()
+        self._queue.append((payload, key, tracker))
+        self._wake()
+        return True
+
+    def _replace(self, key: str, payload: str, tracker: Optional[BroadcastTracker]) -> bool:
+        """Sustituye el frame pendiente más reciente con la misma clave."""
+        for idx in range(len(self._queue) - 1, -1, -1):
+            _, queued_key, old_tracker = self._queue[idx]
+            if queued_key == key:
+                if tracker is not None:
+                    tracker.add()
+                self._queue[idx] = (payload, key, tracker)
+                if old_tracker is not None:
+                    old_tracker.discarded()
+                return True
+        return False
+
+    def _wake(self) -> None:
+        try:
+            same_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            same_loop = False
+        if same_loop:
+            self._wakeup.set()
+        elif self._loop is not None:
+            # Broadcast disparado desde otro loop/hilo (p.ej. TestClient)
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _spawn(self, callback: Optional[Callable[..., Awaitable[None]]], *args: Any) -> None:
+        if callback is None or self._loop is None:
+            return
+        loop = self._loop
+        loop.call_soon_threadsafe(lambda: loop.create_task(callback(*args)))
+
+    def _close_pending(self) -> None:
+        self.closed = True
+        while self._queue:
+            _, _, tracker = self._queue.popleft()
+            if tracker is not None:
+                tracker.discarded()
+
+    async def _writer_loop(self) -> None:
+        tracker: Optional[BroadcastTracker] = None
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                payload, _, tracker = self._queue.popleft()
+                await self.websocket.send_text(payload)
+                if tracker is not None:
+                    tracker.delivered()
+                tracker = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if tracker is not None:
+                tracker.discarded()
+            self._close_pending()
+            if self._on_failure is not None:
+                await self._on_failure(self.connection_id, e)
+
+    async def close(self) -> None:
+        """Detiene la tarea escritora y descarta los frames pendientes."""
+        self._close_pending()
+        task = self._task
+        self._task = None
+        if task is None or task is asyncio.current_task() or task.done():
+            return
+        if task.get_loop() is not asyncio.get_running_loop():
+            task.get_loop().call_soon_threadsafe(task.cancel)
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:  # pragma: no cover - defensivo
+            fanout_logger.warning(f"Error cerrando writer de {self.connection_id}: {e}")
@@ -2,36 +2,118 @@
 Redis Pub/Sub bridge para broadcast cross-worker de WebSockets.
 
 Permite que múltiples procesos/workers compartan mensajes de broadcast
-publicando en un canal Redis y suscribiéndose al mismo.
+publicando en canales Redis y suscribiéndose a ellos.
+
+- Los broadcasts sin topic van al canal base (``ws_broadcast``); los mensajes
+  con topic van a ``ws_broadcast:topic:<topic>`` y cada worker solo se
+  suscribe a los topics que tienen sus conexiones locales.
+- Sobre el canal viaja un sobre binario compacto::
+
+      0x01 | len(cabecera) (uint16 BE) | cabecera JSON | frame UTF-8
+
+  La cabecera (``{"e": event_type, "t": topic, "o": origen}``) permite
+  enrutar sin decodificar el frame, que se reenvía tal cual a las conexiones
+  locales. Los payloads JSON planos (formato anterior) siguen aceptándose.
+- Con ``batch_window_ms > 0`` los publish se acumulan durante la ventana y se
+  envían en un único pipeline (un round-trip a Redis).
 """
 from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any, Optional, Protocol, cast
+import struct
+import uuid
+from typing import Any, Optional, Protocol, Union, cast
 
 from src.core.logging import get_logger
+from src.core.ws_fanout import encode_frame
 
 ws_pubsub_logger = get_logger("websockets.pubsub")
 
+ENVELOPE_VERSION = 1
+_HEADER_LEN = struct.Struct("!H")
+
 
 class _BroadcastManager(Protocol):
     async def broadcast_local_dict(self, message_dict: dict[str, Any]) -> int:  # pragma: no cover - protocolo mínimo
         ...
 
 
+def encode_envelope(frame: str, event_type: str, topic: Optional[str] = None,
+                    origin: Optional[str] = None) -> bytes:
+    """Construye el sobre binario para un frame ya serializado."""
+    header: dict[str, Any] = {"e": event_type}
+    if topic:
+        header["t"] = topic
+    if origin:
+        header["o"] = origin
+    head = encode_frame(header).encode("utf-8")
+    return bytes((ENVELOPE_VERSION,)) + _HEADER_LEN.pack(len(head)) + head + frame.encode("utf-8")
+
+
+def decode_envelope(data: Union[bytes, bytearray, str]) -> Optional[tuple[str, str, Optional[str], Optional[str]]]:
+    """Devuelve ``(frame, event_type, topic, origin)`` o None si no es un sobre."""
+    if isinstance(data, str):
+        return None
+    if len(data) < 1 + _HEADER_LEN.size or data[0] != ENVELOPE_VERSION:
+        return None
+    (head_len,) = _HEADER_LEN.unpack_from(data, 1)
+    body_start = 1 + _HEADER_LEN.size + head_len
+    try:
+        header = json.loads(bytes(data[1 + _HEADER_LEN.size:body_start]))
+        frame = bytes(data[body_start:]).decode("utf-8")
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or "e" not in header:
+        return None
+    return frame, header["e"], header.get("t"), header.get("o")
+
+
 class RedisWebSocketPubSub:
-    def __init__(self, redis_url: str, channel: str = "ws_broadcast"):
+    def __init__(self, redis_url: str, channel: str = "ws_broadcast",
+                 batch_window_ms: float = 0.0, max_batch: int = 100,
+                 shard_by_topic: bool = True, client: Optional[Any] = None):
         self.redis_url = redis_url
         self.channel = channel
-        # Cliente Redis asíncrono (tipo dinámico del paquete redis.asyncio)
-        self._redis: Optional[Any] = None
+        # Cliente Redis asíncrono (tipo dinámico del paquete redis.asyncio);
+        # puede inyectarse ya creado (tests/harness en proceso)
+        self._redis: Optional[Any] = client
         self._subscriber_task: Optional[asyncio.Task[None]] = None
         self._running = False
         self._manager: Optional[_BroadcastManager] = None
+        # Identificador de este worker para ignorar sus propios mensajes
+        self.origin = uuid.uuid4().hex[:12]
+        # Micro-batching de publish
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._batch: list[tuple[str, bytes]] = []
+        self._flush_task: Optional[asyncio.Task[None]] = None
+        # Sharding por topic
+        self.shard_by_topic = shard_by_topic
+        self._topics: set[str] = set()
+        self._pubsub: Optional[Any] = None
+        # Métricas
+        self.published_messages = 0
+        self.published_batches = 0
+        self.received_messages = 0
+
+    def channel_for(self, topic: Optional[str]) -> str:
+        """Canal Redis donde se publica un mensaje con (o sin) topic."""
+        if topic and self.shard_by_topic:
+            return f"{self.channel}:topic:{topic}"
+        return self.channel
 
     async def start(self, manager: _BroadcastManager) -> None:
         """Conecta a Redis y arranca la tarea de suscripción."""
+        self._manager = manager
+        # Topics que ya tienen conexiones locales antes de arrancar
+        self._topics.update(getattr(manager, "topic_connections", {}).keys())
+        if self._redis is not None:
+            self._running = True
+            self._subscriber_task = asyncio.create_task(self._subscriber_loop())
+            ws_pubsub_logger.info("RedisWebSocketPubSub iniciado", channel=self.channel)
+            return
+
         try:
             # Import local para no obligar dependencia en paths que no lo usen
             from redis import asyncio as redis
@@ -39,7 +121,6 @@ class RedisWebSocketPubSub:
             ws_pubsub_logger.error(f"Redis client no disponible: {e}")
             return
 
-        self._manager = manager
         # from_url devuelve un cliente dinámico; lo tipamos como Any para mypy
         # Endurecer opciones para proveedores TLS (Upstash): keepalive, health check y reintentos
         # rediss:// implica ssl=True automáticamente
@@ -104,6 +185,10 @@ class RedisWebSocketPubSub:
 
     async def stop(self) -> None:
         self._running = False
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._flush()
         if self._subscriber_task:
             self._subscriber_task.cancel()
             try:
@@ -120,23 +205,118 @@ class RedisWebSocketPubSub:
         ws_pubsub_logger.info("RedisWebSocketPubSub detenido")
 
     async def publish(self, message_dict: dict[str, Any]) -> None:
-        """Publica un mensaje en el canal compartido."""
+        """Publica un mensaje (dict) en el canal que le corresponde."""
+        try:
+            frame = encode_frame(message_dict)
+        except Exception as e:
+            ws_pubsub_logger.error(f"Error serializando broadcast para Redis: {e}")
+            return
+        event_type = message_dict.get("event_type") or ""
+        await self.publish_frame(frame, str(getattr(event_type, "value", event_type)), message_dict.get("topic"))
+
+    async def publish_frame(self, frame: str, event_type: str, topic: Optional[str] = None) -> None:
+        """Publica un frame ya serializado sin volver a codificar el payload."""
         if not self._redis:
             ws_pubsub_logger.warning("Redis no inicializado; no se publica broadcast")
             return
+        item = (self.channel_for(topic), encode_envelope(frame, event_type, topic, self.origin))
+        if self.batch_window <= 0:
+            try:
+                await self._redis.publish(*item)
+                self.published_messages += 1
+                self.published_batches += 1
+            except Exception as e:
+                ws_pubsub_logger.error(f"Error publicando broadcast en Redis: {e}")
+            return
+
+        self._batch.append(item)
+        if len(self._batch) >= self.max_batch:
+            await self._flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.batch_window)
+        except asyncio.CancelledError:
+            return
+        self._flush_task = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        """Envía el lote acumulado en un único pipeline."""
+        if not self._batch or self._redis is None:
+            return
+        batch, self._batch = self._batch, []
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for channel, payload in batch:
+                pipe.publish(channel, payload)
+            await pipe.execute()
+            self.published_messages += len(batch)
+            self.published_batches += 1
+        except Exception as e:
+            ws_pubsub_logger.error(f"Error publicando lote de {len(batch)} broadcasts en Redis: {e}")
+
+    # --- Suscripción dinámica por topic ---
+    def watch_topic(self, topic: str) -> None:
+        """Suscribe este worker al canal de un topic (primera conexión local)."""
+        if not self.shard_by_topic or topic in self._topics:
+            return
+        self._topics.add(topic)
+        self._schedule(self._subscribe_channels([self.channel_for(topic)]))
+
+    def unwatch_topic(self, topic: str) -> None:
+        """Cancela la suscripción al topic (última conexión local se fue)."""
+        if not self.shard_by_topic or topic not in self._topics:
+            return
+        self._topics.discard(topic)
+        self._schedule(self._unsubscribe_channels([self.channel_for(topic)]))
+
+    def _schedule(self, coro: Any) -> None:
+        if self._pubsub is None or not self._running:
+            coro.close()
+            return
         try:
-            payload = json.dumps(message_dict)
-            await self._redis.publish(self.channel, payload)
+            asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()
+
+    async def _subscribe_channels(self, channels: list[str]) -> None:
+        try:
+            if self._pubsub is not None and channels:
+                await self._pubsub.subscribe(*channels)
         except Exception as e:
-            ws_pubsub_logger.error(f"Error publicando broadcast en Redis: {e}")
+            ws_pubsub_logger.error(f"Error suscribiendo canales Redis {channels}: {e}")
+
+    async def _unsubscribe_channels(self, channels: list[str]) -> None:
+        try:
+            if self._pubsub is not None and channels:
+                await self._pubsub.unsubscribe(*channels)
+        except Exception as e:
+            ws_pubsub_logger.error(f"Error desuscribiendo canales Redis {channels}: {e}")
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "origin": self.origin,
+            "batch_window_ms": self.batch_window * 1000,
+            "shard_by_topic": self.shard_by_topic,
+            "subscribed_topics": len(self._topics),
+            "published_messages": self.published_messages,
+            "published_batches": self.published_batches,
+            "received_messages": self.received_messages,
+        }
 
     async def _subscriber_loop(self) -> None:
         """Consume mensajes del canal y los reenvía a conexiones locales."""
         assert self._redis is not None
         try:
             pubsub = self._redis.pubsub()
-            await pubsub.subscribe(self.channel)
-            ws_pubsub_logger.info("Suscrito a canal Redis", channel=self.channel)
+            self._pubsub = pubsub
+            channels = [self.channel] + [self.channel_for(t) for t in self._topics if self.shard_by_topic]
+            await pubsub.subscribe(*channels)
+            ws_pubsub_logger.info("Suscrito a canales Redis", channel=self.channel, topics=len(channels) - 1)
 
             async for raw in pubsub.listen():
                 if not self._running:
@@ -150,14 +330,24 @@ class RedisWebSocketPubSub:
                         data = raw.get("data")
                     else:
                         data = raw
-                    if isinstance(data, (bytes, bytearray)):
-                        data = data.decode("utf-8")
-                    if not data:
+                    if not data or self._manager is None:
                         continue
-                    message_dict = json.loads(data)
+                    self.received_messages += 1
                     # Reenviar a conexiones locales sin re-publicar
-                    if self._manager is not None:
-                        await self._manager.broadcast_local_dict(message_dict)
+                    envelope = decode_envelope(data)
+                    if envelope is not None:
+                        frame, event_type, topic, origin = envelope
+                        if origin == self.origin:
+                            # Ya se entregó localmente al publicar
+                            continue
+                        if hasattr(self._manager, "broadcast_local_frame"):
+                            await cast(Any, self._manager).broadcast_local_frame(frame, event_type, topic)
+                        else:
+                            await self._manager.broadcast_local_dict(json.loads(frame))
+                    else:
+                        if isinstance(data, (bytes, bytearray)):
+                            data = data.decode("utf-8")
+                        await self._manager.broadcast_local_dict(json.loads(data))
                 except asyncio.CancelledError:
                     break
                 except Exception as e:
@@ -166,3 +356,5 @@ class RedisWebSocketPubSub:
             pass
         except Exception as e:
             ws_pubsub_logger.error(f"Fallo en suscripción Redis: {e}")
+        finally:
+            self._pubsub = None
@@ -8,13 +8,14 @@ según el diseño especificado en PROMETHEUS_METRICAS_DISENO.md.
 Las métricas se exponen a través del endpoint /metrics en el API principal.
 """
 
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Callable, Iterable, Tuple
 import time
 import threading
 from collections import defaultdict, deque
 from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry
 
 from src.core.logging import get_logger
+from src.shared.latency_histogram import LatencyHistogram
 
 # Logger para métricas
 metrics_logger = get_logger("observability.metrics")
@@ -170,6 +171,38 @@ ws_latency_p99 = Gauge(
     [ENV_LABEL, "channel_type"]
 )
 
+ws_latency_quantile = Gauge(
+    f"{METRIC_PREFIX}ws_latency_quantile_seconds",
+    "Cuantiles de latencia de mensajes WebSocket por ventana deslizante",
+    [ENV_LABEL, "channel_type", "window", "quantile"]
+)
+
+ws_fanout_latency_p50 = Gauge(
+    f"{METRIC_PREFIX}ws_fanout_latency_p50_seconds",
+    "Latencia P50 de entrega del último broadcast (fan-out)",
+    [ENV_LABEL]
+)
+
+ws_fanout_latency_p99 = Gauge(
+    f"{METRIC_PREFIX}ws_fanout_latency_p99_seconds",
+    "Latencia P99 de entrega del último broadcast (fan-out)",
+    [ENV_LABEL]
+)
+
+# --- MÉTRICAS DE CACHÉ (L1 en proceso / L2 Redis) ---
+
+cache_lookups_total = Counter(
+    f"{METRIC_PREFIX}cache_lookups_total",
+    "Consultas a la caché por nivel y resultado",
+    [ENV_LABEL, "tier", "result"]
+)
+
+cache_hit_ratio = Gauge(
+    f"{METRIC_PREFIX}cache_hit_ratio",
+    "Hit ratio acumulado de la caché por nivel (0-1)",
+    [ENV_LABEL, "tier"]
+)
+
 # --- MÉTRICAS DE CIRCUIT BREAKER ---
 
 ws_circuit_breaker_state = Gauge(
@@ -216,37 +249,142 @@ message_latency = Histogram(
 
 # --- GESTIÓN DE MÉTRICAS AVANZADAS ---
 
+# Ventanas deslizantes de latencia: (etiqueta, duración s, ranura s)
+LATENCY_WINDOWS: Tuple[Tuple[str, int, int], ...] = (("1m", 60, 10), ("5m", 300, 60), ("1h", 3600, 300))
+DEFAULT_LATENCY_WINDOW = "5m"
+LATENCY_QUANTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+
+class RollingLatencyWindow:
+    """
+    Histograma de una ventana deslizante: anillo de sub-histogramas por ranura.
+
+    La ventana efectiva abarca entre ``window - slot`` y ``window`` segundos;
+    consultarla fusiona ``window / slot`` histogramas, sin ordenar muestras.
+    """
+
+    __slots__ = ("window_seconds", "slot_seconds", "_starts", "_histograms")
+
+    def __init__(self, window_seconds: int, slot_seconds: int) -> None:
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        slots = window_seconds // slot_seconds
+        self._starts: List[float] = [-1.0] * slots
+        self._histograms: List[Optional[LatencyHistogram]] = [None] * slots
+
+    def record(self, index: int, latency_seconds: float, now: float) -> None:
+        """Registra una latencia con su índice de bucket ya calculado."""
+        slot = int(now // self.slot_seconds)
+        position = slot % len(self._starts)
+        start = slot * self.slot_seconds
+        histogram = self._histograms[position]
+        if histogram is None or self._starts[position] != start:
+            histogram = self._histograms[position] = LatencyHistogram()
+            self._starts[position] = start
+        histogram.record_at(index, latency_seconds)
+
+    def merged(self, now: float) -> LatencyHistogram:
+        result = LatencyHistogram()
+        oldest = int(now // self.slot_seconds) * self.slot_seconds - self.window_seconds
+        for start, histogram in zip(self._starts, self._histograms):
+            if histogram is not None and start > oldest:
+                result.merge(histogram)
+        return result
+
+
+def _quantiles(histogram: LatencyHistogram) -> Dict[str, float]:
+    return {label: histogram.percentile(q) for label, q in LATENCY_QUANTILES}
+
+
 class WebSocketMetricsCollector:
-    """Recolector avanzado de métricas WebSocket con cálculos en tiempo real."""
+    """
+    Recolector avanzado de métricas WebSocket con cálculos en tiempo real.
+
+    Las latencias por tipo de canal se acumulan en histogramas log-lineales
+    (``LatencyHistogram``): uno total y uno por ventana deslizante (1m, 5m,
+    1h). Registrar es O(1) y los percentiles salen del histograma sin copiar
+    ni ordenar muestras. Se usa desde el event loop, así que el registro de
+    latencias no toma lock. Los snapshots se combinan entre workers con
+    :meth:`merge_snapshots` para obtener percentiles de todo el clúster.
+    """
     
-    def __init__(self):
-        self.latency_data: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self.latency_totals: Dict[str, LatencyHistogram] = {}
+        self.latency_windows: Dict[str, Dict[str, RollingLatencyWindow]] = {}
         self.throughput_data: Dict[str, deque] = defaultdict(lambda: deque(maxlen=60))  # 1 minuto
+        # Resumen (p50/p99) por broadcast, últimos 1000 broadcasts
+        self.fanout_data: deque = deque(maxlen=1000)
         self._lock = threading.Lock()
         
     def record_latency(self, channel_type: str, latency_seconds: float):
-        """Registra latencia para cálculos posteriores."""
-        with self._lock:
-            self.latency_data[channel_type].append(latency_seconds)
+        """Registra latencia en el histograma total y en cada ventana."""
+        total = self.latency_totals.get(channel_type)
+        if total is None:
+            total = self.latency_totals[channel_type] = LatencyHistogram()
+            self.latency_windows[channel_type] = {
+                label: RollingLatencyWindow(window, slot) for label, window, slot in LATENCY_WINDOWS
+            }
+        index = LatencyHistogram.bucket_index(int(latency_seconds * 1_000_000))
+        total.record_at(index, latency_seconds)
+        now = self._clock()
+        for window in self.latency_windows[channel_type].values():
+            window.record(index, latency_seconds, now)
             
     def record_throughput(self, channel_type: str, message_count: int):
         """Registra throughput para cálculos posteriores."""
         with self._lock:
             self.throughput_data[channel_type].append(message_count)
+
+    def latency_histogram(self, channel_type: str, window: Optional[str] = DEFAULT_LATENCY_WINDOW) -> LatencyHistogram:
+        """Histograma de la ventana indicada (``None`` = desde el arranque)."""
+        if window is None:
+            return self.latency_totals.get(channel_type) or LatencyHistogram()
+        windows = self.latency_windows.get(channel_type)
+        if windows is None:
+            return LatencyHistogram()
+        return windows[window].merged(self._clock())
             
-    def calculate_percentiles(self, channel_type: str) -> Dict[str, float]:
-        """Calcula percentiles de latencia."""
-        with self._lock:
-            data = sorted(self.latency_data[channel_type])
-            if not data:
-                return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
-                
-            n = len(data)
-            return {
-                "p50": data[int(n * 0.50)],
-                "p95": data[int(n * 0.95)],
-                "p99": data[int(n * 0.99)]
+    def calculate_percentiles(
+        self, channel_type: str, window: Optional[str] = DEFAULT_LATENCY_WINDOW
+    ) -> Dict[str, float]:
+        """Calcula percentiles de latencia (segundos) de la ventana indicada."""
+        return _quantiles(self.latency_histogram(channel_type, window))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Snapshot JSON combinable: histograma total y de cada ventana por canal."""
+        now = self._clock()
+        return {
+            channel_type: {
+                "total": total.snapshot(),
+                "windows": {
+                    label: window.merged(now).snapshot()
+                    for label, window in self.latency_windows[channel_type].items()
+                },
             }
+            for channel_type, total in list(self.latency_totals.items())
+        }
+
+    @staticmethod
+    def merge_snapshots(
+        snapshots: Iterable[Dict[str, Any]],
+        window: Optional[str] = DEFAULT_LATENCY_WINDOW,
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Percentiles por canal combinando snapshots de varios workers.
+
+        Se suman los histogramas (no los percentiles), así que el p99
+        resultante es el del tráfico de todo el clúster.
+        """
+        merged: Dict[str, LatencyHistogram] = {}
+        for snapshot in snapshots:
+            for channel_type, data in snapshot.items():
+                source = data["total"] if window is None else data["windows"].get(window)
+                if not source:
+                    continue
+                histogram = merged.setdefault(channel_type, LatencyHistogram())
+                histogram.merge(LatencyHistogram.from_snapshot(source))
+        return {channel_type: _quantiles(histogram) for channel_type, histogram in merged.items()}
             
     def calculate_throughput(self, channel_type: str) -> float:
         """Calcula throughput promedio por segundo."""
@@ -256,6 +394,36 @@ class WebSocketMetricsCollector:
                 return 0.0
             return sum(data) / len(data)
 
+    def record_fanout(self, latencies: List[float]) -> Dict[str, float]:
+        """Registra las latencias de entrega de un broadcast y devuelve su p50/p99."""
+        data = sorted(latencies)
+        n = len(data)
+        summary = {
+            "recipients": float(n),
+            "p50": data[int(n * 0.50)] if n else 0.0,
+            "p99": data[min(int(n * 0.99), n - 1)] if n else 0.0,
+        }
+        with self._lock:
+            self.fanout_data.append(summary)
+        return summary
+
+    def get_fanout_stats(self) -> Dict[str, float]:
+        """Resumen de fan-out: último broadcast y p50/p99 sobre la ventana."""
+        with self._lock:
+            window = list(self.fanout_data)
+        if not window:
+            return {"broadcasts": 0, "last_p50": 0.0, "last_p99": 0.0, "p50": 0.0, "p99": 0.0}
+        p50s = sorted(s["p50"] for s in window)
+        p99s = sorted(s["p99"] for s in window)
+        n = len(window)
+        return {
+            "broadcasts": n,
+            "last_p50": window[-1]["p50"],
+            "last_p99": window[-1]["p99"],
+            "p50": p50s[int(n * 0.50)],
+            "p99": p99s[min(int(n * 0.99), n - 1)],
+        }
+
 # Instancia global del recolector
 metrics_collector = WebSocketMetricsCollector()
 
@@ -411,6 +579,31 @@ def send_error(error_type: str = "send_failure", channel_type: str = "general",
     send_errors_total.labels(ENVIRONMENT).inc()
 
 
+def broadcast_fanout_completed(latencies: List[float]) -> None:
+    """
+    Registra las latencias de entrega de un broadcast ya completado.
+    
+    Args:
+        latencies: Latencia (segundos) de cada destinatario entregado
+    """
+    summary = metrics_collector.record_fanout(latencies)
+    ws_fanout_latency_p50.labels(ENVIRONMENT).set(summary["p50"])
+    ws_fanout_latency_p99.labels(ENVIRONMENT).set(summary["p99"])
+
+
+def cache_lookup(tier: str, hit: bool, hit_ratio: float) -> None:
+    """
+    Registra una consulta a un nivel de la caché.
+    
+    Args:
+        tier: Nivel consultado ("l1" en proceso, "l2" Redis)
+        hit: Si la key estaba en ese nivel
+        hit_ratio: Hit ratio acumulado del nivel (0-1)
+    """
+    cache_lookups_total.labels(ENVIRONMENT, tier, "hit" if hit else "miss").inc()
+    cache_hit_ratio.labels(ENVIRONMENT, tier).set(hit_ratio)
+
+
 def heartbeat_completed() -> None:
     """
     Registra la finalización de un ciclo heartbeat.
@@ -448,6 +641,9 @@ def update_all_metrics_from_manager(stats: Dict[str, Any]) -> None:
     # Actualizar métricas básicas desde los stats
     active_connections.labels(ENVIRONMENT).set(stats.get('active_connections', 0))
     
+    # Percentiles de latencia por canal y ventana, leídos de los histogramas
+    publish_latency_quantiles()
+    
     # Si hay información de usuarios activos
     unique_users = stats.get('unique_users', 0)
     if unique_users > 0:
@@ -461,4 +657,17 @@ def update_all_metrics_from_manager(stats: Dict[str, Any]) -> None:
     # Actualizar métricas por rol si están disponibles
     roles_data = stats.get('roles', {})
     for role, count in roles_data.items():
-        role_connections.labels(ENVIRONMENT, role).set(count)
\ No newline at end of file
+        role_connections.labels(ENVIRONMENT, role).set(count)
+
+
+def publish_latency_quantiles() -> None:
+    """Publica p50/p95/p99 por canal y ventana (gauges p50/p95/p99 desde 5m)."""
+    for channel_type in list(metrics_collector.latency_totals):
+        for label, _, _ in LATENCY_WINDOWS:
+            quantiles = metrics_collector.calculate_percentiles(channel_type, label)
+            for quantile, value in quantiles.items():
+                ws_latency_quantile.labels(ENVIRONMENT, channel_type, label, quantile).set(value)
+            if label == DEFAULT_LATENCY_WINDOW:
+                ws_latency_p50.labels(ENVIRONMENT, channel_type).set(quantiles["p50"])
+                ws_latency_p95.labels(ENVIRONMENT, channel_type).set(quantiles["p95"])
+                ws_latency_p99.labels(ENVIRONMENT, channel_type).set(quantiles["p99"])
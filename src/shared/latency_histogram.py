@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Mergeable fixed-memory latency histogram shared by the API and the bot.
+
+Only depends on the standard library, so any process can import it without
+pulling in API modules (settings, database, Prometheus collectors).
+"""
+
+import math
+from array import array
+from typing import Any, Dict, List, Tuple
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory log-linear latency histogram (HDR style).
+
+    Values are recorded in microseconds. Below ``SUB_BUCKETS`` µs buckets are
+    linear; above, every power of two is split into ``SUB_BUCKETS`` linear
+    sub-buckets, so the relative error of any percentile is below
+    ``1 / SUB_BUCKETS`` (~6%). Bucket layout is identical in every process,
+    which makes histograms from different workers mergeable by adding counts.
+    """
+
+    SUB_BUCKET_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    MAX_VALUE_BITS = 32  # 2^32 µs ≈ 71 min; larger values land in the last bucket
+    BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+    __slots__ = ("counts", "count", "sum", "min", "max")
+
+    def __init__(self) -> None:
+        self.counts = array("Q", bytes(8 * self.BUCKET_COUNT))
+        self.count = 0
+        self.sum = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def bucket_index(cls, micros: int) -> int:
+        """Bucket index for a value in microseconds."""
+        if micros < cls.SUB_BUCKETS:
+            return max(micros, 0)
+        shift = micros.bit_length() - cls.SUB_BUCKET_BITS - 1
+        index = shift * cls.SUB_BUCKETS + (micros >> shift)
+        return min(index, cls.BUCKET_COUNT - 1)
+
+    @classmethod
+    def bucket_bounds(cls, index: int) -> Tuple[int, int]:
+        """Inclusive lower and exclusive upper bound (µs) of a bucket."""
+        shift = max(index // cls.SUB_BUCKETS - 1, 0)
+        mantissa = index - shift * cls.SUB_BUCKETS
+        return mantissa << shift, (mantissa + 1) << shift
+
+    def record(self, duration: float) -> None:
+        """Record a duration in seconds."""
+        self.record_at(self.bucket_index(int(duration * 1_000_000)), duration)
+
+    def record_at(self, index: int, duration: float) -> None:
+        """Record a duration whose bucket index is already known (shared by several histograms)."""
+        self.counts[index] += 1
+        if self.count == 0 or duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+        self.count += 1
+        self.sum += duration
+
+    def percentile(self, q: float) -> float:
+        """Value in seconds at quantile ``q`` (0-1), clamped to the observed range."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        if rank >= self.count:
+            return self.max
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                low, high = self.bucket_bounds(index)
+                value = (low + high) / 2 / 1_000_000
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds_micros: List[int]) -> List[int]:
+        """Cumulative counts at the given bucket edges (µs), in ascending order."""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds_micros:
+            while index < self.BUCKET_COUNT and self.bucket_bounds(index)[1] <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add the counts of another histogram into this one."""
+        if other.count == 0:
+            return
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.sum += other.sum
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot; only non-empty buckets are included."""
+        return {
+            "sub_bucket_bits": self.SUB_BUCKET_BITS,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(i): c for i, c in enumerate(self.counts) if c},
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        """Rebuild a histogram from :meth:`snapshot` output."""
+        if data.get("sub_bucket_bits", cls.SUB_BUCKET_BITS) != cls.SUB_BUCKET_BITS:
+            raise ValueError("Incompatible histogram layout")
+        histogram = cls()
+        for index, bucket_count in data.get("buckets", {}).items():
+            histogram.counts[int(index)] = int(bucket_count)
+        histogram.count = int(data.get("count", 0))
+        histogram.sum = float(data.get("sum", 0.0))
+        histogram.min = float(data.get("min", 0.0))
+        histogram.max = float(data.get("max", 0.0))
+        return histogram
+
+
+# Prometheus bucket edges: powers of two in microseconds (the schema 0 layout
+# of Prometheus native histograms). They coincide with LatencyHistogram edges,
+# so exported cumulative counts are exact and can be summed across workers.
+PROMETHEUS_BOUNDS_MICROS = [1 << bits for bits in range(8, 26)]  # 256 µs .. ~33.5 s
+
+
+def prometheus_histogram_buckets(histogram: LatencyHistogram) -> List[Tuple[str, float]]:
+    """Cumulative ``(le, count)`` pairs for ``HistogramMetricFamily.add_metric``."""
+    cumulative = histogram.cumulative_counts(PROMETHEUS_BOUNDS_MICROS)
+    buckets = [
+        (str(bound / 1_000_000), count)
+        for bound, count in zip(PROMETHEUS_BOUNDS_MICROS, cumulative)
+    ]
+    buckets.append(("+Inf", histogram.count))
+    return buckets
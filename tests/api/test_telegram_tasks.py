@@ -238,49 +238,31 @@ async def test_finalize_already_completed_task(async_client, mock_db_session):
 
 @pytest.mark.asyncio
 async def test_get_user_tasks_by_telegram_success(async_client, mock_db_session):
-    """Test getting user tasks by telegram_id."""
-    mock_user = MagicMock()
-    mock_user.id = 1
-    mock_user.telegram_id = 123456789
-    
-    mock_task1 = MagicMock()
-    mock_task1.id = 1
-    mock_task1.codigo = "OP-001"
-    mock_task1.titulo = "Active Task"
-    mock_task1.estado = "activa"
-    mock_task1.prioridad = "alta"
-    mock_task1.tipo = "operativa"
-    mock_task1.creada_en = datetime.now()
-    
-    mock_task2 = MagicMock()
-    mock_task2.id = 2
-    mock_task2.codigo = "OP-002"
-    mock_task2.titulo = "Pending Task"
-    mock_task2.estado = "pendiente"
-    mock_task2.prioridad = "media"
-    mock_task2.tipo = "administrativa"
-    mock_task2.creada_en = datetime.now()
-    
-    mock_task3 = MagicMock()
-    mock_task3.id = 3
-    mock_task3.codigo = "OP-003"
-    mock_task3.titulo = "Completed Task"
-    mock_task3.estado = "completada"
-    mock_task3.prioridad = "baja"
-    mock_task3.tipo = "operativa"
-    mock_task3.creada_en = datetime.now()
-    
-    mock_user_result = AsyncMock()
-    mock_user_result.scalars = MagicMock(return_value=MagicMock(first=MagicMock(return_value=mock_user)))
-    
-    mock_tasks_result = AsyncMock()
-    mock_tasks_result.scalars = MagicMock(return_value=MagicMock(all=MagicMock(return_value=[mock_task1, mock_task2, mock_task3])))
-    
-    mock_db_session.execute = AsyncMock(side_effect=[mock_user_result, mock_tasks_result])
-    
+    """Test getting user tasks by telegram_id (counters + active page in one query)."""
+    counters = {
+        "user_id": 1,
+        "total_tasks": 3,
+        "active_tasks": 1,
+        "pending_tasks": 1,
+        "completed_tasks": 1,
+    }
+    mock_row1 = MagicMock(
+        id=1, codigo="OP-001", titulo="Active Task", estado="en_curso",
+        tipo="operativa", inicio_programado=datetime.now(), **counters
+    )
+    mock_row2 = MagicMock(
+        id=2, codigo="OP-002", titulo="Pending Task", estado="programada",
+        tipo="administrativa", inicio_programado=datetime.now(), **counters
+    )
+
+    mock_result = MagicMock()
+    mock_result.all = MagicMock(return_value=[mock_row1, mock_row2])
+    mock_db_session.execute = AsyncMock(return_value=mock_result)
+
     response = await async_client.get("/api/v1/telegram/tasks/user/123456789")
-    
+
     assert response.status_code == status.HTTP_200_OK
+    assert mock_db_session.execute.await_count == 1
     data = response.json()
     assert data["telegram_id"] == 123456789
     assert data["total_tasks"] == 3
@@ -288,6 +270,7 @@ async def test_get_user_tasks_by_telegram_success(async_client, mock_db_session)
     assert data["pending_tasks"] == 1
     assert data["completed_tasks"] == 1
     assert len(data["tasks"]) == 2  # Only active + pending
+    assert data["next_cursor"] is None
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del cliente HTTP asíncrono del bot (ApiService).
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.bot.services import api_service as api_module
+from src.bot.services.api_service import ApiService
+from src.bot.services.task_cache import BotReadCache
+
+TASK = {
+    "id": 1, "uuid": "5f0c6a2e-8d0b-4c55-9a41-2b7f1c9e0d11", "codigo": "TSK001",
+    "titulo": "Patrullaje", "tipo": "patrullaje", "estado": "programada", "prioridad": 3,
+    "inicio_programado": "2025-01-01T10:00:00", "delegado_usuario_id": 1, "creado_por_usuario_id": 1,
+}
+
+
+def _service(handler, **kwargs) -> ApiService:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    kwargs.setdefault("cache", BotReadCache())
+    return ApiService("http://api.test/api/v1", client=client, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_identical_inflight_gets_are_deduplicated():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=[TASK])
+
+    service = _service(handler)
+    results = await asyncio.gather(*(service.get_user_pending_tasks(7) for _ in range(20)))
+
+    assert calls == ["http://api.test/api/v1/tasks/user/telegram/7?status=pending"]
+    assert all(r[0].codigo == "TSK001" for r in results)
+    # Una vez resuelta, una lectura sin caché vuelve a la API
+    await service.get_user_pending_tasks(7, use_cache=False)
+    assert len(calls) == 2 and not api_module._inflight
+
+
+@pytest.mark.asyncio
+async def test_get_retries_transient_errors_but_post_does_not(monkeypatch):
+    monkeypatch.setattr(api_module, "RETRY_BACKOFF_BASE", 0.001)
+    statuses = iter([503, 502, 200])
+    posts = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            posts.append(request)
+            return httpx.Response(503)
+        return httpx.Response(next(statuses), json={"nivel": "agente"})
+
+    service = _service(handler, max_retries=2)
+
+    assert await service.get_user_auth_level(1) == "agente"
+    with pytest.raises(httpx.HTTPStatusError):
+        await service.finalize_task("TSK001", 1)
+    assert len(posts) == 1
+
+
+@pytest.mark.asyncio
+async def test_per_call_timeout_and_relative_api_url(monkeypatch):
+    monkeypatch.setattr(api_module, "RETRY_BACKOFF_BASE", 0.001)
+    attempts = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        raise httpx.ReadTimeout("lenta", request=request)
+
+    service = _service(handler, max_retries=1, timeout=0.01)
+
+    assert await service.get_user_pending_tasks(3) == []
+    assert len(attempts) == 2
+    assert attempts[0].extensions["timeout"]["read"] == 0.01
+    assert ApiService("/api/v1").api_url == "http://api:8000/api/v1"
+
+
+@pytest.mark.asyncio
+async def test_user_task_summary_passes_cursor():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        return httpx.Response(200, json={"total_tasks": 1, "tasks": [], "next_cursor": None})
+
+    service = _service(handler)
+
+    assert (await service.get_user_task_summary(7, cursor="abc", limit=5))["total_tasks"] == 1
+    assert calls == ["http://api.test/api/v1/telegram/tasks/user/7?limit=5&cursor=abc"]
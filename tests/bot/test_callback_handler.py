@@ -115,3 +115,29 @@ async def test_crear_cancel_callback():
     update.callback_query.answer.assert_called_once()
     call_args = update.callback_query.edit_message_text.call_args
     assert "Cancelada" in call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_hist_next_callback_requests_page_after_cursor(monkeypatch):
+    """El botón "Siguiente" de /historial activas pide la página del cursor."""
+    summary = AsyncMock(return_value={
+        "active_tasks": 1, "pending_tasks": 2, "completed_tasks": 0,
+        "tasks": [{"codigo": "TSK003", "titulo": "Patrullaje", "tipo": "patrullaje",
+                   "inicio_programado": "2030-01-01T08:00:00"}],
+        "next_cursor": None,
+    })
+    monkeypatch.setattr("src.bot.services.api_service.ApiService.get_user_task_summary", summary)
+    update = MagicMock()
+    update.callback_query.data = "hist:next:AAAAAQ"
+    update.callback_query.answer = AsyncMock()
+    update.callback_query.edit_message_text = AsyncMock()
+    update.callback_query.from_user.id = 123456
+    update.effective_user.id = 123456
+    
+    await handle_callback_query(update, MagicMock())
+    
+    summary.assert_awaited_once_with(123456, cursor="AAAAAQ")
+    text = update.callback_query.edit_message_text.call_args[0][0]
+    assert "TSK003" in text
+    keyboard = update.callback_query.edit_message_text.call_args[1]["reply_markup"]
+    assert keyboard.inline_keyboard[0][0].callback_data == "hist:first"
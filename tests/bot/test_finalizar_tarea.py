@@ -53,7 +53,7 @@ async def test_show_pending_tasks_empty_list():
     
     # Mock ApiService para retornar lista vacía
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.get_user_pending_tasks.return_value = []
         
         await _show_pending_tasks_list(query, context, page=0)
@@ -84,7 +84,7 @@ async def test_show_pending_tasks_with_items():
     
     # Mock ApiService
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.get_user_pending_tasks.return_value = tareas
         
         await _show_pending_tasks_list(query, context, page=0)
@@ -117,7 +117,7 @@ async def test_show_pending_tasks_pagination():
     
     # Mock ApiService
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.get_user_pending_tasks.return_value = tareas
         
         await _show_pending_tasks_list(query, context, page=0)
@@ -149,7 +149,7 @@ async def test_handle_finalizar_select():
     
     # Mock ApiService
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.get_user_pending_tasks.return_value = [tarea]
         
         await handle_finalizar_action(query, context, "select", ["TSK001"])
@@ -178,7 +178,7 @@ async def test_handle_finalizar_select_not_found():
     
     # Mock ApiService con lista vacía
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.get_user_pending_tasks.return_value = []
         
         await handle_finalizar_action(query, context, "select", ["TSK999"])
@@ -246,13 +246,13 @@ async def test_finalize_task_success():
     
     # Mock ApiService
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.finalize_task.return_value = tarea_finalizada
         
         await _finalize_task(query, context)
     
     # Verificar que se llamó a la API
-    mock_api.finalize_task.assert_called_once_with("TSK001", 12345)
+    mock_api.finalize_task.assert_awaited_once_with("TSK001", 12345)
     
     # Verificar que se limpió el contexto
     assert 'finalizar_task' not in context.user_data
@@ -283,7 +283,7 @@ async def test_finalize_task_not_found():
     
     # Mock ApiService para simular error 404
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.finalize_task.side_effect = Exception("404 not found")
         
         await _finalize_task(query, context)
@@ -313,7 +313,7 @@ async def test_finalize_task_forbidden():
     
     # Mock ApiService para simular error 403
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.finalize_task.side_effect = Exception("403 forbidden")
         
         await _finalize_task(query, context)
@@ -343,7 +343,7 @@ async def test_finalize_task_generic_error():
     
     # Mock ApiService para simular error genérico
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.finalize_task.side_effect = Exception("Connection timeout")
         
         await _finalize_task(query, context)
@@ -374,7 +374,7 @@ async def test_handle_finalizar_cancel():
     
     # Mock ApiService
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         mock_api.get_user_pending_tasks.return_value = []
         
         await handle_finalizar_action(query, context, "cancel", [])
@@ -403,7 +403,7 @@ async def test_complete_finalize_flow():
     
     # Mock ApiService
     with patch('src.bot.services.api_service.ApiService') as MockApiService:
-        mock_api = MockApiService.return_value
+        mock_api = MockApiService.return_value = AsyncMock()
         
         # Step 1: Mostrar lista
         mock_api.get_user_pending_tasks.return_value = [tarea]
@@ -422,6 +422,6 @@ async def test_complete_finalize_flow():
         await handle_finalizar_action(query, context, "confirm", [])
         
         # Verificar que se finalizó correctamente
-        mock_api.finalize_task.assert_called_once_with("TSK001", 12345)
+        mock_api.finalize_task.assert_awaited_once_with("TSK001", 12345)
         assert 'finalizar_task' not in context.user_data
         assert 'finalizar_context' not in context.user_data
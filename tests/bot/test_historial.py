@@ -87,4 +87,23 @@ def test_historial_handler_exists():
     """Verificar que el handler existe y está configurado."""
     from src.bot.commands.historial import historial_handler
     assert historial_handler is not None
-    assert hasattr(historial_handler, 'callback')
\ No newline at end of file
+    assert hasattr(historial_handler, 'callback')
+
+@pytest.mark.asyncio
+async def test_historial_activas_usa_resumen_con_cursor(mock_update, mock_context, monkeypatch):
+    """Test /historial activas: primera página del resumen con botón "Siguiente"."""
+    summary = AsyncMock(return_value={
+        "active_tasks": 1, "pending_tasks": 0, "completed_tasks": 4,
+        "tasks": [{"codigo": "TSK001", "titulo": "Patrullaje", "tipo": "patrullaje",
+                   "inicio_programado": "2030-01-01T08:00:00"}],
+        "next_cursor": "AAAAAQ",
+    })
+    monkeypatch.setattr("src.bot.services.api_service.ApiService.get_user_task_summary", summary)
+    mock_context.args = ["activas"]
+    
+    await historial(mock_update, mock_context)
+    
+    summary.assert_awaited_once_with(12345, cursor=None)
+    call = mock_update.message.reply_text.call_args_list[-1]
+    assert "TSK001" in call[0][0]
+    assert call[1]["reply_markup"].inline_keyboard[0][0].callback_data == "hist:next:AAAAAQ"
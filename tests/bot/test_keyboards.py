@@ -94,3 +94,26 @@ def test_all_main_menu_callbacks():
     
     for i, expected in enumerate(expected_callbacks):
         assert keyboard.inline_keyboard[i][0].callback_data == expected
+
+
+def test_cursor_pagination():
+    """Verifica navegación por cursor (Siguiente lleva el cursor de la API)."""
+    from datetime import datetime, timezone
+    from src.api.routers.telegram_tasks import encode_task_cursor
+    
+    cursor = encode_task_cursor(datetime(2030, 1, 1, 8, 0, 0, 999999, tzinfo=timezone.utc), 2**31 - 1)
+    keyboard = KeyboardFactory.cursor_pagination(cursor)
+    assert len(keyboard.inline_keyboard) == 2
+    callback_data = keyboard.inline_keyboard[0][0].callback_data
+    assert callback_data == f"hist:next:{cursor}"
+    assert len(callback_data.encode("utf-8")) <= 64
+    
+    # Última página (sin cursor) que no es la primera: solo "Inicio" + volver
+    keyboard = KeyboardFactory.cursor_pagination(None, first_page=False)
+    assert keyboard.inline_keyboard[0][0].callback_data == "hist:first"
+    assert len(keyboard.inline_keyboard[0]) == 1
+    
+    # Página única: solo volver al menú
+    keyboard = KeyboardFactory.cursor_pagination(None)
+    assert len(keyboard.inline_keyboard) == 1
+    assert keyboard.inline_keyboard[0][0].callback_data == "menu:main"
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la caché de lectura del bot (TTL, LRU e invalidación).
+"""
+
+import httpx
+import pytest
+
+from src.bot.services.api_service import ApiService
+from src.bot.services.task_cache import PENDING_TASKS, USERS, BotReadCache, apply_task_event
+from src.bot.utils.ux_metrics import UXMetricsCollector
+
+TASK = {
+    "id": 1, "uuid": "5f0c6a2e-8d0b-4c55-9a41-2b7f1c9e0d11", "codigo": "TSK001",
+    "titulo": "Patrullaje", "tipo": "patrullaje", "estado": "programada", "prioridad": 3,
+    "inicio_programado": "2025-01-01T10:00:00", "delegado_usuario_id": 1, "creado_por_usuario_id": 1,
+}
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    collector = UXMetricsCollector()
+    monkeypatch.setattr("src.bot.services.task_cache.ux_metrics", collector)
+    return collector
+
+
+def test_entries_expire_and_lru_is_bounded(metrics, fake_clock):
+    cache = BotReadCache(ttl_seconds=60, max_entries=2, clock=fake_clock)
+    cache.set(PENDING_TASKS, 1, ["a"])
+    cache.set(PENDING_TASKS, 2, ["b"])
+    assert cache.get(PENDING_TASKS, 1) == ["a"]
+    cache.set(USERS, None, [{"id": 1}])
+
+    # La entrada 2 era la menos usada
+    assert cache.get(PENDING_TASKS, 2) is None
+    assert cache.evictions == 1
+    fake_clock.now = 60.0
+    assert cache.get(PENDING_TASKS, 1) is None
+    assert len(cache) == 1
+    assert metrics.get_cache_stats()[PENDING_TASKS] == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+
+@pytest.mark.asyncio
+async def test_pending_tasks_read_through_and_invalidated_on_finalize(metrics):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.method)
+        if request.method == "POST":
+            return httpx.Response(200, json={**TASK, "estado": "finalizada"})
+        return httpx.Response(200, json=[TASK])
+
+    cache = BotReadCache()
+    service = ApiService(
+        "http://api.test/api/v1", client=httpx.AsyncClient(transport=httpx.MockTransport(handler)), cache=cache
+    )
+
+    for _ in range(3):  # listado + dos cambios de página
+        tareas = await service.get_user_pending_tasks(7)
+    assert [t.codigo for t in tareas] == ["TSK001"]
+    assert calls == ["GET"]
+
+    await service.finalize_task("TSK001", 7)
+    await service.get_user_pending_tasks(7)
+
+    assert calls == ["GET", "POST", "GET"]
+    assert metrics.get_metrics_summary()["cache"][PENDING_TASKS]["hits"] == 2
+    assert metrics.get_cache_stats()[PENDING_TASKS]["misses"] == 2
+
+
+def test_task_events_invalidate_pending_lists(metrics):
+    cache = BotReadCache()
+    cache.set(PENDING_TASKS, 7, ["a"])
+    cache.set(PENDING_TASKS, 8, ["b"])
+    cache.set(USERS, None, [{"id": 1}])
+
+    assert apply_task_event({"event_type": "task_updated", "data": {"task_data": {"telegram_id": 7}}}, cache)
+    assert cache.get(PENDING_TASKS, 7) is None and cache.get(PENDING_TASKS, 8) == ["b"]
+
+    assert not apply_task_event({"event_type": "ping", "data": {}}, cache)
+    assert apply_task_event({"event_type": "task_created", "data": {"task_id": 3}}, cache)
+    assert cache.get(PENDING_TASKS, 8) is None
+    assert cache.get(USERS, None) == [{"id": 1}]
+
+
+def test_entity_batch_frames_invalidate_pending_lists(metrics):
+    cache = BotReadCache()
+    cache.set(PENDING_TASKS, 7, ["a"])
+    cache.set(PENDING_TASKS, 8, ["b"])
+
+    efectivos_only = {
+        "event_type": "entity_batch",
+        "data": {
+            "events": [{"event_type": "efectivo_status_changed", "data": {"efectivo_id": 1}}],
+            "count": 1,
+            "resync": [],
+        },
+    }
+    assert not apply_task_event(efectivos_only, cache)
+    assert cache.get(PENDING_TASKS, 8) == ["b"]
+
+    batch = {
+        "event_type": "entity_batch",
+        "data": {
+            "events": [
+                {"event_type": "efectivo_status_changed", "data": {"efectivo_id": 1}},
+                {"event_type": "task_updated", "data": {"task_id": 4, "task_data": {"telegram_id": 7}}},
+            ],
+            "count": 2,
+            "resync": [],
+        },
+    }
+    assert apply_task_event(batch, cache)
+    assert cache.get(PENDING_TASKS, 7) is None and cache.get(PENDING_TASKS, 8) == ["b"]
+
+    # Eventos de tareas descartados en la API: se vacían todas las listas
+    resync = {"event_type": "entity_batch", "data": {"events": [], "count": 0, "resync": ["task"]}}
+    assert apply_task_event(resync, cache)
+    assert cache.get(PENDING_TASKS, 8) is None
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del procesamiento concurrente por chat y del endpoint webhook.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from telegram import Update
+
+from src.bot.utils.update_processor import PerChatUpdateProcessor
+from src.bot.webhook import SECRET_TOKEN_HEADER, create_webhook_app
+
+
+def _update_data(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": "hola",
+            "chat": {"id": chat_id, "type": "private"},
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_updates_run_concurrently_across_chats_in_order_within_chat():
+    processor = PerChatUpdateProcessor(max_concurrent_updates=8)
+    finished = []
+    running = 0
+    peak = 0
+
+    async def handle(update_id: int, chat_id: int, delay: float):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delay)
+        running -= 1
+        finished.append((chat_id, update_id))
+
+    # El primer update de cada chat es el más lento
+    jobs = [(i, i % 4, 0.05 if i < 4 else 0.001) for i in range(12)]
+    await asyncio.gather(*(
+        processor.process_update(Update.de_json(_update_data(i, chat), None), handle(i, chat, delay))
+        for i, chat, delay in jobs
+    ))
+
+    for chat in range(4):
+        assert [u for c, u in finished if c == chat] == [chat, chat + 4, chat + 8]
+    assert peak == 4
+    assert processor.chats_in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_webhook_checks_secret_and_enqueues_update():
+    application = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+    app = create_webhook_app(application, "/webhook/telegram", secret_token="s3cret")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        rejected = await client.post("/webhook/telegram", json=_update_data(1, 7))
+        accepted = await client.post(
+            "/webhook/telegram", json=_update_data(2, 7), headers={SECRET_TOKEN_HEADER: "s3cret"}
+        )
+
+    assert rejected.status_code == 403
+    assert accepted.status_code == 200
+    update = application.update_queue.get_nowait()
+    assert update.update_id == 2 and update.effective_chat.id == 7
+    assert application.update_queue.empty()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del almacenamiento agregado de métricas UX (ranuras y sketches).
+"""
+
+import random
+import subprocess
+import sys
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from src.bot.utils.ux_metrics import MetricType, UXMetricsCollector, UXMetricsPrometheusCollector
+
+
+def test_windowed_rates_use_only_slots_in_window(fake_clock):
+    metrics = UXMetricsCollector(slot_seconds=300, retention_hours=48, clock=fake_clock)
+    for user_id in range(4):
+        metrics.track_wizard_start(user_id, "crear")
+    metrics.track_wizard_complete(0)
+    metrics.track_validation_error(1, "codigo", "invalid_format", 2)
+
+    fake_clock.now += 30 * 3600
+    for user_id in range(10, 12):
+        metrics.track_wizard_start(user_id, "crear")
+        metrics.track_wizard_complete(user_id)
+    metrics.track_confirmation_error(99)
+
+    assert metrics.get_wizard_abandonment_rate(time_window_hours=24) == 0.0
+    assert metrics.get_wizard_abandonment_rate() == 1 - 3 / 6
+    assert metrics.get_wizard_abandonment_rate(wizard_type="finalizar") == 0.0
+    assert metrics.get_confirmation_error_rate(time_window_hours=24) == 1 / 3
+    assert metrics.get_error_breakdown() == {"codigo": 1}
+    assert metrics.get_error_breakdown(time_window_hours=24) == {}
+    assert metrics.get_metrics_summary()["total_events_24h"] == 5
+
+    # Pasada la retención, las ranuras viejas se reutilizan
+    fake_clock.now += 50 * 3600
+    metrics.track_wizard_start(50, "crear")
+    assert metrics.get_wizard_abandonment_rate() == 1.0
+    assert metrics.clear_old_events(days_to_keep=1) == 11
+
+
+def test_step_latency_percentile_is_close_to_exact(fake_clock):
+    metrics = UXMetricsCollector(clock=fake_clock)
+    rng = random.Random(7)
+    latencies = [rng.lognormvariate(5, 0.8) for _ in range(5000)]
+    for value in latencies:
+        metrics._record(MetricType.STEP_LATENCY, wizard_type="crear", step=2, latency_ms=value)
+    metrics._record(MetricType.STEP_LATENCY, wizard_type="crear", step=3, latency_ms=10_000.0)
+
+    exact = sorted(latencies)[int(len(latencies) * 0.95)]
+    assert abs(metrics.get_step_latency_p95(step=2) - exact) / exact < 0.07
+    assert metrics.get_step_latency_p95(step=3) == 10_000.0
+    assert metrics.get_step_latency_p95(step=5) == 0.0
+
+
+def test_prometheus_export_of_totals(fake_clock):
+    metrics = UXMetricsCollector(clock=fake_clock)
+    metrics.track_wizard_start(1, "crear")
+    metrics.track_wizard_abandon(1, step=3)
+    metrics.track_validation_error(2, "titulo", "too_short")
+    metrics.track_cache_lookup("pending", True)
+    metrics._record(MetricType.STEP_LATENCY, step=1, latency_ms=300.0)
+    registry = CollectorRegistry()
+    registry.register(UXMetricsPrometheusCollector(metrics))
+
+    output = generate_latest(registry).decode()
+
+    assert 'ggrt_bot_ux_events_total{env="' in output
+    assert 'event="wizard_abandon",wizard_type="crear"} 1.0' in output
+    assert 'ggrt_bot_validation_errors_total{env="' in output and 'field="titulo"} 1.0' in output
+    assert 'ggrt_bot_cache_lookups_total{cache="pending",env="' in output and 'result="hit"} 1.0' in output
+    assert 'ggrt_bot_step_latency_seconds_count{env="' in output
+    assert 'le="0.524288",step="1"} 1.0' in output
+
+
+def test_ux_metrics_do_not_import_api_modules():
+    code = (
+        "import sys, src.bot.utils.ux_metrics;"
+        "print(sorted(m for m in sys.modules if m.startswith(('src.core', 'src.api'))))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de los stores de sesiones de wizard (timing wheel en memoria y Redis).
+"""
+
+import pytest
+import redis.asyncio as aioredis
+
+from src.bot.utils.wizard_state import (
+    InMemoryWizardStore,
+    RedisWizardStore,
+    WizardSessionConflict,
+    WizardSessionManager,
+    WizardState,
+)
+
+
+class FakeRedis:
+    """Hashes en un dict; el script CAS se ejecuta en Python (interfaz de ``redis.asyncio``)."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.ttls: dict[str, int] = {}
+
+    def register_script(self, lua: str):
+        async def script(keys, args):
+            fields = self.hashes.setdefault(keys[0], {})
+            if fields.get(b"version", b"0") != str(args[0]).encode():
+                return -1
+            version = int(args[0]) + 1
+            pairs = [v if isinstance(v, bytes) else str(v).encode() for v in args[2:]]
+            fields.update(zip(pairs[::2], pairs[1::2]))
+            fields[b"version"] = str(version).encode()
+            self.ttls[keys[0]] = int(args[1])
+            return version
+        return script
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.results = []
+
+    def hgetall(self, key):
+        self.results.append(dict(self.redis.hashes.get(key, {})))
+
+    def pexpire(self, key, ms):
+        exists = key in self.redis.hashes
+        if exists:
+            self.redis.ttls[key] = ms
+        self.results.append(exists)
+
+    async def execute(self):
+        return self.results
+
+
+@pytest.mark.asyncio
+async def test_timing_wheel_expires_idle_sessions_but_not_processing(fake_clock):
+    store = InMemoryWizardStore(ttl_seconds=10, clock=fake_clock)
+    manager = WizardSessionManager(store)
+    await manager.start_wizard(1)
+    await manager.start_wizard(2)
+    await manager.start_wizard(3)
+    await manager.set_processing(3)
+
+    fake_clock.now = 6.0
+    await manager.get_session(1)  # renueva el TTL
+    fake_clock.now = 12.0
+
+    assert (await manager.get_session(2)).state == WizardState.IDLE
+    assert (await manager.get_session(1)).state == WizardState.SELECTING_TYPE
+    assert (await manager.get_session(3)).is_processing()
+    assert len(store) == 2
+    # Ni una larga inactividad recorre la rueda más de una vuelta
+    fake_clock.now = 10_000.0
+    assert await manager.cleanup_old_sessions() == 1
+    assert len(store) == 1 and await manager.get_active_sessions_count() == 1
+
+
+def test_redis_store_uses_async_client():
+    store = RedisWizardStore("redis://localhost:6379/0")
+    assert isinstance(store.redis, aioredis.Redis)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_roundtrip_and_conflict_detection():
+    redis = FakeRedis()
+    replica_a = WizardSessionManager(RedisWizardStore(client=redis, ttl_seconds=60))
+    replica_b = WizardSessionManager(RedisWizardStore(client=redis, ttl_seconds=60))
+
+    await replica_a.start_wizard(7)
+    await replica_b.advance_state(7, WizardState.ENTERING_CODE, data={"tipo": "patrullaje"})
+    session = await replica_a.get_session(7)
+
+    assert session.state == WizardState.ENTERING_CODE
+    assert session.data == {"wizard_type": "crear", "tipo": "patrullaje"}
+    assert redis.ttls["gad:wizard:7"] == 60_000
+
+    # Una escritura con versión obsoleta se rechaza
+    stale_session, stale_version = await replica_a.store.load(7)
+    await replica_b.advance_state(7, WizardState.ENTERING_TITLE, data={"codigo": "TSK1"})
+    with pytest.raises(WizardSessionConflict):
+        await replica_a.store.save(7, stale_session, stale_version)
+
+
+@pytest.mark.asyncio
+async def test_manager_reapplies_change_after_conflict():
+    store = InMemoryWizardStore()
+    manager = WizardSessionManager(store)
+    await manager.start_wizard(7)
+    original_save = store.save
+    raced = []
+
+    async def racing_save(user_id, session, expected_version):
+        if not raced:
+            # Otra réplica escribe entre la lectura y la escritura
+            raced.append(True)
+            other = store._sessions[user_id][0]
+            other.data["delegado_id"] = 5
+            await original_save(user_id, other, expected_version)
+        return await original_save(user_id, session, expected_version)
+
+    store.save = racing_save
+    session = await manager.advance_state(7, WizardState.SELECTING_ASIGNADOS, data={"asignados": [1]})
+
+    assert session.state == WizardState.SELECTING_ASIGNADOS
+    assert session.data["delegado_id"] == 5 and session.data["asignados"] == [1]
+    assert (await store.load(7))[1] == 3
@@ -20,10 +20,14 @@ from typing import AsyncGenerator
 from src.api.main import app
 import threading
 import time
+from datetime import datetime
 import uvicorn
 from typing import Iterator
 from src.api.models.base import Base
-from src.core.database import get_db_session
+from src.api.models.tarea import Tarea
+from src.api.models.usuario import Usuario
+from src.shared.constants import TaskPriority, TaskStatus, TaskType
+from src.core.database import AppSession, get_db_session
 from src.core.cache import get_cache_service
 from jose import jwt
 import os
@@ -53,6 +57,7 @@ engine = create_async_engine(
 TestingSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=AppSession,
     expire_on_commit=False,
 )
 
@@ -102,14 +107,18 @@ def mock_cache_service():
     """
     Mock de CacheService para tests que requieren cache pero no necesitan Redis real.
     
-    Provee un AsyncMock con métodos get, set, delete, delete_pattern configurados
-    con valores de retorno por defecto que simulan comportamiento exitoso.
+    Provee un AsyncMock con métodos get, set, delete, delete_pattern y de
+    invalidación por tags/namespaces configurados con valores de retorno por
+    defecto que simulan comportamiento exitoso.
     """
     cache = AsyncMock()
     cache.get = AsyncMock(return_value=None)
     cache.set = AsyncMock(return_value=True)
     cache.delete = AsyncMock(return_value=True)
     cache.delete_pattern = AsyncMock(return_value=5)
+    cache.invalidate_tags = AsyncMock(return_value=5)
+    cache.invalidate_namespace = AsyncMock(return_value=1)
+    cache.namespaced_key = AsyncMock(side_effect=lambda namespace, key: f"{namespace}:v0:{key}")
     return cache
 
 
@@ -160,6 +169,7 @@ async def db_session(db_engine):
             SessionLocalBind = async_sessionmaker(
                 bind=connection,
                 class_=AsyncSession,
+                sync_session_class=AppSession,
                 expire_on_commit=False,
             )
             async with SessionLocalBind() as session:  # type: ignore[call-arg]
@@ -168,6 +178,66 @@ async def db_session(db_engine):
                 await transaction.rollback()
 
 
+# --- Reloj controlable para componentes con ``clock`` inyectable ---
+class FakeClock:
+    """Reloj manual: devuelve ``now``; los tests lo avanzan asignando o sumando."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_clock() -> FakeClock:
+    return FakeClock()
+
+
+# --- Datos de dominio compartidos ---
+@pytest_asyncio.fixture(scope="function")
+async def user(db_session):
+    """Usuario persistido que delega y crea las tareas de los tests."""
+    user = Usuario(
+        dni="5550000",
+        nombre="Test",
+        apellido="User",
+        email="user@example.com",
+        hashed_password="hashed_password",
+        nivel=1,
+        verificado=True,
+    )
+    db_session.add(user)
+    await db_session.commit()
+    await db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def make_task():
+    """
+    Fábrica de ``Tarea`` sin persistir: ``make_task(user_id, n, **campos)``.
+
+    ``n`` forma el código (único dentro del test); los campos indicados
+    sustituyen a los valores por defecto (tarea programada de prioridad media).
+    """
+    def _make(user_id: int, n: int, **fields) -> Tarea:
+        values = dict(
+            codigo=f"TASK{n:03d}",
+            titulo=f"Tarea {n}",
+            tipo=TaskType.PATRULLAJE,
+            prioridad=TaskPriority.MEDIUM,
+            estado=TaskStatus.PROGRAMMED,
+            inicio_programado=datetime.now(),
+            delegado_usuario_id=user_id,
+            creado_por_usuario_id=user_id,
+        )
+        values.update(fields)
+        return Tarea(**values)
+
+    return _make
+
+
 @pytest_asyncio.fixture(scope="function")
 async def client(db_session: AsyncSession):
     """
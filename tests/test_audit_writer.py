@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la escritura diferida por lotes del audit trail.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.api.models.audit import AuditEventType, AuditSeverity
+from src.core.audit_service import AuditService
+from src.core.audit_writer import AuditWriter, AuditWriterCollector, AuditWriterUnavailable
+
+
+class FakeSession:
+    def __init__(self, sink: "FakeSessionFactory") -> None:
+        self.sink = sink
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def execute(self, statement, rows) -> None:
+        await self.sink.gate.wait()
+        if any(row.get("event_id") == "bad" for row in rows):
+            raise ValueError("fila inválida")
+        self.sink.pending = list(rows)
+
+    async def commit(self) -> None:
+        self.sink.batches.append(self.sink.pending)
+
+    async def rollback(self) -> None:
+        self.sink.rollbacks += 1
+
+
+class FakeSessionFactory:
+    """Registra los lotes confirmados; ``gate`` permite bloquear la escritura."""
+
+    def __init__(self) -> None:
+        self.batches = []
+        self.pending = []
+        self.rollbacks = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    def __call__(self) -> FakeSession:
+        return FakeSession(self)
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def _row(event_id: str, severity: AuditSeverity = AuditSeverity.LOW) -> dict:
+    return {"event_id": event_id, "event_type": AuditEventType.CREATE, "severity": severity}
+
+
+@pytest.mark.asyncio
+async def test_flush_by_batch_size():
+    sink = FakeSessionFactory()
+    writer = AuditWriter(sink, batch_size=3, flush_interval=30.0, durability="async")
+    writer.start()
+    for i in range(6):
+        assert await writer.submit(_row(str(i)))
+    for _ in range(20):
+        if len(sink.rows) == 6:
+            break
+        await asyncio.sleep(0.01)
+    assert [len(batch) for batch in sink.batches] == [3, 3]
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_by_interval():
+    sink = FakeSessionFactory()
+    writer = AuditWriter(sink, batch_size=100, flush_interval=0.05, durability="async")
+    writer.start()
+    await writer.submit(_row("a"))
+    await writer.submit(_row("b"))
+    await asyncio.sleep(0.01)
+    assert sink.batches == []
+    await asyncio.sleep(0.15)
+    assert [[row["event_id"] for row in batch] for batch in sink.batches] == [["a", "b"]]
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_critical_event_waits_for_its_batch():
+    sink = FakeSessionFactory()
+    writer = AuditWriter(sink, batch_size=100, flush_interval=30.0, durability="critical")
+    writer.start()
+    await writer.submit(_row("low"))
+    # El evento crítico no espera a la ventana de 30 s y arrastra al anterior
+    await asyncio.wait_for(writer.submit(_row("crit", AuditSeverity.CRITICAL)), 1.0)
+    assert [row["event_id"] for row in sink.rows] == ["low", "crit"]
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_isolates_invalid_rows():
+    sink = FakeSessionFactory()
+    writer = AuditWriter(sink, batch_size=3, flush_interval=30.0, durability="sync")
+    writer.start()
+    results = await asyncio.gather(
+        writer.submit(_row("ok-1")), writer.submit(_row("bad")), writer.submit(_row("ok-2")),
+        return_exceptions=True,
+    )
+    assert results[0] is True and results[2] is True
+    assert isinstance(results[1], ValueError)
+    assert sorted(row["event_id"] for row in sink.rows) == ["ok-1", "ok-2"]
+    assert writer.written == 2 and writer.failed == 1
+    assert sink.rollbacks == 2
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_after_timeout():
+    sink = FakeSessionFactory()
+    sink.gate.clear()
+    writer = AuditWriter(sink, max_queue=1, batch_size=1, enqueue_timeout=0.01, durability="async")
+    writer.start()
+    assert await writer.submit(_row("1"))  # lo toma el escritor (bloqueado)
+    await asyncio.sleep(0)
+    assert await writer.submit(_row("2"))  # ocupa la cola
+    assert not await writer.submit(_row("3"))
+    assert writer.rejected == 1 and writer.producer_waits == 1
+    sink.gate.set()
+    await writer.stop()
+    assert [row["event_id"] for row in sink.rows] == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_writer_releases_waiters():
+    sink = FakeSessionFactory()
+    sink.gate.clear()
+    writer = AuditWriter(sink, batch_size=1, flush_interval=30.0, durability="sync")
+    writer.start()
+    waiters = [asyncio.create_task(writer.submit(_row(str(i)))) for i in range(3)]
+    await asyncio.sleep(0.01)  # "0" en escritura (bloqueada), el resto en cola
+
+    await writer.stop(timeout=0.01)
+    results = await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), 1.0)
+    assert all(isinstance(result, AuditWriterUnavailable) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_durable_wait_is_bounded():
+    sink = FakeSessionFactory()
+    sink.gate.clear()
+    writer = AuditWriter(sink, durability="sync", flush_timeout=0.01)
+    writer.start()
+    with pytest.raises(AuditWriterUnavailable):
+        await writer.submit(_row("slow"))
+    sink.gate.set()
+    await writer.stop()
+    # La fila se escribe igualmente aunque la espera se haya agotado
+    assert [row["event_id"] for row in sink.rows] == ["slow"]
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_pending_events():
+    sink = FakeSessionFactory()
+    writer = AuditWriter(sink, batch_size=100, flush_interval=30.0, durability="async")
+    writer.start()
+    for i in range(5):
+        await writer.submit(_row(str(i)))
+    await writer.stop()
+    assert len(sink.rows) == 5
+    assert not writer.running
+    assert not await writer.submit(_row("late"))
+
+
+@pytest.mark.asyncio
+async def test_log_event_skips_request_session_with_writer():
+    sink = FakeSessionFactory()
+    writer = AuditWriter(sink, batch_size=1, durability="critical")
+    writer.start()
+    db = MagicMock()
+    db.commit = AsyncMock()
+    service = AuditService(db, writer=writer)
+
+    await service.log_event(AuditEventType.LOGIN_FAILED, "fallo", severity=AuditSeverity.CRITICAL, telegram_id=7)
+
+    db.add.assert_not_called()
+    db.commit.assert_not_awaited()
+    assert sink.rows[0]["telegram_id"] == 7
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_log_event_writes_inline_without_writer():
+    db = MagicMock()
+    db.commit = AsyncMock()
+    service = AuditService(db)
+
+    audit_log = await service.log_event(AuditEventType.READ, "consulta")
+
+    db.add.assert_called_once_with(audit_log)
+    db.commit.assert_awaited_once()
+
+
+def test_collector_exports_backpressure_metrics():
+    writer = AuditWriter(FakeSessionFactory())
+    writer.enqueued, writer.rejected, writer.producer_waits = 10, 2, 3
+    families = {family.name: family for family in AuditWriterCollector(lambda: writer).collect()}
+    assert families["ggrt_audit_queue_depth"].samples[0].value == 0
+    events = {s.labels["outcome"]: s.value for s in families["ggrt_audit_events"].samples if s.name.endswith("_total")}
+    assert events["enqueued"] == 10 and events["rejected"] == 2
+    assert families["ggrt_audit_producer_waits"].samples[0].value == 3
+    assert list(AuditWriterCollector(lambda: None).collect()) == []
+
+
+def test_flush_p99_is_a_percentile_not_the_max():
+    writer = AuditWriter(FakeSessionFactory())
+    for _ in range(199):
+        writer.flush_latency.record(0.001)
+    writer.flush_latency.record(1.0)
+    assert writer.get_stats()["flush_p99_ms"] < 10
@@ -4,6 +4,9 @@ Cache System Tests
 Tests for cache decorators and invalidation patterns.
 """
 
+import asyncio
+import time
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 import json
@@ -197,5 +200,303 @@ class TestCacheIntegration:
             mock_cache.delete_pattern.assert_called_once_with("users:*")
 
 
+
+class FakeRedis:
+    """Redis en memoria (subconjunto async usado por CacheService)."""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.ttls: dict[str, int] = {}
+        self.sets: dict[str, set[str]] = {}
+        self.round_trips = 0
+        self.published: list[tuple[str, str]] = []
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.data.get(key)
+
+    async def set(self, key, value):
+        self.round_trips += 1
+        self.data[key] = value
+        self.ttls.pop(key, None)
+
+    async def setex(self, key, ttl, value):
+        self.round_trips += 1
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    async def delete(self, *keys):
+        self.round_trips += 1
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    async def incr(self, key):
+        self.round_trips += 1
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def eval(self, script, numkeys, *args):
+        """Emula los scripts Lua de CacheService sobre el almacén en memoria."""
+        from src.core import cache as cache_module
+
+        self.round_trips += 1
+        keys, argv = list(args[:numkeys]), list(args[numkeys:])
+        if script == cache_module._SET_WITH_TAGS_LUA:
+            self.data[keys[0]] = argv[0]
+            for tag_key in keys[1:]:
+                self.sets.setdefault(tag_key, set()).add(keys[0])
+            return 1
+        if script == cache_module._INVALIDATE_TAGS_LUA:
+            deleted = []
+            for tag_key in keys:
+                for key in sorted(self.sets.pop(tag_key, set())):
+                    if self.data.pop(key, None) is not None:
+                        deleted.append(key)
+            return deleted
+        raise NotImplementedError(script)
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def get(self, key):
+                self.ops.append(lambda: redis.data.get(key))
+
+            def ttl(self, key):
+                self.ops.append(lambda: redis.ttls.get(key, -1 if key in redis.data else -2))
+
+            async def execute(self):
+                redis.round_trips += 1
+                return [op() for op in self.ops]
+
+        return Pipeline()
+
+
+def _two_tier(redis: FakeRedis | None = None, **l1_options):
+    from src.core.cache import CacheService
+
+    service = CacheService("redis://fake", l1_max_entries=l1_options.pop("l1_max_entries", 100), **l1_options)
+    service._redis = redis or FakeRedis()
+    service._connected = True
+    service._l1_coherent = True  # como si el canal de invalidación estuviera suscrito
+    return service
+
+
+class TestTwoTierCache:
+    """L1 en proceso delante de Redis."""
+
+    @pytest.mark.asyncio
+    async def test_l1_hit_skips_redis(self):
+        redis = FakeRedis()
+        cache = _two_tier(redis)
+        await cache.set("stats:1", {"total": 3}, ttl=60)
+        trips = redis.round_trips
+
+        assert await cache.get("stats:1") == {"total": 3}
+        assert redis.round_trips == trips
+        tiers = cache.get_tier_stats()
+        assert tiers["l1"]["hits"] == 1 and tiers["l2"]["hits"] == 0
+
+    @pytest.mark.asyncio
+    async def test_l2_hit_populates_l1(self):
+        redis = FakeRedis()
+        redis.data["gad:k"] = json.dumps([1, 2])
+        cache = _two_tier(redis)
+
+        assert await cache.get("k") == [1, 2]
+        assert await cache.get("k") == [1, 2]
+        tiers = cache.get_tier_stats()
+        assert (tiers["l1"]["misses"], tiers["l2"]["hits"], tiers["l1"]["hits"]) == (1, 1, 1)
+
+    def test_lru_evicts_by_entries_and_size(self):
+        from src.core.cache import LocalCache
+
+        local = LocalCache(max_entries=2, max_bytes=10, ttl=60)
+        local.set("a", 1, size=4)
+        local.set("b", 2, size=4)
+        local.get("a")  # "a" pasa a ser el más reciente
+        local.set("c", 3, size=4)
+        assert local.get("b") is None and local.get("a") is not None
+        local.set("d", 4, size=8)
+        assert len(local) == 1 and local.size_bytes == 8
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self):
+        cache = _two_tier()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"v": 1}
+
+        results = await asyncio.gather(*(cache.get_or_set("hot", loader, ttl=60) for _ in range(10)))
+        assert calls == 1
+        assert all(r == {"v": 1} for r in results)
+        assert cache.get_tier_stats()["coalesced_loads"] == 9
+
+    @pytest.mark.asyncio
+    async def test_stale_value_served_while_refreshing(self):
+        cache = _two_tier()
+        version = 0
+
+        async def loader():
+            nonlocal version
+            version += 1
+            return version
+
+        assert await cache.get_or_set("k", loader, ttl=60, stale_ttl=30) == 1
+        # Forzar que el valor quede viejo
+        value, _, _, size = cache._l1._entries["k"]
+        cache._l1._entries["k"] = (value, time.monotonic() + 60, time.time() - 1, size)
+
+        assert await cache.get_or_set("k", loader, ttl=60, stale_ttl=30) == 1
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert await cache.get_or_set("k", loader, ttl=60, stale_ttl=30) == 2
+        assert cache.get_tier_stats()["stale_served"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_from_other_worker_clears_l1(self):
+        redis = FakeRedis()
+        worker_a, worker_b = _two_tier(redis), _two_tier(redis)
+        await worker_b.set("k", "old", ttl=60)
+        await worker_a.set("k", "new", ttl=60)
+
+        channel, message = redis.published[-1]
+        assert channel == "gad:cache:invalidate"
+        worker_b._apply_invalidation(message)
+        assert await worker_b.get("k") == "new"
+
+        # Los mensajes propios se ignoran
+        worker_a._apply_invalidation(message)
+        assert worker_a._l1.get("k") is not None
+
+        await worker_a.delete_pattern("k*")
+        worker_b._apply_invalidation(redis.published[-1][1])
+        assert len(worker_b._l1) == 0
+
+    @pytest.mark.asyncio
+    async def test_lost_invalidation_channel_bypasses_l1_and_resubscribes(self, monkeypatch):
+        from src.core import cache as cache_module
+
+        monkeypatch.setattr(cache_module, "_INVALIDATION_RETRY_INITIAL", 0.01)
+        redis = FakeRedis()
+        connected = asyncio.Event()
+        attempts = []
+
+        class FlakyPubSub:
+            async def subscribe(self, channel):
+                attempts.append(channel)
+                if len(attempts) == 1:
+                    raise ConnectionError("pub/sub caído")
+                connected.set()
+
+            async def listen(self):
+                await asyncio.Event().wait()
+                yield {}
+
+            async def aclose(self):
+                pass
+
+        redis.pubsub = FlakyPubSub
+        cache = _two_tier(redis)
+        cache._l1_coherent = False
+        cache._start_invalidation_listener()
+        await cache.set("k", "v", ttl=60)
+
+        # Sin suscripción la L1 no se usa: cada lectura va a Redis
+        trips = redis.round_trips
+        assert await cache.get("k") == "v"
+        assert redis.round_trips == trips + 1 and len(cache._l1) == 0
+
+        await asyncio.wait_for(connected.wait(), timeout=1)
+        assert len(attempts) == 2 and cache._l1_coherent
+        assert await cache.get("k") == "v"
+        assert len(cache._l1) == 1
+        await cache.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_decorator_coalesces_concurrent_misses(self):
+        mock_cache = AsyncMock()
+        mock_cache.get.return_value = None
+        calls = 0
+
+        @cache_result(ttl_seconds=60)
+        async def slow():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"data": 1}
+
+        with patch("src.core.cache_decorators._cache_service", mock_cache):
+            results = await asyncio.gather(*(slow() for _ in range(5)))
+
+        assert calls == 1
+        assert results == [{"data": 1}] * 5
+        mock_cache.set.assert_called_once()
+
+
+
+class TestTagAndNamespaceInvalidation:
+    """Invalidación por tags y por generación de namespace (sin SCAN)."""
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tags_deletes_tagged_keys_only(self):
+        redis = FakeRedis()
+        cache = _two_tier(redis)
+        await cache.set("stats:user:1:days:7", {"t": 1}, ttl=300, tags=["stats:user:1"])
+        await cache.set("stats:user:1:days:30", {"t": 2}, ttl=300, tags=["stats:user:1", "stats"])
+        await cache.set("stats:user:2:days:7", {"t": 3}, ttl=300, tags=["stats:user:2"])
+
+        assert await cache.invalidate_tags("stats:user:1") == 2
+        assert "gad:tag:stats:user:1" not in redis.sets
+        assert await cache.get("stats:user:1:days:7") is None
+        assert await cache.get("stats:user:2:days:7") == {"t": 3}
+        assert json.loads(redis.published[-1][1])["k"] == ["stats:user:1:days:30", "stats:user:1:days:7"]
+
+    @pytest.mark.asyncio
+    async def test_namespace_generation_bump_orphans_old_keys(self):
+        redis = FakeRedis()
+        worker_a, worker_b = _two_tier(redis), _two_tier(redis)
+        key_v0 = await worker_b.namespaced_key("tasks:list", "page:1")
+        await worker_b.set(key_v0, [1, 2], ttl=60)
+
+        assert await worker_a.invalidate_namespace("tasks:list") == 1
+        worker_b._apply_invalidation(redis.published[-1][1])
+
+        key_v1 = await worker_b.namespaced_key("tasks:list", "page:1")
+        assert (key_v0, key_v1) == ("tasks:list:v0:page:1", "tasks:list:v1:page:1")
+        assert await worker_b.get(key_v1) is None
+
+    @pytest.mark.asyncio
+    async def test_decorators_record_and_invalidate_tag_templates(self):
+        mock_cache = AsyncMock()
+        mock_cache.get.return_value = None
+
+        @cache_result(ttl_seconds=60, tags=["user:{user_id}"])
+        async def get_profile(user_id: int):
+            return {"id": user_id}
+
+        @invalidate_cache(tags=["user:{user_id}"], namespaces=["users:list"])
+        async def update_profile(user_id: int):
+            return {"id": user_id}
+
+        with patch("src.core.cache_decorators._cache_service", mock_cache):
+            await get_profile(user_id=7)
+            await update_profile(user_id=7)
+
+        assert mock_cache.set.call_args.kwargs["tags"] == ["user:7"]
+        mock_cache.invalidate_tags.assert_called_once_with("user:7")
+        mock_cache.invalidate_namespace.assert_called_once_with("users:list")
+        mock_cache.delete_pattern.assert_not_called()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
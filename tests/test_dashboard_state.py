@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del estado en memoria del dashboard y sus deltas agrupados.
+"""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+
+from src.api.models.efectivo import Efectivo, EstadoDisponibilidad
+from src.core import websocket_integration
+from src.core.dashboard_state import DashboardState, run_dashboard_publisher
+from src.core.websocket_integration import (
+    WebSocketModelIntegrator,
+    install_model_event_hooks,
+    uninstall_model_event_hooks,
+)
+from src.shared.constants import TaskPriority, TaskStatus
+
+
+def _task_event(state: DashboardState, event_type: str, **data) -> bool:
+    return state.apply_model_event(event_type, "Tarea", {"id": 1, **data})
+
+
+def test_events_update_counters_and_alerts():
+    state = DashboardState()
+    state.replace({}, {})
+    _task_event(state, "insert", estado="programada", prioridad=TaskPriority.URGENT)
+    _task_event(state, "insert", estado=TaskStatus.IN_PROGRESS, prioridad=2)
+    _task_event(state, "update", estado="finalizada", prioridad=4, _old_estado="programada")
+    state.apply_model_event("insert", "Efectivo", {"id": 5, "estado_disponibilidad": "disponible"})
+    state.apply_model_event(
+        "update", "Efectivo", {"id": 5, "estado_disponibilidad": "en_tarea", "_old_estado_disponibilidad": "disponible"}
+    )
+
+    snapshot = state.snapshot()
+    assert snapshot["total_tasks"] == 2
+    assert snapshot["active_tasks"] == 1
+    assert snapshot["completed_tasks"] == 1
+    assert snapshot["pending_tasks"] == 0
+    # La tarea urgente ya está finalizada
+    assert snapshot["alerts_count"] == 0
+    assert snapshot["tasks_by_prioridad"]["URGENT"] == 1
+    assert snapshot["busy_efectivos"] == 1 and snapshot["available_efectivos"] == 0
+    assert snapshot["efectivos_by_estado"]["EN_TAREA"] == 1
+
+    _task_event(state, "delete", estado="en_curso", prioridad=2)
+    assert state.snapshot()["total_tasks"] == 1
+    assert state.drift_events == 0
+
+
+def test_update_without_previous_value_requests_reconciliation():
+    state = DashboardState()
+    state.replace({(TaskStatus.PROGRAMMED, TaskPriority.MEDIUM): 1}, {})
+
+    assert not _task_event(state, "update", estado="en_curso", prioridad=2, _previous_unknown=True)
+    assert state.snapshot()["pending_tasks"] == 1
+    assert state.drift_events == 1 and state.drift_pending
+
+
+def test_delta_contains_only_changed_keys():
+    state = DashboardState()
+    state.replace({(TaskStatus.PROGRAMMED, TaskPriority.HIGH): 2}, {EstadoDisponibilidad.DISPONIBLE: 3})
+    first = state.pop_delta()
+    assert first["version"] == 1 and first["delta"]["total_tasks"] == 2
+    assert state.pop_delta() is None
+
+    _task_event(state, "update", estado="en_curso", prioridad=3, _old_estado="programada")
+    delta = state.pop_delta()
+    assert delta["version"] == 2
+    assert delta["delta"] == {
+        "active_tasks": 1,
+        "pending_tasks": 1,
+        "tasks_by_estado": {"PROGRAMMED": 1, "IN_PROGRESS": 1},
+    }
+    assert state.snapshot()["version"] == 2
+
+
+@pytest.mark.asyncio
+async def test_publisher_coalesces_bursts():
+    state = DashboardState()
+    state.replace({}, {})
+    published = []
+    publish = AsyncMock(side_effect=published.append)
+    publisher = asyncio.create_task(run_dashboard_publisher(0.2, state=state, publish=publish))
+    try:
+        await asyncio.sleep(0.05)
+        for n in range(500):
+            _task_event(state, "insert", estado="programada", prioridad=1 + n % 5)
+        await asyncio.sleep(0.35)
+    finally:
+        publisher.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await publisher
+
+    # Estado inicial + una ráfaga de 500 eventos agrupada en un solo delta
+    assert len(published) == 2
+    assert published[-1]["delta"]["total_tasks"] == 500
+    assert published[-1]["delta"]["alerts_count"] == 200
+
+
+@pytest_asyncio.fixture
+async def integrator(monkeypatch):
+    emitter = MagicMock()
+    emitter.emit_task_event = AsyncMock()
+    emitter.emit_efectivo_event = AsyncMock()
+    integrator = WebSocketModelIntegrator(emitter, dashboard=DashboardState())
+    integrator._loop = asyncio.get_running_loop()
+    monkeypatch.setattr(websocket_integration, "websocket_integrator", integrator)
+    install_model_event_hooks()
+    yield integrator
+    uninstall_model_event_hooks()
+
+
+async def _drain(integrator: WebSocketModelIntegrator) -> None:
+    while not integrator._event_queue.empty():
+        await integrator._handle_model_event(integrator._event_queue.get_nowait())
+
+
+@pytest.mark.asyncio
+async def test_committed_changes_match_reconciliation(db_session, user, make_task, integrator):
+    state = integrator.dashboard
+    await state.reconcile(db_session)
+
+    tasks = [make_task(user.id, n, prioridad=TaskPriority.URGENT if n % 2 else TaskPriority.LOW) for n in range(4)]
+    efectivo = Efectivo(usuario_id=user.id, codigo_interno="DASH-E1")
+    db_session.add_all(tasks + [efectivo])
+    await db_session.commit()
+    await _drain(integrator)
+    assert state.snapshot()["alerts_count"] == 2
+
+    tasks[0].estado = TaskStatus.IN_PROGRESS
+    tasks[1].estado = TaskStatus.COMPLETED
+    tasks[2].deleted_at = datetime.now()
+    efectivo.estado_disponibilidad = EstadoDisponibilidad.EN_TAREA
+    await db_session.commit()
+    await _drain(integrator)
+
+    snapshot = state.snapshot()
+    assert snapshot["total_tasks"] == 3
+    assert snapshot["active_tasks"] == 1 and snapshot["completed_tasks"] == 1
+    assert snapshot["alerts_count"] == 1
+    assert snapshot["busy_efectivos"] == 1
+    assert state.drift_events == 0
+    assert await state.reconcile(db_session) == 0
+    integrator.emitter.emit_task_event.assert_awaited()
+    # El hook y el manejador usan los mismos campos de disponibilidad
+    efectivo_events = [call.args[0] for call in integrator.emitter.emit_efectivo_event.await_args_list]
+    assert efectivo_events == ["created", "status_changed"]
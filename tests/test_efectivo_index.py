@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del índice espacial en memoria de efectivos (despacho de emergencias).
+"""
+
+import random
+
+import pytest
+import pytest_asyncio
+
+from src.api.models.efectivo import Efectivo, EstadoDisponibilidad
+from src.api.models.usuario import Usuario
+from src.core.geo.efectivo_index import (
+    EfectivoEntry,
+    EfectivoSpatialIndex,
+    efectivo_index,
+    haversine_m,
+    install_efectivo_index_sync,
+    load_efectivo_index,
+    uninstall_efectivo_index_sync,
+)
+from src.core.geo.postgis_service import find_nearest_efectivo
+
+CENTER = (-34.6037, -58.3816)
+
+
+def _random_index(n: int, seed: int = 3) -> EfectivoSpatialIndex:
+    rng = random.Random(seed)
+    index = EfectivoSpatialIndex(cell_deg=0.02)
+    estados = list(EstadoDisponibilidad)
+    index.replace_all(
+        EfectivoEntry(
+            i,
+            CENTER[0] + rng.uniform(-0.3, 0.3),
+            CENTER[1] + rng.uniform(-0.3, 0.3),
+            estados[i % len(estados)],
+            "k9" if i % 3 == 0 else None,
+        )
+        for i in range(n)
+    )
+    return index
+
+
+@pytest.mark.parametrize("especialidad", [None, "k9"])
+def test_nearest_matches_brute_force(especialidad):
+    index = _random_index(2000)
+    entries = list(index._entries.values())
+    rng = random.Random(11)
+    for _ in range(50):
+        lat = CENTER[0] + rng.uniform(-0.4, 0.4)
+        lng = CENTER[1] + rng.uniform(-0.4, 0.4)
+        expected = sorted(
+            (haversine_m(lat, lng, e.lat, e.lng), e.efectivo_id)
+            for e in entries
+            if e.estado == EstadoDisponibilidad.DISPONIBLE
+            and (especialidad is None or e.especialidad == especialidad)
+        )[:3]
+        got = index.nearest(lat, lng, k=3, especialidad=especialidad)
+        assert [e.efectivo_id for e, _ in got] == [eid for _, eid in expected]
+
+
+def test_upsert_moves_entry_between_cells_and_remove():
+    index = EfectivoSpatialIndex(cell_deg=0.01)
+    index.upsert(1, lat=0.0, lng=0.0, estado=EstadoDisponibilidad.DISPONIBLE)
+    index.upsert(1, lat=1.0, lng=1.0)
+    assert index.get_stats()["cells"] == 1
+    assert index.nearest(1.0, 1.0)[0][1] == pytest.approx(0.0)
+
+    index.upsert(1, estado=EstadoDisponibilidad.EN_TAREA)
+    assert index.nearest(1.0, 1.0) == []
+    index.remove(1)
+    assert len(index) == 0 and index.get_stats()["cells"] == 0
+
+
+def test_index_without_located_efectivos_is_not_ready():
+    index = EfectivoSpatialIndex()
+    index.replace_all([EfectivoEntry(1, estado=EstadoDisponibilidad.DISPONIBLE)])
+    assert not index.ready and len(index) == 1
+
+    # En cuanto un commit aporta una ubicación el índice responde
+    index.upsert(1, lat=0.0, lng=0.0)
+    assert index.ready
+    index.remove(1)
+    assert not index.ready
+
+
+@pytest_asyncio.fixture
+async def efectivos(db_session):
+    install_efectivo_index_sync()
+    created = []
+    for n, (dlat, estado) in enumerate([
+        (0.001, EstadoDisponibilidad.DISPONIBLE),
+        (0.0005, EstadoDisponibilidad.EN_TAREA),
+        (0.01, EstadoDisponibilidad.DISPONIBLE),
+    ]):
+        user = Usuario(
+            dni=f"555010{n}", nombre="Efectivo", apellido=str(n),
+            email=f"efectivo{n}@example.com", hashed_password="hashed_password",
+            nivel=1, verificado=True,
+        )
+        db_session.add(user)
+        await db_session.flush()
+        efectivo = Efectivo(
+            usuario_id=user.id,
+            codigo_interno=f"EF{n:03d}",
+            estado_disponibilidad=estado,
+            extra_metadata={"lat": CENTER[0] + dlat, "lng": CENTER[1]},
+        )
+        db_session.add(efectivo)
+        created.append(efectivo)
+    await db_session.commit()
+    await load_efectivo_index(db_session)
+    yield created
+    uninstall_efectivo_index_sync()
+    efectivo_index.replace_all([])
+    efectivo_index.ready = False
+
+
+@pytest.mark.asyncio
+async def test_dispatch_uses_index_on_sqlite(db_session, efectivos):
+    nearest = await find_nearest_efectivo(db_session, *CENTER, limit=2)
+
+    assert [r["efectivo_id"] for r in nearest] == [efectivos[0].id, efectivos[2].id]
+    assert nearest[0]["distance_m"] == pytest.approx(111.2, abs=1.0)
+
+
+@pytest.mark.asyncio
+async def test_index_follows_orm_commits(db_session, efectivos):
+    efectivos[0].estado_disponibilidad = EstadoDisponibilidad.EN_TAREA
+    efectivos[1].estado_disponibilidad = EstadoDisponibilidad.DISPONIBLE
+    await db_session.commit()
+
+    nearest = await find_nearest_efectivo(db_session, *CENTER)
+    assert nearest[0]["efectivo_id"] == efectivos[1].id
+
+
+@pytest.mark.asyncio
+async def test_stale_index_entry_is_verified_against_database(db_session, efectivos):
+    # Cambio hecho por otro worker: el índice local no lo ve
+    efectivo_index.upsert(efectivos[1].id, estado=EstadoDisponibilidad.DISPONIBLE)
+
+    nearest = await find_nearest_efectivo(db_session, *CENTER)
+
+    assert nearest[0]["efectivo_id"] == efectivos[0].id
+    assert efectivo_index._entries[efectivos[1].id].estado == EstadoDisponibilidad.EN_TAREA
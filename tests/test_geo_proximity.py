@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del prefiltro espacial de /geo/map/view (ruta SQLite, sin PostGIS).
+"""
+
+import random
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.core.geo import proximity
+from src.core.geo.proximity import (
+    approx_distance_m,
+    bounding_box,
+    distances_m,
+    find_tasks_within_radius,
+)
+from src.shared.constants import TaskPriority
+
+CENTER = (-34.6037, -58.3816)
+
+
+def test_bounding_box_contains_every_point_in_radius():
+    rng = random.Random(7)
+    radius = 5000.0
+    min_lat, max_lat, min_lon, max_lon = bounding_box(*CENTER, radius)
+    for _ in range(2000):
+        lat = CENTER[0] + rng.uniform(-0.1, 0.1)
+        lon = CENTER[1] + rng.uniform(-0.1, 0.1)
+        if approx_distance_m(*CENTER, lat, lon) <= radius:
+            assert min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+
+def test_bounding_box_across_antimeridian_leaves_longitude_open():
+    assert bounding_box(0.0, 179.99, 10000)[2:] == (None, None)
+
+
+def test_distances_match_scalar_formula():
+    lats, lons = [-34.60, -34.62, -34.70], [-58.38, -58.40, -58.30]
+    expected = [approx_distance_m(*CENTER, la, lo) for la, lo in zip(lats, lons)]
+    assert distances_m(*CENTER, lats, lons) == pytest.approx(expected)
+
+
+@pytest.mark.asyncio
+async def test_find_tasks_within_radius_filters_sorts_and_paginates(db_session, user, make_task):
+    # Desplazamientos hacia el norte en metros: 3 dentro de 2 km, 2 fuera
+    offsets_m = [1500, 200, 900, 2500, 50000]
+    db_session.add_all([
+        make_task(
+            user.id,
+            n,
+            prioridad=TaskPriority.HIGH,
+            ubicacion_lat=CENTER[0] + meters / 111_320.0,
+            ubicacion_lon=CENTER[1],
+        )
+        for n, meters in enumerate(offsets_m)
+    ])
+    await db_session.commit()
+
+    tareas, total = await find_tasks_within_radius(db_session, *CENTER, 2000.0)
+    assert total == 3
+    assert [round(t["distance_m"], -1) for t in tareas] == [200, 900, 1500]
+    assert tareas[0]["prioridad"] == TaskPriority.HIGH
+
+    page, total = await find_tasks_within_radius(db_session, *CENTER, 2000.0, limit=1, offset=1)
+    assert total == 3
+    assert [round(t["distance_m"], -1) for t in page] == [900]
+
+
+@pytest.mark.asyncio
+async def test_postgis_path_relies_on_st_dwithin_only(monkeypatch):
+    monkeypatch.setattr(proximity, "postgis_available", AsyncMock(return_value=True))
+    result = MagicMock()
+    result.scalar_one.return_value = 0
+    result.all.return_value = []
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+
+    await find_tasks_within_radius(db, 78.2, 15.6, 50_000.0)
+
+    for call in db.execute.await_args_list:
+        sql = str(call.args[0].compile(dialect=postgresql.dialect()))
+        # Sin recuadro plano: no debe recortar lo que ST_DWithin acepta
+        assert "ST_DWithin" in sql and "BETWEEN" not in sql
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de las latencias por plantilla de ruta (histogramas log-lineales).
+"""
+
+import random
+
+import pytest
+from fastapi import APIRouter, FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import CollectorRegistry, generate_latest
+
+from src.core import performance
+from src.core.performance import (
+    LatencyHistogram,
+    PerformanceMiddleware,
+    RouteLatencyCollector,
+    UNMATCHED_ROUTE,
+    route_template,
+)
+
+
+def test_histogram_percentiles_within_relative_error():
+    rng = random.Random(5)
+    values = sorted(rng.lognormvariate(-4, 1) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = values[int(q * len(values)) - 1]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=1 / LatencyHistogram.SUB_BUCKETS)
+    assert histogram.percentile(1.0) == values[-1]
+
+
+def test_snapshots_merge_across_workers():
+    worker_a, worker_b, combined = PerformanceMiddleware(), PerformanceMiddleware(), PerformanceMiddleware()
+    for i in range(100):
+        worker_a.record_request("GET", "/api/v1/tasks/{task_id}", 0.001 * (i + 1), 200)
+        worker_b.record_request("GET", "/api/v1/tasks/{task_id}", 0.1, 500)
+        combined.record_request("GET", "/api/v1/tasks/{task_id}", 0.001 * (i + 1), 200)
+        combined.record_request("GET", "/api/v1/tasks/{task_id}", 0.1, 500)
+
+    worker_a.merge_snapshot(worker_b.snapshot())
+
+    merged = worker_a.get_statistics()["endpoints"]["GET /api/v1/tasks/{task_id}"]
+    expected = combined.get_statistics()["endpoints"]["GET /api/v1/tasks/{task_id}"]
+    assert merged["percentiles_ms"] == expected["percentiles_ms"]
+    assert merged["total_duration"] == pytest.approx(expected["total_duration"])
+    assert merged["count"] == 200 and merged["errors"] == 100
+    assert merged["status_codes"] == {"200": 100, "500": 100}
+
+
+@pytest.mark.asyncio
+async def test_requests_are_keyed_by_route_template():
+    tracker = PerformanceMiddleware()
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def record(request: Request, call_next):
+        response = await call_next(request)
+        tracker.record_request(request.method, route_template(request.scope), 0.01, response.status_code)
+        return response
+
+    router = APIRouter(prefix="/tasks")
+
+    @router.get("/{task_id}")
+    async def get_task(task_id: int):
+        return {"id": task_id}
+
+    app.include_router(router, prefix="/api/v1")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for task_id in range(50):
+            await client.get(f"/api/v1/tasks/{task_id}")
+        await client.get("/wp-login.php")
+
+    assert set(tracker.endpoint_stats) == {"GET /api/v1/tasks/{task_id}", f"GET {UNMATCHED_ROUTE}"}
+    assert tracker.endpoint_stats["GET /api/v1/tasks/{task_id}"].histogram.count == 50
+
+
+def test_prometheus_export_has_exact_cumulative_buckets():
+    tracker = PerformanceMiddleware()
+    for duration in (0.0002, 0.003, 0.003, 0.5, 120.0):
+        tracker.record_request("POST", "/api/v1/tasks", duration, 201)
+    registry = CollectorRegistry()
+    registry.register(RouteLatencyCollector(tracker))
+
+    text = generate_latest(registry).decode()
+
+    labels = {"env": performance._ENVIRONMENT, "method": "POST", "route": "/api/v1/tasks"}
+    bucket = "ggrt_http_request_duration_seconds_bucket"
+    assert registry.get_sample_value(bucket, {**labels, "le": "0.000256"}) == 1.0
+    assert registry.get_sample_value(bucket, {**labels, "le": "0.004096"}) == 3.0
+    assert registry.get_sample_value(bucket, {**labels, "le": "33.554432"}) == 4.0
+    assert registry.get_sample_value(bucket, {**labels, "le": "+Inf"}) == 5.0
+    assert 'le="0.524288"' in text
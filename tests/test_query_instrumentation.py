@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la instrumentación SQL automática (fingerprints, rutas y N+1).
+"""
+
+import pytest
+import pytest_asyncio
+from fastapi import APIRouter, FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import CollectorRegistry
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.api.dependencies import get_current_active_superuser
+from src.api.main import app as main_app
+from src.core import performance
+from src.core.performance import QueryFingerprintCollector, fingerprint_sql, query_tracker
+from src.core.query_instrumentation import (
+    NO_REQUEST_ROUTE,
+    install_query_instrumentation,
+    request_query_context,
+    uninstall_query_instrumentation,
+)
+
+
+def test_fingerprint_normalizes_literals_and_lists():
+    a, normalized = fingerprint_sql("SELECT * FROM tareas WHERE id IN (?, ?, ?) AND titulo = 'x' LIMIT 10")
+    b, _ = fingerprint_sql("SELECT * FROM tareas\n  WHERE id IN ($1::INTEGER) AND titulo = 'otro' LIMIT 50")
+    c, _ = fingerprint_sql("SELECT * FROM tareas WHERE id = ?")
+
+    assert normalized == "SELECT * FROM tareas WHERE id IN (?, ...) AND titulo = ? LIMIT ?"
+    assert a == b and a != c
+    assert fingerprint_sql("INSERT INTO t (a) VALUES (?, ?), (?, ?)")[0] == fingerprint_sql(
+        "INSERT INTO t (a) VALUES (%(a_m0)s, %(b_m0)s)"
+    )[0]
+
+
+@pytest_asyncio.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, owner INTEGER)"))
+    install_query_instrumentation(engine.sync_engine, n_plus_one_threshold=5)
+    query_tracker.reset_statistics()
+    yield engine
+    uninstall_query_instrumentation(engine.sync_engine)
+    query_tracker.reset_statistics()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_engine_events_feed_tracker(engine):
+    async with engine.begin() as conn:
+        for owner in range(3):
+            await conn.execute(text(f"INSERT INTO items (owner) VALUES ({owner})"))
+        await conn.execute(text("UPDATE items SET owner = 9 WHERE owner < 2"))
+        with pytest.raises(Exception):
+            await conn.execute(text("SELECT missing FROM items"))
+
+    by_type = {s["query_type"]: s for s in query_tracker.get_top_queries(order_by="count")}
+    assert by_type["INSERT"]["count"] == 3
+    assert by_type["INSERT"]["statement"] == "INSERT INTO items (owner) VALUES (?)"
+    assert by_type["UPDATE"]["rows"] == 2
+    assert by_type["SELECT"]["errors"] == 1
+    # Fuera de una solicitud la ruta es la etiqueta fija, nunca None
+    assert by_type["INSERT"]["routes"] == {NO_REQUEST_ROUTE: 3}
+    assert query_tracker.get_statistics()["statistics"]["INSERT"]["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_n_plus_one_detected_per_request_with_route(engine):
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def track(request: Request, call_next):
+        with request_query_context(request.scope):
+            return await call_next(request)
+
+    router = APIRouter(prefix="/items")
+
+    @router.get("/{owner}")
+    async def list_items(owner: int):
+        async with engine.connect() as conn:
+            ids = [row.id for row in await conn.execute(text("SELECT id FROM items WHERE owner = :o"), {"o": owner})]
+            for item_id in range(8):
+                await conn.execute(text("SELECT owner FROM items WHERE id = :id"), {"id": item_id})
+        return ids
+
+    app.include_router(router, prefix="/api/v1")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/api/v1/items/1")
+        await client.get("/api/v1/items/2")
+
+    n_plus_one_fp, _ = fingerprint_sql("SELECT owner FROM items WHERE id = :id")
+    assert query_tracker.n_plus_one == {("/api/v1/items/{owner}", n_plus_one_fp): 2}
+    top = query_tracker.get_top_queries(order_by="n_plus_one")[0]
+    assert top["fingerprint"] == n_plus_one_fp
+    assert top["count"] == 16 and top["n_plus_one_requests"] == 2
+    assert top["routes"] == {"/api/v1/items/{owner}": 16}
+
+    registry = CollectorRegistry()
+    registry.register(QueryFingerprintCollector(query_tracker))
+    env = performance._ENVIRONMENT
+    assert registry.get_sample_value(
+        "ggrt_db_query_duration_seconds_count",
+        {"env": env, "fingerprint": n_plus_one_fp, "query_type": "SELECT"},
+    ) == 16.0
+    assert registry.get_sample_value(
+        "ggrt_db_n_plus_one_total",
+        {"env": env, "route": "/api/v1/items/{owner}", "fingerprint": n_plus_one_fp},
+    ) == 2.0
+
+    main_app.dependency_overrides[get_current_active_superuser] = lambda: None
+    try:
+        async with AsyncClient(transport=ASGITransport(app=main_app), base_url="http://test") as client:
+            response = await client.get("/api/v1/admin/queries/top", params={"order_by": "n_plus_one"})
+    finally:
+        del main_app.dependency_overrides[get_current_active_superuser]
+    assert response.status_code == 200
+    assert response.json()["queries"][0]["fingerprint"] == n_plus_one_fp
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del rate limiting gubernamental (GCRA en memoria y en Redis).
+"""
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.api.middleware import government_rate_limiting as rl
+from src.api.middleware.government_rate_limiting import (
+    GovernmentRateLimiter,
+    GovernmentRateLimitMiddleware,
+    RedisGovernmentRateLimiter,
+    configure_government_rate_limiter,
+)
+
+
+def test_gcra_allows_burst_then_spaces_requests():
+    limiter = GovernmentRateLimiter()
+    decisions = [limiter.check_now("c", 60, 0.0) for _ in range(61)]
+
+    assert not any(d.limited for d in decisions[:60])
+    assert decisions[0].remaining == 59 and decisions[59].remaining == 0
+    assert decisions[60].limited and decisions[60].retry_after == 1
+    # Un intervalo (60 s / 60) después se libera exactamente una solicitud
+    assert not limiter.check_now("c", 60, 1.0).limited
+    assert limiter.check_now("c", 60, 1.0).limited
+    # Los límites de clases distintas no comparten presupuesto
+    assert not limiter.check_now("c", 10, 1.0).limited
+
+
+def test_client_tracking_is_bounded_lru():
+    limiter = GovernmentRateLimiter(max_clients=3)
+    for i in range(5):
+        limiter.check_now(f"client{i}", 100, 0.0)
+    limiter.check_now("client2", 100, 0.0)
+    limiter.check_now("client5", 100, 0.0)
+
+    assert list(k.split(":")[0] for k in limiter._tat) == ["client4", "client2", "client5"]
+    assert limiter.get_stats()["evictions"] == 3
+
+
+class FakeScriptRedis:
+    """Ejecuta el paso GCRA del script Lua en Python con un reloj controlable."""
+
+    def __init__(self):
+        self.now_ms = 0.0
+        self.store: dict[str, float] = {}
+        self.fail = False
+        self.calls = 0
+
+    def register_script(self, lua: str):
+        async def script(keys, args):
+            self.calls += 1
+            if self.fail:
+                raise ConnectionError("redis caído")
+            limit, window = int(args[0]), float(args[1])
+            tat = self.store.get(keys[0], self.now_ms)
+            new_tat, wait = rl._gcra(tat, self.now_ms, limit, window)
+            if new_tat is None:
+                return [1, int(wait + 0.999), 0]
+            self.store[keys[0]] = new_tat
+            return [0, 0, int((window - (new_tat - self.now_ms)) / (window / limit))]
+        return script
+
+    async def aclose(self):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_shares_budget_between_workers():
+    fake = FakeScriptRedis()
+    worker_a = RedisGovernmentRateLimiter(client=fake)
+    worker_b = RedisGovernmentRateLimiter(client=fake)
+
+    for _ in range(5):
+        assert not (await worker_a.check("ip", 10)).limited
+    for _ in range(5):
+        assert not (await worker_b.check("ip", 10)).limited
+    blocked = await worker_a.check("ip", 10)
+
+    assert blocked.limited and blocked.retry_after == 6
+    assert fake.calls == 11
+    assert list(fake.store) == ["gad:ratelimit:ip:10"]
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_falls_back_to_local_limits():
+    fake = FakeScriptRedis()
+    fake.fail = True
+    limiter = RedisGovernmentRateLimiter(client=fake)
+
+    results = [await limiter.check("ip", 2) for _ in range(3)]
+
+    assert [r.limited for r in results] == [False, False, True]
+    assert limiter.get_stats()["redis_errors"] == 3
+
+
+@pytest.mark.asyncio
+async def test_middleware_returns_429_with_headers():
+    app = FastAPI()
+    app.add_middleware(GovernmentRateLimitMiddleware)
+
+    @app.get("/api/v1/ciudadano/tramites")
+    async def tramites():
+        return {"ok": True}
+
+    previous = configure_government_rate_limiter(GovernmentRateLimiter())
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            responses = [await client.get("/api/v1/ciudadano/tramites") for _ in range(61)]
+    finally:
+        configure_government_rate_limiter(previous)
+
+    assert all(r.status_code == 200 for r in responses[:60])
+    assert responses[0].headers["X-RateLimit-Remaining"] == "59"
+    assert responses[60].status_code == 429
+    assert int(responses[60].headers["Retry-After"]) >= 1
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del middleware ASGI único de solicitudes (RequestPipelineMiddleware).
+"""
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from src.api.middleware import government_rate_limiting as rl
+from src.api.middleware.request_pipeline import RequestPipelineMiddleware, cors_wildcard_enabled
+from src.core.performance import performance_middleware
+
+
+def _app(**options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestPipelineMiddleware, **options)
+
+    @app.get("/api/v1/ping")
+    async def ping(request: Request):
+        return PlainTextResponse(request.state.request_id, headers={"server": "leak", "X-Frame-Options": "SAMEORIGIN"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk{i};".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.post("/api/v1/upload")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    return app
+
+
+async def _client(app: FastAPI) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiter():
+    previous = rl.configure_government_rate_limiter(rl.GovernmentRateLimiter())
+    yield
+    rl.configure_government_rate_limiter(previous)
+
+
+@pytest.mark.asyncio
+async def test_security_headers_and_request_id():
+    async with await _client(_app()) as client:
+        response = await client.get("/api/v1/ping")
+        echoed = await client.get("/api/v1/ping", headers={"X-Request-ID": "abc-123"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert response.headers["X-Frame-Options"] == "DENY"
+    assert response.headers["Content-Security-Policy"].startswith("default-src 'none'")
+    assert "server" not in response.headers
+    assert response.headers["X-Request-ID"] == response.text and len(response.text) == 32
+    assert response.headers["X-RateLimit-Limit"] == "100"
+    assert echoed.headers["X-Request-ID"] == "abc-123" and echoed.text == "abc-123"
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_passes_through():
+    async with await _client(_app()) as client:
+        response = await client.get("/stream")
+
+    assert response.text == "chunk0;chunk1;chunk2;"
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    # El CSP solo aplica a /api/
+    assert "Content-Security-Policy" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_body_limit_by_content_length_and_streamed_body():
+    async with await _client(_app(max_body_size=10)) as client:
+        small = await client.post("/api/v1/upload", content=b"12345")
+        declared = await client.post("/api/v1/upload", content=b"x" * 11)
+
+        async def chunked():
+            for _ in range(4):
+                yield b"12345"
+
+        streamed = await client.post("/api/v1/upload", content=chunked())
+
+    assert small.json() == {"size": 5}
+    assert declared.status_code == 413
+    assert streamed.status_code == 413
+    assert streamed.json() == {"detail": "Request body too large"}
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_rejects_with_429():
+    async with await _client(_app()) as client:
+        responses = [await client.get("/api/v1/ciudadano/tramites") for _ in range(61)]
+        health = await client.get("/health")
+
+    assert responses[0].headers["X-RateLimit-Remaining"] == "59"
+    assert responses[-1].status_code == 429
+    assert responses[-1].headers["Retry-After"] == "1"
+    assert responses[-1].headers["X-Content-Type-Options"] == "nosniff"
+    assert "X-RateLimit-Limit" not in health.headers
+
+
+@pytest.mark.asyncio
+async def test_rate_limiting_can_be_disabled():
+    async with await _client(_app(rate_limiting=False)) as client:
+        responses = [await client.get("/api/v1/ciudadano/tramites") for _ in range(61)]
+    assert all(r.status_code == 404 for r in responses)
+    assert "X-RateLimit-Limit" not in responses[0].headers
+
+
+@pytest.mark.asyncio
+async def test_records_route_latency():
+    performance_middleware.reset_statistics()
+    async with await _client(_app()) as client:
+        await client.get("/api/v1/ping")
+    stats = performance_middleware.endpoint_stats["GET /api/v1/ping"]
+    assert stats.histogram.count == 1
+    assert stats.status_codes["200"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cors_wildcard_headers_precomputed():
+    class Settings:
+        cors_origins_list = []
+        ALLOWED_HOSTS = ["*"]
+
+    assert cors_wildcard_enabled(Settings())
+    async with await _client(_app(cors_wildcard=True)) as client:
+        response = await client.get("/stream")
+    assert response.headers["Access-Control-Allow-Origin"] == "*"
+    assert response.headers["Access-Control-Allow-Headers"] == "*"
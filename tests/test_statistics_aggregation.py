@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de los agregados SQL de /stats (ruta SQLite).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.api.models.tarea import Tarea
+from src.api.routers.statistics import aggregate_user_task_stats, get_user_statistics
+from src.shared.constants import TaskStatus
+
+
+@pytest.mark.asyncio
+async def test_aggregates_match_row_by_row_counts(db_session, user, make_task):
+    day1 = datetime(2030, 1, 1, 10, 0)
+    day2 = datetime(2030, 1, 2, 18, 0)
+
+    def completed(n: int, horas: float, fin: datetime, **extra) -> Tarea:
+        return make_task(user.id, n, estado=TaskStatus.COMPLETED,
+                         inicio_real=fin - timedelta(hours=horas), fin_real=fin, **extra)
+
+    db_session.add_all([
+        completed(1, 2.0, day1),
+        completed(2, 4.0, day1),
+        completed(3, 6.0, day2),
+        make_task(user.id, 4, estado=TaskStatus.IN_PROGRESS),
+        make_task(user.id, 5, estado=TaskStatus.PROGRAMMED),
+        make_task(user.id, 6, estado=TaskStatus.CANCELLED),
+        # Borrada lógicamente: no cuenta
+        completed(7, 100.0, day2, deleted_at=datetime.now()),
+    ])
+    await db_session.commit()
+
+    stats = await aggregate_user_task_stats(db_session, user.id, datetime.utcnow() - timedelta(days=1))
+
+    assert stats["total"] == 6
+    assert stats["estados"] == {
+        "COMPLETED": 3, "IN_PROGRESS": 1, "PROGRAMMED": 1, "CANCELLED": 1, "PAUSED": 0,
+    }
+    assert stats["promedio_duracion_horas"] == pytest.approx(4.0, abs=1e-3)
+    assert stats["completadas_por_dia"] == [
+        {"fecha": "2030-01-01", "completadas": 2},
+        {"fecha": "2030-01-02", "completadas": 1},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_aggregates_for_user_without_tasks(db_session, user):
+    stats = await aggregate_user_task_stats(db_session, user.id + 999, datetime.utcnow() - timedelta(days=30))
+
+    assert stats["total"] == 0
+    assert set(stats["estados"].values()) == {0}
+    assert stats["promedio_duracion_horas"] == 0.0
+    assert stats["completadas_por_dia"] == []
+
+
+@pytest.mark.asyncio
+async def test_bypassing_cache_skips_cache_key(db_session, user, mock_cache_service):
+    stats = await get_user_statistics(
+        user.id, days=30, use_cache=False, db=db_session,
+        cache=mock_cache_service, current_user=user,
+    )
+    assert stats["_cache"]["hit"] is False
+    mock_cache_service.namespaced_key.assert_not_awaited()
+    mock_cache_service.get.assert_not_awaited()
+    mock_cache_service.set.assert_not_awaited()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del logging estructurado perezoso (StructuredLogger y sinks).
+"""
+
+import io
+import json
+import threading
+import time
+
+import pytest
+from loguru import logger
+
+from src.core import logging as gad_logging
+from src.core.logging import BatchedQueueSink, get_logger, json_formatter, text_formatter
+
+
+class CountingValue:
+    """Cuenta cuántas veces se serializa el campo."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __str__(self) -> str:
+        self.calls += 1
+        return "valor"
+
+
+@pytest.fixture
+def captured(monkeypatch):
+    monkeypatch.setattr(gad_logging, "_min_level_no", 0)
+    gad_logging.set_log_level("INFO")
+    records = []
+    stream = io.StringIO()
+    handler_ids = [
+        logger.add(records.append, level="INFO", format="{message}"),
+        logger.add(stream, level="INFO", format=text_formatter("{level} | {message}")),
+    ]
+    yield records, stream
+    for handler_id in handler_ids:
+        logger.remove(handler_id)
+
+
+def test_disabled_level_does_not_serialize_fields(captured):
+    records, _ = captured
+    value = CountingValue()
+
+    get_logger("test").debug("mensaje por conexión", payload=value)
+
+    assert value.calls == 0
+    assert records == []
+
+
+def test_fields_travel_as_extra(captured):
+    records, stream = captured
+
+    get_logger("test").info("Request: {path}", method="GET", status=200)
+
+    record = records[0].record
+    assert record["message"] == "Request: {path}"
+    assert record["extra"]["service"] == "test"
+    assert record["extra"]["method"] == "GET" and record["extra"]["status"] == 200
+    assert record["function"] == "test_fields_travel_as_extra"
+    assert stream.getvalue() == 'INFO | Request: {path} | Data: {"method":"GET","status":200}\n'
+
+
+def test_error_adds_exception_fields(captured):
+    records, stream = captured
+
+    get_logger("test").error("fallo", error=ValueError("malo"), path="/x")
+
+    extra = records[0].record["extra"]
+    assert extra["error_type"] == "ValueError" and extra["error_message"] == "malo"
+    assert stream.getvalue().startswith("ERROR | fallo | Error: ")
+
+
+def test_json_formatter_serializes_once_per_record(captured):
+    _, _ = captured
+    value = CountingValue()
+    stream = io.StringIO()
+    handler_id = logger.add(stream, level="INFO", format=json_formatter)
+    try:
+        get_logger("api").info("hola", campo=value)
+    finally:
+        logger.remove(handler_id)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["service"] == "api"
+    assert entry["message"] == "hola"
+    assert entry["data"] == {"campo": "valor"}
+    # Una vez para el sink JSON y otra para el de texto del fixture
+    assert value.calls == 2
+
+
+def test_batched_sink_writes_in_batches_and_drains_on_stop():
+    class CountingStream(io.StringIO):
+        writes = 0
+
+        def write(self, text):
+            CountingStream.writes += 1
+            return super().write(text)
+
+    stream = CountingStream()
+    sink = BatchedQueueSink(stream, max_batch=100, flush_interval=0.05)
+    for i in range(50):
+        sink.write(f"linea {i}\n")
+    sink.stop()
+
+    assert stream.getvalue().splitlines() == [f"linea {i}" for i in range(50)]
+    assert CountingStream.writes < 50
+    assert sink.dropped == 0
+
+
+def test_batched_sink_drops_when_full():
+    stream = io.StringIO()
+    sink = BatchedQueueSink(stream, max_queue=1, flush_interval=10.0)
+    for _ in range(1000):
+        sink.write("x\n")
+    sink.stop()
+    assert sink.dropped > 0
+    assert stream.getvalue().count("x") + sink.dropped == 1000
+
+
+def test_batched_sink_stops_with_messages_after_sentinel():
+    release = threading.Event()
+
+    class GatedStream(io.StringIO):
+        def write(self, text):
+            release.wait(timeout=5)
+            return super().write(text)
+
+    stream = GatedStream()
+    sink = BatchedQueueSink(stream, flush_interval=0.05)
+    sink.write("antes\n")
+    time.sleep(0.1)  # el hilo queda bloqueado escribiendo el primer lote
+    # Un mensaje llega después del centinela: queda en medio del siguiente lote
+    sink._queue.put(BatchedQueueSink._STOP)
+    sink.write("despues\n")
+    release.set()
+    sink._thread.join(timeout=5)
+
+    assert not sink._thread.is_alive()
+    assert stream.getvalue().splitlines() == ["antes", "despues"]
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del rollup incremental de métricas de tareas (ruta SQLite).
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models.metrica_tarea import MetricaTarea
+from src.api.models.tarea import Tarea
+from src.core.task_metrics import (
+    install_task_metrics_rollup,
+    read_user_task_stats,
+    reconcile_task_metrics,
+    rollup_ready,
+    uninstall_task_metrics_rollup,
+)
+from src.shared.constants import TaskPriority, TaskStatus
+
+
+@pytest.fixture(autouse=True)
+def rollup_listener():
+    install_task_metrics_rollup()
+    yield
+    uninstall_task_metrics_rollup()
+
+
+async def _rows(db_session) -> dict:
+    result = await db_session.execute(
+        select(MetricaTarea.estado, MetricaTarea.total_tareas,
+               MetricaTarea.tareas_con_duracion, MetricaTarea.total_horas)
+    )
+    return {estado.name: (total, timed, hours) for estado, total, timed, hours in result if total}
+
+
+@pytest.mark.asyncio
+async def test_rollup_follows_task_lifecycle(db_session, user, make_task):
+    tasks = [make_task(user.id, n) for n in range(3)]
+    db_session.add_all(tasks)
+    await db_session.commit()
+    assert await _rows(db_session) == {"PROGRAMMED": (3, 0, 0.0)}
+
+    fin = datetime(2030, 1, 1, 12, 0)
+    tasks[0].estado = TaskStatus.COMPLETED
+    tasks[0].inicio_real = fin - timedelta(hours=3)
+    tasks[0].fin_real = fin
+    # El bot asigna el valor del enum como texto
+    tasks[1].estado = "en_curso"
+    await db_session.commit()
+    assert await _rows(db_session) == {
+        "PROGRAMMED": (1, 0, 0.0),
+        "IN_PROGRESS": (1, 0, 0.0),
+        "COMPLETED": (1, 1, pytest.approx(3.0)),
+    }
+
+    tasks[2].deleted_at = datetime.now()
+    await db_session.delete(tasks[1])
+    await db_session.commit()
+    assert await _rows(db_session) == {"COMPLETED": (1, 1, pytest.approx(3.0))}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_repairs_drift(db_session, user, make_task):
+    db_session.add_all([make_task(user.id, n, estado=TaskStatus.IN_PROGRESS) for n in range(2)])
+    await db_session.commit()
+    assert await reconcile_task_metrics(db_session) == 0
+
+    # Escritura fuera del ORM: el listener no la ve
+    await db_session.execute(
+        update(Tarea).where(Tarea.codigo == "TASK000").values(estado=TaskStatus.CANCELLED)
+    )
+    await db_session.commit()
+    assert await _rows(db_session) == {"IN_PROGRESS": (2, 0, 0.0)}
+
+    assert await reconcile_task_metrics(db_session) == 2
+    assert await _rows(db_session) == {"IN_PROGRESS": (1, 0, 0.0), "CANCELLED": (1, 0, 0.0)}
+
+
+@pytest.mark.asyncio
+async def test_read_user_task_stats_from_rollup(db_session, user, make_task):
+    fin = datetime(2030, 1, 1, 10, 0)
+    db_session.add_all([
+        make_task(user.id, 1, estado=TaskStatus.COMPLETED, inicio_real=fin - timedelta(hours=2), fin_real=fin),
+        make_task(user.id, 2, estado=TaskStatus.COMPLETED, inicio_real=fin - timedelta(hours=6), fin_real=fin),
+        make_task(user.id, 3, estado=TaskStatus.COMPLETED),
+        make_task(user.id, 4, estado=TaskStatus.PAUSED),
+    ])
+    await db_session.commit()
+
+    stats = await read_user_task_stats(db_session, user.id, date.today() - timedelta(days=1))
+
+    assert stats["total"] == 4
+    assert stats["estados"]["COMPLETED"] == 3 and stats["estados"]["PAUSED"] == 1
+    # Solo promedian las finalizadas con inicio_real y fin_real
+    assert stats["promedio_duracion_horas"] == pytest.approx(4.0)
+    assert [d["completadas"] for d in stats["completadas_por_dia"]] == [3]
+    assert (await read_user_task_stats(db_session, user.id + 999, date.today()))["total"] == 0
+
+
+@pytest.mark.asyncio
+async def test_tasks_created_before_rollup_never_produce_negative_rows(db_session, user, make_task):
+    # Tarea anterior al rollup (listeners sin instalar): su bucket nunca se contó
+    uninstall_task_metrics_rollup()
+    legacy = make_task(user.id, 1)
+    db_session.add(legacy)
+    await db_session.commit()
+    install_task_metrics_rollup()
+    counted = make_task(user.id, 2)
+    db_session.add(counted)
+    await db_session.commit()
+
+    legacy.estado = TaskStatus.IN_PROGRESS
+    counted.estado = TaskStatus.IN_PROGRESS
+    await db_session.commit()
+
+    result = await db_session.execute(select(MetricaTarea.estado, MetricaTarea.total_tareas))
+    rows = {estado.name: total for estado, total in result}
+    assert rows == {"PROGRAMMED": 0, "IN_PROGRESS": 2}
+
+    # Un bucket que nunca existió no se crea con un decremento
+    legacy.estado = TaskStatus.PAUSED
+    await db_session.flush()
+    legacy.prioridad = TaskPriority.HIGH
+    await db_session.commit()
+    result = await db_session.execute(select(MetricaTarea.total_tareas))
+    assert min(total for (total,) in result) >= 0
+
+
+@pytest.mark.asyncio
+async def test_rollup_ready_only_after_reconciliation(db_session, user, make_task):
+    uninstall_task_metrics_rollup()
+    install_task_metrics_rollup()
+    assert not rollup_ready()
+
+    await reconcile_task_metrics(db_session)
+    assert rollup_ready()
+
+    uninstall_task_metrics_rollup()
+    assert not rollup_ready()
+
+
+@pytest.mark.asyncio
+async def test_listeners_only_apply_to_application_sessions(db_session, user, make_task):
+    # Sesión con la Session síncrona por defecto (script, otro engine)
+    other = AsyncSession(bind=db_session.bind)
+    other.add(make_task(user.id, 1))
+    await other.flush()
+    assert (await other.execute(select(MetricaTarea.id))).first() is None
+    await other.close()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del resumen de tareas por telegram_id (una consulta, paginación por cursor).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from src.api.routers.telegram_tasks import (
+    decode_task_cursor,
+    encode_task_cursor,
+    fetch_user_task_summary,
+)
+from src.shared.constants import TaskStatus
+
+TELEGRAM_ID = 777000111
+
+
+@pytest_asyncio.fixture
+async def telegram_user(db_session, user):
+    user.telegram_id = TELEGRAM_ID
+    await db_session.commit()
+    return user
+
+
+def test_cursor_round_trip_fits_callback_data():
+    aware = datetime(2030, 1, 1, 8, 30, 15, 123456).astimezone()
+    naive = datetime(2030, 1, 1, 8, 30, 15, 123456)
+    for inicio in (aware, naive):
+        cursor = encode_task_cursor(inicio, 2**31 - 1)
+        decoded, task_id = decode_task_cursor(cursor)
+        assert (decoded, task_id) == (inicio, 2**31 - 1)
+        assert (decoded.tzinfo is None) == (inicio.tzinfo is None)
+        assert len(f"hist:next:{cursor}".encode()) <= 64
+    with pytest.raises(ValueError):
+        decode_task_cursor("no-es-un-cursor")
+
+
+@pytest.mark.asyncio
+async def test_counts_and_keyset_pages(db_session, telegram_user, make_task):
+    base = datetime(2030, 1, 1, 8, 0)
+    estados = [TaskStatus.PROGRAMMED, TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED]
+    tasks = [
+        make_task(telegram_user.id, n, estado=estados[n % 3], inicio_programado=base + timedelta(hours=n // 2))
+        for n in range(9)
+    ]
+    tasks.append(make_task(telegram_user.id, 9, inicio_programado=base, deleted_at=datetime.now()))
+    db_session.add_all(tasks)
+    await db_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        summary = await fetch_user_task_summary(db_session, TELEGRAM_ID, cursor=cursor, limit=2)
+        assert (summary["total_tasks"], summary["pending_tasks"]) == (9, 3)
+        assert (summary["active_tasks"], summary["completed_tasks"]) == (3, 3)
+        seen.extend(summary["tasks"])
+        cursor = summary["next_cursor"]
+        if cursor is None:
+            break
+
+    # Activas sin repetir, ordenadas por (inicio_programado, id); sin finalizadas ni borradas
+    expected = sorted(
+        (t for t in tasks[:9] if t.estado in (TaskStatus.PROGRAMMED, TaskStatus.IN_PROGRESS)),
+        key=lambda t: (t.inicio_programado, t.id),
+    )
+    assert [t["codigo"] for t in seen] == [t.codigo for t in expected]
+    assert set(seen[0]) == {"id", "codigo", "titulo", "estado", "tipo", "inicio_programado"}
+
+
+@pytest.mark.asyncio
+async def test_user_without_tasks_and_unknown_user(db_session, telegram_user):
+    summary = await fetch_user_task_summary(db_session, TELEGRAM_ID)
+    assert summary == {
+        "total_tasks": 0,
+        "active_tasks": 0,
+        "pending_tasks": 0,
+        "completed_tasks": 0,
+        "tasks": [],
+        "next_cursor": None,
+    }
+    assert await fetch_user_task_summary(db_session, 123) is None
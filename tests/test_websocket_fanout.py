@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Tests del motor de fan-out de WebSocketManager (colas por conexión).
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import WebSocket
+
+from src.core.websockets import WebSocketManager, WSMessage, EventType
+from src.core.ws_fanout import SlowConsumerPolicy
+
+
+class FakeWebSocket(WebSocket):
+    """WebSocket mínimo; si ``gate`` está definido, cada envío espera a que se abra."""
+
+    def __init__(self, gate: asyncio.Event | None = None, fail: bool = False):
+        self.gate = gate
+        self.fail = fail
+        self.sent: list[dict] = []
+        self.closed_code: int | None = None
+
+    async def accept(self):
+        return None
+
+    async def send_text(self, data: str):
+        if self.fail:
+            raise RuntimeError("socket roto")
+        if self.gate is not None:
+            await self.gate.wait()
+        self.sent.append(json.loads(data))
+
+    async def close(self, code: int = 1000):
+        self.closed_code = code
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _notification(i: int = 0) -> WSMessage:
+    return WSMessage(event_type=EventType.NOTIFICATION, data={"i": i})
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_block_fast_client():
+    manager = WebSocketManager(enable_aggressive_cleanup=False)
+    slow = FakeWebSocket(gate=asyncio.Event())
+    fast = FakeWebSocket()
+    slow_id = await manager.connect(slow)
+    await manager.connect(fast)
+    await _drain()
+
+    sent = await manager.broadcast(_notification())
+    await _drain()
+
+    assert sent == 2
+    assert [m["event_type"] for m in fast.sent] == ["connection_ack", "notification"]
+    assert slow.sent == []
+    # El ACK está en vuelo (bloqueado); la notificación espera en cola
+    assert manager._senders[slow_id].queue_depth == 1
+
+    slow.gate.set()
+    await _drain()
+    assert [m["event_type"] for m in slow.sent] == ["connection_ack", "notification"]
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy_bounds_queue():
+    manager = WebSocketManager(enable_aggressive_cleanup=False, send_queue_size=2,
+                               slow_consumer_policy="drop_oldest")
+    ws = FakeWebSocket(gate=asyncio.Event())
+    cid = await manager.connect(ws)
+
+    for i in range(5):
+        await manager.broadcast(_notification(i))
+
+    assert manager._senders[cid].queue_depth == 2
+    assert manager.get_fanout_stats()["dropped_frames"] == 4
+
+    ws.gate.set()
+    await _drain()
+    assert [m["data"]["i"] for m in ws.sent] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_keeps_latest_state():
+    manager = WebSocketManager(enable_aggressive_cleanup=False, send_queue_size=2,
+                               slow_consumer_policy=SlowConsumerPolicy.COALESCE)
+    ws = FakeWebSocket(gate=asyncio.Event())
+    cid = await manager.connect(ws)
+
+    for i in range(3):
+        await manager.broadcast(WSMessage(event_type=EventType.DASHBOARD_UPDATE, data={"v": i}))
+
+    assert manager._senders[cid].queue_depth == 2
+    assert manager.get_fanout_stats()["coalesced_frames"] == 2
+
+    ws.gate.set()
+    await _drain()
+    assert [m["data"].get("v") for m in ws.sent] == [None, 2]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_never_merges_different_tasks():
+    manager = WebSocketManager(enable_aggressive_cleanup=False, send_queue_size=2,
+                               slow_consumer_policy=SlowConsumerPolicy.COALESCE)
+    ws = FakeWebSocket(gate=asyncio.Event())
+    await manager.connect(ws)
+
+    for task_id in (1, 2):
+        await manager.broadcast(WSMessage(event_type=EventType.TASK_UPDATED, data={"id": task_id}))
+
+    assert manager.get_fanout_stats()["coalesced_frames"] == 0
+
+    ws.gate.set()
+    await _drain()
+    assert [m["data"].get("id") for m in ws.sent] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_drops_slow_consumer():
+    manager = WebSocketManager(enable_aggressive_cleanup=False, send_queue_size=1,
+                               slow_consumer_policy="disconnect")
+    ws = FakeWebSocket(gate=asyncio.Event())
+    cid = await manager.connect(ws)
+
+    assert await manager.broadcast(_notification()) == 0
+    await _drain()
+
+    assert cid not in manager.active_connections
+    assert ws.closed_code == 1013
+    assert manager.slow_consumer_disconnects == 1
+
+
+@pytest.mark.asyncio
+async def test_send_failure_disconnects_connection():
+    manager = WebSocketManager(enable_aggressive_cleanup=False)
+    cid = await manager.connect(FakeWebSocket(fail=True))
+    await _drain()
+
+    assert cid not in manager.active_connections
+    assert manager.total_send_errors == 1
+
+
+@pytest.mark.asyncio
+async def test_fanout_latency_reported():
+    manager = WebSocketManager(enable_aggressive_cleanup=False)
+    for _ in range(3):
+        await manager.connect(FakeWebSocket())
+    await _drain()
+
+    await manager.broadcast(_notification())
+    await _drain()
+
+    latency = manager.get_stats()["fanout"]["latency"]
+    assert latency["broadcasts"] >= 1
+    assert latency["last_p99"] >= latency["last_p50"] >= 0.0
+
+
+@pytest.mark.asyncio
+async def test_broadcast_serializes_frame_once(monkeypatch: pytest.MonkeyPatch):
+    import src.core.websockets as ws_module
+
+    calls = []
+    original = ws_module.encode_frame
+
+    def counting_encode(payload):
+        calls.append(payload)
+        return original(payload)
+
+    monkeypatch.setattr(ws_module, "encode_frame", counting_encode)
+    manager = WebSocketManager(enable_aggressive_cleanup=False)
+    sockets = [FakeWebSocket() for _ in range(5)]
+    for ws in sockets:
+        await manager.connect(ws)
+    await _drain()
+    calls.clear()
+
+    assert await manager.broadcast(_notification(7)) == 5
+    await _drain()
+
+    assert len(calls) == 1
+    assert all(ws.sent[-1]["data"] == {"i": 7} for ws in sockets)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_local_frame_forwards_frame_verbatim():
+    manager = WebSocketManager(enable_aggressive_cleanup=False)
+    subscribed = FakeWebSocket()
+    other = FakeWebSocket()
+    sub_id = await manager.connect(subscribed)
+    await manager.connect(other)
+    manager.subscribe(sub_id, {"alerts"})
+    await _drain()
+
+    frame = json.dumps({"event_type": "alert", "data": {"x": 1}, "topic": "alerts"})
+    assert await manager.broadcast_local_frame(frame, "alert", "alerts") == 1
+    await _drain()
+
+    assert subscribed.sent[-1] == json.loads(frame)
+    assert other.sent[-1]["event_type"] == "connection_ack"
+
+
+@pytest.mark.asyncio
+async def test_inverted_indexes_follow_connection_lifecycle():
+    manager = WebSocketManager(enable_aggressive_cleanup=False)
+    cid = await manager.connect(FakeWebSocket(), user_id=7, user_role="ADMIN", user_priority=8)
+    channel = manager.active_connections[cid].assigned_channel
+
+    manager.subscribe(cid, {"alerts", " tasks "})
+    assert manager.topic_connections == {"alerts": {cid}, "tasks": {cid}}
+    assert cid in manager.channel_connections[channel]
+    assert manager.get_stats()["indexes"]["topics"] == {"keys": 2, "entries": 2}
+
+    manager.unsubscribe(cid, {"tasks"})
+    assert manager.topic_connections == {"alerts": {cid}}
+
+    await manager.disconnect(cid)
+    assert manager.topic_connections == {}
+    assert manager.channel_connections == {}
+    assert manager.channel_type_connections == {}
+    assert manager.user_connections == {} and manager.role_connections == {}
+
+
+@pytest.mark.asyncio
+async def test_targeted_sends_use_topic_and_channel_indexes():
+    manager = WebSocketManager(enable_aggressive_cleanup=False)
+    admin_ws, user_ws = FakeWebSocket(), FakeWebSocket()
+    admin_id = await manager.connect(admin_ws, user_id=1, user_role="ADMIN", user_priority=8)
+    user_id = await manager.connect(user_ws, user_id=2, user_role="LEVEL_1")
+    manager.subscribe(user_id, {"alerts"})
+    await _drain()
+
+    topic_msg = WSMessage(event_type=EventType.ALERT, data={}, topic="alerts")
+    assert await manager.broadcast(topic_msg) == 1
+    assert await manager.send_to_role("ADMIN", topic_msg) == 0
+
+    channel_type = manager.active_connections[admin_id].channel_type
+    assert await manager.broadcast_by_channel_type(channel_type, _notification()) == 1
+    await _drain()
+
+    assert [m["event_type"] for m in user_ws.sent] == ["connection_ack", "alert"]
+    assert [m["event_type"] for m in admin_ws.sent] == ["connection_ack", "notification"]
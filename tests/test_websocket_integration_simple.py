@@ -306,8 +306,8 @@ async def test_handle_efectivo_event_update_status_change():
     instance_data = {
         "id": 20,
         "nombre": "Carlos",
-        "_old_estado": "disponible",
-        "estado": "ocupado"
+        "_old_estado_disponibilidad": "disponible",
+        "estado_disponibilidad": "en_tarea"
     }
     
     await integrator._handle_efectivo_event("update", instance_data)
@@ -351,17 +351,18 @@ async def test_handle_usuario_event_logs_event():
 # ============================================================================
 
 @pytest.mark.asyncio
-async def test_trigger_dashboard_update_emits_system_event():
-    """_trigger_dashboard_update debe emitir evento de sistema."""
+async def test_trigger_dashboard_update_marks_dashboard_dirty():
+    """_trigger_dashboard_update debe avisar al publicador de deltas, sin emitir por evento."""
+    from src.core.dashboard_state import DashboardState
+
     mock_emitter = MagicMock()
     mock_emitter.emit_system_event = AsyncMock()
-    integrator = WebSocketModelIntegrator(emitter=mock_emitter)
+    integrator = WebSocketModelIntegrator(emitter=mock_emitter, dashboard=DashboardState())
     
     await integrator._trigger_dashboard_update()
     
-    mock_emitter.emit_system_event.assert_called_once()
-    call_args = mock_emitter.emit_system_event.call_args
-    assert call_args[0][0] == "dashboard_refresh"
+    assert integrator.dashboard._dirty.is_set()
+    mock_emitter.emit_system_event.assert_not_called()
 
 
 # ============================================================================
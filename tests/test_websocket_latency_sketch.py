@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de los histogramas de latencia por ventana de WebSocketMetricsCollector.
+"""
+
+import json
+
+import pytest
+
+from src.observability import metrics as obs
+from src.observability.metrics import WebSocketMetricsCollector
+
+
+def test_rolling_windows_forget_old_samples(fake_clock):
+    collector = WebSocketMetricsCollector(clock=fake_clock)
+    for _ in range(100):
+        collector.record_latency("general", 0.5)
+    fake_clock.now += 120
+    for _ in range(100):
+        collector.record_latency("general", 0.01)
+
+    assert collector.calculate_percentiles("general", "1m")["p99"] == pytest.approx(0.01, rel=0.07)
+    assert collector.calculate_percentiles("general", "5m")["p99"] == pytest.approx(0.5, rel=0.07)
+    assert collector.calculate_percentiles("general", "5m")["p50"] == pytest.approx(0.01, rel=0.07)
+    fake_clock.now += 3600
+    assert collector.calculate_percentiles("general", "1h") == {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    assert collector.latency_histogram("general", None).count == 200
+    assert collector.calculate_percentiles("unknown") == {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+
+def test_merged_snapshots_give_cluster_wide_p99(fake_clock):
+    fast, slow = WebSocketMetricsCollector(clock=fake_clock), WebSocketMetricsCollector(clock=fake_clock)
+    for _ in range(980):
+        fast.record_latency("admin", 0.002)
+    for _ in range(20):
+        slow.record_latency("admin", 1.0)
+    snapshots = [json.loads(json.dumps(w.snapshot())) for w in (fast, slow)]
+
+    cluster = WebSocketMetricsCollector.merge_snapshots(snapshots)["admin"]
+
+    # La media de los p99 de cada worker (~0.5 s) no es el p99 del clúster
+    assert cluster["p99"] == pytest.approx(1.0, rel=0.07)
+    assert cluster["p50"] == pytest.approx(0.002, rel=0.07)
+    totals = WebSocketMetricsCollector.merge_snapshots(snapshots, window=None)["admin"]
+    assert totals["p95"] == pytest.approx(0.002, rel=0.07) and totals["p99"] == pytest.approx(1.0, rel=0.07)
+
+
+def test_update_all_metrics_publishes_window_quantiles(monkeypatch, fake_clock):
+    collector = WebSocketMetricsCollector(clock=fake_clock)
+    for _ in range(10):
+        collector.record_latency("priority", 0.25)
+    monkeypatch.setattr(obs, "metrics_collector", collector)
+
+    obs.update_all_metrics_from_manager({"active_connections": 1})
+
+    labels = (obs.ENVIRONMENT, "priority")
+    assert obs.ws_latency_p99.labels(*labels)._value.get() == pytest.approx(0.25, rel=0.07)
+    assert obs.ws_latency_quantile.labels(*labels, "1h", "p50")._value.get() == pytest.approx(0.25, rel=0.07)
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de las colas acotadas con coalescencia de eventos WebSocket.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.api.middleware import websockets as ws_middleware
+from src.api.middleware.websockets import WebSocketEventEmitter, merge_emitter_events
+from src.core.websocket_integration import WebSocketModelIntegrator, merge_model_events
+from src.core.websockets import EventType
+from src.core.ws_event_batching import (
+    BatchingConfig,
+    CoalescingEventQueue,
+    EventQueueCollector,
+    OverflowPolicy,
+)
+
+
+def _config(**overrides) -> BatchingConfig:
+    return BatchingConfig(**{"window_seconds": 0.0, "max_pending": 3, **overrides})
+
+
+@pytest.mark.asyncio
+async def test_same_key_coalesces_and_keeps_position():
+    queue = CoalescingEventQueue("test", _config())
+    queue.put_nowait({"v": 1}, ("task", 1))
+    queue.put_nowait({"v": 2}, ("task", 2))
+    queue.put_nowait({"v": 3}, ("task", 1))
+
+    assert queue.qsize() == 2
+    assert await queue.get_batch() == [{"v": 3}, {"v": 2}]
+    assert (queue.enqueued, queue.coalesced, queue.delivered, queue.batches) == (2, 1, 2, 1)
+    # La latencia se registra al confirmar la entrega, no al extraer
+    assert queue.latency.count == 0
+    queue.task_done(2)
+    assert queue.latency.count == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_respects_window_and_max_batch():
+    queue = CoalescingEventQueue("test", _config(window_seconds=0.05, max_pending=100, max_batch=4))
+    for n in range(3):
+        queue.put_nowait({"n": n}, ("task", n))
+
+    async def late():
+        await asyncio.sleep(0.01)
+        for n in range(3, 10):
+            queue.put_nowait({"n": n}, ("task", n))
+
+    producer = asyncio.create_task(late())
+    first = await queue.get_batch()
+    await producer
+    assert [e["n"] for e in first] == [0, 1, 2, 3]
+    assert [e["n"] for e in await queue.get_batch()] == [4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_block_policy_waits_for_space_then_degrades():
+    queue = CoalescingEventQueue("test", _config(put_timeout=0.5))
+    for n in range(3):
+        await queue.put({"n": n}, ("task", n), "task")
+
+    async def consume():
+        await asyncio.sleep(0.02)
+        return queue.get_nowait()
+
+    consumer = asyncio.create_task(consume())
+    assert await queue.put({"n": 3}, ("task", 3), "task")
+    assert (await consumer)["n"] == 0
+    assert queue.producer_waits == 1
+
+    # Sin consumidor: tras put_timeout se descarta y se pide resincronizar
+    queue.config = _config(put_timeout=0.01)
+    assert not await queue.put({"n": 4}, ("task", 4), "task")
+    # Una clave ya pendiente siempre se acepta (coalescencia)
+    assert await queue.put({"n": 33}, ("task", 3), "task")
+    assert queue.dropped == 1 and queue.pop_resync() == {"task"}
+    assert queue.pop_resync() == set()
+
+
+def test_drop_oldest_and_degrade_policies():
+    oldest = CoalescingEventQueue("test", _config(policy=OverflowPolicy.DROP_OLDEST))
+    for n in range(5):
+        oldest.put_nowait({"n": n}, ("efectivo", n), "efectivo")
+    assert [oldest.get_nowait()["n"] for _ in range(3)] == [2, 3, 4]
+    assert oldest.dropped == 2 and oldest.pop_resync() == {"efectivo"}
+
+    degrade = CoalescingEventQueue("test", _config(policy=OverflowPolicy.DEGRADE))
+    results = [degrade.put_nowait({"n": n}, ("task", n), "task") for n in range(5)]
+    assert results == [True, True, True, False, False]
+    assert [degrade.get_nowait()["n"] for _ in range(3)] == [0, 1, 2]
+
+
+def _model_event(event_type: str, **data) -> dict:
+    return {"event_type": event_type, "model_name": "Tarea", "instance_data": {"id": 42, **data}}
+
+
+def test_merge_model_events_keeps_net_effect():
+    insert = _model_event("insert", estado="programada", prioridad=2)
+    update = _model_event("update", estado="en_curso", prioridad=2, _old_estado="programada")
+    finish = _model_event("update", estado="finalizada", prioridad=2, _old_estado="en_curso")
+    delete = _model_event("delete", estado="finalizada", prioridad=2)
+
+    assert merge_model_events(insert, update)["instance_data"] == {"id": 42, "estado": "en_curso", "prioridad": 2}
+    assert merge_model_events(insert, delete) is None
+
+    merged = merge_model_events(update, finish)
+    assert merged["event_type"] == "update"
+    assert merged["instance_data"]["_old_estado"] == "programada"
+    # Vuelta al estado original: sin cambio neto de estado
+    back = _model_event("update", estado="programada", prioridad=2, _old_estado="en_curso")
+    assert "_old_estado" not in merge_model_events(update, back)["instance_data"]
+
+    gone = merge_model_events(update, delete)
+    assert gone["event_type"] == "delete"
+    assert gone["instance_data"]["_old_estado"] == "programada"
+    restored = merge_model_events(delete, _model_event("insert", estado="finalizada", prioridad=2))
+    assert restored["event_type"] == "update" and "_old_estado" not in restored["instance_data"]
+
+
+def test_merge_emitter_events_keeps_created_and_original_status():
+    created = {"type": "task_event", "event_type": "created", "task_id": 1, "task_data": {"estado": "a"}}
+    changed = {
+        "type": "task_event", "event_type": "status_changed", "task_id": 1,
+        "task_data": {"estado": "b", "_status_change": {"old": "a", "new": "b"}},
+    }
+    again = {
+        "type": "task_event", "event_type": "status_changed", "task_id": 1,
+        "task_data": {"estado": "c", "_status_change": {"old": "b", "new": "c"}},
+    }
+    updated = {"type": "task_event", "event_type": "updated", "task_id": 1, "task_data": {"estado": "c"}}
+
+    assert merge_emitter_events(created, changed)["event_type"] == "created"
+    merged = merge_emitter_events(merge_emitter_events(changed, again), updated)
+    assert merged["event_type"] == "status_changed"
+    assert merged["task_data"]["_status_change"] == {"old": "a", "new": "c"}
+
+
+def test_merge_emitter_events_create_then_delete_cancels_out():
+    created = {"type": "task_event", "event_type": "created", "task_id": 1, "task_data": {}}
+    changed = {"type": "task_event", "event_type": "status_changed", "task_id": 1, "task_data": {}}
+    deleted = {"type": "task_event", "event_type": "deleted", "task_id": 1, "task_data": {}}
+
+    assert merge_emitter_events(created, deleted) is None
+    assert merge_emitter_events(changed, deleted)["event_type"] == "deleted"
+    assert merge_emitter_events(deleted, created)["event_type"] == "updated"
+
+    queue = CoalescingEventQueue("test", _config(), merge=merge_emitter_events)
+    queue.put_nowait(created, ("task", 1))
+    queue.put_nowait(deleted, ("task", 1))
+    assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_emitter_sends_one_frame_per_batch(monkeypatch):
+    manager = MagicMock()
+    manager.broadcast = AsyncMock(return_value=1)
+    manager.send_to_user = AsyncMock(return_value=1)
+    monkeypatch.setattr(ws_middleware, "websocket_manager", manager)
+    emitter = WebSocketEventEmitter(_config(max_pending=10_000, max_batch=1000))
+
+    for n in range(1000):
+        await emitter.emit_task_event("updated", n % 100, {"n": n})
+    await emitter.emit_efectivo_event("status_changed", 7, {"estado": "en_tarea"})
+    await emitter.emit_task_event("updated", 5, {"n": -1}, user_id=9)
+
+    await emitter._handle_batch(await emitter._event_queue.get_batch(), emitter._event_queue.pop_resync())
+
+    frame = manager.broadcast.await_args.args[0]
+    assert manager.broadcast.await_count == 1
+    assert frame.event_type == EventType.ENTITY_BATCH
+    assert frame.data["count"] == 101
+    # Gana el último estado de cada tarea
+    task_5 = next(e for e in frame.data["events"] if e["data"].get("task_id") == 5)
+    assert task_5["event_type"] == "task_updated" and task_5["data"]["task_data"] == {"n": 905}
+    # El evento dirigido a un usuario sale aparte, con el formato individual
+    assert manager.send_to_user.await_args.args[1].event_type == EventType.TASK_UPDATED
+
+
+@pytest.mark.asyncio
+async def test_dropped_model_events_trigger_resync():
+    emitter = MagicMock()
+    dashboard = MagicMock()
+    integrator = WebSocketModelIntegrator(
+        emitter, dashboard=dashboard, config=_config(policy=OverflowPolicy.DEGRADE, max_pending=1)
+    )
+    integrator._handle_model_event = AsyncMock()
+    integrator.queue_event_nowait("update", "Tarea", {"id": 1})
+    integrator.queue_event_nowait("update", "Tarea", {"id": 2})
+
+    processor = asyncio.create_task(integrator.process_events())
+    await asyncio.sleep(0.02)
+    processor.cancel()
+
+    dashboard.request_reconciliation.assert_called_once()
+    emitter.request_resync.assert_called_once_with("task")
+    assert integrator._handle_model_event.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_emitter_records_latency_after_broadcast(monkeypatch):
+    queue_latency_at_send = []
+    manager = MagicMock()
+
+    async def broadcast(message):
+        queue_latency_at_send.append(emitter._event_queue.latency.count)
+        return 1
+
+    manager.broadcast = broadcast
+    monkeypatch.setattr(ws_middleware, "websocket_manager", manager)
+    emitter = WebSocketEventEmitter(_config())
+    await emitter.emit_task_event("updated", 1, {"n": 1})
+
+    await emitter.start()
+    await asyncio.sleep(0.02)
+    await emitter.stop()
+
+    assert queue_latency_at_send == [0]
+    assert emitter._event_queue.latency.count == 1
+
+
+def test_collector_exports_queue_metrics():
+    queue = CoalescingEventQueue("collector-test", _config())
+    queue.put_nowait({"n": 1}, ("task", 1))
+    queue.put_nowait({"n": 2}, ("task", 1))
+    queue.get_nowait()
+    queue.task_done()
+
+    families = {family.name: family for family in EventQueueCollector().collect()}
+    samples = {
+        (s.name, tuple(sorted(s.labels.items()))): s.value
+        for family in families.values() for s in family.samples
+        if s.labels.get("queue") == "collector-test"
+    }
+    assert samples[("ggrt_ws_event_queue_depth", (("queue", "collector-test"),))] == 0
+    assert samples[("ggrt_ws_events_total", (("outcome", "coalesced"), ("queue", "collector-test")))] == 1
+    assert samples[("ggrt_ws_event_batch_size_count", (("queue", "collector-test"),))] == 1
+    assert samples[("ggrt_ws_event_latency_seconds_count", (("queue", "collector-test"),))] == 1
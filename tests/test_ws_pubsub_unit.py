@@ -99,3 +99,135 @@ async def test_publish_sends_payload(monkeypatch: pytest.MonkeyPatch):
     client = fake_asyncio.last_client
     assert client is not None
     assert client.published and client.published[0][0] == "test_channel"
+
+
+def test_envelope_roundtrip_keeps_frame_untouched():
+    from src.core.ws_pubsub import decode_envelope, encode_envelope
+
+    frame = '{"event_type":"notification","data":{"text":"a\\nb"}}'
+    envelope = encode_envelope(frame, "notification", "alerts", "w1")
+    assert isinstance(envelope, bytes)
+    assert decode_envelope(envelope) == (frame, "notification", "alerts", "w1")
+    assert decode_envelope(encode_envelope(frame, "notification")) == (frame, "notification", None, None)
+    # Payload sin cabecera (formato anterior)
+    assert decode_envelope(frame) is None
+    assert decode_envelope(frame.encode("utf-8")) is None
+
+
+class FakePipeline:
+    def __init__(self, client: "BatchingRedis"):
+        self.client = client
+        self.commands: list[tuple[str, bytes]] = []
+
+    def publish(self, channel: str, payload: bytes) -> None:
+        self.commands.append((channel, payload))
+
+    async def execute(self) -> None:
+        self.client.round_trips += 1
+        self.client.published.extend(self.commands)
+
+
+class BatchingRedis(FakeRedis):
+    def __init__(self, queue: asyncio.Queue):
+        super().__init__(queue)
+        self.round_trips = 0
+        self.pubsubs: list[FakePubSub] = []
+
+    async def publish(self, channel: str, payload: str) -> None:
+        self.round_trips += 1
+        await super().publish(channel, payload)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def pubsub(self) -> "ShardedPubSub":
+        ps = ShardedPubSub(self.queue)
+        self.pubsubs.append(ps)
+        return ps
+
+
+class ShardedPubSub(FakePubSub):
+    async def subscribe(self, *channels: str) -> None:
+        self._subscribed.extend(channels)
+
+    async def unsubscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self._subscribed.remove(channel)
+
+
+@pytest.mark.asyncio
+async def test_publish_batches_within_window_in_one_pipeline():
+    client = BatchingRedis(asyncio.Queue())
+    pubsub = RedisWebSocketPubSub("redis://fake", channel="ws", batch_window_ms=5, client=client)
+
+    for i in range(10):
+        await pubsub.publish_frame(f'{{"i":{i}}}', "notification")
+    assert client.published == []
+
+    await asyncio.sleep(0.02)
+    assert client.round_trips == 1
+    assert len(client.published) == 10
+    assert pubsub.get_stats()["published_batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_flushes_when_batch_is_full_and_on_stop():
+    client = BatchingRedis(asyncio.Queue())
+    pubsub = RedisWebSocketPubSub("redis://fake", channel="ws", batch_window_ms=1000,
+                                  max_batch=4, client=client)
+
+    for i in range(6):
+        await pubsub.publish_frame(f'{{"i":{i}}}', "notification")
+    assert client.round_trips == 1 and len(client.published) == 4
+
+    await pubsub.stop()
+    assert client.round_trips == 2 and len(client.published) == 6
+
+
+@pytest.mark.asyncio
+async def test_topic_messages_use_topic_channels_and_dynamic_subscriptions():
+    class TopicManager(DummyManager):
+        topic_connections = {"alerts": {"c1"}}
+
+    client = BatchingRedis(asyncio.Queue())
+    pubsub = RedisWebSocketPubSub("redis://fake", channel="ws", client=client)
+    await pubsub.start(TopicManager())
+    await asyncio.sleep(0)
+    subscribed = client.pubsubs[0]._subscribed
+    assert subscribed == ["ws", "ws:topic:alerts"]
+
+    pubsub.watch_topic("tasks")
+    pubsub.unwatch_topic("alerts")
+    await asyncio.sleep(0)
+    assert subscribed == ["ws", "ws:topic:tasks"]
+
+    await pubsub.publish_frame("{}", "alert", "tasks")
+    await pubsub.publish_frame("{}", "notification")
+    assert [c for c, _ in client.published] == ["ws:topic:tasks", "ws"]
+    await pubsub.stop()
+
+
+@pytest.mark.asyncio
+async def test_subscriber_skips_own_messages_and_forwards_frames():
+    from src.core.ws_pubsub import encode_envelope
+
+    class FrameManager(DummyManager):
+        def __init__(self):
+            super().__init__()
+            self.frames: list[tuple[str, str, Any]] = []
+
+        async def broadcast_local_frame(self, frame: str, event_type: str, topic=None) -> int:
+            self.frames.append((frame, event_type, topic))
+            return 1
+
+    queue: asyncio.Queue = asyncio.Queue()
+    mgr = FrameManager()
+    pubsub = RedisWebSocketPubSub("redis://fake", channel="ws", client=BatchingRedis(queue))
+    await pubsub.start(mgr)
+
+    await queue.put({"type": "message", "data": encode_envelope('{"a":1}', "alert", "x", pubsub.origin)})
+    await queue.put({"type": "message", "data": encode_envelope('{"b":2}', "alert", "x", "otro")})
+    await asyncio.sleep(0.02)
+    await pubsub.stop()
+
+    assert mgr.frames == [('{"b":2}', "alert", "x")]